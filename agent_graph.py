@@ -3,7 +3,10 @@ Sistema de Agente Multimodal baseado em Grafos usando LangGraph.
 """
 
 import os
+import time
+import asyncio
 import operator
+import threading
 from dotenv import load_dotenv
 from typing import TypedDict, Annotated, List
 
@@ -11,28 +14,41 @@ from typing import TypedDict, Annotated, List
 from langchain_core.messages import BaseMessage, AIMessage, HumanMessage
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.output_parsers import StrOutputParser
+from langchain_core.runnables import RunnableLambda
 from langchain_openai import ChatOpenAI
 from langchain_community.chat_message_histories import ChatMessageHistory
 from langgraph.graph import END, StateGraph
 
+# Backends locais (FAKE_BACKENDS=true) precisam estar ativos antes dos clientes
+import fake_backends
+fake_backends.ativar_se_configurado()
+
 # Importar ferramentas especializadas
 from tools.categorias import categorias_intencao
-from tools.busca_contabilidade import busca_contabilidade
-from tools.busca_assistencia_de_banco_de_dados import busca_assistencia_de_banco_de_dados
-from tools.busca_assistencia_gestao import busca_assistencia_gestao
-from tools.busca_geral import busca_geral
-from tools.gerar_imagem import gerar_imagem
-from tools.analisar_imagem import analisar_imagem
-from tools.gerar_audio import gerar_audio
-from tools.analisar_audio import analisar_audio
-from tools.gerar_video import gerar_video
-from tools.analisar_video import analisar_video
+from tools.busca_contabilidade import busca_contabilidade, abusca_contabilidade
+from tools.busca_assistencia_de_banco_de_dados import (
+    busca_assistencia_de_banco_de_dados,
+    abusca_assistencia_de_banco_de_dados,
+)
+from tools.busca_assistencia_gestao import busca_assistencia_gestao, abusca_assistencia_gestao
+from tools.busca_geral import busca_geral, abusca_geral
+from tools.gerar_imagem import gerar_imagem, agerar_imagem
+from tools.analisar_imagem import analisar_imagem, aanalisar_imagem
+from tools.gerar_audio import gerar_audio, agerar_audio
+from tools.analisar_audio import analisar_audio, aanalisar_audio
+from tools.gerar_video import gerar_video, agerar_video
+from tools.analisar_video import analisar_video, aanalisar_video
+from speculative_retrieval import classificar_com_especulacao
+from single_flight import coalescedor, chave_coalescencia
+import tracing
+import rate_limiter
+import deadlines
 
 # Carregar variáveis de ambiente
 load_dotenv()
 
 # Modelo de linguagem
-llm = ChatOpenAI(model='gpt-4o-mini', temperature=0.3)
+llm = ChatOpenAI(model='gpt-4o-mini', temperature=0.3, **rate_limiter.opcoes_openai())
 
 # --- ESTADO DO AGENTE ---
 class AgentState(TypedDict):
@@ -41,60 +57,134 @@ class AgentState(TypedDict):
     """
     input: str
     intencao: str
+    # Todas as intenções da mensagem (a primeira é a principal)
+    intencoes: List[str]
     resposta_final: str
+    # Respostas dos nós especialistas executados em paralelo
+    respostas_parciais: Annotated[List[dict], operator.add]
     arquivo_upload: str
+    # Trechos recuperados em paralelo à classificação, por domínio
+    contextos_prefetch: dict
+    # Instante (epoch) em que a resposta precisa estar pronta
+    prazo: float
+    # Etapas abandonadas por falta de tempo, com o motivo
+    degradacoes: Annotated[List[dict], operator.add]
     # Histórico que se acumula no LangGraph
     history: Annotated[List[BaseMessage], operator.add]
 
 # --- NÓS DO GRAFO ---
 
-def classificar_intencao(state: AgentState) -> dict:
-    """
-    Classifica a intenção do usuário usando o histórico para contexto.
-    """
-    print("--- 🧠 Classificando intenção ---")
-    
+# Máximo de intenções atendidas em paralelo numa mesma mensagem
+MAX_INTENCOES = int(os.getenv("MAX_INTENCOES", "3"))
+
+def _criar_chain_classificador():
+    """Monta a cadeia de classificação de intenção."""
     prompt = ChatPromptTemplate.from_messages([
         ("system", """Você é um classificador de intenção para um assistente multimodal. 
         Analise a última mensagem do usuário e classifique em uma das categorias:
         {categorias}
         
-        Considere o contexto da conversa. Responda APENAS com o nome da categoria."""),
+        Considere o contexto da conversa. Responda APENAS com o nome da categoria.
+        Se a mensagem fizer mais de um pedido (ex.: explicar um assunto e gerar uma imagem),
+        responda com as categorias separadas por vírgula, na ordem em que aparecem."""),
         MessagesPlaceholder(variable_name="history"),
     ])
+    return prompt | llm | StrOutputParser()
+
+def _extrair_intencoes(resposta: str) -> List[str]:
+    """Converte a resposta do classificador em uma lista de intenções sem repetição."""
+    intencoes = []
+    for parte in resposta.split(","):
+        intencao = parte.strip().lower()
+        if intencao and intencao not in intencoes:
+            intencoes.append(intencao)
+    # Categorias desconhecidas são descartadas quando há alguma válida
+    validas = [i for i in intencoes if i in categorias_intencao]
+    return (validas or intencoes or ["busca_geral"])[:MAX_INTENCOES]
+
+def classificar_intencao(state: AgentState) -> dict:
+    """
+    Classifica a intenção do usuário usando o histórico para contexto.
+    """
+    print("--- 🧠 Classificando intenção ---")
     
-    chain = prompt | llm | StrOutputParser()
+    chain = _criar_chain_classificador()
     intencao_classificada = chain.invoke({
         "history": state['history'],
         "categorias": ", ".join(categorias_intencao)
     })
     
     print(f"Intenção classificada: {intencao_classificada}")
-    return {"intencao": intencao_classificada.strip()}
+    intencoes = _extrair_intencoes(intencao_classificada)
+    return {"intencao": intencoes[0], "intencoes": intencoes}
+
+async def aclassificar_intencao(state: AgentState) -> dict:
+    """
+    Versão assíncrona de `classificar_intencao`.
+    
+    Inicia a recuperação de contexto dos domínios mais prováveis ao mesmo
+    tempo que a classificação; os nós escolhidos reaproveitam os trechos.
+    """
+    print("--- 🧠 Classificando intenção ---")
+    
+    chain = _criar_chain_classificador()
+    
+    degradacoes = []
+    
+    async def _classificar():
+        try:
+            intencao_classificada = await asyncio.wait_for(
+                chain.ainvoke({
+                    "history": state['history'],
+                    "categorias": ", ".join(categorias_intencao)
+                }),
+                timeout=deadlines.tempo_classificador(state.get('prazo')),
+            )
+        except asyncio.TimeoutError:
+            # Sem tempo para classificar: seguir com a busca geral
+            degradacoes.append(deadlines.registrar_degradacao("classificador", "classificacao", "prazo"))
+            return ["busca_geral"]
+        print(f"Intenção classificada: {intencao_classificada}")
+        return _extrair_intencoes(intencao_classificada)
+    
+    intencoes, contextos = await classificar_com_especulacao(_classificar(), state['input'])
+    return {
+        "intencao": intencoes[0],
+        "intencoes": intencoes,
+        "contextos_prefetch": contextos,
+        "degradacoes": degradacoes,
+    }
+
+def _resposta_parcial(intencao: str, resposta: str, degradacoes=None) -> dict:
+    """Formata a saída de um nó especialista para a etapa de combinação."""
+    return {
+        "respostas_parciais": [{"intencao": intencao, "resposta": resposta}],
+        "degradacoes": degradacoes or [],
+    }
 
 def node_contabilidade(state: AgentState) -> dict:
     """Nó especializado em contabilidade."""
     print("--- 📊 Processando consulta contábil ---")
     resposta = busca_contabilidade(state['input'])
-    return {"resposta_final": resposta}
+    return _resposta_parcial("contabilidade", resposta)
 
 def node_banco_dados(state: AgentState) -> dict:
     """Nó especializado em banco de dados."""
     print("--- 🗄️ Processando consulta de banco de dados ---")
     resposta = busca_assistencia_de_banco_de_dados(state['input'])
-    return {"resposta_final": resposta}
+    return _resposta_parcial("banco_de_dados", resposta)
 
 def node_gestao(state: AgentState) -> dict:
     """Nó especializado em gestão."""
     print("--- 📈 Processando consulta de gestão ---")
     resposta = busca_assistencia_gestao(state['input'])
-    return {"resposta_final": resposta}
+    return _resposta_parcial("gestao", resposta)
 
 def node_gerar_imagem(state: AgentState) -> dict:
     """Nó para geração de imagens."""
     print("--- 🎨 Gerando imagem ---")
     resposta = gerar_imagem(state['input'])
-    return {"resposta_final": resposta}
+    return _resposta_parcial("gerar_imagem", resposta)
 
 def node_analisar_imagem(state: AgentState) -> dict:
     """Nó para análise de imagens."""
@@ -103,13 +193,13 @@ def node_analisar_imagem(state: AgentState) -> dict:
         resposta = analisar_imagem(state['arquivo_upload'])
     else:
         resposta = "Por favor, faça upload de uma imagem para análise."
-    return {"resposta_final": resposta}
+    return _resposta_parcial("analisar_imagem", resposta)
 
 def node_gerar_audio(state: AgentState) -> dict:
     """Nó para geração de áudio."""
     print("--- 🎵 Gerando áudio ---")
     resposta = gerar_audio(state['input'])
-    return {"resposta_final": resposta}
+    return _resposta_parcial("gerar_audio", resposta)
 
 def node_analisar_audio(state: AgentState) -> dict:
     """Nó para análise de áudio."""
@@ -118,13 +208,13 @@ def node_analisar_audio(state: AgentState) -> dict:
         resposta = analisar_audio(state['arquivo_upload'])
     else:
         resposta = "Por favor, faça upload de um arquivo de áudio para análise."
-    return {"resposta_final": resposta}
+    return _resposta_parcial("analisar_audio", resposta)
 
 def node_gerar_video(state: AgentState) -> dict:
     """Nó para geração de vídeo."""
     print("--- 🎬 Gerando vídeo ---")
     resposta = gerar_video(state['input'])
-    return {"resposta_final": resposta}
+    return _resposta_parcial("gerar_video", resposta)
 
 def node_analisar_video(state: AgentState) -> dict:
     """Nó para análise de vídeo."""
@@ -133,131 +223,414 @@ def node_analisar_video(state: AgentState) -> dict:
         resposta = analisar_video(state['arquivo_upload'])
     else:
         resposta = "Por favor, faça upload de um arquivo de vídeo para análise."
-    return {"resposta_final": resposta}
+    return _resposta_parcial("analisar_video", resposta)
 
 def node_busca_geral(state: AgentState) -> dict:
     """Nó para busca geral."""
     print("--- 🔍 Processando busca geral ---")
     resposta = busca_geral(state['input'])
-    return {"resposta_final": resposta}
+    return _resposta_parcial("busca_geral", resposta)
+
+# --- NÓS ASSÍNCRONOS ---
+# Mesma lógica dos nós acima, usando as versões assíncronas das ferramentas.
+# São usados por `ainvoke`; `invoke` continua usando os nós síncronos.
+# Nós que dependem só do texto coalescem perguntas idênticas em andamento.
+# Cada nó respeita o prazo da requisição, degradando nas etapas listadas
+# (ver `deadlines.aexecutar_com_prazo`).
+
+async def anode_contabilidade(state: AgentState) -> dict:
+    """Nó especializado em contabilidade (assíncrono)."""
+    print("--- 📊 Processando consulta contábil ---")
+    pergunta = state['input']
+    contexto = (state.get('contextos_prefetch') or {}).get('contabilidade')
+    resposta, degradacoes = await deadlines.aexecutar_com_prazo("contabilidade", pergunta, state.get('prazo'), [
+        ("completa", lambda: coalescedor.executar(
+            chave_coalescencia("contabilidade", pergunta, contexto),
+            lambda: abusca_contabilidade(pergunta, contexto=contexto),
+        ), 0.6),
+        ("sem_rag", lambda: abusca_contabilidade(pergunta, usar_rag=False), 0.7),
+        ("modelo_pequeno", lambda: abusca_contabilidade(pergunta, usar_rag=False, tier="pequeno"), 1.0),
+    ])
+    return _resposta_parcial("contabilidade", resposta, degradacoes)
+
+async def anode_banco_dados(state: AgentState) -> dict:
+    """Nó especializado em banco de dados (assíncrono)."""
+    print("--- 🗄️ Processando consulta de banco de dados ---")
+    pergunta = state['input']
+    resposta, degradacoes = await deadlines.aexecutar_com_prazo("banco_de_dados", pergunta, state.get('prazo'), [
+        ("completa", lambda: coalescedor.executar(
+            chave_coalescencia("banco_de_dados", pergunta),
+            lambda: abusca_assistencia_de_banco_de_dados(pergunta),
+        ), 0.7),
+        ("modelo_pequeno", lambda: abusca_assistencia_de_banco_de_dados(pergunta, tier="pequeno"), 1.0),
+    ])
+    return _resposta_parcial("banco_de_dados", resposta, degradacoes)
+
+async def anode_gestao(state: AgentState) -> dict:
+    """Nó especializado em gestão (assíncrono)."""
+    print("--- 📈 Processando consulta de gestão ---")
+    pergunta = state['input']
+    contexto = (state.get('contextos_prefetch') or {}).get('gestao')
+    resposta, degradacoes = await deadlines.aexecutar_com_prazo("gestao", pergunta, state.get('prazo'), [
+        ("completa", lambda: coalescedor.executar(
+            chave_coalescencia("gestao", pergunta, contexto),
+            lambda: abusca_assistencia_gestao(pergunta, contexto=contexto),
+        ), 0.6),
+        ("sem_rag", lambda: abusca_assistencia_gestao(pergunta, usar_rag=False), 0.7),
+        ("modelo_pequeno", lambda: abusca_assistencia_gestao(pergunta, usar_rag=False, tier="pequeno"), 1.0),
+    ])
+    return _resposta_parcial("gestao", resposta, degradacoes)
+
+async def anode_gerar_imagem(state: AgentState) -> dict:
+    """Nó para geração de imagens (assíncrono)."""
+    print("--- 🎨 Gerando imagem ---")
+    resposta, degradacoes = await deadlines.aexecutar_com_prazo("gerar_imagem", state['input'], state.get('prazo'), [
+        ("completa", lambda: agerar_imagem(state['input']), 1.0),
+    ])
+    return _resposta_parcial("gerar_imagem", resposta, degradacoes)
+
+async def anode_analisar_imagem(state: AgentState) -> dict:
+    """Nó para análise de imagens (assíncrono)."""
+    print("--- 🔍 Analisando imagem ---")
+    if state.get('arquivo_upload'):
+        resposta, degradacoes = await deadlines.aexecutar_com_prazo("analisar_imagem", state['input'], state.get('prazo'), [
+            ("completa", lambda: aanalisar_imagem(state['arquivo_upload']), 1.0),
+        ], usar_cache=False)
+    else:
+        resposta, degradacoes = "Por favor, faça upload de uma imagem para análise.", []
+    return _resposta_parcial("analisar_imagem", resposta, degradacoes)
+
+async def anode_gerar_audio(state: AgentState) -> dict:
+    """Nó para geração de áudio (assíncrono)."""
+    print("--- 🎵 Gerando áudio ---")
+    resposta, degradacoes = await deadlines.aexecutar_com_prazo("gerar_audio", state['input'], state.get('prazo'), [
+        ("completa", lambda: agerar_audio(state['input']), 1.0),
+    ])
+    return _resposta_parcial("gerar_audio", resposta, degradacoes)
+
+async def anode_analisar_audio(state: AgentState) -> dict:
+    """Nó para análise de áudio (assíncrono)."""
+    print("--- 🎧 Analisando áudio ---")
+    if state.get('arquivo_upload'):
+        resposta, degradacoes = await deadlines.aexecutar_com_prazo("analisar_audio", state['input'], state.get('prazo'), [
+            ("completa", lambda: aanalisar_audio(state['arquivo_upload']), 1.0),
+        ], usar_cache=False)
+    else:
+        resposta, degradacoes = "Por favor, faça upload de um arquivo de áudio para análise.", []
+    return _resposta_parcial("analisar_audio", resposta, degradacoes)
+
+async def anode_gerar_video(state: AgentState) -> dict:
+    """Nó para geração de vídeo (assíncrono)."""
+    print("--- 🎬 Gerando vídeo ---")
+    resposta, degradacoes = await deadlines.aexecutar_com_prazo("gerar_video", state['input'], state.get('prazo'), [
+        ("completa", lambda: agerar_video(state['input']), 1.0),
+    ])
+    return _resposta_parcial("gerar_video", resposta, degradacoes)
+
+async def anode_analisar_video(state: AgentState) -> dict:
+    """Nó para análise de vídeo (assíncrono)."""
+    print("--- 📹 Analisando vídeo ---")
+    if state.get('arquivo_upload'):
+        resposta, degradacoes = await deadlines.aexecutar_com_prazo("analisar_video", state['input'], state.get('prazo'), [
+            ("completa", lambda: aanalisar_video(state['arquivo_upload']), 1.0),
+        ], usar_cache=False)
+    else:
+        resposta, degradacoes = "Por favor, faça upload de um arquivo de vídeo para análise.", []
+    return _resposta_parcial("analisar_video", resposta, degradacoes)
+
+async def anode_busca_geral(state: AgentState) -> dict:
+    """Nó para busca geral (assíncrono)."""
+    print("--- 🔍 Processando busca geral ---")
+    pergunta = state['input']
+    resposta, degradacoes = await deadlines.aexecutar_com_prazo("busca_geral", pergunta, state.get('prazo'), [
+        ("completa", lambda: coalescedor.executar(
+            chave_coalescencia("busca_geral", pergunta),
+            lambda: abusca_geral(pergunta),
+        ), 1.0),
+    ])
+    return _resposta_parcial("busca_geral", resposta, degradacoes)
 
 # --- LÓGICA DE ROTEAMENTO ---
-def decidir_proximo_passo(state: AgentState) -> str:
-    """Decide qual nó executar baseado na intenção classificada."""
-    intencao = state['intencao'].lower()
-    print(f"--- 🛤️ Roteando para: {intencao} ---")
+ROTEAMENTO = {
+    "contabilidade": "node_contabilidade",
+    "banco_de_dados": "node_banco_dados", 
+    "gestao": "node_gestao",
+    "gerar_imagem": "node_gerar_imagem",
+    "analisar_imagem": "node_analisar_imagem",
+    "gerar_audio": "node_gerar_audio",
+    "analisar_audio": "node_analisar_audio",
+    "gerar_video": "node_gerar_video",
+    "analisar_video": "node_analisar_video",
+    "busca_geral": "node_busca_geral"
+}
+
+def decidir_proximo_passo(state: AgentState) -> List[str]:
+    """
+    Decide quais nós executar baseado nas intenções classificadas.
     
-    roteamento = {
-        "contabilidade": "node_contabilidade",
-        "banco_de_dados": "node_banco_dados", 
-        "gestao": "node_gestao",
-        "gerar_imagem": "node_gerar_imagem",
-        "analisar_imagem": "node_analisar_imagem",
-        "gerar_audio": "node_gerar_audio",
-        "analisar_audio": "node_analisar_audio",
-        "gerar_video": "node_gerar_video",
-        "analisar_video": "node_analisar_video",
-        "busca_geral": "node_busca_geral"
-    }
+    Retornar mais de um nó faz o LangGraph executá-los em paralelo
+    no mesmo passo; `node_combinar` junta as respostas em seguida.
+    """
+    intencoes = state.get('intencoes') or [state['intencao']]
+    print(f"--- 🛤️ Roteando para: {', '.join(intencoes)} ---")
     
-    return roteamento.get(intencao, "node_busca_geral")
+    nos = []
+    for intencao in intencoes:
+        no = ROTEAMENTO.get(intencao.lower(), "node_busca_geral")
+        if no not in nos:
+            nos.append(no)
+    return nos
+
+# Quando nenhum especialista chegou a uma resposta (todos degradaram sem texto)
+MENSAGEM_SEM_RESPOSTA = (
+    "Desculpe, não consegui responder à sua mensagem agora. "
+    "Tente novamente em instantes ou reformule a pergunta."
+)
+
+def node_combinar(state: AgentState) -> dict:
+    """Combina as respostas dos nós especialistas na resposta final."""
+    # Resposta vazia não vira seção em branco na combinação
+    parciais = [p for p in state.get('respostas_parciais') or [] if (p.get('resposta') or '').strip()]
+    if not parciais:
+        print("--- ⚠️ Nenhum especialista respondeu ---")
+        return {"resposta_final": MENSAGEM_SEM_RESPOSTA}
+    if len(parciais) == 1:
+        return {"resposta_final": parciais[0]['resposta']}
+    
+    print(f"--- 🧩 Combinando {len(parciais)} respostas ---")
+    
+    # Manter a ordem em que os pedidos aparecem na mensagem
+    ordem = {intencao: i for i, intencao in enumerate(state.get('intencoes') or [])}
+    parciais = sorted(parciais, key=lambda p: ordem.get(p['intencao'], len(ordem)))
+    
+    secoes = [
+        f"### {p['intencao'].replace('_', ' ').capitalize()}\n\n{p['resposta'].strip()}"
+        for p in parciais
+    ]
+    return {"resposta_final": "\n\n---\n\n".join(secoes)}
 
 # --- CONSTRUÇÃO DO GRAFO ---
+def _no(nome, func, afunc):
+    """
+    Combina as versões síncrona e assíncrona de um nó em um único runnable,
+    registrando o tempo do nó no trace da requisição.
+    """
+    return RunnableLambda(tracing.rastrear_no(nome, func), afunc=tracing.arastrear_no(nome, afunc))
+
 def criar_grafo_assistente():
     """Cria e retorna o grafo do assistente multimodal."""
     
     graph = StateGraph(AgentState)
     
-    # Adicionar nós
-    graph.add_node('classificador', classificar_intencao)
-    graph.add_node('node_contabilidade', node_contabilidade)
-    graph.add_node('node_banco_dados', node_banco_dados)
-    graph.add_node('node_gestao', node_gestao)
-    graph.add_node('node_gerar_imagem', node_gerar_imagem)
-    graph.add_node('node_analisar_imagem', node_analisar_imagem)
-    graph.add_node('node_gerar_audio', node_gerar_audio)
-    graph.add_node('node_analisar_audio', node_analisar_audio)
-    graph.add_node('node_gerar_video', node_gerar_video)
-    graph.add_node('node_analisar_video', node_analisar_video)
-    graph.add_node('node_busca_geral', node_busca_geral)
+    # Adicionar nós (cada nó tem versão síncrona e assíncrona)
+    graph.add_node('classificador', _no('classificador', classificar_intencao, aclassificar_intencao))
+    graph.add_node('node_contabilidade', _no('node_contabilidade', node_contabilidade, anode_contabilidade))
+    graph.add_node('node_banco_dados', _no('node_banco_dados', node_banco_dados, anode_banco_dados))
+    graph.add_node('node_gestao', _no('node_gestao', node_gestao, anode_gestao))
+    graph.add_node('node_gerar_imagem', _no('node_gerar_imagem', node_gerar_imagem, anode_gerar_imagem))
+    graph.add_node('node_analisar_imagem', _no('node_analisar_imagem', node_analisar_imagem, anode_analisar_imagem))
+    graph.add_node('node_gerar_audio', _no('node_gerar_audio', node_gerar_audio, anode_gerar_audio))
+    graph.add_node('node_analisar_audio', _no('node_analisar_audio', node_analisar_audio, anode_analisar_audio))
+    graph.add_node('node_gerar_video', _no('node_gerar_video', node_gerar_video, anode_gerar_video))
+    graph.add_node('node_analisar_video', _no('node_analisar_video', node_analisar_video, anode_analisar_video))
+    graph.add_node('node_busca_geral', _no('node_busca_geral', node_busca_geral, anode_busca_geral))
+    graph.add_node('node_combinar', tracing.rastrear_no('node_combinar', node_combinar))
     
     # Definir ponto de entrada
     graph.set_entry_point('classificador')
     
-    # Adicionar arestas condicionais
+    # Adicionar arestas condicionais (um ou mais nós em paralelo)
     graph.add_conditional_edges(
         'classificador',
         decidir_proximo_passo,
-        {
-            "node_contabilidade": "node_contabilidade",
-            "node_banco_dados": "node_banco_dados",
-            "node_gestao": "node_gestao",
-            "node_gerar_imagem": "node_gerar_imagem",
-            "node_analisar_imagem": "node_analisar_imagem",
-            "node_gerar_audio": "node_gerar_audio",
-            "node_analisar_audio": "node_analisar_audio",
-            "node_gerar_video": "node_gerar_video",
-            "node_analisar_video": "node_analisar_video",
-            "node_busca_geral": "node_busca_geral"
-        }
+        {no: no for no in ROTEAMENTO.values()}
     )
     
-    # Adicionar arestas para o fim
-    for node in ["node_contabilidade", "node_banco_dados", "node_gestao", 
-                 "node_gerar_imagem", "node_analisar_imagem", "node_gerar_audio",
-                 "node_analisar_audio", "node_gerar_video", "node_analisar_video",
-                 "node_busca_geral"]:
-        graph.add_edge(node, END)
+    # Todos os especialistas convergem para a combinação das respostas
+    for node in ROTEAMENTO.values():
+        graph.add_edge(node, 'node_combinar')
+    graph.add_edge('node_combinar', END)
     
     return graph.compile()
 
+# Grafo compilado do processo: os nós só dependem do estado recebido, então
+# uma única instância atende todas as sessões
+_grafo_compilado = None
+_grafo_lock = threading.Lock()
+
+def obter_grafo_compilado():
+    """Retorna o grafo compilado do processo (compila na primeira chamada)."""
+    global _grafo_compilado
+    if _grafo_compilado is None:
+        with _grafo_lock:
+            if _grafo_compilado is None:
+                _grafo_compilado = criar_grafo_assistente()
+    return _grafo_compilado
+
+# --- EXECUÇÃO SÍNCRONA SOBRE O CAMINHO ASSÍNCRONO ---
+_loop_compartilhado = None
+_loop_lock = threading.Lock()
+
+def _obter_loop_compartilhado():
+    """
+    Retorna o loop de eventos do processo usado pela API síncrona.
+    
+    Um único loop em thread dedicada evita recriar clientes HTTP assíncronos
+    a cada chamada (como aconteceria com `asyncio.run`) e funciona mesmo
+    quando o chamador não pode bloquear um loop próprio, como no Streamlit.
+    """
+    global _loop_compartilhado
+    with _loop_lock:
+        if _loop_compartilhado is None:
+            _loop_compartilhado = asyncio.new_event_loop()
+            threading.Thread(
+                target=_loop_compartilhado.run_forever,
+                name="assistente-async",
+                daemon=True,
+            ).start()
+    return _loop_compartilhado
+
+def executar_sincrono(coro):
+    """Executa uma corrotina no loop compartilhado e aguarda o resultado."""
+    return asyncio.run_coroutine_threadsafe(coro, _obter_loop_compartilhado()).result()
+
 # --- CLASSE PRINCIPAL DO AGENTE ---
 class AssistenteMultimodalGraph:
-    """Classe principal do assistente baseado em grafos."""
+    """
+    Sessão de conversa com o assistente baseado em grafos.
     
-    def __init__(self):
-        self.app = criar_grafo_assistente()
-        self.history = ChatMessageHistory()
+    O grafo compilado (sem checkpointer) é o mesmo para todas as sessões
+    do processo; a sessão guarda apenas o próprio histórico, que entra no
+    estado inicial de cada execução.
+    """
     
-    def processar_mensagem(self, input_usuario: str, arquivo_upload=None) -> dict:
+    def __init__(self, sessao_id=None):
         """
-        Processa uma mensagem do usuário através do grafo.
+        Args:
+            sessao_id: Identificador da sessão; com ele o histórico é
+                persistido no SQLite e retomado após reinícios (opcional)
+        """
+        self.app = obter_grafo_compilado()
+        self.sessao_id = sessao_id
+        self.history = self._criar_historico()
+    
+    def _criar_historico(self):
+        if self.sessao_id is None:
+            return ChatMessageHistory()
+        from session_history import HistoricoPersistente
+        return HistoricoPersistente(self.sessao_id)
+    
+    async def astream_mensagem(self, input_usuario: str, arquivo_upload=None):
+        """
+        Processa uma mensagem emitindo eventos à medida que os nós terminam.
+        
+        Eventos:
+            {"evento": "etapa", "no": ...}: um nó do grafo terminou
+            {"evento": "parcial", "intencao": ..., "resposta": ...}: resposta
+                de um especialista, antes da combinação
+            {"evento": "resposta", "resposta_final": ..., "intencao": ...,
+                "intencoes": ..., "degradacoes": ...}: sempre o último
         
         Args:
             input_usuario: Texto da mensagem do usuário
             arquivo_upload: Arquivo carregado (opcional)
-            
-        Returns:
-            dict: Resultado com resposta_final e intencao
         """
         # Adicionar mensagem do usuário ao histórico
         self.history.add_user_message(input_usuario)
         
         # Preparar estado inicial
+        prazo = deadlines.criar_prazo()
         estado_inicial = {
             "history": self.history.messages,
             "input": input_usuario,
-            "arquivo_upload": arquivo_upload
+            "arquivo_upload": arquivo_upload,
+            "prazo": prazo
         }
+        # Os nós degradam sozinhos; este limite só cobre o que escapar deles
+        fim = time.monotonic() + deadlines.restante(prazo) + deadlines.get_deadline_config()["tolerancia"]
         
         # Executar o grafo
-        resultado = self.app.invoke(estado_inicial)
-        
-        # Extrair resposta e intenção
-        resposta_agente = resultado.get('resposta_final', 'Desculpe, não consegui processar sua solicitação.')
-        intencao = resultado.get('intencao', 'desconhecido')
+        resultado = {}
+        with tracing.trace_requisicao(input=input_usuario, sessao=self.sessao_id) as trace:
+            config = tracing.callbacks_da_requisicao(trace)
+            execucao = self.app.astream(estado_inicial, config=config, stream_mode=["updates", "values"])
+            try:
+                while True:
+                    try:
+                        modo, dados = await asyncio.wait_for(
+                            execucao.__anext__(), timeout=max(0.0, fim - time.monotonic())
+                        )
+                    except StopAsyncIteration:
+                        break
+                    if modo == "values":
+                        resultado = dados
+                        continue
+                    for no, atualizacao in dados.items():
+                        yield {"evento": "etapa", "no": no}
+                        for parcial in (atualizacao or {}).get("respostas_parciais", []):
+                            yield {"evento": "parcial", **parcial}
+            except asyncio.TimeoutError:
+                resultado = {
+                    "resposta_final": deadlines.MENSAGEM_SEM_TEMPO,
+                    "degradacoes": [deadlines.registrar_degradacao("grafo", "mensagem", "prazo")],
+                }
+            finally:
+                await execucao.aclose()
+            
+            # Extrair resposta e intenção
+            resposta_agente = resultado.get('resposta_final', 'Desculpe, não consegui processar sua solicitação.')
+            intencao = resultado.get('intencao', 'desconhecido')
+            if trace is not None:
+                trace.atributos['intencoes'] = resultado.get('intencoes', [intencao])
+                trace.atributos['degradacoes'] = resultado.get('degradacoes', [])
         
         # Adicionar resposta ao histórico
         self.history.add_ai_message(resposta_agente)
         
-        return {
+        yield {
+            'evento': 'resposta',
             'resposta_final': resposta_agente,
-            'intencao': intencao
+            'intencao': intencao,
+            'intencoes': resultado.get('intencoes', [intencao]),
+            'degradacoes': resultado.get('degradacoes', [])
         }
     
+    async def aprocessar_mensagem(self, input_usuario: str, arquivo_upload=None) -> dict:
+        """
+        Processa uma mensagem do usuário através do grafo de forma assíncrona.
+        
+        Args:
+            input_usuario: Texto da mensagem do usuário
+            arquivo_upload: Arquivo carregado (opcional)
+            
+        Returns:
+            dict: Resultado com resposta_final, intencao, intencoes e degradacoes
+        """
+        resultado = {}
+        async for evento in self.astream_mensagem(input_usuario, arquivo_upload):
+            if evento['evento'] == 'resposta':
+                resultado = {chave: valor for chave, valor in evento.items() if chave != 'evento'}
+        return resultado
+    
+    def processar_mensagem(self, input_usuario: str, arquivo_upload=None) -> dict:
+        """
+        Processa uma mensagem do usuário através do grafo.
+        
+        Wrapper síncrono de `aprocessar_mensagem`, executado no loop
+        compartilhado do processo.
+        
+        Args:
+            input_usuario: Texto da mensagem do usuário
+            arquivo_upload: Arquivo carregado (opcional)
+            
+        Returns:
+            dict: Resultado com resposta_final, intencao, intencoes e degradacoes
+        """
+        return executar_sincrono(self.aprocessar_mensagem(input_usuario, arquivo_upload))
+    
     def limpar_historico(self):
         """Limpa o histórico da conversa."""
-        self.history = ChatMessageHistory()
+        self.history.clear()
 
 # --- FUNÇÃO PARA TESTE EM LINHA DE COMANDO ---
 def main():
@@ -17,6 +17,12 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path
 
+from tools import views
+
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('api/chat/', views.chat, name='chat'),
+    path('api/chat/stream/', views.chat_stream, name='chat_stream'),
+    path('api/sessoes/<str:sessao_id>/', views.sessao, name='sessao'),
+    path('api/status/', views.status, name='status'),
 ]
@@ -0,0 +1,298 @@
+"""
+Exportação dos eventos do LearningSystem em formato colunar.
+
+Lê só os segmentos diários do log (`events-AAAA-MM-DD.jsonl`) dentro da
+janela pedida, em blocos de tamanho fixo, e grava cada bloco em Parquet ou
+CSV particionado por dia:
+
+    <saida>/interactions/day=2026-10-19/part-00000.parquet
+    <saida>/feedback/day=2026-10-19/part-00000.parquet
+    <saida>/summary_by_day.<formato>
+    <saida>/summary.json
+
+O resumo é agregado bloco a bloco com pandas (contagens por dia e
+intenção, feedback por tipo, latência com o mesmo histograma dos baldes),
+então a memória fica no tamanho de um bloco e o tempo acompanha o número
+de dias da janela, não o tamanho total do log. Dias já aposentados para
+`summaries.jsonl` entram só no resumo.
+
+Uso:
+    python analytics_export.py --inicio 2026-10-01 --fim 2026-10-19
+    python analytics_export.py --formato csv --saida export_csv
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from datetime import datetime
+
+import pandas as pd
+
+import learning_system
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+COLUNAS = {
+    "interaction": ["timestamp", "user_input", "intent", "model_used", "latency_ms"],
+    "feedback": ["timestamp", "user_input", "response", "feedback_type"],
+}
+PASTAS = {"interaction": "interactions", "feedback": "feedback"}
+BINS_LATENCIA = [0.0] + learning_system.LIMITES_LATENCIA
+
+def segmentos_da_janela(diretorio, inicio=None, fim=None):
+    """[(dia, caminho)] dos segmentos com dia entre `inicio` e `fim` (AAAA-MM-DD, inclusive)."""
+    segmentos = []
+    for nome in learning_system.listar_segmentos(diretorio):
+        dia = nome[len(learning_system.PREFIXO_SEGMENTO):-len(".jsonl")]
+        if (inicio and dia < inicio) or (fim and dia > fim):
+            continue
+        segmentos.append((dia, os.path.join(diretorio, nome)))
+    return segmentos
+
+def ler_em_blocos(caminho, tamanho_bloco=50000):
+    """Lê um segmento em blocos: {tipo: DataFrame} com no máximo `tamanho_bloco` eventos."""
+    registros = {"interaction": [], "feedback": []}
+    with open(caminho, 'r', encoding='utf-8') as f:
+        for linha in f:
+            if not linha.endswith("\n"):
+                break  # gravação em andamento
+            if not linha.strip():
+                continue
+            evento = json.loads(linha)
+            registros["feedback" if evento.get("type") == "feedback" else "interaction"].append(evento)
+            if len(registros["interaction"]) + len(registros["feedback"]) >= tamanho_bloco:
+                yield _para_dataframes(registros)
+                registros = {"interaction": [], "feedback": []}
+    if registros["interaction"] or registros["feedback"]:
+        yield _para_dataframes(registros)
+
+def _para_dataframes(registros):
+    """DataFrames com as mesmas colunas e tipos em todos os blocos."""
+    quadros = {}
+    for tipo, linhas in registros.items():
+        if not linhas:
+            continue
+        df = pd.DataFrame.from_records(linhas).reindex(columns=COLUNAS[tipo])
+        df["timestamp"] = pd.to_datetime(df["timestamp"], format="ISO8601")
+        if "latency_ms" in df:
+            df["latency_ms"] = pd.to_numeric(df["latency_ms"]).astype("float64")
+        for coluna in df.columns.difference(["timestamp", "latency_ms"]):
+            df[coluna] = df[coluna].astype("string")
+        quadros[tipo] = df
+    return quadros
+
+
+class ResumoExport:
+    """Agregados por dia somados bloco a bloco (tamanho independe do log)."""
+
+    def __init__(self):
+        self.intencoes = pd.Series(dtype="int64")  # (dia, intenção) -> interações
+        self.feedback = pd.Series(dtype="int64")  # (dia, tipo) -> feedbacks
+        self.latencia = {}  # dia -> {"count", "sum", "max"}
+        self.histograma = pd.Series(dtype="int64")  # (dia, faixa) -> interações
+
+    @staticmethod
+    def _somar(acumulado, parcial):
+        return parcial if acumulado.empty else acumulado.add(parcial, fill_value=0)
+
+    def adicionar(self, dia, quadros):
+        interacoes = quadros.get("interaction")
+        if interacoes is not None:
+            parcial = interacoes.groupby("intent", observed=True).size()
+            parcial.index = pd.MultiIndex.from_product([[dia], parcial.index], names=["day", "intent"])
+            self.intencoes = self._somar(self.intencoes, parcial)
+
+            latencias = interacoes["latency_ms"].dropna()
+            if not latencias.empty:
+                self._somar_latencia(dia, len(latencias), float(latencias.sum()), float(latencias.max()))
+
+                faixas = pd.cut(latencias, bins=BINS_LATENCIA, labels=False, include_lowest=True)
+                parcial = faixas.value_counts()
+                parcial.index = pd.MultiIndex.from_product([[dia], parcial.index.astype(int)], names=["day", "faixa"])
+                self.histograma = self._somar(self.histograma, parcial)
+
+        feedbacks = quadros.get("feedback")
+        if feedbacks is not None:
+            parcial = feedbacks.groupby("feedback_type", observed=True).size()
+            parcial.index = pd.MultiIndex.from_product([[dia], parcial.index], names=["day", "feedback_type"])
+            self.feedback = self._somar(self.feedback, parcial)
+
+    def _somar_latencia(self, dia, contagem, soma, maximo):
+        atual = self.latencia.setdefault(dia, {"count": 0, "sum": 0.0, "max": 0.0})
+        atual["count"] += contagem
+        atual["sum"] += soma
+        atual["max"] = max(atual["max"], maximo)
+
+    def adicionar_resumo_diario(self, resumo):
+        """Dia aposentado do log: entra a partir do balde de `summaries.jsonl`."""
+        dia, balde = resumo["day"], resumo["bucket"]
+        if balde["intents"]:
+            parcial = pd.Series(balde["intents"], dtype="int64")
+            parcial.index = pd.MultiIndex.from_product([[dia], parcial.index], names=["day", "intent"])
+            self.intencoes = self._somar(self.intencoes, parcial)
+        if balde["feedback"]:
+            parcial = pd.Series(balde["feedback"], dtype="int64")
+            parcial.index = pd.MultiIndex.from_product([[dia], parcial.index], names=["day", "feedback_type"])
+            self.feedback = self._somar(self.feedback, parcial)
+        if balde["latency_count"]:
+            self._somar_latencia(dia, balde["latency_count"], balde["latency_sum"], balde["latency_max"])
+            parcial = pd.Series(balde["latency_hist"], dtype="int64")
+            parcial = parcial[parcial > 0]
+            parcial.index = pd.MultiIndex.from_product([[dia], parcial.index], names=["day", "faixa"])
+            self.histograma = self._somar(self.histograma, parcial)
+
+    def por_dia(self):
+        """Uma linha por dia: interações, feedback por tipo e latência média/p95."""
+        colunas = []
+        if not self.intencoes.empty:
+            colunas.append(self.intencoes.groupby(level="day").sum().rename("interactions"))
+            colunas.append(self.intencoes.unstack("intent", fill_value=0).add_prefix("intent_"))
+        if not self.feedback.empty:
+            colunas.append(self.feedback.unstack("feedback_type", fill_value=0).add_prefix("feedback_"))
+        if self.latencia:
+            latencia = pd.DataFrame.from_dict(self.latencia, orient="index")
+            colunas.append((latencia["sum"] / latencia["count"]).rename("latency_avg_ms"))
+            colunas.append(latencia["max"].rename("latency_max_ms"))
+            colunas.append(self._percentis_por_dia(95, latencia["max"]).rename("latency_p95_ms"))
+        if not colunas:
+            return pd.DataFrame()
+        tabela = pd.concat(colunas, axis=1).sort_index()
+        contagens = [c for c in tabela.columns if c == "interactions" or c.startswith(("intent_", "feedback_"))]
+        tabela[contagens] = tabela[contagens].fillna(0).astype("int64")
+        return tabela
+
+    def _percentis_por_dia(self, p, maximos):
+        if self.histograma.empty:
+            return pd.Series(None, index=maximos.index, dtype="float64")
+        histogramas = self.histograma.unstack("faixa", fill_value=0)
+        histogramas = histogramas.reindex(columns=range(len(learning_system.LIMITES_LATENCIA)), fill_value=0)
+        return histogramas.apply(
+            lambda linha: learning_system.percentil_histograma(linha.tolist(), p, maximos[linha.name]),
+            axis=1,
+        )
+
+    @staticmethod
+    def _por_nivel(serie, nivel):
+        # Série vazia não tem o MultiIndex (groupby(level=...) falharia)
+        return pd.Series(dtype="int64") if serie.empty else serie.groupby(level=nivel).sum()
+
+    def totais(self):
+        """Totais da janela inteira (zerados, e latência None, se a janela não tem dados)."""
+        histograma = (self._por_nivel(self.histograma, "faixa")
+                      .reindex(range(len(learning_system.LIMITES_LATENCIA)), fill_value=0))
+        maximo = max((dia["max"] for dia in self.latencia.values()), default=None)
+        contagem = sum(dia["count"] for dia in self.latencia.values())
+        soma = sum(dia["sum"] for dia in self.latencia.values())
+        feedback = {str(k): int(v) for k, v in self._por_nivel(self.feedback, "feedback_type").items()}
+        total_feedback = sum(feedback.values())
+        return {
+            "interactions": int(self.intencoes.sum()),
+            "intents": {str(k): int(v) for k, v in
+                        self._por_nivel(self.intencoes, "intent").sort_values(ascending=False).items()},
+            "feedback": feedback,
+            "success_rate": feedback.get("positive", 0) / total_feedback * 100 if total_feedback else 0.0,
+            "latency_ms": {
+                "count": int(contagem),
+                "avg": round(soma / contagem, 1) if contagem else None,
+                "p50": learning_system.percentil_histograma(histograma.tolist(), 50, maximo) if contagem else None,
+                "p95": learning_system.percentil_histograma(histograma.tolist(), 95, maximo) if contagem else None,
+                "max": maximo,
+            },
+        }
+
+def _gravar(df, caminho, formato):
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    if formato == "parquet":
+        df.to_parquet(caminho, index=False)
+    else:
+        df.to_csv(caminho, index=False)
+
+def exportar(diretorio=None, saida="analytics_export", formato="parquet", inicio=None, fim=None,
+             tamanho_bloco=50000):
+    """
+    Exporta os eventos da janela e o resumo agregado.
+
+    Args:
+        diretorio (str): Diretório do log (padrão: LEARNING_DATA_DIR)
+        saida (str): Diretório de saída
+        formato (str): "parquet" ou "csv"
+        inicio, fim (str): Dias AAAA-MM-DD (inclusive); None = sem limite
+        tamanho_bloco (int): Eventos por bloco lido e por arquivo gravado
+
+    Returns:
+        dict: Eventos e arquivos gravados, duração e totais da janela
+    """
+    if formato == "parquet" and pyarrow is None:
+        raise RuntimeError("Exportação em Parquet requer o pacote pyarrow (ou use formato='csv')")
+    diretorio = diretorio or learning_system.LEARNING_CONFIG["diretorio"]
+    extensao = "parquet" if formato == "parquet" else "csv"
+
+    inicio_execucao = time.perf_counter()
+    resumo = ResumoExport()
+    eventos = 0
+    arquivos = 0
+
+    # Dias já resumidos (sem eventos brutos)
+    caminho_resumos = os.path.join(diretorio, learning_system.ARQUIVO_RESUMOS)
+    if os.path.exists(caminho_resumos):
+        with open(caminho_resumos, 'r', encoding='utf-8') as f:
+            for linha in f:
+                if not linha.strip():
+                    continue
+                resumo_dia = json.loads(linha)
+                if (inicio and resumo_dia["day"] < inicio) or (fim and resumo_dia["day"] > fim):
+                    continue
+                resumo.adicionar_resumo_diario(resumo_dia)
+
+    segmentos = segmentos_da_janela(diretorio, inicio, fim)
+    for dia, caminho in segmentos:
+        for parte, quadros in enumerate(ler_em_blocos(caminho, tamanho_bloco)):
+            for tipo, df in quadros.items():
+                destino = os.path.join(saida, PASTAS[tipo], f"day={dia}", f"part-{parte:05d}.{extensao}")
+                _gravar(df, destino, formato)
+                eventos += len(df)
+                arquivos += 1
+            resumo.adicionar(dia, quadros)
+        print(f"--- 📤 {dia} exportado ---")
+
+    por_dia = resumo.por_dia()
+    _gravar(por_dia.reset_index(names="day"), os.path.join(saida, f"summary_by_day.{extensao}"), formato)
+    totais = resumo.totais()
+    relatorio = {
+        "inicio": inicio,
+        "fim": fim,
+        "formato": formato,
+        "dias": len(segmentos),
+        "eventos": eventos,
+        "arquivos": arquivos,
+        "duracao_s": round(time.perf_counter() - inicio_execucao, 3),
+        "totais": totais,
+        "export_date": datetime.now().isoformat(),
+    }
+    with open(os.path.join(saida, "summary.json"), 'w', encoding='utf-8') as f:
+        json.dump(relatorio, f, ensure_ascii=False, indent=2)
+    return relatorio
+
+def main(argv=None):
+    """Função principal da linha de comando."""
+    parser = argparse.ArgumentParser(description="Exporta os eventos do LearningSystem em Parquet ou CSV.")
+    parser.add_argument("--diretorio", help="Diretório do log (padrão: LEARNING_DATA_DIR)")
+    parser.add_argument("--saida", default="analytics_export", help="Diretório de saída")
+    parser.add_argument("--formato", choices=["parquet", "csv"], default="parquet")
+    parser.add_argument("--inicio", help="Primeiro dia (AAAA-MM-DD)")
+    parser.add_argument("--fim", help="Último dia (AAAA-MM-DD)")
+    parser.add_argument("--bloco", type=int, default=50000, help="Eventos por bloco")
+    args = parser.parse_args(argv)
+
+    relatorio = exportar(args.diretorio, args.saida, args.formato, args.inicio, args.fim, args.bloco)
+    print(f"\n📊 {relatorio['eventos']} eventos de {relatorio['dias']} dias em {relatorio['arquivos']} arquivos "
+          f"({relatorio['duracao_s']} s) -> {args.saida}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
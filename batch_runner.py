@@ -0,0 +1,243 @@
+"""
+Processamento em lote de perguntas (JSONL) pelo grafo do assistente.
+
+Cada linha da entrada é um objeto JSON com a pergunta e, opcionalmente, um
+identificador e uma sessão:
+
+    {"id": "faq-001", "pergunta": "Como emitir uma NF-e?"}
+    {"id": "faq-002", "sessao": "cliente-7", "pergunta": "E para cancelar?"}
+
+Itens da mesma sessão são processados em ordem, com o histórico da
+conversa; sessões diferentes (e itens sem sessão) não compartilham nada e
+rodam em paralelo, até `--workers` ao mesmo tempo.
+
+Cada resposta é gravada no arquivo de saída assim que fica pronta. Ao rodar
+de novo com a mesma saída, os itens já respondidos são pulados; numa sessão
+com itens pendentes, as respostas já gravadas voltam ao histórico (na ordem
+do arquivo) antes deles, para que a conversa continue de onde parou.
+
+Uso:
+    python batch_runner.py perguntas.jsonl --saida respostas.jsonl --workers 8
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+from datetime import datetime
+
+from dotenv import load_dotenv
+
+import tracing
+
+load_dotenv()
+
+def ler_itens(caminho, campo_id="id", campo_pergunta="pergunta"):
+    """
+    Lê o arquivo JSONL de entrada.
+
+    Linhas vazias são ignoradas; itens sem id recebem "linha-N".
+
+    Returns:
+        list: Itens com id, sessao, pergunta e arquivo (opcional)
+    """
+    itens = []
+    with open(caminho, 'r', encoding='utf-8') as f:
+        for numero, linha in enumerate(f, start=1):
+            linha = linha.strip()
+            if not linha:
+                continue
+            try:
+                dados = json.loads(linha)
+            except json.JSONDecodeError as e:
+                print(f"Linha {numero} ignorada (JSON inválido): {e}")
+                continue
+            pergunta = dados.get(campo_pergunta)
+            if not pergunta:
+                print(f"Linha {numero} ignorada (sem '{campo_pergunta}')")
+                continue
+            itens.append({
+                "id": str(dados.get(campo_id) or f"linha-{numero}"),
+                "sessao": dados.get("sessao"),
+                "pergunta": pergunta,
+                "arquivo": dados.get("arquivo"),
+            })
+    return itens
+
+def respostas_concluidas(caminho_saida):
+    """Resposta de cada id que já tem resposta sem erro no arquivo de saída."""
+    concluidas = {}
+    if not os.path.exists(caminho_saida):
+        return concluidas
+    with open(caminho_saida, 'r', encoding='utf-8') as f:
+        for linha in f:
+            try:
+                registro = json.loads(linha)
+            except json.JSONDecodeError:
+                # Linha truncada por uma interrupção no meio da escrita
+                continue
+            if not registro.get("erro"):
+                concluidas[registro["id"]] = registro.get("resposta", "")
+    return concluidas
+
+def selecionar_pendentes(itens, respondidas, limite=None):
+    """
+    Itens a processar: os pendentes (até `limite`) e, das sessões deles, os já
+    respondidos, que só voltam ao histórico.
+
+    Returns:
+        tuple: (itens na ordem do arquivo, quantidade de pendentes)
+    """
+    pendentes = [item for item in itens if item["id"] not in respondidas]
+    if limite is not None:
+        pendentes = pendentes[:limite]
+    selecionados = {item["id"] for item in pendentes}
+    sessoes = {item["sessao"] for item in pendentes if item["sessao"] is not None}
+    return [item for item in itens if item["id"] in selecionados or item["sessao"] in sessoes], len(pendentes)
+
+def agrupar_por_sessao(itens):
+    """Agrupa os itens em sessões, mantendo a ordem do arquivo."""
+    sessoes = {}
+    for item in itens:
+        chave = item["sessao"] if item["sessao"] is not None else f"__item__{item['id']}"
+        sessoes.setdefault(chave, []).append(item)
+    return list(sessoes.values())
+
+
+class ExecucaoLote:
+    """Estado de uma execução: arquivo de saída, concorrência e latências."""
+
+    def __init__(self, caminho_saida, workers, respondidas=None):
+        self.caminho_saida = caminho_saida
+        self.respondidas = respondidas or {}
+        self.limite = asyncio.Semaphore(workers)
+        self.latencias = []
+        self.concluidos = 0
+        self.erros = 0
+        self._saida = open(caminho_saida, 'a', encoding='utf-8')
+
+    def gravar(self, registro):
+        """Acrescenta um registro na saída e força a gravação em disco."""
+        self._saida.write(json.dumps(registro, ensure_ascii=False) + "\n")
+        self._saida.flush()
+
+    def fechar(self):
+        self._saida.close()
+
+    async def processar_sessao(self, itens, total):
+        """
+        Processa os itens de uma sessão em ordem, com um assistente próprio.
+
+        Itens já respondidos (`respondidas`) não são enviados de novo: a
+        pergunta e a resposta gravada entram no histórico da sessão.
+        """
+        # Importado aqui para que `--help` não carregue Django/FAISS
+        from agent_graph import AssistenteMultimodalGraph
+
+        async with self.limite:
+            assistente = AssistenteMultimodalGraph()
+            for item in itens:
+                if item["id"] in self.respondidas:
+                    assistente.history.add_user_message(item["pergunta"])
+                    assistente.history.add_ai_message(self.respondidas[item["id"]])
+                    continue
+                inicio = time.perf_counter()
+                registro = {
+                    "id": item["id"],
+                    "sessao": item["sessao"],
+                    "pergunta": item["pergunta"],
+                    "inicio": datetime.now().isoformat(),
+                }
+                try:
+                    resultado = await assistente.aprocessar_mensagem(item["pergunta"], item["arquivo"])
+                    registro.update({
+                        "resposta": resultado["resposta_final"],
+                        "intencao": resultado["intencao"],
+                        "intencoes": resultado.get("intencoes", []),
+                        "degradacoes": resultado.get("degradacoes", []),
+                    })
+                    self.concluidos += 1
+                except Exception as e:
+                    registro["erro"] = repr(e)
+                    self.erros += 1
+                latencia = (time.perf_counter() - inicio) * 1000
+                registro["latencia_ms"] = round(latencia, 3)
+                self.latencias.append(latencia)
+                self.gravar(registro)
+
+                feitos = self.concluidos + self.erros
+                status = "erro" if "erro" in registro else registro["intencao"]
+                print(f"[{feitos}/{total}] {item['id']} ({status}) {latencia:.0f} ms")
+
+async def executar_lote(itens, caminho_saida, workers, respondidas=None):
+    """
+    Processa os itens pendentes e retorna o relatório da execução.
+
+    Args:
+        itens (list): Itens a processar (ver `selecionar_pendentes`)
+        respondidas (dict): Respostas já gravadas ({id: resposta}); esses
+            itens só voltam ao histórico da sessão
+
+    Returns:
+        dict: Quantidades, itens/s e percentis de latência
+    """
+    respondidas = respondidas or {}
+    execucao = ExecucaoLote(caminho_saida, workers, respondidas)
+    sessoes = agrupar_por_sessao(itens)
+    total = sum(1 for item in itens if item["id"] not in respondidas)
+    inicio = time.perf_counter()
+    try:
+        await asyncio.gather(*(execucao.processar_sessao(s, total) for s in sessoes))
+    finally:
+        execucao.fechar()
+    duracao = time.perf_counter() - inicio
+
+    processados = execucao.concluidos + execucao.erros
+    return {
+        "processados": processados,
+        "concluidos": execucao.concluidos,
+        "erros": execucao.erros,
+        "sessoes": len(sessoes),
+        "duracao_s": round(duracao, 3),
+        "itens_por_s": round(processados / duracao, 3) if duracao else 0.0,
+        "p50_ms": round(tracing.percentil(execucao.latencias, 50), 3),
+        "p95_ms": round(tracing.percentil(execucao.latencias, 95), 3),
+        "p99_ms": round(tracing.percentil(execucao.latencias, 99), 3),
+    }
+
+def main(argv=None):
+    """Função principal da linha de comando."""
+    parser = argparse.ArgumentParser(description="Processa um arquivo JSONL de perguntas pelo assistente.")
+    parser.add_argument("entrada", help="Arquivo JSONL com as perguntas")
+    parser.add_argument("--saida", help="Arquivo JSONL de respostas (padrão: <entrada>.respostas.jsonl)")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("BATCH_WORKERS", "4")),
+                        help="Sessões processadas ao mesmo tempo")
+    parser.add_argument("--campo-id", default="id", help="Campo com o identificador do item")
+    parser.add_argument("--campo-pergunta", default="pergunta", help="Campo com o texto da pergunta")
+    parser.add_argument("--limite", type=int, help="Processa no máximo N itens pendentes")
+    parser.add_argument("--refazer", action="store_true", help="Ignora as respostas já gravadas na saída")
+    args = parser.parse_args(argv)
+
+    saida = args.saida or os.path.splitext(args.entrada)[0] + ".respostas.jsonl"
+    itens = ler_itens(args.entrada, args.campo_id, args.campo_pergunta)
+
+    respondidas = {} if args.refazer else respostas_concluidas(saida)
+    respondidos = sum(1 for item in itens if item["id"] in respondidas)
+    print(f"📄 {len(itens)} itens lidos, {respondidos} já respondidos, {len(itens) - respondidos} pendentes")
+    selecionados, pendentes = selecionar_pendentes(itens, respondidas, args.limite)
+    if not pendentes:
+        return 0
+
+    relatorio = asyncio.run(executar_lote(selecionados, saida, max(1, args.workers), respondidas))
+
+    print("\n📊 Resumo do lote")
+    print(f"   Processados: {relatorio['processados']} ({relatorio['erros']} com erro) em {relatorio['duracao_s']} s")
+    print(f"   Vazão: {relatorio['itens_por_s']} itens/s")
+    print(f"   Latência: p50 {relatorio['p50_ms']:.0f} ms | p95 {relatorio['p95_ms']:.0f} ms | p99 {relatorio['p99_ms']:.0f} ms")
+    print(f"   Saída: {saida}")
+    return 1 if relatorio["erros"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,545 @@
+"""
+Benchmarks de componentes do assistente.
+
+Cada benchmark é um subcomando:
+
+    python benchmarks.py sessoes --concorrencia 1 100
+    python benchmarks.py aprendizado --interacoes 1000000
+    python benchmarks.py movidesk --artigos 230 --concorrencia 1 4 8
+    python benchmarks.py descoberta --artigos 1000 --pagina 100 500 1000
+    python benchmarks.py ingestao --trechos 10000
+    python benchmarks.py embeddings --trechos 1000 --simultaneos 1 4
+    python benchmarks.py fluxo --artigos 300 --pagina 50 --memoria
+
+`sessoes`: tempo para abrir uma sessão (`AssistenteMultimodalGraph`) com N
+sessões sendo criadas ao mesmo tempo (threads, como no Streamlit) e
+memória alocada por sessão. Compara o grafo compilado por sessão (como era
+antes) com o grafo compartilhado do processo.
+
+`aprendizado`: custo de `record_interaction` e de `get_learning_insights`
+conforme o log cresce, comparado à recontagem sobre a lista completa (como
+era antes), e acerto do top-10 aproximado contra a contagem exata.
+
+`movidesk`: coleta de artigos contra a Movidesk falsa (com cota e 429),
+em artigos/s, para cada limite de requisições simultâneas. A coleta
+antiga fazia uma requisição por vez com 7 s de pausa entre elas.
+
+`descoberta`: requisições e tempo para trazer a base inteira da Movidesk
+falsa, um GET por artigo (lista de IDs) contra a listagem paginada com
+`$select`, para cada tamanho de página.
+
+`ingestao`: tempo de gravação no SQLite (num banco temporário) dos
+artigos, trechos e embeddings de ~N trechos, linha a linha (uma transação
+por linha, como era antes) contra as gravações em lote do pipeline.
+
+`embeddings`: trechos/s na geração de embeddings contra o servidor falso,
+um `embed_query` por trecho (como era antes) contra lotes limitados por
+tokens em `embed_documents`, com alguns lotes em voo ao mesmo tempo.
+
+`fluxo`: ingestão completa (coleta, trechos, embeddings e gravações) da
+Movidesk falsa num banco temporário, com o grafo etapa por etapa contra o
+modo em fluxo (`executar_streaming`): tempo total e, com `--memoria`,
+pico de memória.
+"""
+
+import os
+import sys
+import time
+import random
+import shutil
+import tempfile
+import argparse
+import threading
+import tracemalloc
+
+import tracing
+
+def _medir_concorrente(criar, quantidade):
+    """
+    Cria `quantidade` sessões em threads liberadas ao mesmo tempo.
+
+    Returns:
+        dict: p50/p95/máx do tempo de criação (ms) e memória por sessão (KB)
+    """
+    barreira = threading.Barrier(quantidade)
+    latencias = []
+    sessoes = []
+    lock = threading.Lock()
+
+    def trabalhar():
+        barreira.wait()
+        inicio = time.perf_counter()
+        sessao = criar()
+        duracao = (time.perf_counter() - inicio) * 1000
+        with lock:
+            latencias.append(duracao)
+            sessoes.append(sessao)
+
+    tracemalloc.start()
+    threads = [threading.Thread(target=trabalhar) for _ in range(quantidade)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    memoria, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "sessoes": quantidade,
+        "p50_ms": round(tracing.percentil(latencias, 50), 3),
+        "p95_ms": round(tracing.percentil(latencias, 95), 3),
+        "max_ms": round(max(latencias), 3),
+        "memoria_por_sessao_kb": round(memoria / quantidade / 1024, 1),
+    }
+
+def benchmark_sessoes(concorrencias):
+    """Início de sessão com grafo por sessão vs. grafo compartilhado."""
+    from langchain_community.chat_message_histories import ChatMessageHistory
+    import agent_graph
+
+    def por_sessao():
+        # Comportamento anterior: cada sessão compilava o próprio grafo
+        return agent_graph.criar_grafo_assistente(), ChatMessageHistory()
+
+    # Compilação única fora da medição (no servidor acontece no primeiro uso)
+    agent_graph.obter_grafo_compilado()
+
+    resultados = {}
+    for nome, criar in (("por_sessao", por_sessao), ("compartilhado", agent_graph.AssistenteMultimodalGraph)):
+        resultados[nome] = [_medir_concorrente(criar, n) for n in concorrencias]
+    return resultados
+
+def imprimir_sessoes(resultados):
+    print("\n📊 Início de sessão")
+    for nome, medicoes in resultados.items():
+        print(f"\n   {nome}:")
+        for m in medicoes:
+            print(f"   {m['sessoes']:>5} sessões   p50 {m['p50_ms']:>9.3f} ms   p95 {m['p95_ms']:>9.3f} ms   "
+                  f"máx {m['max_ms']:>9.3f} ms   {m['memoria_por_sessao_kb']:>8.1f} KB/sessão")
+
+def _insights_recontando(interacoes, feedbacks):
+    """Cálculo anterior: Counter sobre todas as interações e varredura dos feedbacks."""
+    from collections import Counter
+    consultas = Counter(interacao["user_input"] for interacao in interacoes)
+    positivos = sum(1 for f in feedbacks if f["feedback_type"] == "positive")
+    return {
+        "frequent_queries": [consulta for consulta, _ in consultas.most_common(10)],
+        "success_rate": positivos / len(feedbacks) * 100 if feedbacks else 0.0,
+    }
+
+def benchmark_aprendizado(total, pontos=5, consultas_distintas=50000, semente=42):
+    """Registra `total` interações (com 1% de feedbacks) medindo os insights em pontos do caminho."""
+    from collections import Counter
+    from learning_system import LearningSystem
+
+    rng = random.Random(semente)
+    intencoes = ["contabilidade", "gestao", "banco_de_dados", "busca_geral", "gerar_imagem"]
+    diretorio = tempfile.mkdtemp(prefix="bench_aprendizado_")
+    sistema = LearningSystem(data_dir=diretorio, legacy_file=os.path.join(diretorio, "inexistente.json"))
+
+    interacoes, feedbacks, exatas = [], [], Counter()
+    marcos = {max(1, total * (i + 1) // pontos) for i in range(pontos)}
+    medicoes = []
+    tempo_registro = 0.0
+    try:
+        for n in range(1, total + 1):
+            # Distribuição de cauda longa: poucas consultas muito repetidas
+            consulta = f"consulta {min(int(rng.paretovariate(1.2)), consultas_distintas)}"
+            intencao = intencoes[hash(consulta) % len(intencoes)]
+            inicio = time.perf_counter()
+            sistema.record_interaction(consulta, intencao, "bench")
+            if n % 100 == 0:
+                tipo = "negative" if rng.random() < 0.3 else "positive"
+                sistema.record_feedback(consulta, "", tipo)
+                feedbacks.append({"feedback_type": tipo})
+            tempo_registro += time.perf_counter() - inicio
+
+            interacoes.append({"user_input": consulta})
+            exatas[consulta] += 1
+
+            if n in marcos:
+                inicio = time.perf_counter()
+                insights = sistema.get_learning_insights()
+                sistema.identify_improvement_areas()
+                incremental_ms = (time.perf_counter() - inicio) * 1000
+
+                inicio = time.perf_counter()
+                _insights_recontando(interacoes, feedbacks)
+                recontagem_ms = (time.perf_counter() - inicio) * 1000
+
+                top_exato = {consulta for consulta, _ in exatas.most_common(10)}
+                medicoes.append({
+                    "interacoes": n,
+                    "insights_incremental_ms": round(incremental_ms, 3),
+                    "insights_recontagem_ms": round(recontagem_ms, 3),
+                    "acerto_top10": len(top_exato & set(insights["frequent_queries"])) / 10,
+                })
+        sistema.save_data()
+    finally:
+        shutil.rmtree(diretorio, ignore_errors=True)
+
+    return {
+        "registro_us": round(tempo_registro / (total + total // 100) * 1e6, 3),
+        "medicoes": medicoes,
+    }
+
+def imprimir_aprendizado(resultado):
+    print("\n📊 Sistema de aprendizado")
+    print(f"   record_*: {resultado['registro_us']} µs por evento")
+    for m in resultado["medicoes"]:
+        print(f"   {m['interacoes']:>9} interações   insights {m['insights_incremental_ms']:>8.3f} ms   "
+              f"recontagem {m['insights_recontagem_ms']:>9.3f} ms   top-10 {m['acerto_top10']:.0%}")
+
+def benchmark_movidesk(total, concorrencias, rpm_servidor=600, rpm_cliente=1200, latencia_ms=150):
+    """Coleta `total` artigos (com 1% de IDs repetidos) contra o servidor falso."""
+    import fake_backends
+    import rate_limiter
+    import movidesk_client
+
+    config = fake_backends.get_fake_config()
+    config["movidesk_rpm"] = rpm_servidor
+    config["latencias_ms"]["movidesk"] = latencia_ms
+    config["movidesk_artigos"] = total
+    servidor = fake_backends.ServidorFalso(config=config).iniciar()
+
+    # Artigos existentes, alguns IDs inexistentes (404) e 1% de repetidos
+    rng = random.Random(42)
+    ids = list(fake_backends.ids_movidesk(config["semente"], total))
+    ids += [rng.randint(600000, 10 ** 6) for _ in range(max(1, total // 50))]
+    ids += rng.sample(ids, max(1, total // 100))
+    resultados = []
+    try:
+        for concorrencia in concorrencias:
+            limites = rate_limiter.get_limites()
+            limites["por_minuto"]["movidesk"]["requisicoes"] = rpm_cliente
+            limites["concorrencia"]["movidesk"] = concorrencia
+            limitador = rate_limiter.configurar_limitador(limites)
+
+            config_cliente = movidesk_client.get_movidesk_config()
+            config_cliente.update(base_url=f"{servidor.url}/public/v1", concorrencia=concorrencia)
+            _, resumo = movidesk_client.buscar_artigos(ids, config=config_cliente)
+            estatisticas = limitador.resumo()
+            resultados.append({
+                "concorrencia": concorrencia,
+                **resumo,
+                "respostas_429": estatisticas["por_endpoint"]["movidesk"]["respostas_429"],
+                "rpm_final": estatisticas["rpm"]["movidesk"],
+            })
+    finally:
+        servidor.parar()
+        rate_limiter.configurar_limitador()
+
+    return {
+        "artigos": len(set(ids)),
+        "antes_s": round((len(ids) - 1) * 7 + len(ids) * latencia_ms / 1000, 1),
+        "rpm_servidor": rpm_servidor,
+        "medicoes": resultados,
+    }
+
+def imprimir_movidesk(resultado):
+    print("\n📊 Coleta da Movidesk (servidor falso)")
+    print(f"   {resultado['artigos']} IDs distintos, cota do servidor {resultado['rpm_servidor']} req/min; "
+          f"sequencial com 7 s de pausa: ~{resultado['antes_s']} s")
+    for m in resultado["medicoes"]:
+        print(f"   {m['concorrencia']:>3} simultâneas   {m['segundos']:>8.2f} s   {m['artigos_por_segundo']:>7.2f} artigos/s   "
+              f"429: {m['respostas_429']:>4}   ritmo final {m['rpm_final']:>7.1f} req/min   "
+              f"404: {m['nao_encontrados']}   erros: {m['erros']}   repetidos: {m['duplicados']}")
+
+def benchmark_descoberta(total, paginas, concorrencia=4, latencia_ms=50):
+    """Base de `total` artigos: GET por ID vs. listagem paginada (sem cota)."""
+    import fake_backends
+    import rate_limiter
+    import movidesk_client
+
+    config = fake_backends.get_fake_config()
+    config["movidesk_rpm"] = 0
+    config["movidesk_artigos"] = total
+    config["latencias_ms"]["movidesk"] = latencia_ms
+    config["movidesk_pagina_maxima"] = max(paginas)
+    servidor = fake_backends.ServidorFalso(config=config).iniciar()
+
+    limites = rate_limiter.get_limites()
+    limites["por_minuto"]["movidesk"]["requisicoes"] = 0
+    limites["concorrencia"]["movidesk"] = concorrencia
+    rate_limiter.configurar_limitador(limites)
+    config_cliente = movidesk_client.get_movidesk_config()
+    config_cliente.update(base_url=f"{servidor.url}/public/v1", concorrencia=concorrencia)
+
+    def requisicoes():
+        return sum(servidor.estatisticas().get("movidesk", {}).values())
+
+    ids = fake_backends.ids_movidesk(config["semente"], total)
+    resultados = []
+    try:
+        antes = requisicoes()
+        artigos, resumo = movidesk_client.buscar_artigos(ids, config=config_cliente)
+        resultados.append({"modo": f"GET por ID ({concorrencia} simultâneos)", "artigos": len(artigos),
+                           "requisicoes": requisicoes() - antes, "segundos": resumo["segundos"]})
+        for tamanho in paginas:
+            config_cliente["tamanho_pagina"] = tamanho
+            antes = requisicoes()
+            artigos, resumo = movidesk_client.listar_artigos(movidesk_client.CAMPOS_ARTIGO, config=config_cliente)
+            resultados.append({"modo": f"listagem $top={tamanho}", "artigos": len(artigos),
+                               "requisicoes": requisicoes() - antes, "segundos": resumo["segundos"]})
+    finally:
+        servidor.parar()
+        rate_limiter.configurar_limitador()
+    return resultados
+
+def imprimir_descoberta(resultados):
+    print("\n📊 Descoberta dos artigos da Movidesk (servidor falso)")
+    for r in resultados:
+        print(f"   {r['modo']:<28} {r['artigos']:>6} artigos   {r['requisicoes']:>6} requisições   "
+              f"{r['segundos']:>8.2f} s")
+
+def _banco_temporario(prefixo):
+    """Aponta o Django para um SQLite novo (no disco do projeto) e cria as tabelas."""
+    diretorio = tempfile.mkdtemp(prefix=prefixo, dir=".")
+    os.environ["SQLITE_PATH"] = os.path.join(diretorio, "bench.sqlite3")
+    os.environ.setdefault("OPENAI_API_KEY", "fake")
+    import setup_django
+    setup_django.setup_django()
+    from django.core.management import call_command
+    call_command("migrate", verbosity=0)
+    return diretorio
+
+def _artigos_falsos(trechos):
+    """Artigos da Movidesk falsa que somam ~`trechos` trechos (~7 por artigo)."""
+    import fake_backends
+    ids = fake_backends.ids_movidesk(42, max(1, trechos // 7))
+    return [fake_backends.artigo_movidesk(artigo_id) for artigo_id in ids]
+
+def _ingerir_linha_a_linha(artigos_json, vetor):
+    """Gravações anteriores do pipeline: update_or_create, create e save por linha."""
+    from tools.models import ArtigosFonte, ArtigoProcessado
+    from tools.pipeline import campos_fonte, splitter
+
+    tempos = {}
+    inicio = time.perf_counter()
+    fontes = []
+    for artigo_json in artigos_json:
+        fonte, _ = ArtigosFonte.objects.update_or_create(artigo_id=artigo_json["id"], defaults=campos_fonte(artigo_json))
+        fontes.append(fonte)
+    tempos["fontes_s"] = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    for fonte in fontes:
+        for idx, chunk in enumerate(splitter.split_text(fonte.conteudo_bruto)):
+            ArtigoProcessado.objects.create(fonte=fonte, indice_trecho=idx, conteudo_limpo=chunk)
+    tempos["trechos_s"] = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    for trecho in ArtigoProcessado.objects.filter(embedding__isnull=True):
+        trecho.embedding = vetor
+        trecho.save()
+    tempos["embeddings_s"] = time.perf_counter() - inicio
+    return tempos
+
+def _ingerir_em_lote(artigos_json, vetor):
+    """Gravações atuais do pipeline: upserts e bulk_update em lotes transacionais."""
+    from tools.models import ArtigoProcessado
+    from tools import pipeline
+
+    tempos = {}
+    inicio = time.perf_counter()
+    fontes, _ = pipeline.gravar_fontes(artigos_json)
+    tempos["fontes_s"] = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    pipeline.gravar_trechos(fontes)
+    tempos["trechos_s"] = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    tamanho = pipeline.PIPELINE_CONFIG["lote_banco"]
+    ultimo = 0
+    while True:
+        lote = list(ArtigoProcessado.objects.filter(embedding__isnull=True, id__gt=ultimo)
+                    .order_by("id").only("id")[:tamanho])
+        if not lote:
+            break
+        for trecho in lote:
+            trecho.embedding = vetor
+        pipeline.gravar_embeddings(lote)
+        ultimo = lote[-1].id
+    tempos["embeddings_s"] = time.perf_counter() - inicio
+    return tempos
+
+def benchmark_ingestao(trechos, dimensao=1536):
+    """Grava ~`trechos` trechos (artigos da Movidesk falsa) nos dois modos, cada um num banco vazio."""
+    diretorio = _banco_temporario("bench_ingestao_")
+    from tools.models import ArtigosFonte, ArtigoProcessado
+
+    artigos_json = _artigos_falsos(trechos)
+    rng = random.Random(42)
+    vetor = [rng.gauss(0, 1) for _ in range(dimensao)]
+
+    resultados = {}
+    try:
+        for nome, ingerir in (("linha_a_linha", _ingerir_linha_a_linha), ("em_lote", _ingerir_em_lote)):
+            ArtigosFonte.objects.all().delete()
+            tempos = ingerir(artigos_json, vetor)
+            tempos["total_s"] = sum(tempos.values())
+            resultados[nome] = {
+                "artigos": ArtigosFonte.objects.count(),
+                "trechos": ArtigoProcessado.objects.count(),
+                **{chave: round(valor, 2) for chave, valor in tempos.items()},
+            }
+    finally:
+        shutil.rmtree(diretorio, ignore_errors=True)
+    return resultados
+
+def imprimir_ingestao(resultados):
+    print("\n📊 Gravação da ingestão no SQLite")
+    for nome, r in resultados.items():
+        print(f"   {nome:<14} {r['artigos']:>6} artigos {r['trechos']:>7} trechos   fontes {r['fontes_s']:>7.2f} s   "
+              f"trechos {r['trechos_s']:>7.2f} s   embeddings {r['embeddings_s']:>7.2f} s   total {r['total_s']:>7.2f} s")
+
+def benchmark_embeddings(trechos, simultaneos, latencia_ms=60):
+    """Embeddings de ~`trechos` trechos contra o servidor falso: um por chamada vs. lotes em paralelo."""
+    import fake_backends
+    fake_backends.ativar(config={**fake_backends.get_fake_config(),
+                                 "latencias_ms": {**fake_backends.LATENCIAS_PADRAO, "embeddings": latencia_ms}})
+    diretorio = _banco_temporario("bench_embeddings_")
+    from tools.models import ArtigoProcessado
+    from tools import pipeline
+
+    fontes, _ = pipeline.gravar_fontes(_artigos_falsos(trechos))
+    total = pipeline.gravar_trechos(fontes)
+    resultados = []
+    try:
+        # Como era: embed_query e save() por trecho
+        inicio = time.perf_counter()
+        for trecho in ArtigoProcessado.objects.filter(embedding__isnull=True):
+            trecho.embedding = pipeline.embeddings.embed_query(trecho.conteudo_limpo)
+            trecho.save()
+        duracao = time.perf_counter() - inicio
+        resultados.append({"modo": "um por chamada", "requisicoes": total, "segundos": round(duracao, 2),
+                           "trechos_por_segundo": round(total / duracao, 1)})
+
+        for quantidade in simultaneos:
+            ArtigoProcessado.objects.update(embedding=None)
+            antes = fake_backends.obter_servidor().estatisticas()["embeddings"].get(200, 0)
+            resumo = pipeline.embeddar_pendentes(simultaneos=quantidade)
+            depois = fake_backends.obter_servidor().estatisticas()["embeddings"].get(200, 0)
+            resultados.append({"modo": f"lotes, {quantidade} simultâneos", "requisicoes": depois - antes,
+                               "segundos": resumo["segundos"], "trechos_por_segundo": resumo["trechos_por_segundo"]})
+    finally:
+        shutil.rmtree(diretorio, ignore_errors=True)
+    return {"trechos": total, "medicoes": resultados}
+
+def imprimir_embeddings(resultado):
+    print(f"\n📊 Embeddings do pipeline ({resultado['trechos']} trechos, servidor falso)")
+    for m in resultado["medicoes"]:
+        print(f"   {m['modo']:<24} {m['requisicoes']:>6} requisições   {m['segundos']:>8.2f} s   "
+              f"{m['trechos_por_segundo']:>8.1f} trechos/s")
+
+def benchmark_fluxo(artigos, pagina, memoria=False, latencia_ms=1000):
+    """Ingestão da base falsa inteira: grafo etapa por etapa vs. filas limitadas."""
+    import fake_backends
+    import rate_limiter
+    os.environ["MOVIDESK_PAGE_SIZE"] = str(pagina)
+    config = fake_backends.get_fake_config()
+    # Vetores menores para o JSON dos embeddings não dominar o tempo; páginas lentas como as da API real
+    fake_backends.ativar(config={**config, "movidesk_artigos": artigos, "dimensao_embedding": 256,
+                                 "latencias_ms": {**config["latencias_ms"], "movidesk": latencia_ms}})
+    diretorio = _banco_temporario("bench_fluxo_")
+    from tools.models import ArtigosFonte, ArtigoProcessado
+    from tools import pipeline
+
+    modos = [
+        ("etapa por etapa", lambda: pipeline.pipeline.invoke({"completo": True})),
+        ("em fluxo", lambda: pipeline.executar_streaming(completo=True)),
+    ]
+
+    def medir(executar, rastrear):
+        # Banco vazio e limitador novo: cada modo começa com a cota cheia
+        ArtigosFonte.objects.all().delete()
+        rate_limiter.configurar_limitador()
+        if rastrear:
+            tracemalloc.start()
+        inicio = time.perf_counter()
+        executar()
+        duracao = time.perf_counter() - inicio
+        pico = tracemalloc.get_traced_memory()[1] if rastrear else None
+        tracemalloc.stop()
+        return duracao, pico
+
+    resultados = []
+    try:
+        for nome, executar in modos:
+            duracao, _ = medir(executar, False)
+            resultado = {"modo": nome, "artigos": ArtigosFonte.objects.count(),
+                         "trechos": ArtigoProcessado.objects.filter(embedding__isnull=False).count(),
+                         "segundos": round(duracao, 2), "pico_mb": None}
+            if memoria:
+                # Outra execução: o tracemalloc deixa tudo bem mais lento
+                _, pico = medir(executar, True)
+                resultado["pico_mb"] = round(pico / 1024 / 1024, 1)
+            resultados.append(resultado)
+    finally:
+        rate_limiter.configurar_limitador()
+        shutil.rmtree(diretorio, ignore_errors=True)
+    return {"pagina": pagina, "medicoes": resultados}
+
+def imprimir_fluxo(resultado):
+    print(f"\n📊 Ingestão completa da Movidesk falsa (páginas de {resultado['pagina']})")
+    for m in resultado["medicoes"]:
+        pico = f"   pico {m['pico_mb']:>7.1f} MB" if m["pico_mb"] is not None else ""
+        print(f"   {m['modo']:<16} {m['artigos']:>6} artigos {m['trechos']:>7} trechos   {m['segundos']:>8.2f} s{pico}")
+
+def main(argv=None):
+    """Função principal da linha de comando."""
+    parser = argparse.ArgumentParser(description="Benchmarks do assistente multimodal.")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    sessoes = subparsers.add_parser("sessoes", help="Tempo e memória para abrir sessões")
+    sessoes.add_argument("--concorrencia", type=int, nargs="+", default=[1, 100],
+                         help="Quantidades de sessões criadas ao mesmo tempo")
+
+    aprendizado = subparsers.add_parser("aprendizado", help="Registro e insights do LearningSystem")
+    aprendizado.add_argument("--interacoes", type=int, default=1000000, help="Interações registradas")
+    aprendizado.add_argument("--pontos", type=int, default=5, help="Medições dos insights ao longo do caminho")
+
+    movidesk = subparsers.add_parser("movidesk", help="Coleta de artigos da Movidesk (servidor falso)")
+    movidesk.add_argument("--artigos", type=int, default=230, help="IDs de artigos coletados")
+    movidesk.add_argument("--concorrencia", type=int, nargs="+", default=[1, 4, 8],
+                          help="Requisições simultâneas")
+    movidesk.add_argument("--rpm-servidor", type=int, default=600, help="Cota do servidor falso (req/min)")
+    movidesk.add_argument("--rpm-cliente", type=int, default=1200,
+                          help="Ritmo inicial do limitador (acima da cota, para exercitar a adaptação)")
+
+    descoberta = subparsers.add_parser("descoberta", help="GET por artigo vs. listagem paginada da Movidesk")
+    descoberta.add_argument("--artigos", type=int, default=1000, help="Artigos na base falsa")
+    descoberta.add_argument("--pagina", type=int, nargs="+", default=[100, 500, 1000], help="Tamanhos de página ($top)")
+
+    ingestao = subparsers.add_parser("ingestao", help="Gravações do pipeline: linha a linha vs. em lote")
+    ingestao.add_argument("--trechos", type=int, default=10000, help="Trechos gravados (aproximado)")
+
+    embeddings = subparsers.add_parser("embeddings", help="Embeddings do pipeline: um por chamada vs. em lotes")
+    embeddings.add_argument("--trechos", type=int, default=1000, help="Trechos (aproximado)")
+    embeddings.add_argument("--simultaneos", type=int, nargs="+", default=[1, 4], help="Lotes em voo ao mesmo tempo")
+
+    fluxo = subparsers.add_parser("fluxo", help="Ingestão completa: etapa por etapa vs. em fluxo")
+    fluxo.add_argument("--artigos", type=int, default=300, help="Artigos na Movidesk falsa")
+    fluxo.add_argument("--pagina", type=int, default=50, help="Artigos por página da listagem")
+    fluxo.add_argument("--memoria", action="store_true", help="Mede também o pico de memória (execução extra)")
+    args = parser.parse_args(argv)
+
+    if args.benchmark == "sessoes":
+        imprimir_sessoes(benchmark_sessoes(args.concorrencia))
+    elif args.benchmark == "aprendizado":
+        imprimir_aprendizado(benchmark_aprendizado(args.interacoes, args.pontos))
+    elif args.benchmark == "movidesk":
+        imprimir_movidesk(benchmark_movidesk(args.artigos, args.concorrencia, args.rpm_servidor, args.rpm_cliente))
+    elif args.benchmark == "descoberta":
+        imprimir_descoberta(benchmark_descoberta(args.artigos, args.pagina))
+    elif args.benchmark == "ingestao":
+        imprimir_ingestao(benchmark_ingestao(args.trechos))
+    elif args.benchmark == "embeddings":
+        imprimir_embeddings(benchmark_embeddings(args.trechos, args.simultaneos))
+    elif args.benchmark == "fluxo":
+        imprimir_fluxo(benchmark_fluxo(args.artigos, args.pagina, args.memoria))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
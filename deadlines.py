@@ -0,0 +1,158 @@
+"""
+Prazo por requisição com degradação controlada nos nós do grafo.
+
+Cada mensagem recebe um prazo absoluto (`prazo` no AgentState). O
+classificador usa uma fração do tempo restante; os nós especialistas usam o
+que sobrar, menos uma reserva para a combinação das respostas. Dentro do
+nó, as etapas são tentadas em ordem (ex.: completa → sem RAG → modelo
+pequeno) e cada uma só recebe parte do tempo que resta, para que a seguinte
+ainda caiba no prazo. Uma etapa que falha (exceção, ex.: `ErroEtapa` das
+ferramentas assíncronas) também passa a vez à seguinte, e sua resposta não
+vai para o cache. Se nenhuma terminar, é usada a última resposta guardada
+para a mesma pergunta.
+
+Configuração:
+    AGENT_DEADLINE_SECONDS: prazo total da mensagem
+    DEADLINE_CLASSIFIER_SHARE: fração do prazo usada pelo classificador
+    DEADLINE_RESERVE_SECONDS: reserva para a combinação das respostas
+    DEADLINE_MIN_STAGE_SECONDS: tempo mínimo para valer a pena iniciar uma etapa
+    DEADLINE_GRACE_SECONDS: tolerância antes de abandonar a mensagem inteira
+    ANSWER_CACHE_SIZE: respostas guardadas para o último recurso
+"""
+
+import os
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+
+import tracing
+from single_flight import normalizar_pergunta
+
+DEADLINE_CONFIG = {
+    "prazo_total": float(os.getenv("AGENT_DEADLINE_SECONDS", "30")),
+    "fracao_classificador": float(os.getenv("DEADLINE_CLASSIFIER_SHARE", "0.25")),
+    "reserva": float(os.getenv("DEADLINE_RESERVE_SECONDS", "0.5")),
+    "minimo_etapa": float(os.getenv("DEADLINE_MIN_STAGE_SECONDS", "0.5")),
+    "tolerancia": float(os.getenv("DEADLINE_GRACE_SECONDS", "2")),
+}
+
+MENSAGEM_SEM_TEMPO = (
+    "⏱️ Não foi possível concluir a resposta dentro do tempo limite. "
+    "Tente novamente ou reformule a pergunta de forma mais específica."
+)
+
+
+class ErroEtapa(Exception):
+    """Falha de uma ferramenta assíncrona; a mensagem é mostrada se nada mais responder."""
+
+
+def get_deadline_config():
+    """Retorna a configuração de prazos."""
+    return DEADLINE_CONFIG
+
+def criar_prazo(segundos=None):
+    """Retorna o instante (epoch) em que a requisição deve terminar."""
+    return time.time() + (DEADLINE_CONFIG["prazo_total"] if segundos is None else segundos)
+
+def restante(prazo):
+    """Segundos até o prazo (infinito quando não há prazo)."""
+    if not prazo:
+        return float("inf")
+    return max(0.0, prazo - time.time())
+
+def tempo_classificador(prazo):
+    """Fatia do tempo restante reservada à classificação (None sem prazo)."""
+    if not prazo:
+        return None
+    return restante(prazo) * DEADLINE_CONFIG["fracao_classificador"]
+
+def tempo_no(prazo):
+    """Tempo disponível para um nó especialista (descontada a reserva final)."""
+    return max(0.0, restante(prazo) - DEADLINE_CONFIG["reserva"])
+
+
+class CacheRespostas:
+    """Últimas respostas completas por intenção e pergunta normalizada (LRU)."""
+
+    def __init__(self, capacidade=1000):
+        self._capacidade = capacidade
+        self._dados = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obter(self, intencao, pergunta):
+        chave = (intencao, normalizar_pergunta(pergunta))
+        with self._lock:
+            resposta = self._dados.get(chave)
+            if resposta is not None:
+                self._dados.move_to_end(chave)
+            return resposta
+
+    def guardar(self, intencao, pergunta, resposta):
+        chave = (intencao, normalizar_pergunta(pergunta))
+        with self._lock:
+            self._dados[chave] = resposta
+            self._dados.move_to_end(chave)
+            while len(self._dados) > self._capacidade:
+                self._dados.popitem(last=False)
+
+cache_respostas = CacheRespostas(int(os.getenv("ANSWER_CACHE_SIZE", "1000")))
+
+
+def registrar_degradacao(intencao, etapa, motivo):
+    """Monta o registro da degradação e o envia ao trace."""
+    tracing.registrar_evento("degradacao", intencao, etapa=etapa, motivo=motivo)
+    print(f"--- ⏱️ Degradação em {intencao}: {etapa} ({motivo}) ---")
+    return {"intencao": intencao, "etapa": etapa, "motivo": motivo}
+
+async def aexecutar_com_prazo(intencao, pergunta, prazo, etapas, usar_cache=True):
+    """
+    Executa as etapas em ordem até uma terminar dentro do prazo do nó.
+
+    Args:
+        intencao (str): Intenção atendida pelo nó
+        pergunta (str): Texto do usuário (chave do cache de respostas)
+        prazo (float): Prazo da requisição (epoch) ou None
+        etapas (list): [(nome, fabrica, fracao)] onde `fabrica()` retorna a
+            corrotina da etapa e `fracao` é a parte do tempo restante que ela
+            pode usar (a última normalmente 1.0)
+        usar_cache (bool): False quando a resposta não depende só do texto
+            (ex.: análise de arquivo enviado)
+
+    Returns:
+        tuple: (resposta, lista de degradações); sem etapa nem cache, a
+        mensagem do último `ErroEtapa` ou `MENSAGEM_SEM_TEMPO`
+    """
+    degradacoes = []
+    erro = None
+    for nome, fabrica, fracao in etapas:
+        disponivel = tempo_no(prazo)
+        limite = disponivel * fracao
+        if limite < DEADLINE_CONFIG["minimo_etapa"] and disponivel != float("inf"):
+            degradacoes.append(registrar_degradacao(intencao, nome, "sem_tempo"))
+            continue
+        try:
+            if limite == float("inf"):
+                resposta = await fabrica()
+            else:
+                resposta = await asyncio.wait_for(fabrica(), timeout=limite)
+        except asyncio.TimeoutError:
+            degradacoes.append(registrar_degradacao(intencao, nome, "prazo"))
+            continue
+        except Exception as e:
+            # Erro não é resposta: nem vai para o cache, nem encerra as etapas
+            degradacoes.append(registrar_degradacao(intencao, nome, "erro"))
+            erro = e
+            continue
+        if usar_cache and not degradacoes:
+            cache_respostas.guardar(intencao, pergunta, resposta)
+        return resposta, degradacoes
+
+    # Nenhuma etapa coube no prazo: última resposta completa para a pergunta
+    resposta = cache_respostas.obter(intencao, pergunta) if usar_cache else None
+    if usar_cache:
+        tracing.registrar_cache(f"resposta:{intencao}", hit=resposta is not None)
+    degradacoes.append(registrar_degradacao(intencao, "cache", "usado" if resposta is not None else "vazio"))
+    if resposta is None:
+        resposta = str(erro) if isinstance(erro, ErroEtapa) else MENSAGEM_SEM_TEMPO
+    return resposta, degradacoes
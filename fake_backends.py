@@ -0,0 +1,549 @@
+"""
+Backends locais e determinísticos no lugar da OpenAI, do Tavily e da Movidesk.
+
+Um servidor HTTP que imita as rotas usadas pelo assistente:
+
+    POST /v1/chat/completions      (texto, classificação e visão)
+    POST /v1/embeddings
+    POST /v1/images/generations    (DALL-E)
+    POST /v1/audio/transcriptions  (Whisper)
+    POST /v1/audio/speech          (TTS)
+    POST /search                   (Tavily)
+    GET  /public/v1/article/<id>   (Movidesk)
+    GET  /public/v1/article        (Movidesk: listagem com $select, $filter, $orderby, $top, $skip)
+
+Latência e tamanho das respostas seguem distribuições log-normais
+configuráveis; a mesma requisição com a mesma semente gera sempre a mesma
+resposta e a mesma latência. Respostas 429/5xx podem ser injetadas para
+exercitar o limitador. A rota da Movidesk tem cota própria (balde com um
+segundo de rajada): envia `X-RateLimit-Remaining` / `X-RateLimit-Reset` e
+responde 429 com `Retry-After` quando a cota acaba. A base da Movidesk
+falsa tem FAKE_MOVIDESK_ARTICLES artigos; a cada FAKE_MOVIDESK_REVISION
+uma fração deles (FAKE_MOVIDESK_CHANGE_RATE) muda de conteúdo e de
+`updatedDate`, para exercitar a sincronização incremental.
+
+Ativação:
+    FAKE_BACKENDS=true inicia o servidor dentro do processo e aponta
+    OPENAI_BASE_URL / TAVILY_BASE_URL / MOVIDESK_BASE_URL para ele (`ativar_se_configurado`).
+    `python fake_backends.py --porta 8765` roda o servidor separado.
+
+Configuração (variáveis FAKE_*):
+    FAKE_SEED, FAKE_<ROTA>_LATENCY_MS (mediana; ROTA = CHAT, EMBEDDINGS,
+    IMAGES, TRANSCRIPTIONS, SPEECH, SEARCH, MOVIDESK), FAKE_LATENCY_SIGMA,
+    FAKE_MS_PER_TOKEN, FAKE_TOKENS_MEDIAN, FAKE_TOKENS_SIGMA,
+    FAKE_EMBEDDING_DIM, FAKE_ERROR_429_RATE, FAKE_ERROR_5XX_RATE,
+    FAKE_MOVIDESK_RPM (0 sem cota), FAKE_MOVIDESK_ARTICLES, FAKE_MOVIDESK_REVISION,
+    FAKE_MOVIDESK_CHANGE_RATE, FAKE_MOVIDESK_PAGE_MAX ($top máximo; acima dele a página vem menor)
+"""
+
+import os
+import re
+import sys
+import json
+import math
+import time
+import random
+import hashlib
+import bisect
+import argparse
+import functools
+import itertools
+import threading
+from datetime import datetime, timedelta
+from urllib.parse import parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from dotenv import load_dotenv
+
+ROTAS = {
+    "/v1/chat/completions": "chat",
+    "/v1/embeddings": "embeddings",
+    "/v1/images/generations": "images",
+    "/v1/audio/transcriptions": "transcriptions",
+    "/v1/audio/speech": "speech",
+    "/search": "search",
+}
+
+# Latência mediana padrão por rota (ms)
+LATENCIAS_PADRAO = {
+    "chat": 400,
+    "embeddings": 60,
+    "images": 3000,
+    "transcriptions": 800,
+    "speech": 600,
+    "search": 700,
+    "movidesk": 150,
+}
+
+# Artigos da Movidesk falsos: /public/v1/article/<id> e a listagem /public/v1/article
+ROTA_ARTIGO_MOVIDESK = re.compile(r"^/public/v1/article/(\d+)$")
+ROTA_LISTA_MOVIDESK = "/public/v1/article"
+# Condições aceitas no $filter da listagem, unidas por "and" (ex.: updatedDate ge 2025-01-01T00:00:00)
+CONDICAO_FILTRO = re.compile(r"^(\w+) (eq|ne|gt|ge|lt|le) '?([^']+?)'?$")
+
+CATEGORIAS_MOVIDESK = ["Fiscal", "Financeiro", "Estoque", "Vendas", "Contabilidade", "Cadastros", "Relatórios"]
+
+# Palavras que levam o classificador falso a cada categoria (em ordem de prioridade)
+PALAVRAS_CATEGORIA = [
+    ("gerar_imagem", ["gere uma imagem", "gerar imagem", "crie uma imagem", "desenhe", "ilustração", "logo"]),
+    ("analisar_imagem", ["analise a imagem", "analisar imagem", "descreva a foto", "nesta imagem"]),
+    ("gerar_audio", ["gere um áudio", "gerar áudio", "narre", "leia em voz alta"]),
+    ("analisar_audio", ["transcreva", "analisar áudio", "neste áudio"]),
+    ("gerar_video", ["gere um vídeo", "gerar vídeo", "crie um vídeo"]),
+    ("analisar_video", ["analise o vídeo", "analisar vídeo", "neste vídeo"]),
+    ("banco_de_dados", ["sql", "query", "tabela", "banco de dados", "índice", "join"]),
+    ("contabilidade", ["icms", "imposto", "tribut", "contab", "fiscal", "nf-e", "nota fiscal", "sped", "dre", "balanço"]),
+    ("gestao", ["gestão", "estoque", "vendas", "kpi", "indicador", "compras", "planejamento"]),
+]
+
+def get_fake_config():
+    """Lê a configuração dos backends falsos do ambiente."""
+    return {
+        "semente": int(os.getenv("FAKE_SEED", "42")),
+        "latencias_ms": {
+            rota: float(os.getenv(f"FAKE_{rota.upper()}_LATENCY_MS", str(padrao)))
+            for rota, padrao in LATENCIAS_PADRAO.items()
+        },
+        "sigma_latencia": float(os.getenv("FAKE_LATENCY_SIGMA", "0.35")),
+        "ms_por_token": float(os.getenv("FAKE_MS_PER_TOKEN", "2")),
+        "tokens_mediana": float(os.getenv("FAKE_TOKENS_MEDIAN", "180")),
+        "sigma_tokens": float(os.getenv("FAKE_TOKENS_SIGMA", "0.5")),
+        "dimensao_embedding": int(os.getenv("FAKE_EMBEDDING_DIM", "1536")),
+        "taxa_429": float(os.getenv("FAKE_ERROR_429_RATE", "0")),
+        "taxa_5xx": float(os.getenv("FAKE_ERROR_5XX_RATE", "0")),
+        "movidesk_rpm": float(os.getenv("FAKE_MOVIDESK_RPM", "0")),
+        "movidesk_artigos": int(os.getenv("FAKE_MOVIDESK_ARTICLES", "250")),
+        "movidesk_revisao": int(os.getenv("FAKE_MOVIDESK_REVISION", "0")),
+        "movidesk_alterados": float(os.getenv("FAKE_MOVIDESK_CHANGE_RATE", "0.05")),
+        "movidesk_pagina_maxima": int(os.getenv("FAKE_MOVIDESK_PAGE_MAX", "1000")),
+    }
+
+
+# --- GERAÇÃO DETERMINÍSTICA ---
+
+def _rng(semente, *partes):
+    """Gerador aleatório derivado da semente e do conteúdo da requisição."""
+    resumo = hashlib.sha256(str(semente).encode())
+    for parte in partes:
+        resumo.update(b"\0")
+        resumo.update(parte if isinstance(parte, bytes) else str(parte).encode("utf-8"))
+    return random.Random(int.from_bytes(resumo.digest()[:8], "big"))
+
+def _lognormal(rng, mediana, sigma):
+    return mediana * math.exp(rng.gauss(0, sigma)) if mediana > 0 else 0.0
+
+def vetor_embedding(texto, dimensao, semente=42):
+    """
+    Vetor unitário determinístico para o texto.
+
+    Textos com o mesmo início ficam próximos, o que imita o suficiente a
+    busca por similaridade para os testes de carga.
+    """
+    base = _rng(semente, "embedding", texto[:40])
+    detalhe = _rng(semente, "embedding", texto)
+    vetor = [base.gauss(0, 1) + 0.3 * detalhe.gauss(0, 1) for _ in range(dimensao)]
+    norma = math.sqrt(sum(v * v for v in vetor)) or 1.0
+    return [v / norma for v in vetor]
+
+@functools.lru_cache(maxsize=8)
+def ids_movidesk(semente=42, total=250):
+    """IDs dos artigos existentes na Movidesk falsa, em ordem crescente."""
+    return tuple(sorted(_rng(semente, "movidesk", "ids").sample(range(1000, 600000), total)))
+
+def _ultima_revisao(artigo_id, semente, revisao, taxa_alterados):
+    """Última revisão (0 = original) em que o artigo mudou."""
+    ultima = 0
+    for numero in range(1, revisao + 1):
+        if _rng(semente, "movidesk", "revisao", artigo_id, numero).random() < taxa_alterados:
+            ultima = numero
+    return ultima
+
+@functools.lru_cache(maxsize=100000)
+def artigo_movidesk(artigo_id, semente=42, revisao=0, taxa_alterados=0.0):
+    """
+    Artigo determinístico da base de conhecimento falsa, na revisão pedida.
+
+    Mesmos campos usados da API real: id, title, categories, contentText e
+    updatedDate. Artigos que mudam numa revisão ganham texto novo e
+    `updatedDate` posterior a todas as revisões anteriores. O dicionário é
+    compartilhado (cache): não alterar.
+    """
+    ultima = _ultima_revisao(artigo_id, semente, revisao, taxa_alterados)
+    rng = _rng(semente, "movidesk", artigo_id, ultima)
+    if ultima:
+        atualizado = datetime(2025, 1, 1) + timedelta(days=ultima, seconds=artigo_id % 86400)
+    else:
+        atualizado = datetime(2024, 1, 1) + timedelta(days=artigo_id % 365, seconds=artigo_id % 86400)
+    palavras = ["nota", "fiscal", "estoque", "cadastro", "cliente", "produto", "imposto", "relatório",
+                "pedido", "financeiro", "configuração", "sistema", "emissão", "cálculo", "lançamento"]
+    tamanho = max(40, int(_lognormal(rng, 300, 0.6)))
+    frases = []
+    for inicio in range(0, tamanho, 12):
+        frase = " ".join(rng.choice(palavras) for _ in range(min(12, tamanho - inicio)))
+        frases.append(frase.capitalize() + ".")
+    return {
+        "id": artigo_id,
+        "title": f"Artigo {artigo_id}: " + " ".join(rng.choice(palavras) for _ in range(4)),
+        "categories": [{"name": nome} for nome in rng.sample(CATEGORIAS_MOVIDESK, rng.randint(1, 2))],
+        "contentText": " ".join(frases),
+        "updatedDate": atualizado.isoformat(),
+    }
+
+def _filtro_movidesk(expressao):
+    """Converte o $filter (condições unidas por "and") numa função sobre o artigo."""
+    operadores = {"eq": "__eq__", "ne": "__ne__", "gt": "__gt__", "ge": "__ge__", "lt": "__lt__", "le": "__le__"}
+    condicoes = []
+    for parte in re.split(r"\s+and\s+", expressao.strip()):
+        encontrada = CONDICAO_FILTRO.match(parte.strip())
+        if encontrada is None:
+            raise ValueError(f"filtro não suportado: {parte}")
+        campo, operador, valor = encontrada.groups()
+        valor = int(valor) if campo == "id" else datetime.fromisoformat(valor.rstrip("Z"))
+        condicoes.append((campo, operadores[operador], valor))
+
+    def aceitar(artigo):
+        for campo, operador, valor in condicoes:
+            atual = artigo[campo] if campo == "id" else datetime.fromisoformat(artigo[campo])
+            if not getattr(atual, operador)(valor):
+                return False
+        return True
+    return aceitar
+
+def _texto_das_mensagens(mensagens):
+    """Concatena o conteúdo textual das mensagens do chat."""
+    partes = []
+    for mensagem in mensagens or []:
+        conteudo = mensagem.get("content")
+        if isinstance(conteudo, list):
+            conteudo = " ".join(p.get("text", "") for p in conteudo if isinstance(p, dict))
+        partes.append(conteudo or "")
+    return "\n".join(partes)
+
+def classificar(texto):
+    """Categorias presentes no texto, pela tabela de palavras-chave."""
+    texto = texto.lower()
+    encontradas = [cat for cat, palavras in PALAVRAS_CATEGORIA if any(p in texto for p in palavras)]
+    return encontradas or ["busca_geral"]
+
+def _resposta_chat(corpo, config, rng):
+    """Conteúdo e uso de tokens de um chat completion falso."""
+    mensagens = corpo.get("messages") or []
+    texto = _texto_das_mensagens(mensagens)
+    tokens_prompt = max(1, len(texto) // 4)
+
+    if "classificador" in texto.lower():
+        # Classificador do grafo (histórico) ou da ferramenta (TEXTO DO USUÁRIO)
+        citado = re.search(r'TEXTO DO USUÁRIO:\s*"(.*)"', texto, re.DOTALL)
+        pergunta = citado.group(1) if citado else _texto_das_mensagens(mensagens[-1:])
+        return ", ".join(classificar(pergunta)), tokens_prompt, 3
+
+    tokens = max(5, int(_lognormal(rng, config["tokens_mediana"], config["sigma_tokens"])))
+    palavras = ["resposta", "simulada", "do", "backend", "local", "para", "testes", "de", "carga"]
+    conteudo = " ".join(palavras[i % len(palavras)] for i in range(tokens))
+    if "CONFIANCA" in texto:
+        conteudo += "\nCONFIANCA: " + rng.choice(["alta", "alta", "media", "baixa"])
+    return conteudo, tokens_prompt, tokens
+
+
+class _Estado:
+    """Contadores do servidor (ocorrências por requisição e totais)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.ocorrencias = {}
+        self.por_rota = {}
+        self.cota = None
+        self.cota_em = time.monotonic()
+
+    def proxima_ocorrencia(self, chave):
+        with self._lock:
+            self.ocorrencias[chave] = self.ocorrencias.get(chave, 0) + 1
+            return self.ocorrencias[chave]
+
+    def consumir_cota(self, por_minuto):
+        """
+        Gasta uma requisição da cota (balde com um segundo de rajada).
+
+        Returns:
+            tuple: (permitida, restantes, segundos até liberar a próxima)
+        """
+        taxa = por_minuto / 60.0
+        capacidade = max(1.0, taxa)
+        with self._lock:
+            agora = time.monotonic()
+            if self.cota is None:
+                self.cota = capacidade
+            self.cota = min(capacidade, self.cota + (agora - self.cota_em) * taxa)
+            self.cota_em = agora
+            permitida = self.cota >= 1
+            if permitida:
+                self.cota -= 1
+            proxima = max(0.0, (1 - self.cota) / taxa)
+            return permitida, int(self.cota), proxima
+
+    def contar(self, rota, status):
+        with self._lock:
+            dados = self.por_rota.setdefault(rota, {})
+            dados[status] = dados.get(status, 0) + 1
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    config = None
+    estado = None
+
+    def log_message(self, *args):
+        pass
+
+    def _enviar(self, status, corpo, tipo="application/json", cabecalhos=None):
+        dados = corpo if isinstance(corpo, bytes) else json.dumps(corpo).encode("utf-8")
+        self.send_response(status)
+        for nome, valor in (cabecalhos or {}).items():
+            self.send_header(nome, valor)
+        self.send_header("content-type", tipo)
+        self.send_header("content-length", str(len(dados)))
+        self.end_headers()
+        try:
+            self.wfile.write(dados)
+        except (BrokenPipeError, ConnectionResetError):
+            # Cliente desistiu (prazo esgotado ou especulação cancelada)
+            pass
+
+    def do_GET(self):
+        caminho, _, consulta = self.path.partition("?")
+        encontrado = ROTA_ARTIGO_MOVIDESK.match(caminho)
+        if encontrado is None and caminho != ROTA_LISTA_MOVIDESK:
+            self._enviar(404, {"error": {"message": f"rota desconhecida: {self.path}"}})
+            return
+
+        config = self.config
+        cabecalhos = {}
+        if config["movidesk_rpm"] > 0:
+            permitida, restantes, proxima = self.estado.consumir_cota(config["movidesk_rpm"])
+            cabecalhos = {
+                "x-ratelimit-limit": str(int(config["movidesk_rpm"])),
+                "x-ratelimit-remaining": str(restantes),
+                "x-ratelimit-reset": f"{proxima:.3f}",
+            }
+            if not permitida:
+                self.estado.contar("movidesk", 429)
+                cabecalhos["retry-after"] = f"{proxima:.3f}"
+                self._enviar(429, {"message": "Too many requests (simulado)"}, cabecalhos=cabecalhos)
+                return
+
+        rng = _rng(config["semente"], "movidesk", "latencia", self.path)
+        time.sleep(_lognormal(rng, config["latencias_ms"]["movidesk"], config["sigma_latencia"]) / 1000)
+        existentes = ids_movidesk(config["semente"], config["movidesk_artigos"])
+        versao = (config["semente"], config["movidesk_revisao"], config["movidesk_alterados"])
+
+        if encontrado is None:
+            parametros = {nome: valores[0] for nome, valores in parse_qs(consulta).items()}
+            try:
+                resposta = self._listar_movidesk(existentes, versao, parametros)
+            except ValueError as e:
+                self.estado.contar("movidesk", 400)
+                self._enviar(400, {"message": str(e)}, cabecalhos=cabecalhos)
+                return
+            self.estado.contar("movidesk", 200)
+            self._enviar(200, resposta, cabecalhos=cabecalhos)
+            return
+
+        artigo_id = int(encontrado.group(1))
+        indice = bisect.bisect_left(existentes, artigo_id)
+        if indice == len(existentes) or existentes[indice] != artigo_id:
+            self.estado.contar("movidesk", 404)
+            self._enviar(404, {"message": "Article not found"}, cabecalhos=cabecalhos)
+            return
+        self.estado.contar("movidesk", 200)
+        self._enviar(200, artigo_movidesk(artigo_id, *versao), cabecalhos=cabecalhos)
+
+    def _listar_movidesk(self, existentes, versao, parametros):
+        """Uma página da listagem: filtra, pagina e projeta os campos pedidos."""
+        # Um $top acima do máximo é reduzido em silêncio (a página vem menor)
+        topo = min(int(parametros.get("$top", self.config["movidesk_pagina_maxima"])),
+                   self.config["movidesk_pagina_maxima"])
+        pular = int(parametros.get("$skip", 0))
+        aceitar = _filtro_movidesk(parametros["$filter"]) if parametros.get("$filter") else None
+        campos = [campo.strip() for campo in parametros.get("$select", "").split(",") if campo.strip()]
+        ordem = [campo.strip() for campo in parametros.get("$orderby", "id").split(",") if campo.strip()]
+
+        artigos = (artigo_movidesk(artigo_id, *versao) for artigo_id in existentes)
+        if aceitar is not None:
+            artigos = (artigo for artigo in artigos if aceitar(artigo))
+        if ordem != ["id"]:
+            artigos = sorted(artigos, key=lambda artigo: tuple(artigo[campo] for campo in ordem))
+        pagina = itertools.islice(artigos, pular, pular + topo)
+        return [{campo: artigo.get(campo) for campo in campos} if campos else artigo for artigo in pagina]
+
+    def do_POST(self):
+        bruto = self.rfile.read(int(self.headers.get("content-length", 0) or 0))
+        rota = ROTAS.get(self.path.split("?")[0])
+        if rota is None:
+            self._enviar(404, {"error": {"message": f"rota desconhecida: {self.path}"}})
+            return
+
+        config = self.config
+        rng = _rng(config["semente"], rota, bruto)
+
+        # Falhas injetadas variam a cada repetição da mesma requisição
+        chave = hashlib.sha1(bruto).hexdigest()
+        falha = _rng(config["semente"], "falha", chave, self.estado.proxima_ocorrencia(chave)).random()
+        if falha < config["taxa_429"]:
+            time.sleep(_lognormal(rng, 20, 0.2) / 1000)
+            self.estado.contar(rota, 429)
+            self._enviar(429, {"error": {"message": "rate limit (simulado)"}}, cabecalhos={"retry-after": "0.5"})
+            return
+        if falha < config["taxa_429"] + config["taxa_5xx"]:
+            time.sleep(_lognormal(rng, 20, 0.2) / 1000)
+            self.estado.contar(rota, 503)
+            self._enviar(503, {"error": {"message": "indisponível (simulado)"}})
+            return
+
+        latencia = _lognormal(rng, config["latencias_ms"][rota], config["sigma_latencia"])
+        corpo = {}
+        if "json" in (self.headers.get("content-type") or ""):
+            corpo = json.loads(bruto or b"{}")
+
+        if rota == "chat":
+            conteudo, tokens_prompt, tokens = _resposta_chat(corpo, config, rng)
+            latencia += tokens * config["ms_por_token"]
+            resposta = {
+                "id": f"chatcmpl-{chave[:12]}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": corpo.get("model", "fake"),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": conteudo},
+                    "finish_reason": "stop",
+                }],
+                "usage": {
+                    "prompt_tokens": tokens_prompt,
+                    "completion_tokens": tokens,
+                    "total_tokens": tokens_prompt + tokens,
+                },
+            }
+        elif rota == "embeddings":
+            entradas = corpo.get("input")
+            entradas = entradas if isinstance(entradas, list) else [entradas]
+            # Entradas já tokenizadas chegam como listas de inteiros
+            textos = [e if isinstance(e, str) else json.dumps(e) for e in entradas]
+            latencia += len(textos) * 0.5
+            resposta = {
+                "object": "list",
+                "data": [
+                    {"object": "embedding", "index": i,
+                     "embedding": vetor_embedding(t, config["dimensao_embedding"], config["semente"])}
+                    for i, t in enumerate(textos)
+                ],
+                "model": corpo.get("model", "fake"),
+                "usage": {"prompt_tokens": sum(len(t) // 4 for t in textos),
+                          "total_tokens": sum(len(t) // 4 for t in textos)},
+            }
+        elif rota == "images":
+            resposta = {"created": int(time.time()), "data": [{"url": f"https://fake.local/imagens/{chave[:16]}.png"}]}
+        elif rota == "transcriptions":
+            resposta = {"text": "Transcrição simulada do áudio enviado."}
+        elif rota == "speech":
+            time.sleep(latencia / 1000)
+            self.estado.contar(rota, 200)
+            self._enviar(200, b"ID3" + rng.randbytes(2048), tipo="audio/mpeg")
+            return
+        else:
+            resposta = {
+                "query": corpo.get("query"),
+                "results": [
+                    {"title": "Resultado simulado", "url": "https://fake.local/busca",
+                     "content": f"Resultado simulado para: {corpo.get('query')}", "score": 0.9},
+                ][:corpo.get("max_results") or 5],
+            }
+
+        time.sleep(latencia / 1000)
+        self.estado.contar(rota, 200)
+        self._enviar(200, resposta)
+
+
+class ServidorFalso:
+    """Servidor dos backends falsos em uma thread própria."""
+
+    def __init__(self, porta=0, config=None):
+        handler = type("Handler", (_Handler,), {
+            "config": config or get_fake_config(),
+            "estado": _Estado(),
+        })
+        self._handler = handler
+        self._servidor = ThreadingHTTPServer(("127.0.0.1", porta), handler)
+        self._servidor.daemon_threads = True
+        self.porta = self._servidor.server_address[1]
+        self.url = f"http://127.0.0.1:{self.porta}"
+        self._thread = None
+
+    def iniciar(self):
+        self._thread = threading.Thread(target=self._servidor.serve_forever, name="fake-backends", daemon=True)
+        self._thread.start()
+        return self
+
+    def parar(self):
+        self._servidor.shutdown()
+        self._servidor.server_close()
+
+    def estatisticas(self):
+        """Respostas enviadas por rota e status."""
+        return {rota: dict(dados) for rota, dados in self._handler.estado.por_rota.items()}
+
+
+_servidor = None
+
+def ativo():
+    """Indica se os backends falsos foram ativados neste processo."""
+    return _servidor is not None
+
+def obter_servidor():
+    return _servidor
+
+def ativar(porta=0, config=None):
+    """
+    Inicia o servidor falso e aponta os clientes do processo para ele.
+
+    Precisa rodar antes de os clientes da OpenAI serem criados.
+    """
+    global _servidor
+    if _servidor is None:
+        _servidor = ServidorFalso(porta, config).iniciar()
+        os.environ["OPENAI_BASE_URL"] = f"{_servidor.url}/v1"
+        os.environ["TAVILY_BASE_URL"] = _servidor.url
+        os.environ["MOVIDESK_BASE_URL"] = f"{_servidor.url}/public/v1"
+        os.environ.setdefault("OPENAI_API_KEY", "fake")
+        os.environ.setdefault("TAVILY_API_KEY", "fake")
+        # O tokenizador (tiktoken) baixa o vocabulário da internet
+        os.environ.setdefault("EMBEDDINGS_CHECK_CTX_LENGTH", "false")
+        print(f"--- 🧪 Backends falsos ativos em {_servidor.url} ---")
+    return _servidor
+
+def ativar_se_configurado():
+    """Ativa os backends falsos quando FAKE_BACKENDS=true."""
+    load_dotenv()
+    if os.getenv("FAKE_BACKENDS", "false").lower() == "true":
+        return ativar(int(os.getenv("FAKE_BACKENDS_PORT", "0")))
+    return None
+
+def main(argv=None):
+    """Roda o servidor falso em primeiro plano."""
+    parser = argparse.ArgumentParser(description="Backends falsos da OpenAI, do Tavily e da Movidesk.")
+    parser.add_argument("--porta", type=int, default=int(os.getenv("FAKE_BACKENDS_PORT", "8765")))
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    servidor = ServidorFalso(args.porta)
+    print(f"Backends falsos em {servidor.url}")
+    print(f"  OPENAI_BASE_URL={servidor.url}/v1")
+    print(f"  TAVILY_BASE_URL={servidor.url}")
+    print(f"  MOVIDESK_BASE_URL={servidor.url}/public/v1")
+    try:
+        servidor._servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,139 +1,859 @@
 """
 Sistema de aprendizado incremental para o assistente multimodal.
+
+Interações e feedbacks são gravados como eventos em um log só de
+acréscimo, um arquivo JSONL por dia (`events-AAAA-MM-DD.jsonl`), por um
+gravador em segundo plano que junta os eventos em lotes. Um registro não
+regrava mais o histórico inteiro.
+
+Os agregados ficam em `snapshot.json`, junto da posição do log que eles
+já incluem (quanto de cada segmento já foi lido, porque um evento que
+ficou na fila na virada do dia é gravado depois no segmento do seu dia,
+já anterior): totais, uso por intenção, feedback por tipo, as consultas
+mais frequentes (Space-Saving, com no máximo LEARNING_TOP_K contadores),
+um índice da entrada normalizada para a intenção e a cauda de eventos
+recentes. Cada evento atualiza tudo isso em O(1), então os insights não
+dependem do tamanho do log. Ao carregar, lê-se o snapshot e só os eventos
+posteriores a ele. O snapshot é refeito a partir do próprio log, então
+vários processos podem gravar no mesmo diretório (com trava de arquivo)
+sem perder eventos uns dos outros.
+
+Interações, intenções, latência e feedback também são contados em baldes
+por hora e por dia, de onde saem as janelas móveis (24 h, 7 d, 30 d). Os
+segmentos brutos mais antigos que LEARNING_RAW_RETENTION_DAYS são
+resumidos em `summaries.jsonl` (um balde por dia) e apagados, então
+memória, disco do log e tempo de carga não crescem com o tempo de uso.
+
+Na primeira execução, o `learning_data.json` antigo é importado.
+
+Configuração:
+    LEARNING_DATA_DIR: diretório do log e do snapshot
+    LEARNING_LEGACY_FILE: arquivo JSON do formato antigo (importado uma vez)
+    LEARNING_TAIL_SIZE: eventos recentes mantidos em memória
+    LEARNING_FLUSH_EVENTS: máximo de eventos por gravação
+    LEARNING_FLUSH_INTERVAL_SECONDS: espera para juntar eventos num lote
+    LEARNING_SNAPSHOT_EVERY: eventos gravados entre atualizações do snapshot
+    LEARNING_TOP_K: contadores do sketch de consultas frequentes
+    LEARNING_INDEX_SIZE: entradas distintas no índice entrada -> intenção
+    LEARNING_HOURLY_RETENTION_HOURS: baldes por hora mantidos
+    LEARNING_DAILY_RETENTION_DAYS: baldes por dia mantidos
+    LEARNING_RAW_RETENTION_DAYS: dias de eventos brutos antes de resumir
 """
 
 import json
 import os
-from datetime import datetime
-from collections import defaultdict, Counter
+import time
+import queue
+import atexit
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from collections import defaultdict, deque, Counter, OrderedDict
 
-class LearningSystem:
-    def __init__(self, data_file="learning_data.json"):
-        self.data_file = data_file
-        self.interactions = []
-        self.feedback_data = []
+from single_flight import normalizar_pergunta
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+LEARNING_CONFIG = {
+    "diretorio": os.getenv("LEARNING_DATA_DIR", "learning_data"),
+    "arquivo_legado": os.getenv("LEARNING_LEGACY_FILE", "learning_data.json"),
+    "tamanho_cauda": int(os.getenv("LEARNING_TAIL_SIZE", "1000")),
+    "tamanho_lote": int(os.getenv("LEARNING_FLUSH_EVENTS", "100")),
+    "intervalo": float(os.getenv("LEARNING_FLUSH_INTERVAL_SECONDS", "1.0")),
+    "snapshot_a_cada": int(os.getenv("LEARNING_SNAPSHOT_EVERY", "1000")),
+    "top_k": int(os.getenv("LEARNING_TOP_K", "100")),
+    "tamanho_indice": int(os.getenv("LEARNING_INDEX_SIZE", "100000")),
+    "retencao_horas": int(os.getenv("LEARNING_HOURLY_RETENTION_HOURS", "72")),
+    "retencao_dias": int(os.getenv("LEARNING_DAILY_RETENTION_DAYS", "400")),
+    "retencao_bruta_dias": int(os.getenv("LEARNING_RAW_RETENTION_DAYS", "30")),
+}
+
+ARQUIVO_SNAPSHOT = "snapshot.json"
+# Snapshots de outra versão são descartados e refeitos a partir do log
+VERSAO_SNAPSHOT = 3
+ARQUIVO_RESUMOS = "summaries.jsonl"
+ARQUIVO_TRAVA = ".lock"
+PREFIXO_SEGMENTO = "events-"
+
+def get_learning_config():
+    """Retorna a configuração do sistema de aprendizado."""
+    return LEARNING_CONFIG
+
+@contextmanager
+def _travar(diretorio):
+    """Trava exclusiva entre processos para o diretório do log."""
+    with open(os.path.join(diretorio, ARQUIVO_TRAVA), 'a+b') as f:
+        if fcntl:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+# --- LOG DE EVENTOS ---
+def _nome_segmento(evento):
+    """Segmento diário do evento, pela data do timestamp."""
+    return f"{PREFIXO_SEGMENTO}{evento['timestamp'][:10]}.jsonl"
+
+def listar_segmentos(diretorio):
+    """Segmentos do log em ordem cronológica."""
+    if not os.path.isdir(diretorio):
+        return []
+    return sorted(nome for nome in os.listdir(diretorio)
+                  if nome.startswith(PREFIXO_SEGMENTO) and nome.endswith(".jsonl"))
+
+def acrescentar_eventos(diretorio, eventos):
+    """Acrescenta eventos aos segmentos do dia, sob a trava do diretório."""
+    por_segmento = defaultdict(list)
+    for evento in eventos:
+        por_segmento[_nome_segmento(evento)].append(
+            json.dumps(evento, ensure_ascii=False, separators=(",", ":")) + "\n"
+        )
+    with _travar(diretorio):
+        for nome, linhas in por_segmento.items():
+            with open(os.path.join(diretorio, nome), 'a', encoding='utf-8') as f:
+                f.write("".join(linhas))
+                f.flush()
+                os.fsync(f.fileno())
+
+def _offsets_lidos(diretorio, posicao):
+    """
+    Bytes já lidos de cada segmento existente, pela posição de um snapshot.
+
+    Aceita a posição dos snapshots anteriores (um segmento e um offset,
+    com tudo antes dele dado como lido).
+    """
+    if not posicao:
+        return {}
+    segmentos = listar_segmentos(diretorio)
+    if "segments" in posicao:
+        return {nome: offset for nome, offset in posicao["segments"].items() if nome in segmentos}
+    offsets = {}
+    for nome in segmentos:
+        if nome < posicao["segment"]:
+            offsets[nome] = os.path.getsize(os.path.join(diretorio, nome))
+        elif nome == posicao["segment"]:
+            offsets[nome] = posicao["offset"]
+    return offsets
+
+def ler_eventos_desde(diretorio, posicao=None):
+    """
+    Percorre os eventos gravados depois de `posicao`, em todos os segmentos.
+
+    Cada segmento é lido a partir do que a posição já inclui dele, então
+    eventos acrescentados a um segmento antigo também entram. Linhas
+    incompletas (gravação em andamento) ficam para a próxima leitura.
+
+    Yields:
+        tuple: (evento, posição logo após o evento); a posição é o mesmo
+            dicionário, atualizado a cada evento
+    """
+    offsets = _offsets_lidos(diretorio, posicao)
+    posicao = {"segments": offsets}
+    for nome in listar_segmentos(diretorio):
+        caminho = os.path.join(diretorio, nome)
+        inicio = offsets.get(nome, 0)
+        if inicio > os.path.getsize(caminho):
+            # Segmento aposentado e recriado por um evento atrasado
+            inicio = 0
+        with open(caminho, 'rb') as f:
+            f.seek(inicio)
+            while True:
+                linha = f.readline()
+                if not linha.endswith(b"\n"):
+                    break
+                offsets[nome] = f.tell()
+                if linha.strip():
+                    yield json.loads(linha), posicao
+
+# --- BALDES POR HORA E POR DIA ---
+# Limites superiores (ms) do histograma de latência de cada balde
+LIMITES_LATENCIA = [100, 200, 300, 500, 750, 1000, 1500, 2000, 3000, 5000, 7500,
+                    10000, 15000, 20000, 30000, 60000, float("inf")]
+
+# Janela -> (granularidade, quantidade de baldes)
+JANELAS = {
+    "24h": ("hora", 24),
+    "7d": ("dia", 7),
+    "30d": ("dia", 30),
+}
+
+def _novo_balde():
+    return {
+        "interactions": 0,
+        "intents": {},
+        "feedback": {},
+        "latency_count": 0,
+        "latency_sum": 0.0,
+        "latency_max": 0.0,
+        "latency_hist": [0] * len(LIMITES_LATENCIA),
+    }
+
+def _aplicar_no_balde(balde, evento):
+    """Conta o evento no balde."""
+    if evento.get("type") == "feedback":
+        tipo = evento["feedback_type"]
+        balde["feedback"][tipo] = balde["feedback"].get(tipo, 0) + 1
+        return
+    balde["interactions"] += 1
+    balde["intents"][evento["intent"]] = balde["intents"].get(evento["intent"], 0) + 1
+    latencia = evento.get("latency_ms")
+    if latencia is not None:
+        balde["latency_count"] += 1
+        balde["latency_sum"] += latencia
+        balde["latency_max"] = max(balde["latency_max"], latencia)
+        balde["latency_hist"][next(i for i, limite in enumerate(LIMITES_LATENCIA) if latencia <= limite)] += 1
+
+def _somar_baldes(destino, origem):
+    """Acumula `origem` em `destino`."""
+    destino["interactions"] += origem["interactions"]
+    for campo in ("intents", "feedback"):
+        for chave, valor in origem[campo].items():
+            destino[campo][chave] = destino[campo].get(chave, 0) + valor
+    destino["latency_count"] += origem["latency_count"]
+    destino["latency_sum"] += origem["latency_sum"]
+    destino["latency_max"] = max(destino["latency_max"], origem["latency_max"])
+    destino["latency_hist"] = [a + b for a, b in zip(destino["latency_hist"], origem["latency_hist"])]
+    return destino
+
+def percentil_histograma(histograma, p, maximo):
+    """Limite superior da faixa que contém o percentil p (ms), sem passar do máximo visto."""
+    total = sum(histograma)
+    if not total:
+        return None
+    alvo = total * p / 100
+    acumulado = 0
+    for contagem, limite in zip(histograma, LIMITES_LATENCIA):
+        acumulado += contagem
+        if acumulado >= alvo:
+            return min(limite, maximo)
+    return maximo
+
+
+class BaldesTempo:
+    """Baldes de uma granularidade (hora ou dia), só os mais recentes."""
+
+    def __init__(self, tamanho_chave, retencao):
+        self.tamanho_chave = tamanho_chave  # 13 -> AAAA-MM-DDTHH, 10 -> AAAA-MM-DD
+        self.retencao = retencao
+        self.baldes = {}
+
+    def aplicar(self, evento):
+        chave = evento["timestamp"][:self.tamanho_chave]
+        balde = self.baldes.get(chave)
+        if balde is None:
+            balde = self.baldes[chave] = _novo_balde()
+            if len(self.baldes) > self.retencao:
+                # Raro (um balde novo por hora/dia): descarta os mais antigos
+                for antiga in sorted(self.baldes)[:len(self.baldes) - self.retencao]:
+                    del self.baldes[antiga]
+        _aplicar_no_balde(balde, evento)
+
+    def somar_desde(self, chave_inicial):
+        """Soma dos baldes com chave >= `chave_inicial`."""
+        total = _novo_balde()
+        for chave, balde in self.baldes.items():
+            if chave >= chave_inicial:
+                _somar_baldes(total, balde)
+        return total
+
+
+# --- AGREGADOS ---
+class TopK:
+    """
+    Itens mais frequentes com memória limitada (Space-Saving).
+
+    Mantém no máximo `capacidade` contadores agrupados por contagem, então
+    registrar é O(1). Quando um item novo chega com os contadores cheios,
+    ele herda o contador de menor contagem (que passa a ser o seu erro
+    máximo). Itens com frequência acima de total/capacidade nunca saem.
+    """
+
+    def __init__(self, capacidade=100):
+        self.capacidade = capacidade
+        self.contagens = {}
+        self.erros = {}
+        self.exemplos = {}
+        self._baldes = defaultdict(dict)  # contagem -> itens (dict mantém a ordem de chegada)
+        self._minimo = 0
+
+    def registrar(self, chave, exemplo=None):
+        contagem = self.contagens.get(chave)
+        if contagem is None:
+            if len(self.contagens) < self.capacidade:
+                contagem = 0
+                self.erros[chave] = 0
+            else:
+                # Substitui o item mais antigo entre os de menor contagem
+                contagem = self._minimo
+                removido = next(iter(self._baldes[contagem]))
+                self._remover_do_balde(removido, contagem)
+                del self.contagens[removido], self.erros[removido], self.exemplos[removido]
+                self.erros[chave] = contagem
+            self.exemplos[chave] = exemplo if exemplo is not None else chave
+        else:
+            self._remover_do_balde(chave, contagem)
+
+        self.contagens[chave] = contagem + 1
+        self._baldes[contagem + 1][chave] = None
+        if contagem == 0:
+            self._minimo = 1
+        elif contagem == self._minimo and not self._baldes.get(contagem):
+            self._minimo = contagem + 1
+
+    def _remover_do_balde(self, chave, contagem):
+        balde = self._baldes[contagem]
+        del balde[chave]
+        if not balde:
+            del self._baldes[contagem]
+
+    def mais_frequentes(self, limite=10):
+        """[(exemplo, contagem)] em ordem decrescente de contagem."""
+        ordenados = sorted(self.contagens.items(), key=lambda item: item[1], reverse=True)[:limite]
+        return [(self.exemplos[chave], contagem) for chave, contagem in ordenados]
+
+    def para_dict(self):
+        return {
+            "capacidade": self.capacidade,
+            "itens": [[chave, contagem, self.erros[chave], self.exemplos[chave]]
+                      for chave, contagem in self.contagens.items()],
+        }
+
+    @classmethod
+    def de_dict(cls, dados, capacidade=None):
+        topk = cls(capacidade or dados.get("capacidade", 100))
+        # Maiores primeiro, para que uma capacidade menor descarte os menores
+        for chave, contagem, erro, exemplo in sorted(dados.get("itens", []), key=lambda item: item[1], reverse=True):
+            if len(topk.contagens) >= topk.capacidade:
+                break
+            topk.contagens[chave] = contagem
+            topk.erros[chave] = erro
+            topk.exemplos[chave] = exemplo
+            topk._baldes[contagem][chave] = None
+        topk._minimo = min(topk._baldes, default=0)
+        return topk
+
+
+class IndiceEntradas:
+    """Entrada normalizada -> intenção da primeira interação (LRU limitado)."""
+
+    def __init__(self, capacidade=100000):
+        self.capacidade = capacidade
+        self._dados = OrderedDict()
+
+    def registrar(self, chave, intencao):
+        if chave in self._dados:
+            self._dados.move_to_end(chave)
+            return
+        self._dados[chave] = intencao
+        if len(self._dados) > self.capacidade:
+            self._dados.popitem(last=False)
+
+    def obter(self, chave):
+        return self._dados.get(chave)
+
+    def __len__(self):
+        return len(self._dados)
+
+    def para_lista(self):
+        return list(self._dados.items())
+
+    @classmethod
+    def de_lista(cls, itens, capacidade=100000):
+        indice = cls(capacidade)
+        for chave, intencao in itens[-capacidade:]:
+            indice._dados[chave] = intencao
+        return indice
+
+
+class Agregados:
+    """Totais, sketch de consultas, índice de entradas e cauda recente, atualizados evento a evento."""
+
+    def __init__(self, tamanho_cauda=1000):
+        self.total_interactions = 0
+        self.total_feedback = 0
+        self.feedback_types = Counter()
         self.usage_patterns = defaultdict(int)
-        self.load_data()
-    
-    def load_data(self):
-        """Carrega dados de aprendizado existentes."""
-        if os.path.exists(self.data_file):
+        self.problem_intents = defaultdict(int)
+        self.frequent_queries = TopK(LEARNING_CONFIG["top_k"])
+        self.input_index = IndiceEntradas(LEARNING_CONFIG["tamanho_indice"])
+        self.recent_interactions = deque(maxlen=tamanho_cauda)
+        self.recent_feedback = deque(maxlen=tamanho_cauda)
+        self.recent_negative = deque(maxlen=5)
+        self.hourly = BaldesTempo(13, LEARNING_CONFIG["retencao_horas"])
+        self.daily = BaldesTempo(10, LEARNING_CONFIG["retencao_dias"])
+
+    def aplicar(self, evento):
+        self.hourly.aplicar(evento)
+        self.daily.aplicar(evento)
+        chave = normalizar_pergunta(evento["user_input"])
+        if evento.get("type") == "feedback":
+            self.total_feedback += 1
+            self.feedback_types[evento["feedback_type"]] += 1
+            self.recent_feedback.append(evento)
+            if evento["feedback_type"] == "negative":
+                self.recent_negative.append(evento)
+                intencao = self.input_index.obter(chave)
+                if intencao is not None:
+                    self.problem_intents[intencao] += 1
+        else:
+            self.total_interactions += 1
+            self.usage_patterns[evento["intent"]] += 1
+            self.frequent_queries.registrar(chave, evento["user_input"])
+            self.input_index.registrar(chave, evento["intent"])
+            self.recent_interactions.append(evento)
+
+    def aplicar_resumo(self, resumo):
+        """Incorpora o resumo diário de eventos já aposentados do log."""
+        balde = resumo["bucket"]
+        self.total_interactions += balde["interactions"]
+        self.total_feedback += sum(balde["feedback"].values())
+        self.feedback_types.update(balde["feedback"])
+        for intencao, quantidade in balde["intents"].items():
+            self.usage_patterns[intencao] += quantidade
+        if resumo["day"] in self.daily.baldes:
+            _somar_baldes(self.daily.baldes[resumo["day"]], balde)
+        else:
+            self.daily.baldes[resumo["day"]] = _somar_baldes(_novo_balde(), balde)
+
+    def janela(self, nome, agora=None):
+        """Soma dos baldes da janela móvel ("24h", "7d" ou "30d")."""
+        granularidade, quantidade = JANELAS[nome]
+        agora = agora or datetime.now()
+        if granularidade == "hora":
+            inicio = (agora - timedelta(hours=quantidade - 1)).strftime("%Y-%m-%dT%H")
+            return self.hourly.somar_desde(inicio)
+        inicio = (agora - timedelta(days=quantidade - 1)).strftime("%Y-%m-%d")
+        return self.daily.somar_desde(inicio)
+
+    def para_dict(self):
+        return {
+            "total_interactions": self.total_interactions,
+            "total_feedback": self.total_feedback,
+            "feedback_types": dict(self.feedback_types),
+            "usage_patterns": dict(self.usage_patterns),
+            "problem_intents": dict(self.problem_intents),
+            "frequent_queries": self.frequent_queries.para_dict(),
+            "input_index": self.input_index.para_lista(),
+            "recent_interactions": list(self.recent_interactions),
+            "recent_feedback": list(self.recent_feedback),
+            "recent_negative": list(self.recent_negative),
+            "hourly": self.hourly.baldes,
+            "daily": self.daily.baldes,
+        }
+
+    @classmethod
+    def de_dict(cls, dados, tamanho_cauda=1000):
+        agregados = cls(tamanho_cauda)
+        agregados.total_interactions = dados.get("total_interactions", 0)
+        agregados.total_feedback = dados.get("total_feedback", 0)
+        agregados.feedback_types = Counter(dados.get("feedback_types", {}))
+        agregados.usage_patterns = defaultdict(int, dados.get("usage_patterns", {}))
+        agregados.problem_intents = defaultdict(int, dados.get("problem_intents", {}))
+        agregados.frequent_queries = TopK.de_dict(dados.get("frequent_queries", {}), LEARNING_CONFIG["top_k"])
+        agregados.input_index = IndiceEntradas.de_lista(dados.get("input_index", []), LEARNING_CONFIG["tamanho_indice"])
+        agregados.recent_interactions.extend(dados.get("recent_interactions", []))
+        agregados.recent_feedback.extend(dados.get("recent_feedback", []))
+        agregados.recent_negative.extend(dados.get("recent_negative", []))
+        agregados.hourly.baldes = dados.get("hourly", {})
+        agregados.daily.baldes = dados.get("daily", {})
+        return agregados
+
+# --- SNAPSHOT ---
+def _agregados_dos_resumos(diretorio, tamanho_cauda=1000):
+    """Ponto de partida sem snapshot: os resumos dos dias já aposentados."""
+    agregados = Agregados(tamanho_cauda)
+    caminho = os.path.join(diretorio, ARQUIVO_RESUMOS)
+    if os.path.exists(caminho):
+        with open(caminho, 'r', encoding='utf-8') as f:
+            for linha in f:
+                if linha.strip():
+                    agregados.aplicar_resumo(json.loads(linha))
+    return agregados
+
+def ler_snapshot(diretorio, tamanho_cauda=1000):
+    """Retorna (agregados, posição do log incluída) do snapshot, ou os resumos."""
+    caminho = os.path.join(diretorio, ARQUIVO_SNAPSHOT)
+    if not os.path.exists(caminho):
+        return _agregados_dos_resumos(diretorio, tamanho_cauda), None
+    with open(caminho, 'r', encoding='utf-8') as f:
+        dados = json.load(f)
+    if dados.get("version") != VERSAO_SNAPSHOT:
+        print(f"--- 🔁 Snapshot de aprendizado em versão antiga, refazendo a partir do log ---")
+        return _agregados_dos_resumos(diretorio, tamanho_cauda), None
+    return Agregados.de_dict(dados["aggregates"], tamanho_cauda), dados.get("position")
+
+def gravar_snapshot(diretorio, agregados, posicao):
+    """Grava o snapshot de forma atômica (arquivo temporário + troca)."""
+    caminho = os.path.join(diretorio, ARQUIVO_SNAPSHOT)
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump({
+            "version": VERSAO_SNAPSHOT,
+            "position": posicao,
+            "aggregates": agregados.para_dict(),
+            "last_updated": datetime.now().isoformat(),
+        }, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(temporario, caminho)
+
+def carregar(diretorio, tamanho_cauda=1000):
+    """Agregados atuais: snapshot mais os eventos gravados depois dele."""
+    agregados, posicao = ler_snapshot(diretorio, tamanho_cauda)
+    for evento, posicao in ler_eventos_desde(diretorio, posicao):
+        agregados.aplicar(evento)
+    return agregados
+
+def compactar(diretorio, tamanho_cauda=1000):
+    """Incorpora ao snapshot os eventos gravados depois dele."""
+    with _travar(diretorio):
+        agregados, posicao = ler_snapshot(diretorio, tamanho_cauda)
+        novos = 0
+        for evento, posicao in ler_eventos_desde(diretorio, posicao):
+            agregados.aplicar(evento)
+            novos += 1
+        if novos:
+            gravar_snapshot(diretorio, agregados, posicao)
+    return agregados
+
+def aposentar_segmentos(diretorio, dias_retencao=30, hoje=None):
+    """
+    Resume em `summaries.jsonl` e apaga os segmentos mais antigos que a retenção.
+
+    Só segmentos já incluídos por inteiro no snapshot são aposentados; cada
+    um vira um balde diário, lido linha a linha.
+
+    Returns:
+        list: Dias aposentados
+    """
+    limite = ((hoje or datetime.now()) - timedelta(days=dias_retencao)).strftime("%Y-%m-%d")
+    aposentados = []
+    with _travar(diretorio):
+        _, posicao = ler_snapshot(diretorio)
+        if posicao is None:
+            return aposentados
+        lidos = _offsets_lidos(diretorio, posicao)
+        for nome in listar_segmentos(diretorio):
+            dia = nome[len(PREFIXO_SEGMENTO):-len(".jsonl")]
+            if dia >= limite:
+                break
+            caminho = os.path.join(diretorio, nome)
+            if lidos.get(nome, 0) < os.path.getsize(caminho):
+                continue
+            balde = _novo_balde()
+            with open(caminho, 'r', encoding='utf-8') as f:
+                for linha in f:
+                    if linha.strip():
+                        _aplicar_no_balde(balde, json.loads(linha))
+            with open(os.path.join(diretorio, ARQUIVO_RESUMOS), 'a', encoding='utf-8') as f:
+                f.write(json.dumps({"day": dia, "bucket": balde}, ensure_ascii=False, separators=(",", ":")) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.remove(caminho)
+            aposentados.append(dia)
+    if aposentados:
+        print(f"--- 🗜️ {len(aposentados)} dias de eventos resumidos em {ARQUIVO_RESUMOS} ---")
+    return aposentados
+
+def migrar_json_legado(caminho_legado, diretorio, tamanho_cauda=1000):
+    """
+    Importa o `learning_data.json` do formato antigo para o log.
+
+    Só roda com o diretório vazio; o arquivo antigo não é alterado.
+
+    Returns:
+        int: Eventos importados
+    """
+    os.makedirs(diretorio, exist_ok=True)
+    if listar_segmentos(diretorio) or os.path.exists(os.path.join(diretorio, ARQUIVO_SNAPSHOT)):
+        return 0
+    with open(caminho_legado, 'r', encoding='utf-8') as f:
+        dados = json.load(f)
+
+    eventos = [{"type": "interaction", **i} for i in dados.get("interactions", [])]
+    eventos += [{"type": "feedback", **f} for f in dados.get("feedback", [])]
+    eventos.sort(key=lambda evento: evento["timestamp"])
+    if eventos:
+        acrescentar_eventos(diretorio, eventos)
+
+    with _travar(diretorio):
+        agregados, posicao = Agregados(tamanho_cauda), None
+        for evento, posicao in ler_eventos_desde(diretorio):
+            agregados.aplicar(evento)
+        # O uso por intenção antigo pode ter contagens sem a interação correspondente
+        if dados.get("usage_patterns"):
+            agregados.usage_patterns = defaultdict(int, dados["usage_patterns"])
+        gravar_snapshot(diretorio, agregados, posicao)
+    print(f"--- 📦 {len(eventos)} eventos importados de {caminho_legado} para {diretorio} ---")
+    return len(eventos)
+
+# --- GRAVAÇÃO EM SEGUNDO PLANO ---
+class GravadorEventos:
+    """Grava os eventos de um diretório em lotes, numa thread própria."""
+
+    def __init__(self, diretorio, tamanho_lote=100, intervalo=1.0, snapshot_a_cada=1000, tamanho_cauda=1000):
+        self.diretorio = diretorio
+        self.tamanho_lote = tamanho_lote
+        self.intervalo = intervalo
+        self.snapshot_a_cada = snapshot_a_cada
+        self.tamanho_cauda = tamanho_cauda
+        self._fila = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._desde_snapshot = 0
+        self.lotes = 0
+        self.eventos = 0
+        self.erros = 0
+
+    def enfileirar(self, evento):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._executar, daemon=True, name="gravador-aprendizado")
+                self._thread.start()
+        self._fila.put(evento)
+
+    def descarregar(self):
+        """Bloqueia até todos os eventos enfileirados estarem gravados."""
+        if self._thread is not None and self._thread.is_alive():
+            self._fila.join()
+
+    def _coletar_lote(self, primeiro):
+        lote = [primeiro]
+        limite = time.monotonic() + self.intervalo
+        while len(lote) < self.tamanho_lote:
+            espera = limite - time.monotonic()
+            if espera <= 0:
+                break
             try:
-                with open(self.data_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    self.interactions = data.get('interactions', [])
-                    self.feedback_data = data.get('feedback', [])
-                    self.usage_patterns = defaultdict(int, data.get('usage_patterns', {}))
+                lote.append(self._fila.get(timeout=espera))
+            except queue.Empty:
+                break
+        return lote
+
+    def _executar(self):
+        while True:
+            lote = self._coletar_lote(self._fila.get())
+            try:
+                acrescentar_eventos(self.diretorio, lote)
+                self.lotes += 1
+                self.eventos += len(lote)
+                self._desde_snapshot += len(lote)
+                if self._desde_snapshot >= self.snapshot_a_cada:
+                    compactar(self.diretorio, self.tamanho_cauda)
+                    aposentar_segmentos(self.diretorio, LEARNING_CONFIG["retencao_bruta_dias"])
+                    self._desde_snapshot = 0
             except Exception as e:
-                print(f"Erro ao carregar dados de aprendizado: {e}")
-    
+                self.erros += 1
+                print(f"Erro ao gravar eventos de aprendizado ({len(lote)} eventos): {e}")
+            finally:
+                for _ in lote:
+                    self._fila.task_done()
+
+    def encerrar(self):
+        """Grava o que falta e atualiza o snapshot (chamado na saída do processo)."""
+        self.descarregar()
+        if self.eventos and os.path.isdir(self.diretorio):
+            compactar(self.diretorio, self.tamanho_cauda)
+
+    def resumo(self):
+        return {
+            "lotes": self.lotes,
+            "eventos": self.eventos,
+            "erros": self.erros,
+            "pendentes": self._fila.qsize(),
+        }
+
+_gravadores = {}
+_gravadores_lock = threading.Lock()
+
+def _obter_gravador(diretorio, tamanho_cauda):
+    """Um gravador por diretório no processo, compartilhado pelas instâncias."""
+    chave = os.path.abspath(diretorio)
+    with _gravadores_lock:
+        if chave not in _gravadores:
+            gravador = GravadorEventos(
+                diretorio,
+                tamanho_lote=LEARNING_CONFIG["tamanho_lote"],
+                intervalo=LEARNING_CONFIG["intervalo"],
+                snapshot_a_cada=LEARNING_CONFIG["snapshot_a_cada"],
+                tamanho_cauda=tamanho_cauda,
+            )
+            atexit.register(gravador.encerrar)
+            _gravadores[chave] = gravador
+        return _gravadores[chave]
+
+def obter_estatisticas_aprendizado():
+    """Retorna as estatísticas dos gravadores de eventos do processo."""
+    with _gravadores_lock:
+        return {diretorio: gravador.resumo() for diretorio, gravador in _gravadores.items()}
+
+
+class LearningSystem:
+    def __init__(self, data_dir=None, legacy_file=None, tail_size=None):
+        self.data_dir = data_dir or LEARNING_CONFIG["diretorio"]
+        self.legacy_file = legacy_file or LEARNING_CONFIG["arquivo_legado"]
+        self.tail_size = tail_size or LEARNING_CONFIG["tamanho_cauda"]
+        self._lock = threading.Lock()
+        os.makedirs(self.data_dir, exist_ok=True)
+        self._gravador = _obter_gravador(self.data_dir, self.tail_size)
+        self.load_data()
+
+    def load_data(self):
+        """Carrega os agregados (snapshot + eventos posteriores) e a cauda recente."""
+        try:
+            if not listar_segmentos(self.data_dir) and os.path.exists(self.legacy_file):
+                migrar_json_legado(self.legacy_file, self.data_dir, self.tail_size)
+            agregados = carregar(self.data_dir, self.tail_size)
+        except Exception as e:
+            print(f"Erro ao carregar dados de aprendizado: {e}")
+            agregados = Agregados(self.tail_size)
+        with self._lock:
+            self.agregados = agregados
+            self.interactions = agregados.recent_interactions
+            self.feedback_data = agregados.recent_feedback
+            self.usage_patterns = agregados.usage_patterns
+
     def save_data(self):
-        """Salva dados de aprendizado."""
+        """Grava os eventos pendentes, atualiza o snapshot e aposenta os segmentos antigos."""
         try:
-            data = {
-                'interactions': self.interactions,
-                'feedback': self.feedback_data,
-                'usage_patterns': dict(self.usage_patterns),
-                'last_updated': datetime.now().isoformat()
-            }
-            with open(self.data_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            self._gravador.descarregar()
+            compactar(self.data_dir, self.tail_size)
+            aposentar_segmentos(self.data_dir, LEARNING_CONFIG["retencao_bruta_dias"])
         except Exception as e:
             print(f"Erro ao salvar dados de aprendizado: {e}")
-    
-    def record_interaction(self, user_input, intent, model_used):
-        """Registra uma interação do usuário."""
+
+    def _registrar(self, evento):
+        """Atualiza os agregados em memória e enfileira o evento para o log."""
+        with self._lock:
+            self.agregados.aplicar(evento)
+        self._gravador.enfileirar(evento)
+
+    def record_interaction(self, user_input, intent, model_used, latency_ms=None):
+        """Registra uma interação do usuário (com a latência da resposta, se medida)."""
         interaction = {
+            'type': 'interaction',
             'timestamp': datetime.now().isoformat(),
             'user_input': user_input,
             'intent': intent,
             'model_used': model_used
         }
-        self.interactions.append(interaction)
-        self.usage_patterns[intent] += 1
-        self.save_data()
-    
+        if latency_ms is not None:
+            interaction['latency_ms'] = round(latency_ms, 1)
+        self._registrar(interaction)
+
     def record_feedback(self, user_input, response, feedback_type):
         """Registra feedback sobre uma resposta."""
         feedback = {
+            'type': 'feedback',
             'timestamp': datetime.now().isoformat(),
             'user_input': user_input,
             'response': response,
             'feedback_type': feedback_type,  # 'positive', 'negative', 'neutral'
         }
-        self.feedback_data.append(feedback)
-        self.save_data()
-    
+        self._registrar(feedback)
+
     def get_frequent_queries(self, limit=10):
-        """Retorna as consultas mais frequentes."""
-        query_counter = Counter()
-        for interaction in self.interactions:
-            query_counter[interaction['user_input']] += 1
-        return [query for query, count in query_counter.most_common(limit)]
-    
+        """Retorna as consultas mais frequentes (contagens aproximadas, Space-Saving)."""
+        with self._lock:
+            return [query for query, count in self.agregados.frequent_queries.mais_frequentes(limit)]
+
     def get_popular_intents(self, limit=5):
         """Retorna as intenções mais populares."""
-        return dict(Counter(self.usage_patterns).most_common(limit))
-    
+        with self._lock:
+            return dict(Counter(self.usage_patterns).most_common(limit))
+
     def get_success_rate(self):
         """Calcula taxa de sucesso baseada no feedback."""
-        if not self.feedback_data:
+        if not self.agregados.total_feedback:
             return 0.0
-        
-        positive_feedback = sum(1 for f in self.feedback_data if f['feedback_type'] == 'positive')
-        total_feedback = len(self.feedback_data)
+
+        positive_feedback = self.agregados.feedback_types['positive']
+        total_feedback = self.agregados.total_feedback
         return (positive_feedback / total_feedback) * 100
-    
+
+    def get_window_analytics(self, window="24h"):
+        """
+        Retorna os números de uma janela móvel, somando os baldes.
+        
+        Args:
+            window: "24h" (baldes por hora), "7d" ou "30d" (baldes por dia)
+        """
+        with self._lock:
+            balde = self.agregados.janela(window)
+        feedback_total = sum(balde["feedback"].values())
+        return {
+            'window': window,
+            'interactions': balde["interactions"],
+            'intents': dict(Counter(balde["intents"]).most_common()),
+            'feedback': balde["feedback"],
+            'success_rate': balde["feedback"].get('positive', 0) / feedback_total * 100 if feedback_total else 0.0,
+            'latency_ms': {
+                'count': balde["latency_count"],
+                'avg': round(balde["latency_sum"] / balde["latency_count"], 1) if balde["latency_count"] else None,
+                'p50': percentil_histograma(balde["latency_hist"], 50, balde["latency_max"]),
+                'p95': percentil_histograma(balde["latency_hist"], 95, balde["latency_max"]),
+                'max': balde["latency_max"] if balde["latency_count"] else None,
+            },
+        }
+
     def get_learning_insights(self):
         """Retorna insights do sistema de aprendizado."""
         return {
-            'total_interactions': len(self.interactions),
-            'total_feedback': len(self.feedback_data),
+            'total_interactions': self.agregados.total_interactions,
+            'total_feedback': self.agregados.total_feedback,
             'success_rate': self.get_success_rate(),
             'frequent_queries': self.get_frequent_queries(),
             'popular_intents': self.get_popular_intents(),
-            'usage_patterns': dict(self.usage_patterns)
+            'usage_patterns': dict(self.usage_patterns),
+            'windows': {janela: self.get_window_analytics(janela) for janela in JANELAS}
         }
-    
+
     def identify_improvement_areas(self):
         """Identifica áreas que precisam de melhoria."""
-        negative_feedback = [f for f in self.feedback_data if f['feedback_type'] == 'negative']
-        
-        # Analisar padrões de feedback negativo
-        problem_intents = defaultdict(int)
-        for feedback in negative_feedback:
-            # Encontrar a intenção relacionada
-            for interaction in self.interactions:
-                if interaction['user_input'] == feedback['user_input']:
-                    problem_intents[interaction['intent']] += 1
-                    break
-        
-        return {
-            'negative_feedback_count': len(negative_feedback),
-            'problem_intents': dict(problem_intents),
-            'recent_issues': negative_feedback[-5:] if negative_feedback else []
-        }
-    
+        with self._lock:
+            return {
+                'negative_feedback_count': self.agregados.feedback_types['negative'],
+                # Intenção da interação com a mesma entrada de cada feedback negativo
+                'problem_intents': dict(self.agregados.problem_intents),
+                'recent_issues': list(self.agregados.recent_negative)
+            }
+
     def get_recommendations(self):
         """Gera recomendações para melhorias."""
         insights = self.get_learning_insights()
         improvements = self.identify_improvement_areas()
-        
+
         recommendations = []
-        
+
         # Recomendar melhorias baseadas em feedback negativo
         if improvements['negative_feedback_count'] > 0:
             for intent, count in improvements['problem_intents'].items():
                 if count >= 2:
                     recommendations.append(f"Melhorar ferramenta de {intent} - {count} feedbacks negativos")
-        
+
         # Recomendar expansão de ferramentas populares
         for intent, usage in insights['popular_intents'].items():
             if usage > 10:
                 recommendations.append(f"Expandir funcionalidades de {intent} - {usage} usos")
-        
+
         return recommendations
-    
+
+    def export_events(self, saida="analytics_export", formato="parquet", inicio=None, fim=None):
+        """Exporta os eventos em Parquet ou CSV particionado por dia (ver `analytics_export`)."""
+        from analytics_export import exportar
+        self._gravador.descarregar()
+        return exportar(self.data_dir, saida, formato, inicio, fim)
+
     def export_analytics(self):
         """Exporta analytics para análise externa."""
         analytics = {
@@ -142,9 +862,15 @@ class LearningSystem:
             'recommendations': self.get_recommendations(),
             'export_date': datetime.now().isoformat()
         }
-        
+
         filename = f"analytics_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
         with open(filename, 'w', encoding='utf-8') as f:
             json.dump(analytics, f, ensure_ascii=False, indent=2)
-        
-        return filename
\ No newline at end of file
+
+        return filename
+
+if __name__ == "__main__":
+    # Importa o JSON antigo e atualiza o snapshot
+    sistema = LearningSystem()
+    sistema.save_data()
+    print(json.dumps(sistema.get_learning_insights(), ensure_ascii=False, indent=2))
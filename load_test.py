@@ -0,0 +1,267 @@
+"""
+Teste de carga de ponta a ponta do assistente.
+
+Abre N sessões simultâneas, cada uma enviando M mensagens em sequência
+(com histórico próprio), e relata vazão, percentis de latência por
+mensagem e por nó do grafo (a partir dos traces) e uso de recursos.
+
+Com `--fake` (ou FAKE_BACKENDS=true) as chamadas à OpenAI e ao Tavily vão
+para os backends locais de `fake_backends`, então o teste roda sem rede e
+com resultados reproduzíveis.
+
+Com `--http` as mensagens vão para a API (`tools/views.py`) de um servidor
+já em execução; respostas 503 da fila de atendimento contam como recusadas.
+
+Uso:
+    python load_test.py --fake --sessoes 20 --mensagens 5
+    python load_test.py --perguntas perguntas.jsonl --relatorio carga.json
+    python load_test.py --http http://localhost:8000 --sessoes 50
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import threading
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Perguntas usadas quando nenhum arquivo é informado (cobrem as intenções de texto)
+PERGUNTAS_PADRAO = [
+    "Como calcular o ICMS de uma venda interestadual?",
+    "Qual o prazo de entrega do SPED fiscal?",
+    "Como lançar a nota fiscal de devolução de compra?",
+    "Escreva uma query SQL com as vendas por categoria no último mês",
+    "Que índice criar na tabela de vendas para filtrar por data?",
+    "Como melhorar o giro de estoque da loja?",
+    "Quais indicadores de vendas acompanhar mensalmente?",
+    "Qual a previsão do tempo para amanhã em São Paulo?",
+    "Explique o DRE e escreva uma query SQL que monte o faturamento por mês",
+]
+
+def carregar_perguntas(caminho):
+    """Lê perguntas de um JSONL (campo "pergunta") ou de um texto (uma por linha)."""
+    if not caminho:
+        return list(PERGUNTAS_PADRAO)
+    perguntas = []
+    with open(caminho, 'r', encoding='utf-8') as f:
+        for linha in f:
+            linha = linha.strip()
+            if not linha:
+                continue
+            if caminho.endswith(".jsonl"):
+                pergunta = json.loads(linha).get("pergunta")
+                if pergunta:
+                    perguntas.append(pergunta)
+            else:
+                perguntas.append(linha)
+    return perguntas
+
+def _uso_recursos():
+    """CPU (s) e memória máxima (MB) do processo, quando disponíveis."""
+    if resource is None:
+        return {"cpu_s": time.process_time(), "memoria_max_mb": None}
+    uso = resource.getrusage(resource.RUSAGE_SELF)
+    # ru_maxrss vem em KB no Linux e em bytes no macOS
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return {"cpu_s": uso.ru_utime + uso.ru_stime, "memoria_max_mb": round(uso.ru_maxrss / divisor, 1)}
+
+
+class GeradorCarga:
+    """Executa as sessões e coleta as latências das mensagens."""
+
+    def __init__(self, perguntas, sessoes, mensagens, intervalo=0.0, semente=42):
+        self.perguntas = perguntas
+        self.sessoes = sessoes
+        self.mensagens = mensagens
+        self.intervalo = intervalo
+        self.semente = semente
+        self.latencias = []
+        self.erros = 0
+        self.degradadas = 0
+        self.recusadas = 0
+
+    def _roteiro(self, sessao):
+        """Perguntas da sessão, sorteadas de forma reproduzível."""
+        rng = random.Random(f"{self.semente}-{sessao}")
+        return [rng.choice(self.perguntas) for _ in range(self.mensagens)]
+
+    async def _sessao(self, numero, enviar):
+        for pergunta in self._roteiro(numero):
+            inicio = time.perf_counter()
+            try:
+                resultado = await enviar(pergunta)
+                if resultado.get("degradacoes"):
+                    self.degradadas += 1
+            except Exception as e:
+                self.erros += 1
+                print(f"Erro na sessão {numero}: {e!r}")
+            self.latencias.append((time.perf_counter() - inicio) * 1000)
+            if self.intervalo:
+                await asyncio.sleep(self.intervalo)
+
+    async def executar_grafo(self):
+        """Dirige o `AssistenteMultimodalGraph` diretamente (uma instância por sessão)."""
+        from agent_graph import AssistenteMultimodalGraph
+
+        async def sessao(numero):
+            assistente = AssistenteMultimodalGraph()
+            await self._sessao(numero, assistente.aprocessar_mensagem)
+
+        await asyncio.gather(*(sessao(n) for n in range(self.sessoes)))
+
+    async def executar_http(self, url):
+        """Envia as mensagens para a API HTTP, com uma sessão da API por sessão do teste."""
+        import httpx
+
+        limites = httpx.Limits(max_connections=self.sessoes, max_keepalive_connections=self.sessoes)
+        async with httpx.AsyncClient(base_url=url, timeout=None, limits=limites) as cliente:
+
+            async def sessao(numero):
+                sessao_id = f"carga-{self.semente}-{numero}"
+
+                async def enviar(pergunta):
+                    resposta = await cliente.post("/api/chat/", json={"sessao": sessao_id, "mensagem": pergunta})
+                    if resposta.status_code == 503:
+                        self.recusadas += 1
+                        return {}
+                    resposta.raise_for_status()
+                    return resposta.json()
+
+                await cliente.delete(f"/api/sessoes/{sessao_id}/")
+                await self._sessao(numero, enviar)
+
+            await asyncio.gather(*(sessao(n) for n in range(self.sessoes)))
+
+async def _aquecer(quantidade):
+    """Mensagens fora da medição (carga das bases de conhecimento, conexões)."""
+    from agent_graph import AssistenteMultimodalGraph
+    assistente = AssistenteMultimodalGraph()
+    for pergunta in PERGUNTAS_PADRAO[:quantidade]:
+        await assistente.aprocessar_mensagem(pergunta)
+
+def executar(args):
+    """Roda o teste de carga e retorna o relatório."""
+    import tracing
+
+    perguntas = carregar_perguntas(args.perguntas)
+    gerador = GeradorCarga(perguntas, args.sessoes, args.mensagens, args.intervalo, args.semente)
+
+    async def rodar():
+        if args.aquecimento and not args.http:
+            print(f"--- 🔥 Aquecimento ({args.aquecimento} mensagens) ---")
+            await _aquecer(args.aquecimento)
+
+        # Sink próprio para separar os traces do teste
+        sink = tracing.MemoriaSink(capacidade=args.sessoes * args.mensagens + 10)
+        tracing.adicionar_sink(sink)
+        recursos_inicio = _uso_recursos()
+        inicio = time.perf_counter()
+        if args.http:
+            await gerador.executar_http(args.http)
+        else:
+            await gerador.executar_grafo()
+        duracao = time.perf_counter() - inicio
+        return sink.traces(), duracao, recursos_inicio
+
+    traces, duracao, recursos_inicio = asyncio.run(rodar())
+    recursos_fim = _uso_recursos()
+    total = len(gerador.latencias)
+
+    relatorio = {
+        "sessoes": args.sessoes,
+        "mensagens_por_sessao": args.mensagens,
+        "mensagens": total,
+        "erros": gerador.erros,
+        "degradadas": gerador.degradadas,
+        "recusadas": gerador.recusadas,
+        "duracao_s": round(duracao, 3),
+        "mensagens_por_s": round(total / duracao, 3) if duracao else 0.0,
+        "latencia_ms": {
+            "p50": round(tracing.percentil(gerador.latencias, 50), 3),
+            "p95": round(tracing.percentil(gerador.latencias, 95), 3),
+            "p99": round(tracing.percentil(gerador.latencias, 99), 3),
+            "max": round(max(gerador.latencias, default=0.0), 3),
+        },
+        "por_no": tracing.resumo_por_span(traces, "no"),
+        "por_modelo": tracing.resumo_por_span(traces, "llm"),
+        "requisicoes": tracing.resumo_requisicoes(traces),
+        "recursos": {
+            "cpu_s": round(recursos_fim["cpu_s"] - recursos_inicio["cpu_s"], 3),
+            "cpu_percentual": round(100 * (recursos_fim["cpu_s"] - recursos_inicio["cpu_s"]) / duracao, 1)
+            if duracao else 0.0,
+            "memoria_max_mb": recursos_fim["memoria_max_mb"],
+            "threads": threading.active_count(),
+        },
+    }
+
+    if args.http:
+        # Traces e limitador ficam nos processos do servidor (ver /api/status/)
+        return relatorio
+
+    import rate_limiter
+    import fake_backends
+    relatorio["limitador"] = rate_limiter.obter_estatisticas_limitador()["por_endpoint"]
+    if fake_backends.ativo():
+        relatorio["backends_falsos"] = fake_backends.obter_servidor().estatisticas()
+    return relatorio
+
+def imprimir_relatorio(relatorio):
+    """Mostra o resumo do teste no terminal."""
+    print("\n📊 Teste de carga")
+    print(f"   {relatorio['sessoes']} sessões x {relatorio['mensagens_por_sessao']} mensagens "
+          f"= {relatorio['mensagens']} ({relatorio['erros']} erros, {relatorio['degradadas']} degradadas, "
+          f"{relatorio['recusadas']} recusadas)")
+    print(f"   Duração: {relatorio['duracao_s']} s | Vazão: {relatorio['mensagens_por_s']} mensagens/s")
+    latencia = relatorio["latencia_ms"]
+    print(f"   Latência: p50 {latencia['p50']:.0f} ms | p95 {latencia['p95']:.0f} ms | "
+          f"p99 {latencia['p99']:.0f} ms | máx {latencia['max']:.0f} ms")
+
+    if relatorio["por_no"]:
+        print("\n   Por nó:")
+        for nome, dados in relatorio["por_no"].items():
+            print(f"   {nome:<22} n={dados['n']:<5} p50 {dados['p50_ms']:>8.0f} ms   p95 {dados['p95_ms']:>8.0f} ms")
+    if relatorio["por_modelo"]:
+        print("\n   Por modelo:")
+        for nome, dados in relatorio["por_modelo"].items():
+            print(f"   {nome:<22} n={dados['n']:<5} p50 {dados['p50_ms']:>8.0f} ms   p95 {dados['p95_ms']:>8.0f} ms")
+
+    recursos = relatorio["recursos"]
+    print(f"\n   CPU: {recursos['cpu_s']} s ({recursos['cpu_percentual']}%) | "
+          f"memória máx: {recursos['memoria_max_mb']} MB | threads: {recursos['threads']}")
+
+def main(argv=None):
+    """Função principal da linha de comando."""
+    parser = argparse.ArgumentParser(description="Teste de carga do assistente multimodal.")
+    parser.add_argument("--sessoes", type=int, default=10, help="Sessões simultâneas")
+    parser.add_argument("--mensagens", type=int, default=5, help="Mensagens por sessão")
+    parser.add_argument("--perguntas", help="Arquivo .jsonl (campo 'pergunta') ou .txt com as perguntas")
+    parser.add_argument("--intervalo", type=float, default=0.0, help="Pausa entre mensagens da sessão (s)")
+    parser.add_argument("--aquecimento", type=int, default=1, help="Mensagens de aquecimento fora da medição")
+    parser.add_argument("--semente", type=int, default=42, help="Semente do sorteio das perguntas")
+    parser.add_argument("--fake", action="store_true", help="Usa os backends falsos locais (sem rede)")
+    parser.add_argument("--http", help="URL base da API (ex.: http://localhost:8000) em vez do grafo local")
+    parser.add_argument("--relatorio", help="Grava o relatório completo em JSON")
+    args = parser.parse_args(argv)
+
+    if args.fake:
+        # Lido por `fake_backends.ativar_se_configurado` ao importar o grafo
+        os.environ["FAKE_BACKENDS"] = "true"
+
+    relatorio = executar(args)
+    imprimir_relatorio(relatorio)
+
+    if args.relatorio:
+        with open(args.relatorio, 'w', encoding='utf-8') as f:
+            json.dump(relatorio, f, ensure_ascii=False, indent=2)
+        print(f"\n   Relatório: {args.relatorio}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
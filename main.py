@@ -1,8 +1,11 @@
 import streamlit as st
 import os
+import time
+import uuid
 from dotenv import load_dotenv
 from agent_graph import AssistenteMultimodalGraph
 from learning_system import LearningSystem
+import tracing
 
 # Carregar variáveis de ambiente
 load_dotenv()
@@ -123,17 +126,24 @@ def main():
     st.title("Assistente Multimodal Spartacus Sistemas")
     st.markdown("Sistema inteligente baseado em grafos para assistência especializada")
     
+    # Sessão da conversa: fica na URL para ser retomada após recarregar a página
+    if 'sessao' not in st.query_params:
+        st.query_params['sessao'] = uuid.uuid4().hex
+    
     # Inicializar o sistema de grafos
     if 'agent_graph' not in st.session_state:
-        st.session_state.agent_graph = AssistenteMultimodalGraph()
+        st.session_state.agent_graph = AssistenteMultimodalGraph(sessao_id=st.query_params['sessao'])
     
     # Inicializar sistema de aprendizado
     if 'learning_system' not in st.session_state:
         st.session_state.learning_system = LearningSystem()
     
-    # Inicializar histórico de chat
+    # Inicializar histórico de chat (com as últimas mensagens da sessão retomada)
     if 'messages' not in st.session_state:
-        st.session_state.messages = []
+        st.session_state.messages = [
+            {"role": "user" if m.type == "human" else "assistant", "content": m.content}
+            for m in st.session_state.agent_graph.history.messages
+        ]
     
     # Sidebar com informações
     with st.sidebar:
@@ -159,6 +169,33 @@ def main():
         
         st.markdown('</div>', unsafe_allow_html=True)
         
+        # Latência por nó do grafo (traces em memória deste processo)
+        sink_memoria = tracing.obter_sink_memoria()
+        traces = sink_memoria.traces() if sink_memoria else []
+        if traces:
+            with st.expander("⏱️ Desempenho", expanded=False):
+                resumo = tracing.resumo_requisicoes(traces)
+                col1, col2 = st.columns(2)
+                with col1:
+                    st.metric("p50", f"{resumo['p50_ms']:.0f} ms")
+                with col2:
+                    st.metric("p95", f"{resumo['p95_ms']:.0f} ms")
+                
+                st.dataframe(
+                    [
+                        {"Nó": nome, "N": dados["n"], "p50 (ms)": round(dados["p50_ms"]), "p95 (ms)": round(dados["p95_ms"])}
+                        for nome, dados in tracing.resumo_por_span(traces, "no").items()
+                    ],
+                    hide_index=True,
+                    use_container_width=True,
+                )
+                st.caption(
+                    f"{resumo['requisicoes']} requisições · "
+                    f"{resumo.get('tokens_prompt', 0)} + {resumo.get('tokens_completion', 0)} tokens · "
+                    f"{resumo.get('embeddings', 0)} embeddings · "
+                    f"cache {resumo['taxa_cache']:.0%}"
+                )
+        
         # Espaçamento
         st.markdown("<br>", unsafe_allow_html=True)
         
@@ -217,6 +254,7 @@ def main():
         # Processar com o sistema de grafos
         with st.chat_message("assistant"):
             with st.spinner("Processando..."):
+                inicio = time.perf_counter()
                 try:
                     # Executar o grafo
                     resultado = st.session_state.agent_graph.processar_mensagem(
@@ -230,7 +268,8 @@ def main():
                     st.session_state.learning_system.record_interaction(
                         user_input=prompt,
                         intent=resultado.get('intencao', 'desconhecido'),
-                        model_used="gpt-4o"
+                        model_used="gpt-4o",
+                        latency_ms=(time.perf_counter() - inicio) * 1000
                     )
                     
                     st.markdown(resposta)
@@ -246,7 +285,8 @@ def main():
                     st.session_state.learning_system.record_interaction(
                         user_input=prompt,
                         intent="erro",
-                        model_used="gpt-4o"
+                        model_used="gpt-4o",
+                        latency_ms=(time.perf_counter() - inicio) * 1000
                     )
 
 if __name__ == "__main__":
@@ -0,0 +1,297 @@
+"""
+Roteamento de modelo por custo e latência para as ferramentas especialistas.
+
+Cada requisição é atendida pelo modelo pequeno, a não ser que os sinais
+indiquem que o grande é necessário (pergunta longa, recuperação fraca ou
+ambígua, intenção configurada como "grande"). Quando o modelo pequeno
+responde com confiança baixa, a resposta é refeita no modelo grande.
+
+Latência, tokens e motivos de escalonamento ficam registrados por nível
+(`obter_estatisticas_roteador`) para ajustar os limites com dados reais.
+"""
+
+import os
+import re
+import time
+import threading
+from collections import deque
+
+from langchain_openai import ChatOpenAI
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import SystemMessage
+from langchain_core.runnables import RunnableLambda
+
+import tracing
+import rate_limiter
+
+# Modelos por nível
+MODELOS = {
+    "pequeno": os.getenv("MODEL_SMALL", "gpt-4o-mini"),
+    "grande": os.getenv("MODEL_LARGE", "gpt-4"),
+}
+
+# Limites do roteamento (distâncias L2 do FAISS: menor = mais parecido)
+ROUTER_CONFIG = {
+    "tamanho_maximo": int(os.getenv("ROUTER_MAX_QUESTION_CHARS", "600")),
+    "distancia_maxima": float(os.getenv("ROUTER_MAX_DISTANCE", "0.5")),
+    "distancia_forte": float(os.getenv("ROUTER_STRONG_DISTANCE", "0.3")),
+    "margem_minima": float(os.getenv("ROUTER_MIN_MARGIN", "0.02")),
+    "intencoes_grandes": [
+        i.strip() for i in os.getenv("ROUTER_LARGE_INTENTS", "").split(",") if i.strip()
+    ],
+    "verificar_confianca": os.getenv("ROUTER_CHECK_CONFIDENCE", "true").lower() == "true",
+}
+
+INSTRUCAO_CONFIANCA = (
+    "Ao final da resposta, em uma linha separada, escreva exatamente "
+    "'CONFIANCA: alta', 'CONFIANCA: media' ou 'CONFIANCA: baixa', indicando "
+    "o quanto a resposta está correta e completa."
+)
+
+_PADRAO_CONFIANCA = re.compile(r"\s*CONFIAN[CÇ]A\s*:\s*(alta|m[eé]dia|baixa)\W*\s*$", re.IGNORECASE)
+
+
+def get_router_config():
+    """Retorna a configuração de roteamento."""
+    return ROUTER_CONFIG
+
+def criar_llm(tier, temperature=0.3, callbacks=None):
+    """Cria o modelo de chat do nível informado."""
+    return ChatOpenAI(
+        model=MODELOS[tier],
+        temperature=temperature,
+        api_key=os.getenv("OPENAI_API_KEY"),
+        callbacks=callbacks,
+        **rate_limiter.opcoes_openai()
+    )
+
+def escolher_tier(intencao, pergunta, scores=None):
+    """
+    Escolhe o nível do modelo a partir dos sinais da requisição.
+
+    Args:
+        intencao (str): Intenção atendida
+        pergunta (str): Texto do usuário
+        scores (list, optional): Distâncias dos trechos recuperados, em ordem.
+            None quando a intenção não usa RAG; lista vazia quando a busca
+            não trouxe contexto.
+
+    Returns:
+        tuple: (nível, motivo)
+    """
+    config = ROUTER_CONFIG
+
+    if len(pergunta or "") > config["tamanho_maximo"]:
+        return "grande", "pergunta_longa"
+    if intencao in config["intencoes_grandes"]:
+        return "grande", "intencao"
+    if scores is not None:
+        if not scores:
+            return "grande", "sem_contexto"
+        melhor = scores[0]
+        if melhor > config["distancia_maxima"]:
+            return "grande", "recuperacao_fraca"
+        margem = scores[1] - melhor if len(scores) > 1 else float("inf")
+        if margem < config["margem_minima"] and melhor > config["distancia_forte"]:
+            return "grande", "recuperacao_ambigua"
+    return "pequeno", "padrao"
+
+def extrair_confianca(resposta):
+    """
+    Separa a marcação de confiança do texto da resposta.
+
+    Returns:
+        tuple: (texto sem a marcação, "alta" | "media" | "baixa" | None)
+    """
+    encontrado = _PADRAO_CONFIANCA.search(resposta or "")
+    if not encontrado:
+        return resposta, None
+    nivel = encontrado.group(1).lower().replace("é", "e")
+    return resposta[:encontrado.start()].rstrip(), nivel
+
+
+class _ContadorTokens(BaseCallbackHandler):
+    """Soma os tokens das chamadas de LLM de uma execução."""
+
+    run_inline = True
+
+    def __init__(self):
+        self.tokens_prompt = 0
+        self.tokens_completion = 0
+
+    def on_llm_end(self, response, **kwargs):
+        tokens_prompt, tokens_completion = tracing.extrair_tokens(response)
+        self.tokens_prompt += tokens_prompt
+        self.tokens_completion += tokens_completion
+
+
+class EstatisticasRoteador:
+    """Latência, tokens e motivos de roteamento por nível de modelo."""
+
+    def __init__(self, janela=1000):
+        self._lock = threading.Lock()
+        self._janela = janela
+        self.por_tier = {}
+        self.motivos = {}
+        self.escalonamentos = 0
+
+    def registrar(self, tier, motivo, duracao, tokens_prompt, tokens_completion, escalonamento=False):
+        with self._lock:
+            dados = self.por_tier.setdefault(tier, {
+                "chamadas": 0,
+                "tokens_prompt": 0,
+                "tokens_completion": 0,
+                "latencias": deque(maxlen=self._janela),
+            })
+            dados["chamadas"] += 1
+            dados["tokens_prompt"] += tokens_prompt
+            dados["tokens_completion"] += tokens_completion
+            dados["latencias"].append(duracao * 1000)
+            self.motivos[motivo] = self.motivos.get(motivo, 0) + 1
+            if escalonamento:
+                self.escalonamentos += 1
+
+    def resumo(self):
+        with self._lock:
+            por_tier = {}
+            for tier, dados in self.por_tier.items():
+                latencias = list(dados["latencias"])
+                por_tier[tier] = {
+                    "modelo": MODELOS.get(tier),
+                    "chamadas": dados["chamadas"],
+                    "tokens_prompt": dados["tokens_prompt"],
+                    "tokens_completion": dados["tokens_completion"],
+                    "p50_ms": tracing.percentil(latencias, 50),
+                    "p95_ms": tracing.percentil(latencias, 95),
+                }
+            return {
+                "por_tier": por_tier,
+                "motivos": dict(self.motivos),
+                "escalonamentos": self.escalonamentos,
+            }
+
+estatisticas = EstatisticasRoteador()
+
+def obter_estatisticas_roteador():
+    """Retorna o resumo acumulado do roteamento neste processo."""
+    return estatisticas.resumo()
+
+
+def _com_instrucao_confianca(llm):
+    """Acrescenta ao prompt o pedido de autoavaliação antes de chamar o modelo."""
+    def anexar(entrada):
+        # Aceita a saída de um PromptTemplate ou uma lista de mensagens
+        mensagens = entrada.to_messages() if hasattr(entrada, "to_messages") else list(entrada)
+        return mensagens + [SystemMessage(content=INSTRUCAO_CONFIANCA)]
+    return RunnableLambda(anexar) | llm
+
+def _preparar(tier, temperature, contador, autoavaliacao):
+    """Retorna o modelo do nível, com o pedido de autoavaliação se solicitado."""
+    # Callbacks no próprio modelo somam-se aos herdados do grafo (trace, streaming)
+    llm = criar_llm(tier, temperature, callbacks=[contador])
+    if autoavaliacao:
+        return _com_instrucao_confianca(llm)
+    return llm
+
+def _registrar(intencao, tier, motivo, inicio, contador, escalonamento):
+    """Registra a chamada nas estatísticas e no trace da requisição."""
+    duracao = time.perf_counter() - inicio
+    estatisticas.registrar(
+        tier, motivo, duracao, contador.tokens_prompt, contador.tokens_completion, escalonamento
+    )
+    tracing.registrar_evento(
+        "roteamento", intencao, tier=tier, modelo=MODELOS[tier], motivo=motivo,
+        duracao_ms=round(duracao * 1000, 3),
+    )
+
+def invocar(intencao, tier, motivo, montar_cadeia, entrada, temperature=0.3,
+            autoavaliacao=False, escalonamento=False):
+    """
+    Executa a cadeia em um nível fixo, registrando latência e tokens.
+
+    Args:
+        intencao (str): Intenção atendida
+        tier (str): "pequeno" ou "grande"
+        motivo (str): Motivo da escolha do nível (vai para as estatísticas)
+        montar_cadeia: Função que recebe o modelo e retorna a cadeia
+        entrada: Entrada da cadeia
+        temperature (float): Temperatura do modelo
+        autoavaliacao (bool): Pede ao modelo a linha de confiança
+        escalonamento (bool): Marca a chamada como repetição no nível grande
+
+    Returns:
+        Saída da cadeia
+    """
+    contador = _ContadorTokens()
+    inicio = time.perf_counter()
+    try:
+        return montar_cadeia(_preparar(tier, temperature, contador, autoavaliacao)).invoke(entrada)
+    finally:
+        _registrar(intencao, tier, motivo, inicio, contador, escalonamento)
+
+async def ainvocar(intencao, tier, motivo, montar_cadeia, entrada, temperature=0.3,
+                   autoavaliacao=False, escalonamento=False):
+    """Versão assíncrona de `invocar`."""
+    contador = _ContadorTokens()
+    inicio = time.perf_counter()
+    try:
+        return await montar_cadeia(_preparar(tier, temperature, contador, autoavaliacao)).ainvoke(entrada)
+    finally:
+        _registrar(intencao, tier, motivo, inicio, contador, escalonamento)
+
+def _pedir_autoavaliacao(tier):
+    """Só o modelo pequeno informa confiança (é a partir dela que se escalona)."""
+    return tier == "pequeno" and ROUTER_CONFIG["verificar_confianca"]
+
+def responder(intencao, pergunta, montar_cadeia, entrada, scores=None, temperature=0.3,
+              tier=None):
+    """
+    Executa a cadeia no nível escolhido, escalonando se a confiança for baixa.
+
+    Args:
+        intencao (str): Intenção atendida
+        pergunta (str): Texto do usuário (sinal de tamanho)
+        montar_cadeia: Função que recebe o modelo e retorna a cadeia (saída str)
+        entrada (dict): Variáveis da cadeia
+        scores (list, optional): Distâncias da recuperação (ver `escolher_tier`)
+        temperature (float): Temperatura do modelo
+        tier (str, optional): Nível imposto pelo chamador (ex.: degradação por
+            prazo); dispensa os sinais e o escalonamento
+
+    Returns:
+        str: Resposta final
+    """
+    forcado = tier is not None
+    tier, motivo = (tier, "prazo") if forcado else escolher_tier(intencao, pergunta, scores)
+    resposta = invocar(
+        intencao, tier, motivo, montar_cadeia, entrada, temperature,
+        autoavaliacao=not forcado and _pedir_autoavaliacao(tier),
+    )
+
+    resposta, confianca = extrair_confianca(resposta)
+    if not forcado and tier == "pequeno" and confianca == "baixa":
+        print(f"--- ⬆️ Confiança baixa no modelo pequeno, escalonando {intencao} ---")
+        resposta = invocar(
+            intencao, "grande", "baixa_confianca", montar_cadeia, entrada, temperature,
+            escalonamento=True,
+        )
+    return resposta
+
+async def aresponder(intencao, pergunta, montar_cadeia, entrada, scores=None, temperature=0.3,
+                     tier=None):
+    """Versão assíncrona de `responder`."""
+    forcado = tier is not None
+    tier, motivo = (tier, "prazo") if forcado else escolher_tier(intencao, pergunta, scores)
+    resposta = await ainvocar(
+        intencao, tier, motivo, montar_cadeia, entrada, temperature,
+        autoavaliacao=not forcado and _pedir_autoavaliacao(tier),
+    )
+
+    resposta, confianca = extrair_confianca(resposta)
+    if not forcado and tier == "pequeno" and confianca == "baixa":
+        print(f"--- ⬆️ Confiança baixa no modelo pequeno, escalonando {intencao} ---")
+        resposta = await ainvocar(
+            intencao, "grande", "baixa_confianca", montar_cadeia, entrada, temperature,
+            escalonamento=True,
+        )
+    return resposta
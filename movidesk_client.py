@@ -0,0 +1,370 @@
+"""
+Coleta concorrente de artigos da base de conhecimento da Movidesk.
+
+Usado pelo pipeline de ingestão (`tools/pipeline.py`) e pelo script de
+exportação (`movidesk_central.py`). Em vez de uma requisição por vez com
+pausa fixa entre elas:
+
+- os IDs repetidos são descartados antes de qualquer requisição;
+- algumas requisições ficam em voo ao mesmo tempo, sobre um pool de
+  conexões reaproveitadas;
+- o ritmo é o do limitador compartilhado (endpoint "movidesk"), que
+  reduz a taxa a cada 429, respeita `Retry-After` e os cabeçalhos de cota
+  da API e repete falhas transitórias com espera exponencial.
+
+A listagem (`listar_artigos`) traz só os campos pedidos (`$select`) dos
+artigos que passam no `$filter`, em páginas de `$top`: com `CAMPOS_ARTIGO`
+ela descobre a base inteira (inclusive artigos novos) com uma requisição
+por página em vez de uma por artigo. Cada página continua do último artigo
+da anterior (não de um `$skip` acumulado), então alterações durante a
+listagem não fazem artigos sumirem dela. Ordenada por `updatedDate`, a
+data do último artigo gravado serve de marca d'água para a próxima listagem.
+
+Uso:
+    artigos, resumo = listar_artigos(CAMPOS_ARTIGO, filtro=filtro_atualizados_desde(data), ordem="updatedDate")
+    artigos, resumo = buscar_artigos([551342, 382259, 551342])   # IDs específicos
+    print(resumo["artigos_por_segundo"])
+
+`ler_arquivo_artigos` lê de volta, um artigo por vez, os arquivos exportados
+pelo `movidesk_central.py` (JSONL, ou a lista JSON dos snapshots antigos).
+
+Configuração:
+    MOVIDESK_TOKEN: token da API
+    MOVIDESK_BASE_URL: raiz da API pública (o servidor falso aponta para si)
+    MOVIDESK_TIMEOUT_SECONDS: tempo máximo de cada requisição
+    MOVIDESK_PAGE_SIZE: artigos por página da listagem ($top)
+    MOVIDESK_RPM / MAX_CONCURRENT_MOVIDESK: ritmo e requisições simultâneas
+        (lidos pelo `rate_limiter`)
+"""
+
+import os
+import json
+import time
+import asyncio
+from datetime import datetime, timezone
+
+import httpx
+from dotenv import load_dotenv
+
+# Antes do limitador, que lê MOVIDESK_RPM ao ser importado
+load_dotenv()
+import rate_limiter
+
+ENDPOINT = "movidesk"
+
+# Campos usados pelo projeto (`$select` da descoberta)
+CAMPOS_ARTIGO = ["id", "title", "categories", "contentText", "updatedDate"]
+
+def get_movidesk_config():
+    """Lê a configuração da API da Movidesk do ambiente."""
+    return {
+        "token": os.getenv("MOVIDESK_TOKEN", "b8ad37b5-67e9-485c-acab-ca7a657090f2"),
+        "base_url": os.getenv("MOVIDESK_BASE_URL", "https://api.movidesk.com/public/v1").rstrip("/"),
+        "timeout": float(os.getenv("MOVIDESK_TIMEOUT_SECONDS", "30")),
+        "tamanho_pagina": int(os.getenv("MOVIDESK_PAGE_SIZE", "1000")),
+        "concorrencia": rate_limiter.limitador.limites["concorrencia"][ENDPOINT],
+    }
+
+def deduplicar_ids(ids):
+    """IDs sem repetições, na ordem da primeira ocorrência."""
+    return list(dict.fromkeys(int(artigo_id) for artigo_id in ids))
+
+def interpretar_data(valor):
+    """Data da API (ISO 8601, sem fuso = UTC) como datetime com fuso, ou None."""
+    if not valor:
+        return None
+    data = datetime.fromisoformat(str(valor).replace("Z", "+00:00"))
+    return data if data.tzinfo else data.replace(tzinfo=timezone.utc)
+
+def filtro_atualizados_desde(data):
+    """`$filter` dos artigos alterados a partir de `data` (inclusive)."""
+    return f"updatedDate ge {data.astimezone(timezone.utc).replace(tzinfo=None).isoformat()}"
+
+def _juntar_filtros(*filtros):
+    """Une expressões `$filter` com "and" (ignorando as vazias)."""
+    return " and ".join(filtro for filtro in filtros if filtro)
+
+def resumir_artigo(artigo_json):
+    """Campos do artigo usados pelo projeto (categorias só pelo nome)."""
+    return {
+        "id": artigo_json.get("id"),
+        "title": artigo_json.get("title"),
+        "categories": [cat.get("name") for cat in artigo_json.get("categories") or []],
+        "contentText": artigo_json.get("contentText"),
+        "updatedDate": artigo_json.get("updatedDate"),
+    }
+
+def ler_arquivo_artigos(caminho, tamanho_bloco=1 << 16):
+    """
+    Lê os artigos de um arquivo JSONL (um por linha) ou JSON (uma lista), um por vez.
+
+    A lista JSON é decodificada aos poucos (blocos de `tamanho_bloco`
+    caracteres), então a memória não cresce com o tamanho do arquivo.
+
+    Yields:
+        dict: JSON de cada artigo
+
+    Raises:
+        ValueError: arquivo com JSON inválido ou truncado
+    """
+    decodificador = json.JSONDecoder()
+    with open(caminho, encoding="utf-8-sig") as arquivo:
+        buffer = arquivo.read(tamanho_bloco).lstrip()
+        if not buffer.startswith("["):
+            arquivo.seek(0)
+            for numero, linha in enumerate(arquivo, start=1):
+                if linha.strip():
+                    try:
+                        yield json.loads(linha)
+                    except json.JSONDecodeError as e:
+                        raise ValueError(f"{caminho}, linha {numero}: {e}") from e
+            return
+
+        buffer = buffer[1:]
+        while True:
+            buffer = buffer.lstrip()
+            if buffer.startswith(","):
+                buffer = buffer[1:].lstrip()
+            if buffer.startswith("]"):
+                return
+            try:
+                artigo, fim = decodificador.raw_decode(buffer)
+            except json.JSONDecodeError:
+                # Artigo cortado no fim do bloco: lê mais e tenta de novo
+                bloco = arquivo.read(tamanho_bloco)
+                if not bloco:
+                    raise ValueError(f"{caminho}: JSON inválido ou truncado perto de {buffer[:80]!r}")
+                buffer += bloco
+                continue
+            yield artigo
+            buffer = buffer[fim:]
+
+
+class ColetorMovidesk:
+    """
+    Cliente assíncrono da API de artigos com pool de conexões próprio.
+
+    Usar como `async with ColetorMovidesk() as coletor:`; as contagens do
+    último `artigos()` ficam em `resumo()`.
+    """
+
+    def __init__(self, config=None):
+        self.config = config or get_movidesk_config()
+        self._cliente = None
+        self._zerar()
+
+    def _zerar(self):
+        self.solicitados = 0
+        self.unicos = 0
+        self.paginas = 0
+        self.encontrados = 0
+        self.nao_encontrados = 0
+        self.erros = 0
+        self.inicio = None
+        self.fim = None
+
+    async def __aenter__(self):
+        concorrencia = self.config["concorrencia"]
+        transporte = httpx.AsyncHTTPTransport(
+            limits=httpx.Limits(max_connections=concorrencia, max_keepalive_connections=concorrencia),
+        )
+        self._cliente = httpx.AsyncClient(
+            base_url=self.config["base_url"],
+            params={"token": self.config["token"]},
+            transport=rate_limiter.TransporteLimitadoAsync(transporte),
+            timeout=self.config["timeout"],
+        )
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._cliente.aclose()
+        self._cliente = None
+
+    async def buscar_artigo(self, artigo_id):
+        """
+        Busca um artigo pelo ID.
+
+        Returns:
+            dict | None: JSON do artigo, ou None se ele não existe (404)
+
+        Raises:
+            httpx.HTTPError: falha que persistiu depois das novas tentativas
+        """
+        resposta = await self._cliente.get(f"/article/{artigo_id}", extensions={"endpoint_limite": ENDPOINT})
+        if resposta.status_code == 404:
+            return None
+        resposta.raise_for_status()
+        return resposta.json()
+
+    async def listar(self, campos, filtro=None, ordem="id", tamanho_pagina=None):
+        """
+        Percorre a listagem de artigos página a página.
+
+        Cada página continua do último artigo da anterior (pela ordenação,
+        no `$filter`) em vez de avançar um `$skip` fixo: um artigo alterado
+        durante a listagem vai para o fim da ordem por `updatedDate` sem
+        deslocar (e pular) os seguintes, e aparece de novo com a data nova.
+        Os empatados na data do último artigo voltam na página seguinte e
+        são descartados aqui. A listagem acaba na primeira página vazia,
+        então um `$top` reduzido pelo servidor não a encerra antes da hora.
+
+        Args:
+            campos (list): Campos retornados de cada artigo (`$select`; o ID e
+                o campo da ordenação vêm sempre)
+            filtro (str): Expressão `$filter` (ex.: `filtro_atualizados_desde`;
+                condições unidas por "and")
+            ordem (str): `$orderby` ("id" ou "updatedDate"; o ID desempata)
+            tamanho_pagina (int): Artigos por página (`$top`)
+
+        Yields:
+            dict: Cada artigo, só com os campos pedidos
+        """
+        self._zerar()
+        self.inicio = time.perf_counter()
+        tamanho_pagina = tamanho_pagina or self.config["tamanho_pagina"]
+        parametros = {
+            "$select": ",".join(dict.fromkeys([*campos, "id", ordem])),
+            "$top": tamanho_pagina,
+            "$orderby": ordem if ordem == "id" else f"{ordem},id",
+        }
+        filtro_pagina, pular, ultimo_valor, empatados = filtro, 0, None, set()
+        try:
+            while True:
+                pedido = {**parametros, "$skip": pular}
+                if filtro_pagina:
+                    pedido["$filter"] = filtro_pagina
+                resposta = await self._cliente.get("/article", params=pedido, extensions={"endpoint_limite": ENDPOINT})
+                resposta.raise_for_status()
+                pagina = resposta.json()
+                self.paginas += 1
+                if not pagina:
+                    break
+                # Os empatados na data em que a página anterior parou voltam: já foram entregues
+                novos = [artigo for artigo in pagina
+                         if not (artigo.get(ordem) == ultimo_valor and artigo.get("id") in empatados)]
+                self.encontrados += len(novos)
+                for artigo in novos:
+                    yield artigo
+
+                valor = pagina[-1].get(ordem)
+                if ordem == "id":
+                    filtro_pagina, pular = _juntar_filtros(filtro, f"id gt {int(valor)}"), 0
+                elif valor is None:
+                    # Artigos sem data vêm primeiro e não têm por onde continuar: só o deslocamento
+                    pular += len(pagina)
+                else:
+                    if valor != ultimo_valor:
+                        empatados = set()
+                    empatados.update(artigo.get("id") for artigo in pagina if artigo.get(ordem) == valor)
+                    filtro_pagina = _juntar_filtros(filtro, filtro_atualizados_desde(interpretar_data(valor)))
+                    # Mais empatados que uma página: aí só o deslocamento avança
+                    pular = 0 if novos else max(pular + len(pagina), len(empatados))
+                ultimo_valor = valor
+        finally:
+            self.fim = time.perf_counter()
+
+    async def artigos(self, ids):
+        """
+        Busca os artigos dos IDs (sem repetições), entregando-os conforme chegam.
+
+        No máximo `concorrencia` requisições ficam em voo e, se quem consome
+        atrasar, a busca espera (a fila de resultados é limitada).
+
+        Yields:
+            tuple: (artigo_id, artigo ou None se não existe, exceção ou None)
+        """
+        self._zerar()
+        ids = list(ids)
+        unicos = deduplicar_ids(ids)
+        self.solicitados, self.unicos = len(ids), len(unicos)
+        self.inicio = time.perf_counter()
+
+        pendentes = iter(unicos)
+        concorrencia = max(1, min(self.config["concorrencia"], len(unicos)))
+        resultados = asyncio.Queue(maxsize=concorrencia)
+
+        async def trabalhar():
+            for artigo_id in pendentes:
+                try:
+                    item = (artigo_id, await self.buscar_artigo(artigo_id), None)
+                except (httpx.HTTPError, ValueError) as e:
+                    item = (artigo_id, None, e)
+                await resultados.put(item)
+            await resultados.put(None)
+
+        trabalhadores = [asyncio.create_task(trabalhar()) for _ in range(concorrencia)] if unicos else []
+        ativos = len(trabalhadores)
+        try:
+            while ativos:
+                item = await resultados.get()
+                if item is None:
+                    ativos -= 1
+                    continue
+                _, artigo, erro = item
+                if erro is not None:
+                    self.erros += 1
+                elif artigo is None:
+                    self.nao_encontrados += 1
+                else:
+                    self.encontrados += 1
+                yield item
+        finally:
+            for trabalhador in trabalhadores:
+                trabalhador.cancel()
+            await asyncio.gather(*trabalhadores, return_exceptions=True)
+            self.fim = time.perf_counter()
+
+    def resumo(self):
+        duracao = ((self.fim or time.perf_counter()) - self.inicio) if self.inicio else 0.0
+        processados = self.encontrados + self.nao_encontrados + self.erros
+        return {
+            "solicitados": self.solicitados,
+            "duplicados": self.solicitados - self.unicos,
+            "encontrados": self.encontrados,
+            "nao_encontrados": self.nao_encontrados,
+            "erros": self.erros,
+            "paginas": self.paginas,
+            "segundos": round(duracao, 3),
+            "artigos_por_segundo": round(processados / duracao, 2) if duracao else 0.0,
+        }
+
+
+async def abuscar_artigos(ids, ao_receber=None, config=None):
+    """
+    Busca todos os artigos dos IDs.
+
+    Args:
+        ids: IDs dos artigos (repetições são ignoradas)
+        ao_receber: Função chamada com (artigo_id, artigo, erro) a cada resultado
+        config (dict): Configuração (padrão: `get_movidesk_config()`)
+
+    Returns:
+        tuple: (lista com o JSON dos artigos encontrados, resumo da coleta)
+    """
+    encontrados = []
+    async with ColetorMovidesk(config) as coletor:
+        async for artigo_id, artigo, erro in coletor.artigos(ids):
+            if ao_receber is not None:
+                ao_receber(artigo_id, artigo, erro)
+            if artigo is not None:
+                encontrados.append(artigo)
+    return encontrados, coletor.resumo()
+
+def buscar_artigos(ids, ao_receber=None, config=None):
+    """Versão síncrona de `abuscar_artigos` (para scripts e nós síncronos do pipeline)."""
+    return asyncio.run(abuscar_artigos(ids, ao_receber, config))
+
+async def alistar_artigos(campos, filtro=None, ordem="id", config=None):
+    """
+    Lista todos os artigos (todas as páginas) com os campos pedidos.
+
+    Returns:
+        tuple: (lista de artigos, resumo da listagem)
+    """
+    async with ColetorMovidesk(config) as coletor:
+        artigos = [artigo async for artigo in coletor.listar(campos, filtro, ordem)]
+    return artigos, coletor.resumo()
+
+def listar_artigos(campos, filtro=None, ordem="id", config=None):
+    """Versão síncrona de `alistar_artigos`."""
+    return asyncio.run(alistar_artigos(campos, filtro, ordem, config))
@@ -0,0 +1,691 @@
+"""
+Limitador compartilhado para as APIs externas (OpenAI, embeddings, Tavily e Movidesk).
+
+Todas as chamadas passam pelo mesmo estado do processo:
+- baldes de tokens para requisições e tokens por minuto, por provedor;
+- limite de chamadas simultâneas por endpoint;
+- novas tentativas com espera exponencial e jitter para 429, 5xx e falhas
+  de conexão, respeitando `Retry-After` quando o servidor o envia (POSTs
+  que criam algo a cada chamada, como a geração de imagens, só repetem
+  429, a não ser com a extensão `repetivel`);
+- baldes adaptativos: um 429 reduz pela metade a taxa do provedor, que
+  volta a subir aos poucos a cada resposta bem-sucedida, e os cabeçalhos
+  `X-RateLimit-Remaining` / `X-RateLimit-Reset` seguram o envio quando o
+  servidor avisa que a cota acabou.
+
+Os clientes da OpenAI (SDK direto ou LangChain) e a busca do Tavily usam o
+transporte HTTP daqui (`cliente_http` / `cliente_http_async`); chamadas de
+outras bibliotecas podem ser envolvidas com `limitador.executar` /
+`limitador.aexecutar`.
+
+Configuração:
+    OPENAI_RPM / OPENAI_TPM: requisições e tokens por minuto (0 desativa)
+    TAVILY_RPM: requisições por minuto ao Tavily
+    MOVIDESK_RPM: requisições por minuto à API da Movidesk
+    MAX_CONCURRENT_<ENDPOINT>: chamadas simultâneas (ex.: MAX_CONCURRENT_EMBEDDINGS)
+    RETRY_MAX_ATTEMPTS, RETRY_BASE_SECONDS, RETRY_MAX_SECONDS: novas tentativas
+"""
+
+import os
+import json
+import time
+import random
+import asyncio
+import weakref
+import threading
+from collections import deque
+from email.utils import parsedate_to_datetime
+
+import httpx
+
+import tracing
+
+# Provedor de cada endpoint (os baldes são por provedor)
+PROVEDORES = {
+    "chat": "openai",
+    "embeddings": "openai",
+    "imagens": "openai",
+    "audio": "openai",
+    "tavily": "tavily",
+    "movidesk": "movidesk",
+}
+
+# Chamadas simultâneas padrão por endpoint
+CONCORRENCIA_PADRAO = {
+    "chat": 8,
+    "embeddings": 4,
+    "imagens": 2,
+    "audio": 4,
+    "tavily": 4,
+    "movidesk": 4,
+}
+
+STATUS_REPETIVEIS = {408, 409, 429, 500, 502, 503, 504}
+
+# POSTs que geram (e cobram) algo novo a cada chamada: depois de um timeout ou
+# 5xx não dá para saber se o servidor já fez, então só o 429 é repetido
+ENDPOINTS_NAO_IDEMPOTENTES = {"imagens"}
+
+# Tempo máximo de cada chamada HTTP às APIs (o SDK da OpenAI usa 10 minutos)
+TIMEOUT_PADRAO = float(os.getenv("UPSTREAM_TIMEOUT_SECONDS", "60"))
+
+def get_limites():
+    """Retorna os limites por provedor e por endpoint configurados no ambiente."""
+    return {
+        "por_minuto": {
+            "openai": {
+                "requisicoes": int(os.getenv("OPENAI_RPM", "500")),
+                "tokens": int(os.getenv("OPENAI_TPM", "200000")),
+            },
+            "tavily": {
+                "requisicoes": int(os.getenv("TAVILY_RPM", "100")),
+                "tokens": 0,
+            },
+            "movidesk": {
+                "requisicoes": int(os.getenv("MOVIDESK_RPM", "60")),
+                "tokens": 0,
+            },
+        },
+        "concorrencia": {
+            endpoint: int(os.getenv(f"MAX_CONCURRENT_{endpoint.upper()}", str(padrao)))
+            for endpoint, padrao in CONCORRENCIA_PADRAO.items()
+        },
+        "tentativas": int(os.getenv("RETRY_MAX_ATTEMPTS", "5")),
+        "espera_base": float(os.getenv("RETRY_BASE_SECONDS", "0.5")),
+        "espera_maxima": float(os.getenv("RETRY_MAX_SECONDS", "20")),
+    }
+
+
+class _Balde:
+    """
+    Balde de tokens com reposição contínua.
+
+    A reserva é feita na hora (o saldo pode ficar negativo) e o chamador
+    aguarda o tempo até o saldo se recompor; assim a ordem de chegada é
+    respeitada sem fila explícita.
+
+    A taxa se adapta ao servidor: `reduzir` (a cada 429) corta pela metade,
+    `recuperar` (a cada sucesso) devolve 1% da taxa configurada por vez.
+    Os 429 de requisições que já estavam em voo (até 1 s depois de uma
+    redução) não reduzem de novo.
+    """
+
+    def __init__(self, por_minuto):
+        self.capacidade = por_minuto
+        self.taxa_configurada = por_minuto / 60.0
+        self.taxa = self.taxa_configurada
+        self.reduzida_em = None
+        self.saldo = float(por_minuto)
+        self.ultimo = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _repor(self, agora):
+        self.saldo = min(self.capacidade, self.saldo + (agora - self.ultimo) * self.taxa)
+        self.ultimo = agora
+
+    def reservar(self, quantidade):
+        """Reserva `quantidade` e retorna quantos segundos esperar antes de usar."""
+        if self.capacidade <= 0 or quantidade <= 0:
+            return 0.0
+        with self._lock:
+            self._repor(time.monotonic())
+            self.saldo -= min(quantidade, self.capacidade)
+            return max(0.0, -self.saldo / self.taxa)
+
+    def pausar(self, segundos):
+        """Esvazia o balde para que ninguém envie nada pelos próximos `segundos`."""
+        if self.capacidade <= 0:
+            return
+        with self._lock:
+            self._repor(time.monotonic())
+            self.saldo = min(self.saldo, -segundos * self.taxa)
+
+    def limitar_saldo(self, restantes):
+        """Não deixa o saldo passar do que o servidor diz que ainda resta."""
+        if self.capacidade <= 0:
+            return
+        with self._lock:
+            self._repor(time.monotonic())
+            self.saldo = min(self.saldo, float(restantes))
+
+    def reduzir(self):
+        if self.capacidade <= 0:
+            return
+        with self._lock:
+            agora = time.monotonic()
+            if self.reduzida_em is not None and agora - self.reduzida_em < 1.0:
+                return
+            self._repor(agora)
+            self.taxa = max(self.taxa_configurada / 20, self.taxa / 2)
+            self.reduzida_em = agora
+
+    def recuperar(self):
+        if self.capacidade <= 0 or self.taxa >= self.taxa_configurada:
+            return
+        with self._lock:
+            self._repor(time.monotonic())
+            self.taxa = min(self.taxa_configurada, self.taxa + self.taxa_configurada / 100)
+
+
+class _Vagas:
+    """
+    Semáforo utilizável tanto por threads quanto por corrotinas (de qualquer loop).
+
+    Threads e corrotinas esperam numa fila única e são atendidas na ordem de
+    chegada: `liberar` passa a vaga direto para a primeira da fila (um
+    `threading.Event` ou um future no loop dela), sem ninguém consultar de
+    tempos em tempos.
+    """
+
+    def __init__(self, limite):
+        self.limite = limite
+        self.em_uso = 0
+        self._lock = threading.Lock()
+        self._fila = deque()
+
+    def _pegar_livre(self):
+        # Com o lock: só pega vaga livre quem não passaria na frente da fila
+        if self.em_uso < self.limite and not self._fila:
+            self.em_uso += 1
+            return True
+        return False
+
+    def tentar(self):
+        with self._lock:
+            return self._pegar_livre()
+
+    def adquirir(self):
+        with self._lock:
+            if self._pegar_livre():
+                return
+            evento = threading.Event()
+            self._fila.append(evento)
+        evento.wait()
+
+    async def aadquirir(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._pegar_livre():
+                return
+            espera = (loop, loop.create_future())
+            self._fila.append(espera)
+        futuro = espera[1]
+        try:
+            await futuro
+        except asyncio.CancelledError:
+            with self._lock:
+                na_fila = espera in self._fila
+                if na_fila:
+                    self._fila.remove(espera)
+            if not na_fila and futuro.done() and not futuro.cancelled():
+                # A vaga chegou junto com o cancelamento: passa para o próximo
+                self.liberar()
+            raise
+
+    def _entregar(self, futuro):
+        # No loop de quem espera; cancelado antes de receber, a vaga segue adiante
+        if futuro.cancelled():
+            self.liberar()
+        else:
+            futuro.set_result(None)
+
+    def liberar(self):
+        with self._lock:
+            while self._fila:
+                proximo = self._fila.popleft()
+                if isinstance(proximo, threading.Event):
+                    proximo.set()
+                    return
+                loop, futuro = proximo
+                try:
+                    loop.call_soon_threadsafe(self._entregar, futuro)
+                    return
+                except RuntimeError:
+                    # Loop já fechado: ninguém mais espera por esse future
+                    continue
+            self.em_uso -= 1
+
+
+def _segundos_retry_after(cabecalhos):
+    """Lê `retry-after-ms` / `Retry-After` (segundos ou data HTTP)."""
+    if not cabecalhos:
+        return None
+    valor = cabecalhos.get("retry-after-ms")
+    if valor:
+        try:
+            return float(valor) / 1000
+        except ValueError:
+            pass
+    valor = cabecalhos.get("retry-after")
+    if not valor:
+        return None
+    try:
+        return max(0.0, float(valor))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(valor).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def _cota_restante(cabecalhos):
+    """
+    Lê `X-RateLimit-Remaining` / `X-RateLimit-Reset` (ou `RateLimit-*`).
+
+    Returns:
+        tuple: (requisições restantes, segundos até renovar a cota), com None
+            no que o servidor não informou
+    """
+    if not cabecalhos:
+        return None, None
+    restantes = reinicio = None
+    for prefixo in ("x-ratelimit-", "ratelimit-"):
+        valor = cabecalhos.get(prefixo + "remaining")
+        if valor is not None and restantes is None:
+            try:
+                restantes = int(float(valor))
+            except ValueError:
+                pass
+        valor = cabecalhos.get(prefixo + "reset")
+        if valor is not None and reinicio is None:
+            try:
+                reinicio = float(valor)
+            except ValueError:
+                continue
+            if reinicio > 1e9:
+                # Instante Unix em vez de segundos restantes
+                reinicio = reinicio - time.time()
+            reinicio = max(0.0, reinicio)
+    return restantes, reinicio
+
+def _status_e_cabecalhos(resultado, erro):
+    """Extrai o status HTTP e os cabeçalhos de uma resposta ou exceção."""
+    if erro is None:
+        if isinstance(resultado, httpx.Response):
+            return resultado.status_code, resultado.headers
+        return None, None
+    resposta = getattr(erro, "response", None)
+    status = getattr(erro, "status_code", None) or getattr(resposta, "status_code", None)
+    if status is None and isinstance(erro, (httpx.TransportError, ConnectionError, TimeoutError)):
+        status = "conexao"
+    if status is None and type(erro).__name__ in ("ConnectionError", "Timeout", "ReadTimeout", "ConnectTimeout"):
+        # Exceções de conexão do requests não herdam das nativas
+        status = "conexao"
+    return status, getattr(resposta, "headers", None)
+
+
+class Limitador:
+    """Estado compartilhado de limites, concorrência e estatísticas do processo."""
+
+    def __init__(self, limites=None):
+        self.limites = limites or get_limites()
+        self._baldes = {
+            provedor: {
+                "requisicoes": _Balde(valores["requisicoes"]),
+                "tokens": _Balde(valores["tokens"]),
+            }
+            for provedor, valores in self.limites["por_minuto"].items()
+        }
+        self._vagas = {
+            endpoint: _Vagas(limite) for endpoint, limite in self.limites["concorrencia"].items()
+        }
+        self._lock = threading.Lock()
+        self.por_endpoint = {}
+
+    # --- PLANEJAMENTO ---
+
+    def _espera_limites(self, endpoint, tokens):
+        """Reserva nos baldes do provedor e retorna a espera necessária."""
+        baldes = self._baldes[PROVEDORES[endpoint]]
+        return max(
+            baldes["requisicoes"].reservar(1),
+            baldes["tokens"].reservar(tokens),
+        )
+
+    def _avaliar(self, endpoint, tentativa, resultado, erro, idempotente=True):
+        """
+        Decide se a chamada deve ser repetida.
+
+        Args:
+            idempotente (bool): False para chamadas que só podem ser repetidas
+                depois de um 429 (o servidor pode ter feito o que foi pedido)
+
+        Returns:
+            float | None: Segundos até a próxima tentativa, ou None para encerrar
+        """
+        status, cabecalhos = _status_e_cabecalhos(resultado, erro)
+        repetivel = status == "conexao" or status in STATUS_REPETIVEIS
+        if not idempotente and status != 429:
+            repetivel = False
+        self._contar(endpoint, "tentativas")
+        self._adaptar(endpoint, status, cabecalhos)
+        if status == 429:
+            self._contar(endpoint, "respostas_429")
+        elif isinstance(status, int) and status >= 500:
+            self._contar(endpoint, "respostas_5xx")
+        elif status == "conexao":
+            self._contar(endpoint, "falhas_conexao")
+
+        if not repetivel or tentativa + 1 >= self.limites["tentativas"]:
+            if repetivel:
+                self._contar(endpoint, "esgotadas")
+            return None
+
+        # Jitter completo sobre a espera exponencial
+        teto = min(self.limites["espera_maxima"], self.limites["espera_base"] * 2 ** tentativa)
+        espera = random.uniform(0, teto)
+        retry_after = _segundos_retry_after(cabecalhos)
+        if retry_after is not None:
+            espera = min(self.limites["espera_maxima"], retry_after) + random.uniform(0, 0.1 * teto)
+        if status == 429:
+            # As demais chamadas ao provedor também esperam
+            self._baldes[PROVEDORES[endpoint]]["requisicoes"].pausar(espera)
+
+        self._contar(endpoint, "repeticoes")
+        tracing.registrar_evento(
+            "repeticao", endpoint, status=status, tentativa=tentativa + 1,
+            espera_ms=round(espera * 1000, 3),
+        )
+        return espera
+
+    def _adaptar(self, endpoint, status, cabecalhos):
+        """Ajusta o balde de requisições do provedor à resposta recebida."""
+        balde = self._baldes[PROVEDORES[endpoint]]["requisicoes"]
+        if status == 429:
+            balde.reduzir()
+            return
+        if isinstance(status, int) and status < 400:
+            balde.recuperar()
+        restantes, reinicio = _cota_restante(cabecalhos)
+        if restantes is None:
+            return
+        balde.limitar_saldo(restantes)
+        if restantes <= 0 and reinicio:
+            balde.pausar(min(self.limites["espera_maxima"], reinicio))
+
+    def _contar(self, endpoint, contador, valor=1):
+        with self._lock:
+            dados = self.por_endpoint.setdefault(endpoint, {
+                "chamadas": 0, "tentativas": 0, "repeticoes": 0, "esgotadas": 0,
+                "respostas_429": 0, "respostas_5xx": 0, "falhas_conexao": 0,
+                "espera_limite_s": 0.0, "espera_repeticao_s": 0.0,
+            })
+            dados[contador] += valor
+
+    # --- EXECUÇÃO ---
+
+    def executar(self, endpoint, funcao, tokens=0, idempotente=True):
+        """
+        Executa `funcao()` respeitando limites e repetindo falhas transitórias.
+
+        Args:
+            endpoint (str): Chave de PROVEDORES ("chat", "embeddings", "tavily"...)
+            funcao: Função sem argumentos que faz a chamada
+            tokens (int): Estimativa de tokens consumidos pela chamada
+            idempotente (bool): False repete só depois de 429 (ver `requisicao_idempotente`)
+
+        Returns:
+            O resultado da última tentativa (ou a exceção dela é propagada)
+        """
+        self._contar(endpoint, "chamadas")
+        tentativa = 0
+        while True:
+            espera = self._espera_limites(endpoint, tokens)
+            if espera:
+                self._contar(endpoint, "espera_limite_s", espera)
+                time.sleep(espera)
+
+            vagas = self._vagas[endpoint]
+            vagas.adquirir()
+            try:
+                resultado, erro = funcao(), None
+            except Exception as e:
+                resultado, erro = None, e
+            finally:
+                vagas.liberar()
+
+            espera = self._avaliar(endpoint, tentativa, resultado, erro, idempotente)
+            if espera is None:
+                if erro is not None:
+                    raise erro
+                return resultado
+            if isinstance(resultado, httpx.Response):
+                resultado.close()
+            self._contar(endpoint, "espera_repeticao_s", espera)
+            time.sleep(espera)
+            tentativa += 1
+
+    async def aexecutar(self, endpoint, fabrica, tokens=0, idempotente=True):
+        """
+        Versão assíncrona de `executar`.
+
+        Args:
+            fabrica: Função sem argumentos que retorna a corrotina da chamada
+                (uma nova a cada tentativa)
+        """
+        self._contar(endpoint, "chamadas")
+        tentativa = 0
+        while True:
+            espera = self._espera_limites(endpoint, tokens)
+            if espera:
+                self._contar(endpoint, "espera_limite_s", espera)
+                await asyncio.sleep(espera)
+
+            vagas = self._vagas[endpoint]
+            await vagas.aadquirir()
+            try:
+                resultado, erro = await fabrica(), None
+            except Exception as e:
+                resultado, erro = None, e
+            finally:
+                vagas.liberar()
+
+            espera = self._avaliar(endpoint, tentativa, resultado, erro, idempotente)
+            if espera is None:
+                if erro is not None:
+                    raise erro
+                return resultado
+            if isinstance(resultado, httpx.Response):
+                await resultado.aclose()
+            self._contar(endpoint, "espera_repeticao_s", espera)
+            await asyncio.sleep(espera)
+            tentativa += 1
+
+    def resumo(self):
+        """Retorna os contadores por endpoint."""
+        with self._lock:
+            return {
+                "por_endpoint": {
+                    endpoint: {
+                        chave: round(valor, 3) if isinstance(valor, float) else valor
+                        for chave, valor in dados.items()
+                    }
+                    for endpoint, dados in self.por_endpoint.items()
+                },
+                "em_uso": {endpoint: vagas.em_uso for endpoint, vagas in self._vagas.items()},
+                # Requisições por minuto atuais de cada provedor (já adaptadas)
+                "rpm": {
+                    provedor: round(baldes["requisicoes"].taxa * 60, 1)
+                    for provedor, baldes in self._baldes.items()
+                },
+            }
+
+# Instância compartilhada por todas as ferramentas do processo
+limitador = Limitador()
+
+def obter_estatisticas_limitador():
+    """Retorna o resumo acumulado do limitador neste processo."""
+    return limitador.resumo()
+
+def configurar_limitador(limites=None):
+    """Recria o limitador (ex.: depois de alterar as variáveis de ambiente)."""
+    global limitador
+    limitador = Limitador(limites)
+    return limitador
+
+# --- TRANSPORTE HTTP PARA OS CLIENTES DA OPENAI ---
+
+def endpoint_da_requisicao(request):
+    """
+    Mapeia a requisição para a chave do endpoint.
+
+    Chamadas fora da OpenAI informam o endpoint na extensão `endpoint_limite`
+    (ex.: `client.post(..., extensions={"endpoint_limite": "tavily"})`).
+    """
+    if request.extensions.get("endpoint_limite"):
+        return request.extensions["endpoint_limite"]
+    caminho = request.url.path
+    if caminho.endswith("/embeddings"):
+        return "embeddings"
+    if "/images/" in caminho:
+        return "imagens"
+    if "/audio/" in caminho:
+        return "audio"
+    return "chat"
+
+def requisicao_idempotente(request):
+    """
+    Indica se a requisição pode ser repetida depois de um timeout ou 5xx.
+
+    Só POSTs de ENDPOINTS_NAO_IDEMPOTENTES não podem; a extensão `repetivel`
+    decide no lugar disso (ex.: `extensions={"repetivel": True}`).
+    """
+    if "repetivel" in request.extensions:
+        return bool(request.extensions["repetivel"])
+    return request.method != "POST" or endpoint_da_requisicao(request) not in ENDPOINTS_NAO_IDEMPOTENTES
+
+def estimar_tokens(request):
+    """Estimativa de tokens da requisição (~4 caracteres por token + saída máxima)."""
+    try:
+        corpo = request.content
+    except httpx.RequestNotRead:
+        return 0
+    if not corpo or request.headers.get("content-type", "").startswith("multipart/"):
+        return 0
+    estimativa = len(corpo) // 4
+    try:
+        dados = json.loads(corpo)
+    except ValueError:
+        return estimativa
+    saida = dados.get("max_tokens") or dados.get("max_completion_tokens") or 0
+    return estimativa + int(saida)
+
+
+class TransporteLimitado(httpx.BaseTransport):
+    """Transporte httpx síncrono que passa cada requisição pelo limitador."""
+
+    def __init__(self, transporte=None):
+        self._transporte = transporte or httpx.HTTPTransport()
+
+    def handle_request(self, request):
+        # Conteúdo em memória para poder reenviar (ex.: upload de áudio)
+        request.read()
+        return limitador.executar(
+            endpoint_da_requisicao(request),
+            lambda: self._transporte.handle_request(request),
+            tokens=estimar_tokens(request),
+            idempotente=requisicao_idempotente(request),
+        )
+
+    def close(self):
+        self._transporte.close()
+
+
+class TransporteLimitadoAsync(httpx.AsyncBaseTransport):
+    """
+    Transporte httpx assíncrono que passa cada requisição pelo limitador.
+
+    Sem um transporte próprio, usa um pool de conexões por loop de eventos:
+    conexões abertas num loop não servem em outro (ex.: um `asyncio.run`
+    por chamada nos scripts), e o cliente pode ser criado fora de qualquer loop.
+    """
+
+    def __init__(self, transporte=None):
+        self._transporte = transporte
+        self._por_loop = weakref.WeakKeyDictionary()
+
+    def _transporte_do_loop(self):
+        if self._transporte is not None:
+            return self._transporte
+        loop = asyncio.get_running_loop()
+        transporte = self._por_loop.get(loop)
+        if transporte is None:
+            transporte = self._por_loop[loop] = httpx.AsyncHTTPTransport()
+        return transporte
+
+    async def handle_async_request(self, request):
+        await request.aread()
+        transporte = self._transporte_do_loop()
+        return await limitador.aexecutar(
+            endpoint_da_requisicao(request),
+            lambda: transporte.handle_async_request(request),
+            tokens=estimar_tokens(request),
+            idempotente=requisicao_idempotente(request),
+        )
+
+    async def aclose(self):
+        if self._transporte is not None:
+            await self._transporte.aclose()
+            return
+        transporte = self._por_loop.pop(asyncio.get_running_loop(), None)
+        if transporte is not None:
+            await transporte.aclose()
+
+
+# Clientes HTTP compartilhados (mantêm o pool de conexões entre chamadas)
+_clientes = {}
+_clientes_async = weakref.WeakKeyDictionary()
+_clientes_lock = threading.Lock()
+
+def cliente_http():
+    """Cliente httpx síncrono limitado, para `OpenAI(http_client=...)`."""
+    with _clientes_lock:
+        if "sync" not in _clientes:
+            _clientes["sync"] = httpx.Client(transport=TransporteLimitado(), timeout=None)
+        return _clientes["sync"]
+
+def cliente_http_async():
+    """
+    Cliente httpx assíncrono limitado, para `AsyncOpenAI(http_client=...)`.
+
+    Um cliente por loop de eventos em execução; fora de um loop (ex.: na
+    criação dos modelos do LangChain), o do processo, cujo transporte também
+    separa as conexões por loop.
+    """
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+    with _clientes_lock:
+        if loop is None:
+            if "async" not in _clientes:
+                _clientes["async"] = httpx.AsyncClient(transport=TransporteLimitadoAsync(), timeout=None)
+            return _clientes["async"]
+        if loop not in _clientes_async:
+            _clientes_async[loop] = httpx.AsyncClient(transport=TransporteLimitadoAsync(), timeout=None)
+        return _clientes_async[loop]
+
+def opcoes_openai():
+    """
+    Parâmetros para ChatOpenAI / OpenAIEmbeddings usarem o limitador.
+
+    As novas tentativas do SDK são desligadas: quem repete é o limitador.
+    Cada chamada é limitada a UPSTREAM_TIMEOUT_SECONDS.
+    """
+    return {
+        "max_retries": 0,
+        "timeout": TIMEOUT_PADRAO,
+        "http_client": cliente_http(),
+        "http_async_client": cliente_http_async(),
+    }
+
+def opcoes_embeddings():
+    """
+    Parâmetros para OpenAIEmbeddings: os do limitador e a checagem de tamanho.
+
+    A checagem de tamanho usa o tiktoken, que baixa o vocabulário na primeira
+    vez; EMBEDDINGS_CHECK_CTX_LENGTH=false a desliga (ex.: sem rede).
+    """
+    opcoes = opcoes_openai()
+    opcoes["check_embedding_ctx_length"] = os.getenv("EMBEDDINGS_CHECK_CTX_LENGTH", "true").lower() == "true"
+    return opcoes
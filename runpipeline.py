@@ -1,8 +1,29 @@
+import argparse
+
 from setup_django import setup_django
 
+parser = argparse.ArgumentParser(description="Ingestão dos artigos da Movidesk (coleta, trechos e embeddings).")
+parser.add_argument("--completo", action="store_true",
+                    help="Lista a base inteira em vez de só os artigos alterados desde a última execução")
+parser.add_argument("--streaming", action="store_true",
+                    help="Coleta, trechos e embeddings ao mesmo tempo, em filas limitadas, em vez de etapa por etapa")
+parser.add_argument("--descartados", action="store_true",
+                    help="Lista os artigos descartados por excesso de falhas e sai")
+args = parser.parse_args()
+
 # Configura Django antes de importar modelos
 setup_django()
 
-from tools.pipeline import pipeline
+# Com FAKE_BACKENDS=true a Movidesk e os embeddings vêm do servidor falso
+import fake_backends
+fake_backends.ativar_se_configurado()
+
+from tools import execucoes
+from tools.pipeline import executar
 
-pipeline.invoke({})
\ No newline at end of file
+if args.descartados:
+    for progresso in execucoes.descartados():
+        print(f"{progresso.artigo_id}\t{progresso.etapa}\t{progresso.tentativas} tentativas\t{progresso.erro}")
+else:
+    # Retoma a última execução que não terminou, se houver
+    executar(completo=args.completo, streaming=args.streaming)
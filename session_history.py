@@ -0,0 +1,326 @@
+"""
+Histórico de conversa persistente por sessão, no SQLite do projeto.
+
+Cada mensagem vira uma linha de `MensagemSessao` (tipo + texto, e os
+metadados só quando existem), então uma conversa nunca é regravada
+inteira: a cada turno entram apenas as mensagens novas. As gravações são
+feitas em segundo plano por um único gravador, que junta as mensagens de
+todas as sessões em lotes (uma transação por lote) e não atrasa a
+resposta ao usuário.
+
+Ao retomar uma sessão (após reinício ou em outro processo) só as últimas
+mensagens são carregadas, que é o que o classificador e os nós usam.
+
+Um turno por vez em cada sessão, em qualquer processo: `adquirir_trava`
+grava uma `TravaSessao` e `liberar_trava` a entrega ao gravador, que a
+apaga na mesma transação das mensagens do turno. A resposta sai sem
+esperar a gravação, e o próximo turno (deste ou de outro processo) só
+começa com o histórico anterior já no banco.
+
+Configuração:
+    SESSION_HISTORY_TAIL: mensagens carregadas ao retomar a sessão
+    SESSION_WRITE_BATCH: máximo de mensagens por transação
+    SESSION_WRITE_INTERVAL_SECONDS: espera para juntar mensagens num lote
+    SESSION_FLUSH_TIMEOUT_SECONDS: espera máxima por `descarregar_sessao`
+    SESSION_LOCK_TIMEOUT_SECONDS: espera máxima por `adquirir_trava`
+    SESSION_LOCK_TTL_SECONDS: validade da trava (a de um processo morto vence)
+"""
+
+import os
+import time
+import uuid
+import queue
+import atexit
+import threading
+from datetime import timedelta
+
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+import setup_django
+setup_django.setup_django()
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+from tools.models import MensagemSessao, TravaSessao
+
+SESSION_CONFIG = {
+    "tamanho_cauda": int(os.getenv("SESSION_HISTORY_TAIL", "20")),
+    "tamanho_lote": int(os.getenv("SESSION_WRITE_BATCH", "200")),
+    "intervalo": float(os.getenv("SESSION_WRITE_INTERVAL_SECONDS", "0.2")),
+    "espera_descarga": float(os.getenv("SESSION_FLUSH_TIMEOUT_SECONDS", "10")),
+    "espera_trava": float(os.getenv("SESSION_LOCK_TIMEOUT_SECONDS", "30")),
+    "validade_trava": float(os.getenv("SESSION_LOCK_TTL_SECONDS", "300")),
+}
+
+# Tipo gravado -> classe da mensagem
+TIPOS_MENSAGEM = {
+    "human": HumanMessage,
+    "ai": AIMessage,
+    "system": SystemMessage,
+}
+
+def get_session_config():
+    """Retorna a configuração do histórico persistente."""
+    return SESSION_CONFIG
+
+def _para_linha(sessao_id, mensagem):
+    """Converte a mensagem na linha compacta (sem campos vazios)."""
+    extras = {}
+    if mensagem.additional_kwargs:
+        extras["additional_kwargs"] = mensagem.additional_kwargs
+    if mensagem.response_metadata:
+        extras["response_metadata"] = mensagem.response_metadata
+    return MensagemSessao(
+        sessao_id=sessao_id,
+        tipo=mensagem.type,
+        conteudo=mensagem.content if isinstance(mensagem.content, str) else str(mensagem.content),
+        extras=extras or None,
+    )
+
+def _sessao_da_operacao(operacao, dado):
+    if operacao == "mensagem":
+        return dado.sessao_id
+    if operacao == "liberar":
+        return dado[0]
+    return dado
+
+def _de_linha(linha):
+    """Reconstrói a mensagem a partir da linha gravada."""
+    classe = TIPOS_MENSAGEM.get(linha.tipo, HumanMessage)
+    return classe(content=linha.conteudo, **(linha.extras or {}))
+
+
+class GravadorHistorico:
+    """
+    Grava as mensagens em lotes numa thread própria (write-behind).
+
+    A fila preserva a ordem das operações, então uma limpeza de sessão
+    nunca apaga mensagens enfileiradas depois dela, e a trava de um turno
+    só sai do banco com as mensagens dele. As operações ainda não
+    gravadas são contadas por sessão, para `descarregar_sessao` esperar só
+    pelas de uma sessão.
+    """
+
+    def __init__(self, tamanho_lote=200, intervalo=0.2):
+        self.tamanho_lote = tamanho_lote
+        self.intervalo = intervalo
+        self._fila = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._pendentes = {}  # sessao_id -> operações enfileiradas e ainda não gravadas
+        self._gravadas = threading.Condition()
+        self.lotes = 0
+        self.mensagens = 0
+        self.erros = 0
+
+    def _iniciar(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._executar, daemon=True, name="gravador-historico")
+                self._thread.start()
+
+    def _contar(self, contagens):
+        with self._gravadas:
+            for sessao_id, delta in contagens.items():
+                restantes = self._pendentes.get(sessao_id, 0) + delta
+                if restantes > 0:
+                    self._pendentes[sessao_id] = restantes
+                else:
+                    self._pendentes.pop(sessao_id, None)
+            self._gravadas.notify_all()
+
+    def enfileirar_mensagens(self, linhas):
+        self._iniciar()
+        linhas = list(linhas)
+        contagens = {}
+        for linha in linhas:
+            contagens[linha.sessao_id] = contagens.get(linha.sessao_id, 0) + 1
+        self._contar(contagens)
+        for linha in linhas:
+            self._fila.put(("mensagem", linha))
+
+    def enfileirar_limpeza(self, sessao_id):
+        self._iniciar()
+        self._contar({sessao_id: 1})
+        self._fila.put(("limpar", sessao_id))
+
+    def enfileirar_liberacao(self, sessao_id, dono):
+        self._iniciar()
+        self._contar({sessao_id: 1})
+        self._fila.put(("liberar", (sessao_id, dono)))
+
+    def descarregar(self):
+        """Bloqueia até tudo o que foi enfileirado estar gravado."""
+        if self._thread is not None and self._thread.is_alive():
+            self._fila.join()
+
+    def descarregar_sessao(self, sessao_id, timeout=None):
+        """
+        Bloqueia até as operações já enfileiradas da sessão estarem gravadas.
+
+        Returns:
+            bool: False se `timeout` (padrão: SESSION_FLUSH_TIMEOUT_SECONDS) venceu antes
+        """
+        timeout = SESSION_CONFIG["espera_descarga"] if timeout is None else timeout
+        with self._gravadas:
+            return self._gravadas.wait_for(lambda: str(sessao_id) not in self._pendentes, timeout)
+
+    def _coletar_lote(self, primeira):
+        """Junta operações até o tamanho do lote ou o fim do intervalo."""
+        lote = [primeira]
+        limite = time.monotonic() + self.intervalo
+        while len(lote) < self.tamanho_lote:
+            espera = limite - time.monotonic()
+            if espera <= 0:
+                break
+            try:
+                lote.append(self._fila.get(timeout=espera))
+            except queue.Empty:
+                break
+        return lote
+
+    def _gravar(self, lote):
+        """Aplica as operações do lote em uma transação, na ordem."""
+        linhas = []
+        with transaction.atomic():
+            for operacao, dado in lote:
+                if operacao == "mensagem":
+                    linhas.append(dado)
+                    continue
+                if linhas:
+                    MensagemSessao.objects.bulk_create(linhas)
+                    linhas = []
+                if operacao == "liberar":
+                    sessao_id, dono = dado
+                    TravaSessao.objects.filter(sessao_id=sessao_id, dono=dono).delete()
+                else:
+                    MensagemSessao.objects.filter(sessao_id=dado).delete()
+            if linhas:
+                MensagemSessao.objects.bulk_create(linhas)
+
+    def _liberar_travas(self, lote):
+        """Depois de um lote com erro: o histórico se perdeu, a sessão não precisa ficar presa."""
+        for operacao, dado in lote:
+            if operacao != "liberar":
+                continue
+            sessao_id, dono = dado
+            try:
+                TravaSessao.objects.filter(sessao_id=sessao_id, dono=dono).delete()
+            except Exception as e:
+                print(f"Erro ao liberar a trava da sessão {sessao_id}: {e}")
+
+    def _executar(self):
+        while True:
+            lote = self._coletar_lote(self._fila.get())
+            try:
+                self._gravar(lote)
+                self.lotes += 1
+                self.mensagens += sum(1 for operacao, _ in lote if operacao == "mensagem")
+            except Exception as e:
+                self.erros += 1
+                print(f"Erro ao gravar histórico de sessão ({len(lote)} operações): {e}")
+                self._liberar_travas(lote)
+            finally:
+                # Conexões do Django são por thread; não deixar uma quebrada para o próximo lote
+                connection.close_if_unusable_or_obsolete()
+                # Com erro também: quem espera a sessão não deve ficar preso
+                contagens = {}
+                for operacao, dado in lote:
+                    sessao_id = _sessao_da_operacao(operacao, dado)
+                    contagens[sessao_id] = contagens.get(sessao_id, 0) - 1
+                self._contar(contagens)
+                for _ in lote:
+                    self._fila.task_done()
+
+    def resumo(self):
+        return {
+            "lotes": self.lotes,
+            "mensagens": self.mensagens,
+            "erros": self.erros,
+            "pendentes": self._fila.qsize(),
+            "mensagens_por_lote": round(self.mensagens / self.lotes, 2) if self.lotes else 0.0,
+        }
+
+gravador = GravadorHistorico(SESSION_CONFIG["tamanho_lote"], SESSION_CONFIG["intervalo"])
+atexit.register(gravador.descarregar)
+
+def obter_estatisticas_historico():
+    """Retorna as estatísticas do gravador de histórico."""
+    return gravador.resumo()
+
+def adquirir_trava(sessao_id, timeout=None):
+    """
+    Reserva a sessão para um turno, em todos os processos que usam o banco.
+
+    Espera o turno anterior deste processo ser gravado e, se a trava é de
+    outro processo, que o gravador dele a apague (ou que ela vença).
+
+    Returns:
+        str | None: dono da trava (para `liberar_trava`), ou None se `timeout`
+        (padrão: SESSION_LOCK_TIMEOUT_SECONDS) venceu antes
+    """
+    sessao_id = str(sessao_id)
+    timeout = SESSION_CONFIG["espera_trava"] if timeout is None else timeout
+    limite = time.monotonic() + timeout
+    if not gravador.descarregar_sessao(sessao_id, timeout):
+        return None
+
+    espera = 0.01
+    while True:
+        agora = timezone.now()
+        TravaSessao.objects.filter(sessao_id=sessao_id, expira_em__lt=agora).delete()
+        dono = uuid.uuid4().hex
+        try:
+            TravaSessao.objects.create(sessao_id=sessao_id, dono=dono,
+                                       expira_em=agora + timedelta(seconds=SESSION_CONFIG["validade_trava"]))
+            return dono
+        except IntegrityError:
+            pass
+        restante = limite - time.monotonic()
+        if restante <= 0:
+            return None
+        # Trava de outro processo: só o banco sabe quando ela sai
+        time.sleep(min(espera, restante))
+        espera = min(espera * 2, 0.2)
+
+def liberar_trava(sessao_id, dono):
+    """Entrega a trava ao gravador: ela sai do banco junto com as mensagens já enfileiradas."""
+    gravador.enfileirar_liberacao(str(sessao_id), dono)
+
+
+class HistoricoPersistente(BaseChatMessageHistory):
+    """
+    Histórico de uma sessão: cauda em memória, gravação incremental no SQLite.
+
+    Args:
+        sessao_id (str): Identificador da sessão (ou thread) da conversa
+        tamanho_cauda (int): Mensagens carregadas ao retomar e mantidas em memória
+    """
+
+    def __init__(self, sessao_id, tamanho_cauda=None):
+        self.sessao_id = str(sessao_id)
+        self.tamanho_cauda = tamanho_cauda or SESSION_CONFIG["tamanho_cauda"]
+        self._mensagens = self._carregar_cauda()
+
+    def _carregar_cauda(self):
+        linhas = (MensagemSessao.objects
+                  .filter(sessao_id=self.sessao_id)
+                  .order_by("-id")[:self.tamanho_cauda])
+        return [_de_linha(linha) for linha in reversed(list(linhas))]
+
+    @property
+    def messages(self):
+        return list(self._mensagens)
+
+    def add_message(self, message):
+        self.add_messages([message])
+
+    def add_messages(self, messages):
+        messages = list(messages)
+        self._mensagens.extend(messages)
+        del self._mensagens[:-self.tamanho_cauda]
+        gravador.enfileirar_mensagens([_para_linha(self.sessao_id, m) for m in messages])
+
+    def clear(self):
+        self._mensagens = []
+        gravador.enfileirar_limpeza(self.sessao_id)
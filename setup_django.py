@@ -10,7 +10,8 @@ def setup_django():
             DATABASES={
                 'default': {
                     'ENGINE': 'django.db.backends.sqlite3',
-                    'NAME': 'db.sqlite3',
+                    # SQLITE_PATH permite outro arquivo (ex.: benchmarks num banco temporário)
+                    'NAME': os.getenv('SQLITE_PATH', 'db.sqlite3'),
                 }
             },
             INSTALLED_APPS=[
@@ -0,0 +1,211 @@
+"""
+Coalescência de requisições idênticas em andamento (single-flight).
+
+Quando vários usuários fazem a mesma pergunta ao mesmo tempo, apenas a
+primeira requisição executa o nó especialista (busca + LLM); as demais
+aguardam essa mesma execução e recebem o mesmo resultado.
+
+`CargaUnica` faz o mesmo para cargas caras do processo (as bases de
+conhecimento): uma carga por vez, numa thread própria, e quem não pode
+esperar por ela segue sem o resultado.
+
+Configuração:
+    KNOWLEDGE_BASE_WAIT_SECONDS: espera máxima por uma base ainda carregando
+"""
+
+import os
+import re
+import asyncio
+import hashlib
+import threading
+import unicodedata
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+import tracing
+
+
+def normalizar_pergunta(pergunta):
+    """Normaliza caixa, acentos compostos, espaços e pontuação final."""
+    texto = unicodedata.normalize("NFKC", pergunta or "").lower()
+    texto = re.sub(r"\s+", " ", texto).strip()
+    return texto.rstrip("?!.;: ")
+
+def chave_coalescencia(intencao, pergunta, contexto=None):
+    """
+    Monta a chave que identifica requisições equivalentes.
+
+    Args:
+        intencao (str): Intenção atendida pelo nó
+        pergunta (str): Texto do usuário
+        contexto (list, optional): Trechos recuperados usados na resposta
+
+    Returns:
+        tuple: (intenção, pergunta normalizada, hash do contexto)
+    """
+    hash_contexto = ""
+    if contexto:
+        # Mesmo conjunto de trechos, independente da ordem ou do score
+        resumo = hashlib.sha1()
+        for conteudo in sorted({trecho["conteudo"] for trecho in contexto}):
+            resumo.update(conteudo.encode("utf-8"))
+            resumo.update(b"\0")
+        hash_contexto = resumo.hexdigest()
+    return (intencao, normalizar_pergunta(pergunta), hash_contexto)
+
+
+class SingleFlight:
+    """
+    Agrupa chamadas concorrentes com a mesma chave em uma única execução.
+
+    A execução roda em uma tarefa própria: se quem a iniciou for cancelado,
+    as demais requisições que aguardam continuam recebendo o resultado.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._em_andamento = {}
+        self.chamadas = 0
+        self.execucoes = 0
+        self.coalescidas = 0
+        self.por_intencao = {}
+
+    async def executar(self, chave, fabrica):
+        """
+        Executa `fabrica()` ou aguarda a execução em andamento com a mesma chave.
+
+        Args:
+            chave (tuple): Chave de `chave_coalescencia`
+            fabrica: Função sem argumentos que retorna a corrotina a executar
+
+        Returns:
+            O resultado compartilhado da execução
+        """
+        loop = asyncio.get_running_loop()
+        # Tarefas pertencem a um loop; loops diferentes não compartilham execuções
+        chave_loop = (id(loop), chave)
+        intencao = chave[0]
+
+        with self._lock:
+            self.chamadas += 1
+            dados = self.por_intencao.setdefault(intencao, {"chamadas": 0, "coalescidas": 0})
+            dados["chamadas"] += 1
+            tarefa = self._em_andamento.get(chave_loop)
+            if tarefa is None:
+                tarefa = loop.create_task(fabrica())
+                self._em_andamento[chave_loop] = tarefa
+                tarefa.add_done_callback(lambda t: self._remover(chave_loop, t))
+                self.execucoes += 1
+                lider = True
+            else:
+                lider = False
+                self.coalescidas += 1
+                dados["coalescidas"] += 1
+                print(f"--- 🔗 Requisição idêntica em andamento ({intencao}), aguardando resultado ---")
+
+        tracing.registrar_cache(f"coalescencia:{intencao}", hit=not lider)
+        return await asyncio.shield(tarefa)
+
+    def _remover(self, chave_loop, tarefa):
+        """Remove a execução concluída, se ainda for a registrada para a chave."""
+        with self._lock:
+            if self._em_andamento.get(chave_loop) is tarefa:
+                del self._em_andamento[chave_loop]
+
+    def resumo(self):
+        """Retorna a taxa de coalescência e as chamadas upstream economizadas."""
+        with self._lock:
+            return {
+                "chamadas": self.chamadas,
+                "execucoes": self.execucoes,
+                "coalescidas": self.coalescidas,
+                "taxa_coalescencia": self.coalescidas / self.chamadas if self.chamadas else 0.0,
+                "chamadas_upstream_economizadas": self.coalescidas,
+                "em_andamento": len(self._em_andamento),
+                "por_intencao": {i: dict(d) for i, d in self.por_intencao.items()},
+            }
+
+# Instância compartilhada pelos nós especialistas do grafo
+coalescedor = SingleFlight()
+
+# Espera máxima por uma carga em andamento antes de seguir sem ela
+ESPERA_CARGA = float(os.getenv("KNOWLEDGE_BASE_WAIT_SECONDS", "5"))
+
+class CargaUnica:
+    """
+    Carga cara feita uma vez por processo, fora de qualquer lock.
+
+    A primeira chamada dispara `carregar()` numa thread própria e as demais
+    aguardam o mesmo future, cada uma por no máximo `espera` segundos: com
+    a carga ainda em andamento, recebem None em vez de ficarem paradas atrás
+    dela (uma carga com crawler leva minutos). Um resultado que `valido`
+    recusa, ou uma exceção, faz a próxima chamada carregar de novo.
+    """
+
+    def __init__(self, nome, carregar, valido=bool):
+        self.nome = nome
+        self.carregar = carregar
+        self.valido = valido
+        self._lock = threading.Lock()
+        self._futuro = None
+
+    def _disparar(self):
+        """Future da carga em andamento ou concluída (dispara outra se a última falhou)."""
+        with self._lock:
+            futuro = self._futuro
+            if futuro is None or (futuro.done() and (futuro.exception() or not self.valido(futuro.result()))):
+                futuro = self._futuro = Future()
+                threading.Thread(target=self._executar, args=(futuro,), daemon=True,
+                                 name=f"carga-{self.nome}").start()
+                pronta = False
+            else:
+                pronta = futuro.done()
+        tracing.registrar_cache(self.nome, hit=pronta)
+        return futuro
+
+    def _executar(self, futuro):
+        futuro.set_running_or_notify_cancel()
+        try:
+            futuro.set_result(self.carregar())
+        except Exception as e:
+            print(f"Erro ao carregar {self.nome}: {e}")
+            futuro.set_exception(e)
+
+    def _resultado(self, futuro):
+        if futuro.exception() is not None:
+            return None
+        resultado = futuro.result()
+        return resultado if self.valido(resultado) else None
+
+    def _indisponivel(self):
+        print(f"--- ⏳ {self.nome} ainda carregando: seguindo sem ela ---")
+        return None
+
+    def obter(self, espera=None):
+        """
+        Resultado da carga, ou None se falhou ou não terminou em `espera`
+        segundos (padrão: KNOWLEDGE_BASE_WAIT_SECONDS).
+        """
+        espera = ESPERA_CARGA if espera is None else espera
+        futuro = self._disparar()
+        try:
+            futuro.exception(timeout=espera)
+        except FutureTimeoutError:
+            return self._indisponivel()
+        return self._resultado(futuro)
+
+    async def aobter(self, espera=None):
+        """Versão assíncrona de `obter` (espera sem ocupar uma thread)."""
+        espera = ESPERA_CARGA if espera is None else espera
+        futuro = self._disparar()
+        if not futuro.done():
+            try:
+                await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(futuro)), timeout=espera)
+            except asyncio.TimeoutError:
+                return self._indisponivel()
+            except Exception:
+                pass
+        return self._resultado(futuro)
+
+def obter_estatisticas_coalescencia():
+    """Retorna o resumo acumulado da coalescência neste processo."""
+    return coalescedor.resumo()
@@ -0,0 +1,165 @@
+"""
+Recuperação especulativa de contexto em paralelo à classificação de intenção.
+
+Enquanto o classificador decide a intenção, a busca vetorial (embedding da
+pergunta + top-k no FAISS) já é iniciada para os domínios mais prováveis.
+Os domínios escolhidos reaproveitam o resultado e os demais são cancelados.
+"""
+
+import os
+import asyncio
+import threading
+import time
+
+import tracing
+
+from tools.busca_contabilidade import arecuperar_contexto as arecuperar_contabilidade
+from tools.busca_assistencia_gestao import arecuperar_contexto as arecuperar_gestao
+
+# Domínios com base de conhecimento que podem ser pré-carregados
+RECUPERADORES = {
+    "contabilidade": arecuperar_contabilidade,
+    "gestao": arecuperar_gestao,
+}
+
+def get_dominios_especulativos():
+    """
+    Retorna os domínios especulados a cada mensagem.
+
+    Configurável por SPECULATIVE_DOMAINS (lista separada por vírgulas,
+    vazio desativa a especulação).
+    """
+    valor = os.getenv("SPECULATIVE_DOMAINS", "contabilidade,gestao")
+    return [d.strip() for d in valor.split(",") if d.strip() in RECUPERADORES]
+
+
+class EstatisticasEspeculacao:
+    """Contadores acumulados do processo para ajustar o conjunto de domínios."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.mensagens = 0
+        self.acertos = 0
+        self.erros = 0
+        self.tarefas_iniciadas = 0
+        self.tarefas_descartadas = 0
+        self.tempo_economizado = 0.0
+        self.tempo_desperdicado = 0.0
+        self.por_dominio = {}
+
+    def registrar(self, dominios, vencedores, economia, desperdicio):
+        """Registra o resultado da especulação de uma mensagem."""
+        with self._lock:
+            self.mensagens += 1
+            self.tarefas_iniciadas += len(dominios)
+            aproveitadas = [d for d in dominios if d in vencedores]
+            if aproveitadas:
+                self.acertos += 1
+            else:
+                self.erros += 1
+            self.tarefas_descartadas += len(dominios) - len(aproveitadas)
+            self.tempo_economizado += economia
+            self.tempo_desperdicado += sum(desperdicio.values())
+            for dominio in dominios:
+                dados = self.por_dominio.setdefault(
+                    dominio, {"iniciadas": 0, "aproveitadas": 0, "tempo_desperdicado": 0.0}
+                )
+                dados["iniciadas"] += 1
+                if dominio in vencedores:
+                    dados["aproveitadas"] += 1
+                dados["tempo_desperdicado"] += desperdicio.get(dominio, 0.0)
+
+    def resumo(self):
+        """Retorna um dicionário com os totais e taxas de aproveitamento."""
+        with self._lock:
+            return {
+                "mensagens": self.mensagens,
+                "acertos": self.acertos,
+                "erros": self.erros,
+                "taxa_acerto": self.acertos / self.mensagens if self.mensagens else 0.0,
+                "tarefas_iniciadas": self.tarefas_iniciadas,
+                "tarefas_descartadas": self.tarefas_descartadas,
+                "tempo_economizado_s": round(self.tempo_economizado, 3),
+                "tempo_desperdicado_s": round(self.tempo_desperdicado, 3),
+                "por_dominio": {d: dict(v) for d, v in self.por_dominio.items()},
+            }
+
+estatisticas = EstatisticasEspeculacao()
+
+def obter_estatisticas_especulacao():
+    """Retorna o resumo acumulado da especulação neste processo."""
+    return estatisticas.resumo()
+
+
+async def _cronometrar(coro):
+    """Executa a corrotina e devolve (resultado, instante de término)."""
+    resultado = await coro
+    return resultado, time.perf_counter()
+
+async def classificar_com_especulacao(classificacao, pergunta):
+    """
+    Executa a classificação enquanto pré-carrega o contexto dos domínios prováveis.
+
+    Args:
+        classificacao: Corrotina que retorna a lista de intenções classificadas
+        pergunta (str): Texto usado na busca vetorial
+
+    Returns:
+        tuple: (intenções, {domínio: trechos}) com o contexto dos vencedores
+    """
+    dominios = get_dominios_especulativos()
+    if not dominios:
+        return await classificacao, {}
+
+    inicio = time.perf_counter()
+    tarefas = {
+        dominio: asyncio.create_task(_cronometrar(RECUPERADORES[dominio](pergunta)))
+        for dominio in dominios
+    }
+
+    try:
+        intencoes = await classificacao
+    except BaseException:
+        for tarefa in tarefas.values():
+            tarefa.cancel()
+        raise
+    fim_classificacao = time.perf_counter()
+
+    vencedores = {intencao.strip().lower() for intencao in intencoes}
+    desperdicio = {}
+    for dominio, tarefa in tarefas.items():
+        if dominio in vencedores:
+            continue
+        if tarefa.done() and not tarefa.cancelled() and tarefa.exception() is None:
+            desperdicio[dominio] = tarefa.result()[1] - inicio
+        else:
+            tarefa.cancel()
+            desperdicio[dominio] = fim_classificacao - inicio
+
+    contextos = {}
+    economia = 0.0
+    for dominio in vencedores.intersection(tarefas):
+        try:
+            contexto, fim_busca = await tarefas[dominio]
+        except Exception as e:
+            print(f"Erro na recuperação especulativa de {dominio}: {e}")
+            continue
+        if contexto is not None:
+            contextos[dominio] = contexto
+        tracing.registrar_cache(f"prefetch:{dominio}", hit=contexto is not None)
+        # Tempo de busca que ficou escondido atrás da classificação
+        economia_dominio = min(fim_classificacao, fim_busca) - inicio
+        economia = max(economia, economia_dominio)
+        print(f"--- ⚡ Contexto de {dominio} pré-carregado (economia de {economia_dominio:.2f}s) ---")
+
+    # Domínios com base de conhecimento escolhidos sem especulação
+    for dominio in vencedores.intersection(RECUPERADORES).difference(tarefas):
+        tracing.registrar_cache(f"prefetch:{dominio}", hit=False)
+    tracing.registrar_evento(
+        "especulacao", "classificador",
+        dominios=dominios, economia_ms=round(economia * 1000, 3),
+        desperdicio_ms=round(sum(desperdicio.values()) * 1000, 3),
+    )
+
+    estatisticas.registrar(dominios, vencedores, economia, desperdicio)
+    return intencoes, contextos
@@ -0,0 +1,21 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Os módulos do projeto ficam na raiz (sem pacote instalável)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Banco SQLite próprio dos testes; chave falsa para os clientes da OpenAI criados na importação
+os.environ.setdefault("SQLITE_PATH", os.path.join(tempfile.mkdtemp(prefix="testes_"), "testes.sqlite3"))
+os.environ.setdefault("OPENAI_API_KEY", "fake")
+
+
+@pytest.fixture(scope="session")
+def banco():
+    """Django configurado com as tabelas criadas no banco dos testes."""
+    import setup_django
+    setup_django.setup_django()
+    from django.core.management import call_command
+    call_command("migrate", verbosity=0)
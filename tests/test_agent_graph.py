@@ -0,0 +1,26 @@
+import agent_graph
+
+
+def test_combinar_sem_respostas_usa_a_mensagem_de_falha():
+    assert agent_graph.node_combinar({"respostas_parciais": []}) == {
+        "resposta_final": agent_graph.MENSAGEM_SEM_RESPOSTA}
+    assert agent_graph.node_combinar({"intencoes": ["contabilidade", "gestao"], "respostas_parciais": [
+        {"intencao": "contabilidade", "resposta": ""},
+        {"intencao": "gestao", "resposta": "  \n"},
+    ]})["resposta_final"] == agent_graph.MENSAGEM_SEM_RESPOSTA
+
+
+def test_combinar_ignora_respostas_vazias():
+    resultado = agent_graph.node_combinar({"intencoes": ["contabilidade", "gestao"], "respostas_parciais": [
+        {"intencao": "gestao", "resposta": "Cadastre o produto."},
+        {"intencao": "contabilidade", "resposta": ""},
+    ]})
+    assert resultado == {"resposta_final": "Cadastre o produto."}
+
+
+def test_combinar_segue_a_ordem_da_mensagem():
+    resposta = agent_graph.node_combinar({"intencoes": ["contabilidade", "gestao"], "respostas_parciais": [
+        {"intencao": "gestao", "resposta": "Cadastre o produto."},
+        {"intencao": "contabilidade", "resposta": "Use o CFOP 5102."},
+    ]})["resposta_final"]
+    assert resposta.index("Contabilidade") < resposta.index("Gestao")
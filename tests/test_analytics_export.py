@@ -0,0 +1,69 @@
+import json
+
+import analytics_export
+
+
+def _gravar_segmento(diretorio, dia, eventos):
+    with open(diretorio / f"events-{dia}.jsonl", "w", encoding="utf-8") as f:
+        for evento in eventos:
+            f.write(json.dumps(evento) + "\n")
+
+
+def _interacao(dia, **extras):
+    return {"type": "interaction", "timestamp": f"{dia}T10:00:00", "user_input": "oi",
+            "intent": "geral", "model_used": "gpt-4o-mini", **extras}
+
+
+def test_janela_sem_eventos(tmp_path):
+    log = tmp_path / "log"
+    log.mkdir()
+    _gravar_segmento(log, "2026-10-18", [_interacao("2026-10-18", latency_ms=120.0)])
+
+    relatorio = analytics_export.exportar(str(log), str(tmp_path / "saida"), "csv", inicio="2026-10-19")
+
+    assert relatorio["eventos"] == 0
+    assert relatorio["totais"]["interactions"] == 0
+    assert relatorio["totais"]["intents"] == {}
+    assert relatorio["totais"]["feedback"] == {}
+    assert relatorio["totais"]["latency_ms"] == {"count": 0, "avg": None, "p50": None, "p95": None, "max": None}
+
+
+def test_diretorio_vazio(tmp_path):
+    relatorio = analytics_export.exportar(str(tmp_path / "inexistente"), str(tmp_path / "saida"), "csv")
+
+    assert relatorio["dias"] == 0
+    assert relatorio["totais"]["interactions"] == 0
+
+
+def test_interacoes_sem_latencia(tmp_path):
+    log = tmp_path / "log"
+    log.mkdir()
+    _gravar_segmento(log, "2026-10-18", [
+        _interacao("2026-10-18"),
+        {"type": "feedback", "timestamp": "2026-10-18T10:01:00", "user_input": "oi",
+         "response": "olá", "feedback_type": "positive"},
+    ])
+
+    relatorio = analytics_export.exportar(str(log), str(tmp_path / "saida"), "csv")
+
+    totais = relatorio["totais"]
+    assert totais["interactions"] == 1
+    assert totais["feedback"] == {"positive": 1}
+    assert totais["success_rate"] == 100.0
+    assert totais["latency_ms"]["count"] == 0
+    assert totais["latency_ms"]["p95"] is None
+    por_dia = (tmp_path / "saida" / "summary_by_day.csv").read_text(encoding="utf-8")
+    assert "2026-10-18" in por_dia
+
+
+def test_percentis_com_latencia(tmp_path):
+    log = tmp_path / "log"
+    log.mkdir()
+    _gravar_segmento(log, "2026-10-18", [_interacao("2026-10-18", latency_ms=float(ms)) for ms in (100, 200, 300)])
+
+    totais = analytics_export.exportar(str(log), str(tmp_path / "saida"), "csv")["totais"]
+
+    assert totais["latency_ms"]["count"] == 3
+    assert totais["latency_ms"]["avg"] == 200.0
+    assert totais["latency_ms"]["max"] == 300.0
+    assert totais["latency_ms"]["p95"] is not None
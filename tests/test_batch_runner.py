@@ -0,0 +1,52 @@
+import json
+import asyncio
+
+from langchain_community.chat_message_histories import ChatMessageHistory
+
+import batch_runner
+
+
+class AssistenteFalso:
+    """Responde com as mensagens que o histórico tinha antes da pergunta."""
+
+    def __init__(self):
+        self.history = ChatMessageHistory()
+
+    async def aprocessar_mensagem(self, pergunta, arquivo=None):
+        anteriores = [m.content for m in self.history.messages]
+        self.history.add_user_message(pergunta)
+        resposta = json.dumps(anteriores, ensure_ascii=False)
+        self.history.add_ai_message(resposta)
+        return {"resposta_final": resposta, "intencao": "contabilidade"}
+
+
+def _item(item_id, sessao, pergunta):
+    return {"id": item_id, "sessao": sessao, "pergunta": pergunta, "arquivo": None}
+
+
+def test_retomada_devolve_os_turnos_respondidos_ao_historico(tmp_path, monkeypatch):
+    import agent_graph
+    monkeypatch.setattr(agent_graph, "AssistenteMultimodalGraph", AssistenteFalso)
+    saida = tmp_path / "respostas.jsonl"
+    # Execução anterior parou depois do primeiro item da sessão (o terceiro deu erro)
+    saida.write_text(
+        json.dumps({"id": "1", "sessao": "s", "pergunta": "Como emitir uma NF-e?", "resposta": "Pelo menu Fiscal."}) + "\n"
+        + json.dumps({"id": "outro", "sessao": None, "pergunta": "Oi", "resposta": "Olá"}) + "\n"
+        + json.dumps({"id": "3", "sessao": "s", "pergunta": "E para inutilizar?", "erro": "Timeout()"}) + "\n",
+        encoding="utf-8",
+    )
+    itens = [_item("1", "s", "Como emitir uma NF-e?"), _item("outro", None, "Oi"),
+             _item("2", "s", "E para cancelar?"), _item("3", "s", "E para inutilizar?")]
+
+    respondidas = batch_runner.respostas_concluidas(str(saida))
+    selecionados, pendentes = batch_runner.selecionar_pendentes(itens, respondidas)
+    relatorio = asyncio.run(batch_runner.executar_lote(selecionados, str(saida), 2, respondidas))
+
+    assert pendentes == 2 and [item["id"] for item in selecionados] == ["1", "2", "3"]
+    assert relatorio["processados"] == 2
+    registros = [json.loads(linha) for linha in saida.read_text(encoding="utf-8").splitlines()][3:]
+    assert [(r["id"], json.loads(r["resposta"])) for r in registros] == [
+        ("2", ["Como emitir uma NF-e?", "Pelo menu Fiscal."]),
+        ("3", ["Como emitir uma NF-e?", "Pelo menu Fiscal.", "E para cancelar?",
+               json.dumps(["Como emitir uma NF-e?", "Pelo menu Fiscal."], ensure_ascii=False)]),
+    ]
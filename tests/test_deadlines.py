@@ -0,0 +1,61 @@
+import uuid
+import asyncio
+
+import deadlines
+from single_flight import SingleFlight, chave_coalescencia
+
+
+async def _falha():
+    await asyncio.sleep(0.01)
+    raise deadlines.ErroEtapa("Erro ao processar consulta contábil: 503")
+
+
+async def _resposta(texto):
+    return texto
+
+
+def test_erro_passa_a_vez_e_nao_vai_para_o_cache():
+    pergunta = uuid.uuid4().hex
+
+    resposta, degradacoes = asyncio.run(deadlines.aexecutar_com_prazo("contabilidade", pergunta, None, [
+        ("completa", _falha, 0.6),
+        ("sem_rag", lambda: _resposta("resposta sem RAG"), 1.0),
+    ]))
+
+    assert resposta == "resposta sem RAG"
+    assert [(d["etapa"], d["motivo"]) for d in degradacoes] == [("completa", "erro")]
+    assert deadlines.cache_respostas.obter("contabilidade", pergunta) is None
+
+
+def test_todas_as_etapas_com_erro_usam_o_cache():
+    pergunta = uuid.uuid4().hex
+    etapas = [("completa", _falha, 1.0)]
+
+    resposta, _ = asyncio.run(deadlines.aexecutar_com_prazo("contabilidade", pergunta, None, etapas))
+    assert resposta == "Erro ao processar consulta contábil: 503"
+    assert deadlines.cache_respostas.obter("contabilidade", pergunta) is None
+
+    deadlines.cache_respostas.guardar("contabilidade", pergunta, "resposta completa anterior")
+    resposta, degradacoes = asyncio.run(deadlines.aexecutar_com_prazo("contabilidade", pergunta, None, etapas))
+    assert resposta == "resposta completa anterior"
+    assert degradacoes[-1]["motivo"] == "usado"
+
+
+def test_erro_coalescido_nao_e_compartilhado_como_resposta():
+    coalescedor = SingleFlight()
+    pergunta = uuid.uuid4().hex
+    chave = chave_coalescencia("contabilidade", pergunta)
+
+    async def pedido():
+        return await deadlines.aexecutar_com_prazo("contabilidade", pergunta, None, [
+            ("completa", lambda: coalescedor.executar(chave, _falha), 0.6),
+            ("sem_rag", lambda: _resposta("resposta sem RAG"), 1.0),
+        ])
+
+    async def principal():
+        return await asyncio.gather(pedido(), pedido())
+
+    resultados = asyncio.run(principal())
+
+    assert coalescedor.resumo()["coalescidas"] == 1
+    assert [resposta for resposta, _ in resultados] == ["resposta sem RAG", "resposta sem RAG"]
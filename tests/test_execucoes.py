@@ -0,0 +1,67 @@
+import random
+
+import pytest
+
+
+def _artigo(artigo_id, data):
+    return {"id": artigo_id, "title": f"Artigo {artigo_id}", "categories": ["Geral"],
+            "contentText": f"conteúdo {artigo_id}", "updatedDate": data}
+
+
+def _sem_inacabadas():
+    from tools.models import ExecucaoPipeline
+    ExecucaoPipeline.objects.exclude(status="concluida").update(status="abandonada")
+
+
+def test_marca_e_gravada_com_o_lote(banco):
+    from tools import execucoes
+    from tools.models import ArtigosFonte, ExecucaoPipeline
+    from tools.pipeline import gravar_fontes
+    registro = execucoes.iniciar_execucao("grafo", False, "")
+    primeiro, segundo = random.sample(range(10**8, 10**9), 2)
+
+    gravar_fontes([_artigo(primeiro, "2024-05-10T12:00:00")], execucao=registro, da_listagem=True)
+    marca = ExecucaoPipeline.objects.get(pk=registro.id).marca
+    assert marca is not None and marca.day == 10
+
+    # Lote que falha na transação: nem o artigo nem a marca ficam no banco
+    def falhar(artigo_ids):
+        raise RuntimeError("falha no meio do lote")
+    registro.gravados = falhar
+    with pytest.raises(RuntimeError):
+        gravar_fontes([_artigo(segundo, "2024-06-01T08:00:00")], execucao=registro, da_listagem=True)
+
+    assert not ArtigosFonte.objects.filter(artigo_id=segundo).exists()
+    assert ExecucaoPipeline.objects.get(pk=registro.id).marca == marca
+
+
+def test_recoleta_por_id_nao_avanca_a_marca(banco):
+    from tools import execucoes
+    from tools.models import ExecucaoPipeline
+    from tools.pipeline import gravar_fontes
+    registro = execucoes.iniciar_execucao("grafo", False, "")
+
+    gravar_fontes([_artigo(random.randint(10**8, 10**9), "2024-05-10T12:00:00")], execucao=registro)
+
+    assert ExecucaoPipeline.objects.get(pk=registro.id).marca is None
+
+
+def test_completo_nao_retoma_execucao_incremental(banco):
+    from tools import execucoes
+    from tools.models import ExecucaoPipeline
+    _sem_inacabadas()
+    incremental = execucoes.iniciar_execucao("grafo", False, "updatedDate ge 2024-05-01T00:00:00Z")
+
+    assert execucoes.retomar_execucao("grafo", completo=True) is None
+    assert ExecucaoPipeline.objects.get(pk=incremental.id).status == "abandonada"
+
+
+def test_completo_retoma_execucao_completa(banco):
+    from tools import execucoes
+    _sem_inacabadas()
+    completa = execucoes.iniciar_execucao("grafo", True, "")
+
+    retomada = execucoes.retomar_execucao("streaming", completo=True)
+    assert retomada is not None and retomada.id == completa.id
+    # Sem --completo, qualquer execução inacabada é retomada
+    assert execucoes.retomar_execucao("grafo").id == completa.id
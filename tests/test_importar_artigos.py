@@ -0,0 +1,57 @@
+import json
+import random
+
+
+def _artigo(artigo_id, conteudo, data=None):
+    artigo = {"id": artigo_id, "title": f"Artigo {artigo_id}", "categories": ["Geral"], "contentText": conteudo}
+    if data is not None:
+        artigo["updatedDate"] = data
+    return artigo
+
+
+def _importar(tmp_path, artigos):
+    from django.core.management import call_command
+    arquivo = tmp_path / "artigos.jsonl"
+    arquivo.write_text("".join(json.dumps(a) + "\n" for a in artigos), encoding="utf-8")
+    call_command("importar_artigos", str(arquivo), "--sem-embeddings", verbosity=0)
+
+
+def test_export_antigo_nao_desfaz_conteudo_mais_novo(banco, tmp_path):
+    from tools.models import ArtigosFonte
+    from tools.pipeline import gravar_fontes
+    artigo_id = random.randint(10**8, 10**9)
+    gravar_fontes([_artigo(artigo_id, "conteúdo novo", "2024-05-10T12:00:00")])
+    data_banco = ArtigosFonte.objects.get(artigo_id=artigo_id).atualizado_em_api
+
+    # Export mais antigo, com outro conteúdo, e snapshot legado sem updatedDate
+    _importar(tmp_path, [_artigo(artigo_id, "conteúdo velho", "2024-01-01T00:00:00")])
+    _importar(tmp_path, [_artigo(artigo_id, "conteúdo velho")])
+    _importar(tmp_path, [_artigo(artigo_id, "conteúdo novo")])
+
+    fonte = ArtigosFonte.objects.get(artigo_id=artigo_id)
+    assert fonte.conteudo_bruto == "conteúdo novo"
+    assert fonte.atualizado_em_api == data_banco
+
+
+def test_export_mais_novo_atualiza(banco, tmp_path):
+    from tools.models import ArtigosFonte
+    from tools.pipeline import gravar_fontes
+    artigo_id = random.randint(10**8, 10**9)
+    gravar_fontes([_artigo(artigo_id, "conteúdo A", "2024-05-10T12:00:00")])
+
+    _importar(tmp_path, [_artigo(artigo_id, "conteúdo B", "2024-06-01T08:00:00")])
+
+    fonte = ArtigosFonte.objects.get(artigo_id=artigo_id)
+    assert fonte.conteudo_bruto == "conteúdo B"
+    assert fonte.atualizado_em_api.month == 6
+
+
+def test_contagem_de_desatualizados(banco):
+    from tools.pipeline import gravar_fontes
+    artigo_id = random.randint(10**8, 10**9)
+    gravar_fontes([_artigo(artigo_id, "conteúdo", "2024-05-10T12:00:00")])
+
+    _, contagens = gravar_fontes([_artigo(artigo_id, "outro", "2024-05-01T00:00:00"), _artigo(artigo_id, "conteúdo")])
+
+    assert contagens["desatualizados"] == 2
+    assert contagens["novos"] == contagens["alterados"] == 0
@@ -0,0 +1,56 @@
+import os
+import json
+
+import learning_system
+
+
+def _interacao(timestamp, pergunta="Como emitir NF-e?"):
+    return {"type": "interaction", "timestamp": timestamp, "user_input": pergunta,
+            "intent": "contabilidade", "model_used": "fake"}
+
+
+def test_evento_atrasado_num_segmento_antigo_entra_na_carga(tmp_path):
+    diretorio = str(tmp_path)
+    learning_system.acrescentar_eventos(diretorio, [_interacao("2024-05-01T23:59:58")])
+    learning_system.acrescentar_eventos(diretorio, [_interacao("2024-05-02T00:00:05")])
+    learning_system.compactar(diretorio)
+
+    # Evento que ficou na fila na virada do dia: vai para o segmento de ontem
+    learning_system.acrescentar_eventos(diretorio, [_interacao("2024-05-01T23:59:59", "Atrasado")])
+
+    assert learning_system.carregar(diretorio).total_interactions == 3
+    agregados = learning_system.compactar(diretorio)
+    assert agregados.total_interactions == 3
+    # Sem contar de novo o que o snapshot já inclui
+    assert learning_system.carregar(diretorio).total_interactions == 3
+
+
+def test_posicao_de_snapshot_antigo_continua_valendo(tmp_path):
+    diretorio = str(tmp_path)
+    learning_system.acrescentar_eventos(diretorio, [_interacao("2024-05-01T10:00:00"),
+                                                    _interacao("2024-05-02T10:00:00")])
+    segmento = "events-2024-05-02.jsonl"
+    learning_system.gravar_snapshot(diretorio, learning_system.carregar(diretorio), {
+        "segment": segmento, "offset": os.path.getsize(os.path.join(diretorio, segmento)),
+    })
+    learning_system.acrescentar_eventos(diretorio, [_interacao("2024-05-02T11:00:00")])
+
+    assert learning_system.carregar(diretorio).total_interactions == 3
+
+
+def test_segmento_com_evento_atrasado_so_e_aposentado_depois_de_lido(tmp_path):
+    diretorio = str(tmp_path)
+    learning_system.acrescentar_eventos(diretorio, [_interacao("2024-05-01T10:00:00"),
+                                                    _interacao("2024-05-02T10:00:00")])
+    learning_system.compactar(diretorio)
+    learning_system.acrescentar_eventos(diretorio, [_interacao("2024-05-01T23:59:59")])
+
+    hoje = learning_system.datetime(2024, 7, 1)
+    assert learning_system.aposentar_segmentos(diretorio, 30, hoje) == ["2024-05-02"]
+    learning_system.compactar(diretorio)
+    assert learning_system.aposentar_segmentos(diretorio, 30, hoje) == ["2024-05-01"]
+
+    with open(os.path.join(diretorio, learning_system.ARQUIVO_RESUMOS), encoding="utf-8") as f:
+        resumos = [json.loads(linha) for linha in f]
+    assert sum(resumo["bucket"]["interactions"] for resumo in resumos) == 3
+    assert learning_system.carregar(diretorio).total_interactions == 3
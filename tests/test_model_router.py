@@ -0,0 +1,120 @@
+import asyncio
+
+import pytest
+from langchain_core.prompts import PromptTemplate
+from langchain_core.runnables import RunnableLambda
+
+import model_router
+
+
+@pytest.mark.parametrize("intencao, pergunta, scores, esperado", [
+    ("contabil", "x" * 601, [0.1, 0.5], ("grande", "pergunta_longa")),
+    ("contabil", "x" * 600, None, ("pequeno", "padrao")),
+    ("contabil", "Como emitir nota?", [], ("grande", "sem_contexto")),
+    ("contabil", "Como emitir nota?", [0.51, 0.9], ("grande", "recuperacao_fraca")),
+    ("contabil", "Como emitir nota?", [0.5, 0.9], ("pequeno", "padrao")),
+    # Dois trechos quase empatados e nenhum forte: ambígua
+    ("contabil", "Como emitir nota?", [0.35, 0.36], ("grande", "recuperacao_ambigua")),
+    ("contabil", "Como emitir nota?", [0.35, 0.37], ("pequeno", "padrao")),
+    # Empate entre trechos fortes não escalona
+    ("contabil", "Como emitir nota?", [0.3, 0.3], ("pequeno", "padrao")),
+    ("contabil", "Como emitir nota?", [0.4], ("pequeno", "padrao")),
+])
+def test_escolher_tier_nos_limites(intencao, pergunta, scores, esperado):
+    assert model_router.escolher_tier(intencao, pergunta, scores) == esperado
+
+
+def test_escolher_tier_por_intencao(monkeypatch):
+    monkeypatch.setitem(model_router.ROUTER_CONFIG, "intencoes_grandes", ["gestao"])
+    assert model_router.escolher_tier("gestao", "Oi", [0.1]) == ("grande", "intencao")
+    assert model_router.escolher_tier("contabil", "Oi", [0.1]) == ("pequeno", "padrao")
+
+
+@pytest.mark.parametrize("resposta, esperado", [
+    ("Use o menu Fiscal.\nCONFIANCA: baixa", ("Use o menu Fiscal.", "baixa")),
+    ("Use o menu Fiscal.\n\nConfiança: Média.", ("Use o menu Fiscal.", "media")),
+    ("Use o menu Fiscal. CONFIANCA: alta", ("Use o menu Fiscal.", "alta")),
+    ("A confiança: alta não vem no fim aqui.", ("A confiança: alta não vem no fim aqui.", None)),
+    ("Sem marcação.", ("Sem marcação.", None)),
+])
+def test_extrair_confianca(resposta, esperado):
+    assert model_router.extrair_confianca(resposta) == esperado
+
+
+@pytest.fixture
+def modelos(monkeypatch):
+    """Modelos falsos com a resposta de cada nível; guarda as mensagens recebidas."""
+    respostas = {"pequeno": "Resposta curta.\nCONFIANCA: alta", "grande": "Resposta completa."}
+    chamadas = []
+
+    def criar_llm(tier, temperature=0.3, callbacks=None):
+        def responder(entrada):
+            mensagens = entrada.to_messages() if hasattr(entrada, "to_messages") else list(entrada)
+            chamadas.append((tier, [m.content for m in mensagens]))
+            return respostas[tier]
+        return RunnableLambda(responder)
+
+    monkeypatch.setattr(model_router, "criar_llm", criar_llm)
+    monkeypatch.setattr(model_router, "estatisticas", model_router.EstatisticasRoteador())
+    monkeypatch.setitem(model_router.ROUTER_CONFIG, "verificar_confianca", True)
+    return respostas, chamadas
+
+
+def _montar_cadeia(llm):
+    return PromptTemplate.from_template("{pergunta}") | llm
+
+
+def _responder(assincrono, **kwargs):
+    argumentos = dict(intencao="contabil", pergunta="Como emitir nota?", montar_cadeia=_montar_cadeia,
+                      entrada={"pergunta": "Como emitir nota?"}, scores=[0.1, 0.4], **kwargs)
+    if assincrono:
+        return asyncio.run(model_router.aresponder(**argumentos))
+    return model_router.responder(**argumentos)
+
+
+@pytest.mark.parametrize("assincrono", [False, True])
+def test_confianca_baixa_escalona_para_o_grande(modelos, assincrono):
+    respostas, chamadas = modelos
+    respostas["pequeno"] = "Talvez pelo menu Fiscal.\nCONFIANCA: baixa"
+
+    assert _responder(assincrono) == "Resposta completa."
+
+    assert [tier for tier, _ in chamadas] == ["pequeno", "grande"]
+    # Só o pequeno recebe o pedido de autoavaliação
+    assert chamadas[0][1][-1] == model_router.INSTRUCAO_CONFIANCA
+    assert model_router.INSTRUCAO_CONFIANCA not in chamadas[1][1]
+    resumo = model_router.obter_estatisticas_roteador()
+    assert resumo["escalonamentos"] == 1
+    assert resumo["motivos"] == {"padrao": 1, "baixa_confianca": 1}
+    assert {tier: dados["chamadas"] for tier, dados in resumo["por_tier"].items()} == {"pequeno": 1, "grande": 1}
+
+
+@pytest.mark.parametrize("assincrono", [False, True])
+def test_confianca_alta_fica_no_pequeno_sem_a_marcacao(modelos, assincrono):
+    _, chamadas = modelos
+
+    assert _responder(assincrono) == "Resposta curta."
+
+    assert [tier for tier, _ in chamadas] == ["pequeno"]
+    assert model_router.obter_estatisticas_roteador()["escalonamentos"] == 0
+
+
+@pytest.mark.parametrize("assincrono", [False, True])
+def test_nivel_imposto_nao_pede_confianca_nem_escalona(modelos, assincrono):
+    respostas, chamadas = modelos
+    respostas["pequeno"] = "Talvez pelo menu Fiscal.\nCONFIANCA: baixa"
+
+    assert _responder(assincrono, tier="pequeno") == "Talvez pelo menu Fiscal."
+
+    assert [tier for tier, _ in chamadas] == ["pequeno"]
+    assert model_router.INSTRUCAO_CONFIANCA not in chamadas[0][1]
+    assert model_router.obter_estatisticas_roteador()["motivos"] == {"prazo": 1}
+
+
+def test_sem_verificacao_de_confianca_nao_pede_autoavaliacao(modelos, monkeypatch):
+    _, chamadas = modelos
+    monkeypatch.setitem(model_router.ROUTER_CONFIG, "verificar_confianca", False)
+
+    _responder(False)
+
+    assert model_router.INSTRUCAO_CONFIANCA not in chamadas[0][1]
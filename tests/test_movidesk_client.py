@@ -0,0 +1,122 @@
+import asyncio
+
+import pytest
+
+import fake_backends
+import rate_limiter
+import movidesk_client
+
+
+@pytest.fixture
+def movidesk():
+    """Movidesk falsa sem latência nem cota, com o cliente apontado para ela."""
+    config = fake_backends.get_fake_config()
+    config.update(movidesk_rpm=0, movidesk_artigos=60, movidesk_alterados=0.3)
+    config["latencias_ms"]["movidesk"] = 0
+    servidor = fake_backends.ServidorFalso(config=config).iniciar()
+    limites = rate_limiter.get_limites()
+    limites["por_minuto"]["movidesk"]["requisicoes"] = 0
+    rate_limiter.configurar_limitador(limites)
+    config_cliente = movidesk_client.get_movidesk_config()
+    config_cliente.update(base_url=f"{servidor.url}/public/v1", concorrencia=4)
+    try:
+        yield servidor, config, config_cliente
+    finally:
+        servidor.parar()
+        rate_limiter.configurar_limitador()
+
+
+def test_listagem_continua_quando_o_servidor_reduz_o_top(movidesk):
+    servidor, config, config_cliente = movidesk
+    config["movidesk_pagina_maxima"] = 7
+    config_cliente["tamanho_pagina"] = 20
+
+    for ordem in ("id", "updatedDate"):
+        artigos, resumo = movidesk_client.listar_artigos(movidesk_client.CAMPOS_ARTIGO, ordem=ordem,
+                                                         config=config_cliente)
+        ids = [artigo["id"] for artigo in artigos]
+        assert sorted(ids) == list(fake_backends.ids_movidesk(config["semente"], 60))
+        assert resumo["encontrados"] == 60
+
+    # 60 artigos em páginas de 7, mais a página vazia do fim
+    _, resumo = movidesk_client.listar_artigos(movidesk_client.CAMPOS_ARTIGO, config=config_cliente)
+    assert resumo["paginas"] == 10
+
+
+def test_artigo_alterado_durante_a_listagem_nao_faz_outro_sumir(movidesk):
+    servidor, config, config_cliente = movidesk
+    config_cliente["tamanho_pagina"] = 10
+
+    async def listar():
+        vistos = []
+        async with movidesk_client.ColetorMovidesk(config_cliente) as coletor:
+            async for artigo in coletor.listar(movidesk_client.CAMPOS_ARTIGO, ordem="updatedDate"):
+                vistos.append(artigo)
+                if len(vistos) == 10:
+                    # Parte da base muda (updatedDate vai para o fim) entre a 1ª e a 2ª página
+                    config["movidesk_revisao"] = 1
+        return vistos
+
+    vistos = asyncio.run(listar())
+
+    ids = {artigo["id"] for artigo in vistos}
+    assert ids == set(fake_backends.ids_movidesk(config["semente"], 60))
+    # Os alterados depois da 1ª página voltam no fim, já com a data nova
+    alterados = [a for a in vistos if a["updatedDate"].startswith("2025")]
+    assert alterados and all(vistos.index(a) >= len(vistos) - len(alterados) for a in alterados)
+
+
+def test_artigos_sem_repetir_ids_e_com_concorrencia_limitada(movidesk):
+    servidor, config, config_cliente = movidesk
+    config["latencias_ms"]["movidesk"] = 20
+    config_cliente["concorrencia"] = 3
+    existentes = list(fake_backends.ids_movidesk(config["semente"], 60))[:20]
+    ids = existentes + existentes[:5] + [999999999]
+    em_voo = maximo = 0
+
+    async def coletar():
+        nonlocal em_voo, maximo
+        async with movidesk_client.ColetorMovidesk(config_cliente) as coletor:
+            buscar = coletor.buscar_artigo
+
+            async def contando(artigo_id):
+                nonlocal em_voo, maximo
+                em_voo += 1
+                maximo = max(maximo, em_voo)
+                try:
+                    return await buscar(artigo_id)
+                finally:
+                    em_voo -= 1
+
+            coletor.buscar_artigo = contando
+            itens = [item async for item in coletor.artigos(ids)]
+        return itens, coletor.resumo()
+
+    itens, resumo = asyncio.run(coletar())
+
+    assert sorted(artigo_id for artigo_id, _, _ in itens) == sorted(existentes + [999999999])
+    assert (resumo["duplicados"], resumo["encontrados"], resumo["nao_encontrados"], resumo["erros"]) == (5, 20, 1, 0)
+    assert sum(servidor.estatisticas()["movidesk"].values()) == 21
+    assert maximo == 3
+
+
+def test_artigos_se_adaptam_a_cota_do_servidor(movidesk):
+    servidor, config, config_cliente = movidesk
+    # Servidor aceita 10 req/s; o cliente começa achando que pode 20 req/s
+    config["movidesk_rpm"] = 600
+    limites = rate_limiter.get_limites()
+    limites["por_minuto"]["movidesk"]["requisicoes"] = 1200
+    rate_limiter.configurar_limitador(limites)
+    ids = fake_backends.ids_movidesk(config["semente"], 60)[:30]
+
+    artigos, resumo = movidesk_client.buscar_artigos(ids, config=config_cliente)
+
+    assert len(artigos) == 30 and resumo["erros"] == 0
+    estatisticas = servidor.estatisticas()["movidesk"]
+    contadores = rate_limiter.limitador.resumo()["por_endpoint"]["movidesk"]
+    assert estatisticas.get(429, 0) == contadores["respostas_429"] > 0
+    # Cada 429 foi repetido depois do Retry-After, sem esgotar as tentativas
+    assert contadores["repeticoes"] == contadores["respostas_429"] and contadores["esgotadas"] == 0
+    assert contadores["espera_repeticao_s"] > 0
+    # O ritmo caiu para perto da cota do servidor
+    assert rate_limiter.limitador.resumo()["rpm"]["movidesk"] < 1200
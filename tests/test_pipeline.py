@@ -0,0 +1,263 @@
+import threading
+
+import pytest
+
+import fake_backends
+import rate_limiter
+
+
+@pytest.fixture
+def backends(banco, monkeypatch):
+    """Movidesk e embeddings falsos sem latência, banco sem artigos e o pipeline apontado para eles."""
+    from langchain_openai import OpenAIEmbeddings
+    from tools import pipeline
+    from tools.models import ArtigosFonte, ExecucaoPipeline, ProgressoArtigo
+    config = fake_backends.get_fake_config()
+    config.update(movidesk_rpm=0, movidesk_artigos=12, movidesk_alterados=0.3, dimensao_embedding=8,
+                  taxa_429=0.0, taxa_5xx=0.0)
+    config["latencias_ms"].update(movidesk=0, embeddings=0)
+    servidor = fake_backends.ServidorFalso(config=config).iniciar()
+    limites = rate_limiter.get_limites()
+    limites["por_minuto"]["movidesk"]["requisicoes"] = 0
+    limites.update(tentativas=1)
+    rate_limiter.configurar_limitador(limites)
+    monkeypatch.setenv("MOVIDESK_BASE_URL", f"{servidor.url}/public/v1")
+    monkeypatch.setattr(pipeline, "embeddings", OpenAIEmbeddings(
+        model="text-embedding-3-small", base_url=f"{servidor.url}/v1",
+        **{**rate_limiter.opcoes_embeddings(), "check_embedding_ctx_length": False},
+    ))
+    ProgressoArtigo.objects.all().delete()
+    ExecucaoPipeline.objects.all().delete()
+    ArtigosFonte.objects.all().delete()
+    try:
+        yield servidor, config
+    finally:
+        servidor.parar()
+        rate_limiter.configurar_limitador()
+
+
+def _sem_vetor():
+    from tools.models import ArtigoProcessado
+    return ArtigoProcessado.objects.filter(embedding__isnull=True).count()
+
+
+def test_fluxo_grava_todos_os_trechos_com_vetor(backends):
+    from tools import pipeline
+    from tools.models import ArtigosFonte, ArtigoProcessado
+
+    resumo = pipeline.executar_streaming(completo=True, tamanho_fila=3)
+
+    assert resumo["novos"] == ArtigosFonte.objects.count() == 12
+    assert ArtigoProcessado.objects.count() == resumo["trechos"] > 12
+    assert _sem_vetor() == 0 and resumo["falhas"] == 0
+
+
+def test_fluxo_com_embeddings_falhando_deixa_os_trechos_pendentes(backends, monkeypatch):
+    from tools import pipeline
+    from tools.models import ArtigoProcessado
+    servidor, config = backends
+    config["taxa_5xx"] = 1.0
+
+    resumo = pipeline.executar_streaming(completo=True, tamanho_fila=3)
+
+    assert resumo["novos"] == 12 and resumo["falhas"] > 0
+    assert _sem_vetor() == ArtigoProcessado.objects.count() > 0
+    # A próxima passada pega exatamente os que ficaram sem vetor
+    config["taxa_5xx"] = 0.0
+    assert pipeline.embeddar_pendentes()["trechos"] == ArtigoProcessado.objects.count()
+    assert _sem_vetor() == 0
+
+
+def test_fluxo_falha_se_a_thread_de_embeddings_morre(backends, monkeypatch):
+    from tools import pipeline
+
+    def quebrar(*args):
+        raise ValueError("lotes quebrados")
+    monkeypatch.setattr(pipeline, "lotes_por_tokens", quebrar)
+    erros = []
+
+    def executar():
+        try:
+            pipeline.executar_streaming(completo=True, tamanho_fila=1)
+        except Exception as e:
+            erros.append(e)
+    thread = threading.Thread(target=executar, daemon=True)
+    thread.start()
+    thread.join(timeout=30)
+
+    # Com a fila de trechos cheia e ninguém consumindo, antes ficava preso para sempre
+    assert not thread.is_alive()
+    assert len(erros) == 1 and isinstance(erros[0], RuntimeError)
+    assert "lotes quebrados" in str(erros[0])
+
+
+def _pedidos_embeddings(servidor):
+    return sum(servidor.estatisticas().get("embeddings", {}).values())
+
+
+def _trechos_por_artigo():
+    from tools.models import ArtigoProcessado
+    trechos = {}
+    for artigo_id, trecho_id in ArtigoProcessado.objects.values_list("fonte__artigo_id", "id"):
+        trechos.setdefault(artigo_id, set()).add(trecho_id)
+    return trechos
+
+
+def test_execucao_sem_mudancas_nao_pede_embeddings(backends):
+    from tools import pipeline
+    servidor, _ = backends
+    pipeline.executar(completo=True)
+    pedidos = _pedidos_embeddings(servidor)
+    trechos = _trechos_por_artigo()
+
+    resumo = pipeline.executar(completo=True)
+
+    assert (resumo["novos"], resumo["alterados"], resumo["sem_mudanca"]) == (0, 0, 12)
+    assert _pedidos_embeddings(servidor) == pedidos
+    assert _trechos_por_artigo() == trechos
+
+
+def test_artigo_alterado_troca_os_trechos_e_gera_embeddings_de_novo(backends):
+    from tools import pipeline
+    from tools.models import ArtigosFonte
+    servidor, config = backends
+    pipeline.executar(completo=True)
+    pedidos = _pedidos_embeddings(servidor)
+    antes = _trechos_por_artigo()
+    config["movidesk_revisao"] = 1
+
+    resumo = pipeline.executar()
+
+    alterados = {artigo_id for artigo_id in antes
+                 if fake_backends.artigo_movidesk(artigo_id, config["semente"], 1, 0.3)["updatedDate"].startswith("2025")}
+    assert alterados and resumo["alterados"] == len(alterados) and resumo["novos"] == 0
+    depois = _trechos_por_artigo()
+    for artigo_id in antes:
+        if artigo_id in alterados:
+            # Trechos antigos apagados: os de agora são linhas novas, com o conteúdo novo
+            assert depois[artigo_id].isdisjoint(antes[artigo_id])
+            fonte = ArtigosFonte.objects.get(artigo_id=artigo_id)
+            assert fonte.conteudo_bruto == fake_backends.artigo_movidesk(artigo_id, config["semente"], 1, 0.3)["contentText"]
+        else:
+            assert depois[artigo_id] == antes[artigo_id]
+    assert _pedidos_embeddings(servidor) > pedidos
+    assert _sem_vetor() == 0
+
+
+def test_artigo_sem_data_na_api_nao_forca_a_base_inteira(backends):
+    from tools import pipeline
+    from tools.models import ArtigosFonte
+    pipeline.gravar_fontes([fake_backends.artigo_movidesk(1), {**fake_backends.artigo_movidesk(2), "updatedDate": None}])
+
+    assert pipeline.filtro_descoberta() is not None
+    # Linha de antes da sincronização (sem hash): só a base inteira a alcança
+    ArtigosFonte.objects.filter(artigo_id=2).update(hash_conteudo="")
+    assert pipeline.filtro_descoberta() is None
+
+
+class _EmbeddingsGravados:
+    """Repassa para os embeddings falsos guardando os textos de cada chamada (e falhando com `veneno`)."""
+
+    def __init__(self, embeddings, veneno=()):
+        self.embeddings = embeddings
+        self.veneno = set(veneno)
+        self.chamadas = []
+
+    def embed_documents(self, textos, **kwargs):
+        self.chamadas.append(list(textos))
+        if self.veneno.intersection(textos):
+            raise ValueError("trecho envenenado")
+        return self.embeddings.embed_documents(textos, **kwargs)
+
+
+def _gravar_corpus(artigos=12):
+    from tools import pipeline
+    fontes, _ = pipeline.gravar_fontes([fake_backends.artigo_movidesk(artigo_id)
+                                        for artigo_id in fake_backends.ids_movidesk(42, artigos)])
+    pipeline.gravar_trechos(fontes)
+    return fontes
+
+
+def test_lotes_de_embeddings_respeitam_tokens_e_quantidade(backends, monkeypatch):
+    from tools import pipeline
+    from tools.models import ArtigoProcessado
+    _gravar_corpus()
+    gravados = _EmbeddingsGravados(pipeline.embeddings)
+    monkeypatch.setattr(pipeline, "embeddings", gravados)
+
+    resumo = pipeline.embeddar_pendentes(max_tokens=300, max_trechos=3, simultaneos=2)
+
+    total = ArtigoProcessado.objects.count()
+    assert resumo["trechos"] == total and resumo["lotes"] == len(gravados.chamadas) > 1
+    assert sum(len(textos) for textos in gravados.chamadas) == total
+    for textos in gravados.chamadas:
+        assert len(textos) <= 3
+        assert len(textos) == 1 or sum(pipeline.estimar_tokens_texto(t) for t in textos) <= 300
+    assert _sem_vetor() == 0
+
+
+def test_execucao_interrompida_so_pede_os_trechos_sem_vetor(backends, monkeypatch):
+    from tools import pipeline
+    from tools.models import ArtigoProcessado
+    _gravar_corpus()
+    gravar_embeddings = pipeline.gravar_embeddings
+    gravacoes = []
+
+    def interromper_na_terceira(trechos, *args, **kwargs):
+        gravacoes.append(len(trechos))
+        if len(gravacoes) == 3:
+            raise KeyboardInterrupt()
+        gravar_embeddings(trechos, *args, **kwargs)
+    monkeypatch.setattr(pipeline, "gravar_embeddings", interromper_na_terceira)
+    with pytest.raises(KeyboardInterrupt):
+        pipeline.embeddar_pendentes(max_trechos=2, simultaneos=1)
+    monkeypatch.setattr(pipeline, "gravar_embeddings", gravar_embeddings)
+    pendentes = sorted(ArtigoProcessado.objects.filter(embedding__isnull=True).values_list("conteudo_limpo", flat=True))
+    assert 0 < len(pendentes) == ArtigoProcessado.objects.count() - 4
+
+    gravados = _EmbeddingsGravados(pipeline.embeddings)
+    monkeypatch.setattr(pipeline, "embeddings", gravados)
+    pipeline.embeddar_pendentes(max_trechos=2, simultaneos=1)
+
+    assert sorted(texto for textos in gravados.chamadas for texto in textos) == pendentes
+    assert _sem_vetor() == 0
+
+
+def test_artigo_envenenado_falha_sozinho_no_lote(backends, monkeypatch):
+    from tools import execucoes, pipeline
+    from tools.models import ArtigoProcessado, ProgressoArtigo
+    fontes = _gravar_corpus(4)
+    envenenado = fontes[1]
+    trechos_envenenados = set(ArtigoProcessado.objects.filter(fonte=envenenado).values_list("conteudo_limpo", flat=True))
+    gravados = _EmbeddingsGravados(pipeline.embeddings, veneno=trechos_envenenados)
+    monkeypatch.setattr(pipeline, "embeddings", gravados)
+    registro = execucoes.iniciar_execucao("grafo", True, "")
+
+    resumo = pipeline.embeddar_pendentes(simultaneos=1, execucao=registro)
+
+    # Um lote com tudo, depois um por artigo: só o envenenado fica sem vetor
+    assert len(gravados.chamadas[0]) == ArtigoProcessado.objects.count()
+    assert resumo["falhas"] == 1
+    assert set(ArtigoProcessado.objects.filter(embedding__isnull=True).values_list("fonte_id", flat=True)) == {envenenado.pk}
+    progresso = ProgressoArtigo.objects.get(artigo_id=envenenado.artigo_id)
+    assert (progresso.etapa, progresso.tentativas) == ("trechos", 1)
+    assert set(ProgressoArtigo.objects.filter(etapa="concluido").values_list("artigo_id", flat=True)) == {
+        fonte.artigo_id for fonte in fontes if fonte.pk != envenenado.pk}
+
+
+def test_artigo_com_menos_trechos_perde_os_do_fim(backends):
+    from tools import pipeline
+    from tools.models import ArtigoProcessado
+    fonte = _gravar_corpus(1)[0]
+    fonte.conteudo_bruto = " ".join(f"Frase número {i} do artigo original." for i in range(60))
+    pipeline.gravar_trechos([fonte])
+    ArtigoProcessado.objects.filter(fonte=fonte).update(embedding=[0.1, 0.2])
+    antes = ArtigoProcessado.objects.filter(fonte=fonte).count()
+
+    fonte.conteudo_bruto = " ".join(f"Frase número {i} do artigo reescrito." for i in range(20))
+    gravados = pipeline.gravar_trechos([fonte])
+
+    trechos = list(ArtigoProcessado.objects.filter(fonte=fonte).order_by("indice_trecho"))
+    assert gravados == len(trechos) < antes
+    assert [t.indice_trecho for t in trechos] == list(range(len(trechos)))
+    assert all(t.embedding is None and "reescrito" in t.conteudo_limpo for t in trechos)
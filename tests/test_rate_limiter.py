@@ -0,0 +1,230 @@
+import time
+import asyncio
+import threading
+
+import httpx
+import pytest
+
+import fake_backends
+import rate_limiter
+
+CORPO_EMBEDDINGS = {"model": "fake", "input": ["texto de teste"]}
+CORPO_CHAT = {"model": "fake", "messages": [{"role": "user", "content": "oi"}]}
+
+
+@pytest.fixture
+def servidor():
+    """Backends falsos sem latência e um limitador novo (3 tentativas, espera base curta)."""
+    config = fake_backends.get_fake_config()
+    config["latencias_ms"].update(chat=0, embeddings=0)
+    config.update(ms_por_token=0, taxa_429=0.0, taxa_5xx=0.0)
+    servidor = fake_backends.ServidorFalso(config=config).iniciar()
+    limites = rate_limiter.get_limites()
+    limites.update(tentativas=3, espera_base=0.01, espera_maxima=5)
+    rate_limiter.configurar_limitador(limites)
+    try:
+        yield servidor, config
+    finally:
+        servidor.parar()
+        rate_limiter.configurar_limitador()
+
+
+def _contadores(endpoint):
+    return rate_limiter.limitador.resumo()["por_endpoint"][endpoint]
+
+def _esperar_repeticao(endpoint, timeout=5):
+    """Espera o limitador decidir repetir uma chamada (depois de esvaziar o balde)."""
+    limite = time.monotonic() + timeout
+    while rate_limiter.limitador.resumo()["por_endpoint"].get(endpoint, {}).get("repeticoes", 0) < 1:
+        assert time.monotonic() < limite
+        time.sleep(0.005)
+
+
+def test_sync_repete_429_respeitando_retry_after(servidor):
+    servidor, config = servidor
+    config["taxa_429"] = 1.0
+    rpm = rate_limiter.limitador.resumo()["rpm"]["openai"]
+
+    with httpx.Client(transport=rate_limiter.TransporteLimitado()) as cliente:
+        inicio = time.monotonic()
+        resposta = cliente.post(f"{servidor.url}/v1/embeddings", json=CORPO_EMBEDDINGS)
+        duracao = time.monotonic() - inicio
+
+    assert resposta.status_code == 429
+    # Duas esperas do Retry-After (0,5 s), bem acima da espera exponencial configurada
+    assert duracao >= 1.0
+    contadores = _contadores("embeddings")
+    assert (contadores["tentativas"], contadores["repeticoes"], contadores["respostas_429"]) == (3, 2, 3)
+    assert contadores["esgotadas"] == 1
+    assert servidor.estatisticas()["embeddings"] == {429: 3}
+    assert rate_limiter.limitador.resumo()["rpm"]["openai"] <= rpm / 2
+
+
+def test_async_repete_5xx_com_espera_exponencial(servidor):
+    servidor, config = servidor
+    config["taxa_5xx"] = 1.0
+    rpm = rate_limiter.limitador.resumo()["rpm"]["openai"]
+
+    async def chamar():
+        async with httpx.AsyncClient(transport=rate_limiter.TransporteLimitadoAsync()) as cliente:
+            return await cliente.post(f"{servidor.url}/v1/embeddings", json=CORPO_EMBEDDINGS)
+
+    inicio = time.monotonic()
+    resposta = asyncio.run(chamar())
+
+    assert resposta.status_code == 503
+    assert time.monotonic() - inicio < 1.0
+    contadores = _contadores("embeddings")
+    assert (contadores["tentativas"], contadores["repeticoes"], contadores["respostas_5xx"]) == (3, 2, 3)
+    assert contadores["esgotadas"] == 1
+    # 5xx não é falta de cota: o ritmo do provedor continua o mesmo
+    assert rate_limiter.limitador.resumo()["rpm"]["openai"] == rpm
+
+
+def test_sync_429_segura_as_outras_chamadas_do_provedor(servidor):
+    servidor, config = servidor
+    config["taxa_429"] = 1.0
+    respostas = {}
+
+    def embeddings():
+        with httpx.Client(transport=rate_limiter.TransporteLimitado()) as cliente:
+            respostas["embeddings"] = cliente.post(f"{servidor.url}/v1/embeddings", json=CORPO_EMBEDDINGS)
+
+    thread = threading.Thread(target=embeddings)
+    thread.start()
+    _esperar_repeticao("embeddings")
+    config["taxa_429"] = 0.0
+    with httpx.Client(transport=rate_limiter.TransporteLimitado()) as cliente:
+        inicio = time.monotonic()
+        resposta = cliente.post(f"{servidor.url}/v1/chat/completions", json=CORPO_CHAT)
+        duracao = time.monotonic() - inicio
+    thread.join()
+
+    assert resposta.status_code == respostas["embeddings"].status_code == 200
+    # O chat esperou o Retry-After recebido pelos embeddings (mesmo balde da OpenAI)
+    assert duracao >= 0.4
+    assert _contadores("chat")["espera_limite_s"] >= 0.4
+    assert _contadores("chat")["tentativas"] == 1
+
+
+def test_async_429_segura_as_outras_chamadas_do_provedor(servidor):
+    servidor, config = servidor
+    config["taxa_429"] = 1.0
+
+    async def chamar():
+        async with httpx.AsyncClient(transport=rate_limiter.TransporteLimitadoAsync()) as cliente:
+            embeddings = asyncio.create_task(cliente.post(f"{servidor.url}/v1/embeddings", json=CORPO_EMBEDDINGS))
+            await asyncio.to_thread(_esperar_repeticao, "embeddings")
+            config["taxa_429"] = 0.0
+            inicio = time.monotonic()
+            chat = await cliente.post(f"{servidor.url}/v1/chat/completions", json=CORPO_CHAT)
+            return await embeddings, chat, time.monotonic() - inicio
+
+    embeddings, chat, duracao = asyncio.run(chamar())
+
+    assert chat.status_code == embeddings.status_code == 200
+    assert duracao >= 0.4
+    assert _contadores("chat")["espera_limite_s"] >= 0.4
+
+
+def test_cliente_async_compartilhado_entre_loops(servidor):
+    servidor, _ = servidor
+
+    async def chamar():
+        cliente = rate_limiter.cliente_http_async()
+        resposta = await cliente.post(f"{servidor.url}/v1/embeddings", json=CORPO_EMBEDDINGS)
+        return cliente, resposta.status_code
+
+    # Um `asyncio.run` por chamada, como nos scripts: cada loop com suas conexões
+    primeiro, status_1 = asyncio.run(chamar())
+    segundo, status_2 = asyncio.run(chamar())
+    assert status_1 == status_2 == 200
+    assert primeiro is not segundo
+
+    # O cliente criado fora de um loop (modelos do LangChain) também serve em loops diferentes
+    processo = rate_limiter.cliente_http_async()
+    for _ in range(2):
+        resposta = asyncio.run(processo.post(f"{servidor.url}/v1/embeddings", json=CORPO_EMBEDDINGS))
+        assert resposta.status_code == 200
+
+
+def test_geracao_de_imagem_nao_e_repetida_depois_de_5xx(servidor):
+    servidor, config = servidor
+    config["taxa_5xx"] = 1.0
+    corpo = {"model": "fake", "prompt": "um gráfico de vendas"}
+
+    with httpx.Client(transport=rate_limiter.TransporteLimitado()) as cliente:
+        resposta = cliente.post(f"{servidor.url}/v1/images/generations", json=corpo)
+        assert resposta.status_code == 503
+        # O servidor pode ter gerado (e cobrado) a imagem: uma tentativa só
+        assert servidor.estatisticas()["images"] == {503: 1}
+
+        # Marcada como repetível, volta às tentativas normais
+        cliente.post(f"{servidor.url}/v1/images/generations", json=corpo, extensions={"repetivel": True})
+        assert servidor.estatisticas()["images"] == {503: 4}
+
+        # 429 garante que nada foi feito: repete mesmo sem a marca
+        config.update(taxa_5xx=0.0, taxa_429=1.0)
+        cliente.post(f"{servidor.url}/v1/images/generations", json=corpo)
+    assert servidor.estatisticas()["images"] == {503: 4, 429: 3}
+
+
+def test_vagas_async_acordam_na_ordem_sem_consultar():
+    vagas = rate_limiter._Vagas(1)
+    atendidos = []
+
+    async def esperar(nome):
+        await vagas.aadquirir()
+        atendidos.append((nome, time.monotonic()))
+
+    async def principal():
+        await vagas.aadquirir()
+        tarefas = [asyncio.create_task(esperar(nome)) for nome in ("a", "b", "cancelada", "c")]
+        await asyncio.sleep(0.3)
+        # Cancelar quem espera não perde a vaga nem a posição dos outros
+        tarefas[2].cancel()
+        for _ in range(4):
+            liberada = time.monotonic()
+            vagas.liberar()
+            await asyncio.sleep(0.02)
+            if len(atendidos) < 3:
+                # Acordado pelo `liberar`, não por uma consulta de até 100 ms
+                assert atendidos[-1][1] - liberada < 0.01
+
+    asyncio.run(principal())
+    assert [nome for nome, _ in atendidos] == ["a", "b", "c"]
+    assert vagas.em_uso == 0
+
+
+def test_vagas_atendem_threads_e_corrotinas_pela_ordem_de_chegada():
+    vagas = rate_limiter._Vagas(1)
+    vagas.adquirir()
+    atendidos = []
+
+    def thread(nome):
+        vagas.adquirir()
+        atendidos.append(nome)
+        vagas.liberar()
+
+    async def corrotina(nome):
+        await vagas.aadquirir()
+        atendidos.append(nome)
+        vagas.liberar()
+
+    primeira = threading.Thread(target=thread, args=("thread 1",))
+    primeira.start()
+    time.sleep(0.05)
+    loop = threading.Thread(target=asyncio.run, args=(corrotina("corrotina"),))
+    loop.start()
+    time.sleep(0.05)
+    segunda = threading.Thread(target=thread, args=("thread 2",))
+    segunda.start()
+    time.sleep(0.05)
+    # Com vaga livre, quem chega agora não passa na frente da fila
+    assert not vagas.tentar()
+
+    vagas.liberar()
+    for t in (primeira, loop, segunda):
+        t.join(timeout=5)
+    assert atendidos == ["thread 1", "corrotina", "thread 2"]
+    assert vagas.em_uso == 0
@@ -0,0 +1,91 @@
+import time
+import uuid
+import asyncio
+import threading
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from langchain_core.messages import AIMessage, HumanMessage
+
+
+def test_descarregar_sessao_espera_so_a_gravacao(banco, monkeypatch):
+    import session_history
+    monkeypatch.setattr(session_history.gravador, "intervalo", 1.0)
+    sessao = uuid.uuid4().hex
+
+    session_history.HistoricoPersistente(sessao).add_messages([HumanMessage("oi"), AIMessage("olá")])
+
+    assert session_history.gravador.descarregar_sessao(sessao, timeout=5)
+    assert [m.content for m in session_history.HistoricoPersistente(sessao).messages] == ["oi", "olá"]
+
+
+def test_turno_seguinte_ve_o_anterior(banco, monkeypatch):
+    import session_history
+    from tools import views
+    # Janela de gravação maior que o intervalo entre os turnos
+    monkeypatch.setattr(session_history.gravador, "intervalo", 1.0)
+    sessao = uuid.uuid4().hex
+
+    async def turno(pergunta):
+        async with views._sessao_exclusiva(sessao):
+            historico = await sync_to_async(session_history.HistoricoPersistente)(sessao)
+            vistas = [m.content for m in historico.messages]
+            historico.add_messages([HumanMessage(pergunta), AIMessage(f"resposta: {pergunta}")])
+        return vistas
+
+    async def conversa():
+        await turno("Como emitir nota?")
+        return await turno("E para cancelar?")
+
+    assert asyncio.run(conversa()) == ["Como emitir nota?", "resposta: Como emitir nota?"]
+
+
+def test_turno_termina_sem_esperar_a_gravacao(banco, monkeypatch):
+    import session_history
+    from tools import views
+    monkeypatch.setattr(session_history.gravador, "intervalo", 1.0)
+    sessao = uuid.uuid4().hex
+
+    async def turno():
+        async with views._sessao_exclusiva(sessao):
+            historico = await sync_to_async(session_history.HistoricoPersistente)(sessao)
+            historico.add_messages([HumanMessage("oi"), AIMessage("olá")])
+        return time.monotonic()
+
+    inicio = time.monotonic()
+    fim = asyncio.run(turno())
+    assert fim - inicio < 0.8
+    # Quem espera é o turno seguinte: a trava só sai do banco com as mensagens
+    assert session_history.adquirir_trava(sessao, timeout=5)
+    assert [m.content for m in session_history.HistoricoPersistente(sessao).messages] == ["oi", "olá"]
+
+
+def test_trava_de_outro_processo_segura_o_turno(banco):
+    import session_history
+    from tools.models import TravaSessao
+    from django.utils import timezone
+    sessao = uuid.uuid4().hex
+    # Turno em andamento num outro worker
+    TravaSessao.objects.create(sessao_id=sessao, dono="outro", expira_em=timezone.now() + timedelta(minutes=5))
+
+    assert session_history.adquirir_trava(sessao, timeout=0.2) is None
+
+    def terminar_turno():
+        time.sleep(0.3)
+        TravaSessao.objects.filter(sessao_id=sessao, dono="outro").delete()
+    threading.Thread(target=terminar_turno).start()
+    inicio = time.monotonic()
+    assert session_history.adquirir_trava(sessao, timeout=5)
+    assert time.monotonic() - inicio >= 0.25
+
+
+def test_trava_vencida_de_processo_morto_e_retomada(banco):
+    import session_history
+    from tools.models import TravaSessao
+    from django.utils import timezone
+    sessao = uuid.uuid4().hex
+    TravaSessao.objects.create(sessao_id=sessao, dono="morto", expira_em=timezone.now() - timedelta(seconds=1))
+
+    dono = session_history.adquirir_trava(sessao, timeout=1)
+
+    assert dono and TravaSessao.objects.get(sessao_id=sessao).dono == dono
@@ -0,0 +1,115 @@
+import time
+import asyncio
+import threading
+
+from single_flight import CargaUnica
+
+
+def test_carga_lenta_nao_segura_quem_chega_depois():
+    cargas = []
+    liberar = threading.Event()
+
+    def carregar():
+        cargas.append(1)
+        liberar.wait(5)
+        return "base"
+
+    carga = CargaUnica("base de teste", carregar)
+    inicio = time.monotonic()
+    resultados = []
+    threads = [threading.Thread(target=lambda: resultados.append(carga.obter(espera=0.05))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Todos seguem sem a base em vez de esperar a carga inteira
+    assert resultados == [None] * 5
+    assert time.monotonic() - inicio < 1.0
+    liberar.set()
+    assert carga.obter(espera=5) == "base"
+    assert asyncio.run(carga.aobter(espera=0)) == "base"
+    assert len(cargas) == 1
+
+
+def test_carga_que_falhou_e_tentada_de_novo():
+    tentativas = []
+
+    def carregar():
+        tentativas.append(1)
+        if len(tentativas) == 1:
+            raise ConnectionError("crawler fora do ar")
+        return "" if len(tentativas) == 2 else "base"
+
+    carga = CargaUnica("base de teste", carregar)
+
+    assert carga.obter(espera=5) is None
+    # Resultado inválido (base vazia) também não fica guardado
+    assert carga.obter(espera=5) is None
+    assert carga.obter(espera=5) == "base"
+    assert carga.obter(espera=5) == "base"
+    assert len(tentativas) == 3
+
+
+def test_aobter_nao_cancela_a_carga_compartilhada():
+    liberar = threading.Event()
+    carga = CargaUnica("base de teste", lambda: liberar.wait(5) and "base")
+
+    async def principal():
+        assert await carga.aobter(espera=0.05) is None
+        liberar.set()
+        return await carga.aobter(espera=5)
+
+    assert asyncio.run(principal()) == "base"
+
+
+def test_chamadas_identicas_simultaneas_vao_uma_vez_ao_backend():
+    from single_flight import SingleFlight, chave_coalescencia
+    coalescedor = SingleFlight()
+    chamadas = []
+
+    async def backend():
+        chamadas.append(1)
+        await asyncio.sleep(0.05)
+        return "Use o CFOP 5102."
+
+    async def principal():
+        # Mesma pergunta com caixa, espaços e pontuação diferentes
+        perguntas = ["Qual CFOP usar?", "qual cfop  usar", "QUAL CFOP USAR?!"] * 4
+        return await asyncio.gather(*(
+            coalescedor.executar(chave_coalescencia("contabilidade", p), backend) for p in perguntas))
+
+    respostas = asyncio.run(principal())
+
+    assert respostas == ["Use o CFOP 5102."] * 12
+    assert len(chamadas) == 1
+    resumo = coalescedor.resumo()
+    assert (resumo["execucoes"], resumo["coalescidas"], resumo["em_andamento"]) == (1, 11, 0)
+
+
+def test_cancelar_quem_iniciou_nao_cancela_os_outros():
+    from single_flight import SingleFlight
+    coalescedor = SingleFlight()
+    chave = ("contabilidade", "qual cfop usar", "")
+    chamadas = []
+
+    async def backend():
+        chamadas.append(1)
+        await asyncio.sleep(0.1)
+        return "resposta"
+
+    async def principal():
+        lider = asyncio.create_task(coalescedor.executar(chave, backend))
+        await asyncio.sleep(0)
+        seguidores = [asyncio.create_task(coalescedor.executar(chave, backend)) for _ in range(3)]
+        await asyncio.sleep(0.02)
+        lider.cancel()
+        seguidores[0].cancel()
+        resultados = await asyncio.gather(lider, *seguidores, return_exceptions=True)
+        return resultados
+
+    lider, cancelado, *outros = asyncio.run(principal())
+
+    assert isinstance(lider, asyncio.CancelledError) and isinstance(cancelado, asyncio.CancelledError)
+    assert outros == ["resposta", "resposta"]
+    assert len(chamadas) == 1
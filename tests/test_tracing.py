@@ -0,0 +1,74 @@
+import json
+import asyncio
+
+import pytest
+
+import tracing
+
+
+@pytest.fixture
+def memoria():
+    """Só um sink em memória durante o teste (os do ambiente voltam no fim)."""
+    anteriores = list(tracing._sinks)
+    sink = tracing.MemoriaSink()
+    tracing.configurar_sinks([sink])
+    try:
+        yield sink
+    finally:
+        tracing.configurar_sinks(anteriores)
+
+
+def test_traces_isolados_entre_requisicoes_simultaneas(memoria):
+    async def requisicao(numero):
+        with tracing.trace_requisicao(numero=numero):
+            for _ in range(numero):
+                await asyncio.sleep(0.001)
+                tracing.registrar_embeddings()
+            # Subtarefas e threads da requisição herdam o trace dela
+            await asyncio.gather(*(asyncio.to_thread(tracing.registrar_cache, f"base:{numero}", True)
+                                   for _ in range(numero)))
+            with tracing.medir("no", f"no_{numero}"):
+                await asyncio.sleep(0.001)
+
+    async def principal():
+        await asyncio.gather(*(requisicao(numero) for numero in range(1, 6)))
+
+    asyncio.run(principal())
+
+    traces = {trace["atributos"]["numero"]: trace for trace in memoria.traces()}
+    assert sorted(traces) == [1, 2, 3, 4, 5]
+    for numero, trace in traces.items():
+        assert trace["contadores"]["embeddings"] == trace["contadores"]["cache_hits"] == numero
+        assert {evento["nome"] for evento in trace["eventos"]} == {f"base:{numero}"}
+        assert [span["nome"] for span in trace["spans"]] == [f"no_{numero}"]
+    # Fora de uma requisição nada é registrado
+    assert tracing.trace_atual() is None
+
+
+def test_trace_com_erro_e_sink_quebrado(memoria, tmp_path):
+    class SinkQuebrado:
+        def emitir(self, trace):
+            raise OSError("disco cheio")
+
+    arquivo = tmp_path / "traces.jsonl"
+    tracing.configurar_sinks([SinkQuebrado(), memoria, tracing.JsonlSink(str(arquivo))])
+
+    with pytest.raises(ValueError):
+        with tracing.trace_requisicao(input="oi"):
+            raise ValueError("falhou")
+
+    # O sink quebrado não impede os outros de receber o trace
+    assert "ValueError" in memoria.traces()[-1]["atributos"]["erro"]
+    linhas = [json.loads(linha) for linha in arquivo.read_text(encoding="utf-8").splitlines()]
+    assert [linha["trace_id"] for linha in linhas] == [memoria.traces()[-1]["trace_id"]]
+
+
+def test_sem_sinks_nao_cria_trace():
+    anteriores = list(tracing._sinks)
+    tracing.configurar_sinks([])
+    try:
+        with tracing.trace_requisicao(input="oi") as trace:
+            tracing.registrar_embeddings()
+            assert trace is None and tracing.trace_atual() is None
+    finally:
+        tracing.configurar_sinks(anteriores)
@@ -3,7 +3,11 @@ Ferramenta para análise de áudio usando Whisper (Speech-to-Text).
 """
 
 import os
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
+
+import tracing
+import rate_limiter
+from deadlines import ErroEtapa
 
 def analisar_audio(arquivo_audio):
     """
@@ -18,16 +22,58 @@ def analisar_audio(arquivo_audio):
     
     try:
         # Inicializar cliente OpenAI
-        client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        client = OpenAI(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            max_retries=0,
+            timeout=rate_limiter.TIMEOUT_PADRAO,
+            http_client=rate_limiter.cliente_http()
+        )
         
         # Transcrever áudio
-        transcript = client.audio.transcriptions.create(
-            model="whisper-1",
-            file=arquivo_audio
+        with tracing.medir("llm", "whisper-1"):
+            transcript = client.audio.transcriptions.create(
+                model="whisper-1",
+                file=arquivo_audio
+            )
+        tracing.registrar_chamada_llm()
+        
+        transcricao = transcript.text
+        return f"🎤 **Transcrição do Áudio:**\n\n{transcricao}"
+        
+    except Exception as e:
+        return f"❌ Erro ao analisar áudio: {str(e)}"
+
+async def aanalisar_audio(arquivo_audio):
+    """
+    Versão assíncrona de `analisar_audio`.
+    
+    Args:
+        arquivo_audio: Arquivo de áudio carregado
+        
+    Returns:
+        str: Transcrição do áudio
+
+    Raises:
+        ErroEtapa: Falha na transcrição (a mensagem vai para o usuário)
+    """
+    
+    try:
+        client = AsyncOpenAI(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            max_retries=0,
+            timeout=rate_limiter.TIMEOUT_PADRAO,
+            http_client=rate_limiter.cliente_http_async()
         )
         
+        with tracing.medir("llm", "whisper-1"):
+            transcript = await client.audio.transcriptions.create(
+                model="whisper-1",
+                file=arquivo_audio
+            )
+        tracing.registrar_chamada_llm()
+        
         transcricao = transcript.text
         return f"🎤 **Transcrição do Áudio:**\n\n{transcricao}"
         
     except Exception as e:
-        return f"❌ Erro ao analisar áudio: {str(e)}"
\ No newline at end of file
+        raise ErroEtapa(f"❌ Erro ao analisar áudio: {str(e)}") from e
\ No newline at end of file
@@ -4,7 +4,33 @@ Ferramenta para análise de imagens usando GPT-4 Vision.
 
 import os
 import base64
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
+
+import tracing
+import rate_limiter
+from deadlines import ErroEtapa
+
+PROMPT_ANALISE = "Analise esta imagem detalhadamente. Descreva o que você vê, incluindo objetos, pessoas, cores, ambiente, emoções transmitidas e qualquer texto visível."
+
+def _montar_mensagens(base64_image):
+    """Monta a mensagem multimodal enviada ao modelo de visão."""
+    return [
+        {
+            "role": "user",
+            "content": [
+                {
+                    "type": "text",
+                    "text": PROMPT_ANALISE
+                },
+                {
+                    "type": "image_url",
+                    "image_url": {
+                        "url": f"data:image/jpeg;base64,{base64_image}"
+                    }
+                }
+            ]
+        }
+    ]
 
 def analisar_imagem(arquivo_imagem):
     """
@@ -19,37 +45,67 @@ def analisar_imagem(arquivo_imagem):
     
     try:
         # Inicializar cliente OpenAI
-        client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        client = OpenAI(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            max_retries=0,
+            timeout=rate_limiter.TIMEOUT_PADRAO,
+            http_client=rate_limiter.cliente_http()
+        )
         
         # Converter imagem para base64
         image_data = arquivo_imagem.read()
         base64_image = base64.b64encode(image_data).decode('utf-8')
         
         # Analisar imagem
-        response = client.chat.completions.create(
-            model="gpt-4-vision-preview",
-            messages=[
-                {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "text",
-                            "text": "Analise esta imagem detalhadamente. Descreva o que você vê, incluindo objetos, pessoas, cores, ambiente, emoções transmitidas e qualquer texto visível."
-                        },
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": f"data:image/jpeg;base64,{base64_image}"
-                            }
-                        }
-                    ]
-                }
-            ],
-            max_tokens=500
+        with tracing.medir("llm", "gpt-4-vision-preview"):
+            response = client.chat.completions.create(
+                model="gpt-4-vision-preview",
+                messages=_montar_mensagens(base64_image),
+                max_tokens=500
+            )
+        tracing.registrar_chamada_llm(response.usage)
+        
+        analise = response.choices[0].message.content
+        return f"🔍 **Análise da Imagem:**\n\n{analise}"
+        
+    except Exception as e:
+        return f"❌ Erro ao analisar imagem: {str(e)}"
+
+async def aanalisar_imagem(arquivo_imagem):
+    """
+    Versão assíncrona de `analisar_imagem`.
+    
+    Args:
+        arquivo_imagem: Arquivo de imagem carregado
+        
+    Returns:
+        str: Análise detalhada da imagem
+
+    Raises:
+        ErroEtapa: Falha na análise da imagem (a mensagem vai para o usuário)
+    """
+    
+    try:
+        client = AsyncOpenAI(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            max_retries=0,
+            timeout=rate_limiter.TIMEOUT_PADRAO,
+            http_client=rate_limiter.cliente_http_async()
         )
         
+        image_data = arquivo_imagem.read()
+        base64_image = base64.b64encode(image_data).decode('utf-8')
+        
+        with tracing.medir("llm", "gpt-4-vision-preview"):
+            response = await client.chat.completions.create(
+                model="gpt-4-vision-preview",
+                messages=_montar_mensagens(base64_image),
+                max_tokens=500
+            )
+        tracing.registrar_chamada_llm(response.usage)
+        
         analise = response.choices[0].message.content
         return f"🔍 **Análise da Imagem:**\n\n{analise}"
         
     except Exception as e:
-        return f"❌ Erro ao analisar imagem: {str(e)}"
\ No newline at end of file
+        raise ErroEtapa(f"❌ Erro ao analisar imagem: {str(e)}") from e
\ No newline at end of file
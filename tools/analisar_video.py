@@ -29,4 +29,18 @@ def analisar_video(arquivo_video):
     - Análise de movimento e cenas
     
     📧 Entre em contato para mais informações sobre esta funcionalidade.
-    """
\ No newline at end of file
+    """
+
+async def aanalisar_video(arquivo_video):
+    """
+    Versão assíncrona de `analisar_video`.
+    
+    Args:
+        arquivo_video: Arquivo de vídeo carregado
+        
+    Returns:
+        str: Análise do vídeo
+    """
+    
+    # Placeholder sem I/O - apenas mantém a mesma interface da versão síncrona
+    return analisar_video(arquivo_video)
@@ -3,93 +3,127 @@ Ferramenta especializada em assistência de banco de dados e SQL.
 """
 
 import os
-from langchain_openai import ChatOpenAI
 from langchain.prompts import PromptTemplate
 from langchain.schema import HumanMessage
+from langchain_core.output_parsers import StrOutputParser
+import model_router
+from deadlines import ErroEtapa
 
-def busca_assistencia_de_banco_de_dados(pergunta):
+# Esquemas e relacionamentos do sistema
+DATABASE_SCHEMA = """
+ESTRUTURA DO BANCO DE DADOS:
+
+Tabela: usuarios
+- id (INT, PK)
+- nome (VARCHAR)
+- email (VARCHAR)
+- created_at (TIMESTAMP)
+
+Tabela: produtos
+- id (INT, PK)
+- nome (VARCHAR)
+- preco (DECIMAL)
+- categoria_id (INT, FK)
+- estoque (INT)
+
+Tabela: categorias
+- id (INT, PK)
+- nome (VARCHAR)
+- descricao (TEXT)
+
+Tabela: vendas
+- id (INT, PK)
+- usuario_id (INT, FK)
+- produto_id (INT, FK)
+- quantidade (INT)
+- valor_total (DECIMAL)
+- data_venda (TIMESTAMP)
+
+RELACIONAMENTOS:
+- produtos.categoria_id → categorias.id
+- vendas.usuario_id → usuarios.id
+- vendas.produto_id → produtos.id
+"""
+
+# Prompt especializado
+PROMPT_TEMPLATE = """
+Você é um especialista em banco de dados e SQL com conhecimento completo da estrutura do sistema.
+
+ESTRUTURA DO SISTEMA:
+{schema}
+
+INSTRUÇÕES:
+- Forneça consultas SQL precisas e otimizadas
+- Explique a lógica por trás das consultas
+- Sugira índices quando apropriado
+- Considere performance e boas práticas
+- Use JOINs adequados baseados nos relacionamentos
+
+PERGUNTA: {pergunta}
+
+RESPOSTA ESPECIALIZADA:
+"""
+
+def _criar_chain(llm):
+    """Monta a cadeia que recebe o prompt final já formatado."""
+    return llm | StrOutputParser()
+
+def _montar_prompt(pergunta):
+    """Monta o prompt final com o esquema do sistema."""
+    return PROMPT_TEMPLATE.format(
+        schema=DATABASE_SCHEMA,
+        pergunta=pergunta
+    )
+
+def busca_assistencia_de_banco_de_dados(pergunta, tier=None):
     """
     Fornece assistência especializada em banco de dados e SQL.
     
     Args:
         pergunta (str): Pergunta sobre banco de dados
+        tier (str, optional): Nível de modelo imposto (ver `model_router`)
         
     Returns:
         str: Resposta especializada
     """
     
-    # Configurar o modelo
-    llm = ChatOpenAI(
-        model="gpt-4",
-        temperature=0.2,
-        api_key=os.getenv("OPENAI_API_KEY")
-    )
-    
-    # Esquemas e relacionamentos do sistema
-    database_schema = """
-    ESTRUTURA DO BANCO DE DADOS:
-    
-    Tabela: usuarios
-    - id (INT, PK)
-    - nome (VARCHAR)
-    - email (VARCHAR)
-    - created_at (TIMESTAMP)
-    
-    Tabela: produtos
-    - id (INT, PK)
-    - nome (VARCHAR)
-    - preco (DECIMAL)
-    - categoria_id (INT, FK)
-    - estoque (INT)
-    
-    Tabela: categorias
-    - id (INT, PK)
-    - nome (VARCHAR)
-    - descricao (TEXT)
-    
-    Tabela: vendas
-    - id (INT, PK)
-    - usuario_id (INT, FK)
-    - produto_id (INT, FK)
-    - quantidade (INT)
-    - valor_total (DECIMAL)
-    - data_venda (TIMESTAMP)
-    
-    RELACIONAMENTOS:
-    - produtos.categoria_id → categorias.id
-    - vendas.usuario_id → usuarios.id
-    - vendas.produto_id → produtos.id
+    try:
+        # Criar o prompt final
+        prompt = _montar_prompt(pergunta)
+        
+        # Fazer a consulta (sem RAG: o nível depende da pergunta e da intenção)
+        return model_router.responder(
+            "banco_de_dados", pergunta, _criar_chain,
+            [HumanMessage(content=prompt)],
+            temperature=0.2,
+            tier=tier
+        )
+        
+    except Exception as e:
+        return f"Erro ao processar consulta de banco de dados: {str(e)}"
+
+async def abusca_assistencia_de_banco_de_dados(pergunta, tier=None):
     """
+    Versão assíncrona de `busca_assistencia_de_banco_de_dados`.
     
-    # Prompt especializado
-    prompt_template = """
-    Você é um especialista em banco de dados e SQL com conhecimento completo da estrutura do sistema.
-    
-    ESTRUTURA DO SISTEMA:
-    {schema}
-    
-    INSTRUÇÕES:
-    - Forneça consultas SQL precisas e otimizadas
-    - Explique a lógica por trás das consultas
-    - Sugira índices quando apropriado
-    - Considere performance e boas práticas
-    - Use JOINs adequados baseados nos relacionamentos
-    
-    PERGUNTA: {pergunta}
-    
-    RESPOSTA ESPECIALIZADA:
+    Args:
+        pergunta (str): Pergunta sobre banco de dados
+        tier (str, optional): Nível de modelo imposto (ver `model_router`)
+        
+    Returns:
+        str: Resposta especializada
+
+    Raises:
+        ErroEtapa: Falha na chamada ao modelo (a mensagem vai para o usuário)
     """
     
     try:
-        # Criar o prompt final
-        prompt = prompt_template.format(
-            schema=database_schema,
-            pergunta=pergunta
+        return await model_router.aresponder(
+            "banco_de_dados", pergunta, _criar_chain,
+            [HumanMessage(content=_montar_prompt(pergunta))],
+            temperature=0.2,
+            tier=tier
         )
         
-        # Fazer a consulta
-        response = llm.invoke([HumanMessage(content=prompt)])
-        return response.content
-        
     except Exception as e:
-        return f"Erro ao processar consulta de banco de dados: {str(e)}"
\ No newline at end of file
+        raise ErroEtapa(f"Erro ao processar consulta de banco de dados: {str(e)}") from e
\ No newline at end of file
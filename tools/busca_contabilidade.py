@@ -5,14 +5,17 @@ Ferramenta especializada em contabilidade e tributação brasileira.
 import os
 import pickle
 import numpy as np
-from langchain_openai import ChatOpenAI
 from langchain.prompts import PromptTemplate
-from langchain.schema import HumanMessage
+from langchain_core.output_parsers import StrOutputParser
 from langchain_community.document_loaders import WebBaseLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_openai import OpenAIEmbeddings
 from langchain_community.vectorstores import FAISS
-from langchain.chains import RetrievalQA
+import tracing
+import rate_limiter
+import model_router
+from deadlines import ErroEtapa
+from single_flight import CargaUnica
 from config_knowledge import get_contabilidade_urls
 
 # Importar modelos Django
@@ -30,7 +33,10 @@ class ContabilidadeKnowledgeBase:
             "https://www.nfe.fazenda.gov.br/",
         ]
         self.vectorstore = None
-        self.embeddings = OpenAIEmbeddings(api_key=os.getenv("OPENAI_API_KEY"))
+        self.embeddings = OpenAIEmbeddings(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            **rate_limiter.opcoes_embeddings()
+        )
         
     def _get_database_content(self):
         """Busca conteúdo relevante do banco de dados por palavras-chave."""
@@ -113,7 +119,10 @@ class ContabilidadeKnowledgeBase:
             
             # 1. Carregar documentos das URLs
             try:
-                loader = WebBaseLoader(self.urls_contabilidade)
+                loader = WebBaseLoader(
+                    self.urls_contabilidade,
+                    requests_kwargs={"timeout": rate_limiter.TIMEOUT_PADRAO}
+                )
                 documents = loader.load()
                 
                 # Dividir em chunks
@@ -165,30 +174,8 @@ class ContabilidadeKnowledgeBase:
             print(f"Erro ao criar base de conhecimento: {e}")
             self.vectorstore = None
 
-def busca_contabilidade(pergunta):
-    """
-    Busca informações especializadas em contabilidade e tributação.
-    
-    Args:
-        pergunta (str): Pergunta sobre contabilidade
-        
-    Returns:
-        str: Resposta especializada
-    """
-    
-    # Configurar o modelo
-    llm = ChatOpenAI(
-        model="gpt-4",
-        temperature=0.3,
-        api_key=os.getenv("OPENAI_API_KEY")
-    )
-    
-    # Inicializar base de conhecimento
-    kb = ContabilidadeKnowledgeBase()
-    kb.load_or_create_knowledge_base()
-    
-    # Prompt especializado
-    prompt_template = """
+# Prompt especializado
+PROMPT_TEMPLATE = """
     Você é um especialista em contabilidade e tributação brasileira com acesso a manuais de ERP e base de conhecimento atualizada.
     
     INSTRUÇÕES:
@@ -208,36 +195,170 @@ def busca_contabilidade(pergunta):
     
     RESPOSTA ESPECIALIZADA:
     """
-    
-    try:
-        if kb.vectorstore:
-            # Usar RAG com base de conhecimento híbrida
-            qa_chain = RetrievalQA.from_chain_type(
-                llm=llm,
-                chain_type="stuff",
-                retriever=kb.vectorstore.as_retriever(search_kwargs={"k": 5}),
-                chain_type_kwargs={
-                    "prompt": PromptTemplate(
-                        template=prompt_template,
-                        input_variables=["context", "question"]
-                    )
-                }
-            )
-            
-            resposta = qa_chain.invoke({"query": pergunta})
-            return resposta["result"]
-        else:
-            # Fallback sem base de conhecimento
-            prompt_simples = f"""
+
+# Prompt usado quando não há base de conhecimento disponível
+PROMPT_SIMPLES = """
             Como especialista em contabilidade brasileira, responda:
             
             {pergunta}
             
             Forneça uma resposta prática e detalhada.
             """
+
+def _criar_chain_rag(llm):
+    """Monta a cadeia que responde usando os trechos recuperados ("stuff")."""
+    prompt = PromptTemplate(
+        template=PROMPT_TEMPLATE,
+        input_variables=["context", "question"]
+    )
+    return prompt | llm | StrOutputParser()
+
+def _criar_chain_simples(llm):
+    """Monta a cadeia usada quando não há base de conhecimento."""
+    return PromptTemplate.from_template(PROMPT_SIMPLES) | llm | StrOutputParser()
+
+def _carregar_base_conhecimento():
+    kb = ContabilidadeKnowledgeBase()
+    kb.load_or_create_knowledge_base()
+    return kb
+
+# Base de conhecimento compartilhada pelo processo (carregada sob demanda, numa thread própria)
+_base_conhecimento = CargaUnica("base_conhecimento:contabilidade", _carregar_base_conhecimento,
+                                valido=lambda kb: bool(kb.vectorstore))
+
+def obter_base_conhecimento(espera=None):
+    """
+    Retorna a base de conhecimento do processo, disparando a carga na primeira chamada.
+    
+    Enquanto ela carrega (por mais de `espera` segundos) ou se a carga
+    falhou, retorna None e a resposta segue sem base; uma carga que falhou
+    é tentada de novo na próxima chamada.
+    """
+    return _base_conhecimento.obter(espera)
+
+def _serializar_documentos(documentos):
+    """Converte (Document, score) do FAISS em dicionários simples."""
+    return [
+        {
+            "conteudo": doc.page_content,
+            "metadata": doc.metadata,
+            "score": float(score),
+        }
+        for doc, score in documentos
+    ]
+
+def _formatar_contexto(contexto):
+    """Junta os trechos recuperados no formato do chain "stuff"."""
+    return "\n\n".join(trecho["conteudo"] for trecho in contexto)
+
+def recuperar_contexto(pergunta, k=5):
+    """
+    Busca os trechos mais relevantes para a pergunta.
+    
+    Args:
+        pergunta (str): Pergunta sobre contabilidade
+        k (int): Quantidade de trechos
+        
+    Returns:
+        list | None: Trechos com conteúdo, metadata e score, ou None sem base
+    """
+    kb = obter_base_conhecimento()
+    if kb is None:
+        return None
+    with tracing.medir("recuperacao", "contabilidade", k=k):
+        tracing.registrar_embeddings()
+        documentos = kb.vectorstore.similarity_search_with_score(pergunta, k=k)
+    return _serializar_documentos(documentos)
+
+async def arecuperar_contexto(pergunta, k=5):
+    """Versão assíncrona de `recuperar_contexto` (embedding e busca FAISS assíncronos)."""
+    kb = await _base_conhecimento.aobter()
+    if kb is None:
+        return None
+    with tracing.medir("recuperacao", "contabilidade", k=k):
+        tracing.registrar_embeddings()
+        documentos = await kb.vectorstore.asimilarity_search_with_score(pergunta, k=k)
+    return _serializar_documentos(documentos)
+
+def busca_contabilidade(pergunta, contexto=None, usar_rag=True, tier=None):
+    """
+    Busca informações especializadas em contabilidade e tributação.
+    
+    Args:
+        pergunta (str): Pergunta sobre contabilidade
+        contexto (list, optional): Trechos já recuperados (ex.: pré-carregados
+            em paralelo à classificação). Se omitido, a busca é feita aqui.
+        usar_rag (bool): False responde sem base de conhecimento (degradação)
+        tier (str, optional): Nível de modelo imposto (ver `model_router`)
+        
+    Returns:
+        str: Resposta especializada
+    """
+    
+    try:
+        if contexto is None and usar_rag:
+            contexto = recuperar_contexto(pergunta)
+        
+        if contexto is not None and usar_rag:
+            # Usar RAG com base de conhecimento híbrida; o nível do modelo
+            # depende da qualidade da recuperação
+            return model_router.responder(
+                "contabilidade", pergunta, _criar_chain_rag,
+                {"context": _formatar_contexto(contexto), "question": pergunta},
+                scores=[trecho["score"] for trecho in contexto],
+                temperature=0.3,
+                tier=tier
+            )
+        else:
+            # Fallback sem base de conhecimento
+            return model_router.responder(
+                "contabilidade", pergunta, _criar_chain_simples,
+                {"pergunta": pergunta},
+                scores=[] if usar_rag else None,
+                temperature=0.3,
+                tier=tier
+            )
             
-            response = llm.invoke([HumanMessage(content=prompt_simples)])
-            return response.content
+    except Exception as e:
+        return f"Erro ao processar consulta contábil: {str(e)}"
+
+async def abusca_contabilidade(pergunta, contexto=None, usar_rag=True, tier=None):
+    """
+    Versão assíncrona de `busca_contabilidade`.
+    
+    Args:
+        pergunta (str): Pergunta sobre contabilidade
+        contexto (list, optional): Trechos já recuperados
+        usar_rag (bool): False responde sem base de conhecimento
+        tier (str, optional): Nível de modelo imposto
+        
+    Returns:
+        str: Resposta especializada
+
+    Raises:
+        ErroEtapa: Falha na recuperação ou no modelo (a mensagem vai para o usuário)
+    """
+    
+    try:
+        if contexto is None and usar_rag:
+            contexto = await arecuperar_contexto(pergunta)
+        
+        if contexto is not None and usar_rag:
+            return await model_router.aresponder(
+                "contabilidade", pergunta, _criar_chain_rag,
+                {"context": _formatar_contexto(contexto), "question": pergunta},
+                scores=[trecho["score"] for trecho in contexto],
+                temperature=0.3,
+                tier=tier
+            )
+        else:
+            return await model_router.aresponder(
+                "contabilidade", pergunta, _criar_chain_simples,
+                {"pergunta": pergunta},
+                scores=[] if usar_rag else None,
+                temperature=0.3,
+                tier=tier
+            )
             
     except Exception as e:
-        return f"Erro ao processar consulta contábil: {str(e)}"
\ No newline at end of file
+        raise ErroEtapa(f"Erro ao processar consulta contábil: {str(e)}") from e
\ No newline at end of file
@@ -1,7 +1,6 @@
 import os
 from langchain_openai import ChatOpenAI
 from langchain.schema import HumanMessage
-from langchain_community.tools.tavily_search import TavilySearchResults
 from langchain_core.messages import SystemMessage
 from langchain_core.tools import tool
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
@@ -9,20 +8,40 @@ from langgraph.prebuilt import create_react_agent
 
 from dotenv import load_dotenv
 
+import tracing
+import rate_limiter
+from deadlines import ErroEtapa
+
 
 load_dotenv()
 
 TAVILY_API_KEY = os.getenv("TAVILY_API_KEY")
+TAVILY_BASE_URL = os.getenv("TAVILY_BASE_URL", "https://api.tavily.com")
 
 model = ChatOpenAI(
     model="gpt-4o-mini",
     temperature=0.3,
-    api_key=os.getenv("OPENAI_API_KEY")
+    api_key=os.getenv("OPENAI_API_KEY"),
+    **rate_limiter.opcoes_openai()
 )
 
 #criar o Prompt para o o sistema
 system_prompt = SystemMessage(content="Você é um assistente multimodal capaz de responder perguntas diversas usando a ferramenta de 'busca' na internet.")
 
+def _parametros_busca(pergunta):
+    """Parâmetros da API de busca do Tavily (mesmos padrões do TavilySearchResults)."""
+    return {
+        "api_key": TAVILY_API_KEY,
+        "query": pergunta,
+        "max_results": 2,
+        "search_depth": "advanced",
+    }
+
+def _primeiro_resultado(dados):
+    """Retorna o conteúdo do primeiro resultado da busca."""
+    resultados = dados.get("results") or []
+    return resultados[0]["content"] if resultados else "Nenhum resultado encontrado."
+
 @tool("busca")
 def busca_geral(pergunta: str) -> str:
     """
@@ -34,6 +53,42 @@ def busca_geral(pergunta: str) -> str:
     Returns:
         str: A resposta obtida da busca na internet, Ou uma mensagem de quem não houve resultados;
     """
-    search = TavilySearchResults(api_key=TAVILY_API_KEY, max_results=2)
-    resultados = search.invoke({"query": pergunta})
-    return resultados[0]["content"] if resultados else "Nenhum resultado encontrado."
+    try:
+        # Requisição pelo cliente compartilhado (limites e novas tentativas)
+        with tracing.medir("busca_web", "tavily"):
+            resposta = rate_limiter.cliente_http().post(
+                f"{TAVILY_BASE_URL}/search",
+                json=_parametros_busca(pergunta),
+                extensions={"endpoint_limite": "tavily"},
+                timeout=30,
+            )
+            resposta.raise_for_status()
+        return _primeiro_resultado(resposta.json())
+    except Exception as e:
+        return f"Erro ao realizar busca na internet: {str(e)}"
+
+async def abusca_geral(pergunta: str) -> str:
+    """
+    Versão assíncrona da ferramenta `busca`.
+    
+    Args:
+        pergunta (str): A pergunta ou consulta a ser realizada na internet.
+    
+    Returns:
+        str: A resposta obtida da busca na internet, Ou uma mensagem de quem não houve resultados;
+
+    Raises:
+        ErroEtapa: Falha na requisição ao Tavily (a mensagem vai para o usuário)
+    """
+    try:
+        with tracing.medir("busca_web", "tavily"):
+            resposta = await rate_limiter.cliente_http_async().post(
+                f"{TAVILY_BASE_URL}/search",
+                json=_parametros_busca(pergunta),
+                extensions={"endpoint_limite": "tavily"},
+                timeout=30,
+            )
+            resposta.raise_for_status()
+        return _primeiro_resultado(resposta.json())
+    except Exception as e:
+        raise ErroEtapa(f"Erro ao realizar busca na internet: {str(e)}") from e
@@ -3,31 +3,14 @@ Ferramenta para classificar a intenção do usuário baseada na entrada de texto
 """
 
 import os
-from langchain_openai import ChatOpenAI
 from langchain.prompts import PromptTemplate
 from langchain.schema import HumanMessage
+from langchain_core.output_parsers import StrOutputParser
+import model_router
 from .categorias import categorias_intencao, descricoes_categorias
 
-def classificar_intencao(texto_usuario):
-    """
-    Classifica a intenção do usuário baseada no texto de entrada.
-    
-    Args:
-        texto_usuario (str): Texto fornecido pelo usuário
-        
-    Returns:
-        str: Categoria da intenção identificada
-    """
-    
-    # Configurar o modelo
-    llm = ChatOpenAI(
-        model="gpt-4",
-        temperature=0.1,
-        api_key=os.getenv("OPENAI_API_KEY")
-    )
-    
-    # Criar prompt para classificação
-    prompt_template = """
+# Prompt para classificação
+PROMPT_TEMPLATE = """
     Você é um classificador de intenções especializado. Sua tarefa é analisar o texto do usuário 
     e determinar qual categoria melhor representa sua intenção.
     
@@ -48,34 +31,99 @@ def classificar_intencao(texto_usuario):
     
     CATEGORIA:
     """
-    
+
+def _criar_chain(llm):
+    """Monta a cadeia que recebe o prompt final já formatado."""
+    return llm | StrOutputParser()
+
+def _montar_prompt(texto_usuario):
+    """Monta o prompt de classificação com categorias e descrições."""
     # Preparar as categorias e descrições para o prompt
     categorias_str = ", ".join(categorias_intencao)
     descricoes_str = "\n".join([f"- {cat}: {desc.strip()}" for cat, desc in descricoes_categorias.items()])
     
-    # Criar o prompt final
-    prompt = prompt_template.format(
+    return PROMPT_TEMPLATE.format(
         categorias=categorias_str,
         descricoes=descricoes_str,
         texto=texto_usuario
     )
+
+def _categoria_conhecida(resposta):
+    """Retorna a categoria conhecida presente na resposta, ou None."""
+    categoria = resposta.strip().lower()
+    
+    # Validar se a categoria retornada é válida
+    if categoria in categorias_intencao:
+        return categoria
+    
+    # Se a categoria não for válida, tentar encontrar uma correspondência parcial
+    for cat in categorias_intencao:
+        if cat in categoria:
+            return cat
+    
+    return None
+
+def _validar_categoria(resposta):
+    """Normaliza a resposta do modelo para uma categoria conhecida."""
+    # Se não encontrar correspondência, retornar busca_geral
+    return _categoria_conhecida(resposta) or "busca_geral"
+
+def classificar_intencao(texto_usuario):
+    """
+    Classifica a intenção do usuário baseada no texto de entrada.
+    
+    Args:
+        texto_usuario (str): Texto fornecido pelo usuário
+        
+    Returns:
+        str: Categoria da intenção identificada
+    """
+    
+    # Criar o prompt final
+    mensagens = [HumanMessage(content=_montar_prompt(texto_usuario))]
     
     try:
-        # Fazer a classificação
-        response = llm.invoke([HumanMessage(content=prompt)])
-        categoria = response.content.strip().lower()
+        # Fazer a classificação no modelo pequeno
+        resposta = model_router.invocar(
+            "classificacao", "pequeno", "padrao", _criar_chain, mensagens, temperature=0.1
+        )
         
-        # Validar se a categoria retornada é válida
-        if categoria in categorias_intencao:
-            return categoria
-        else:
-            # Se a categoria não for válida, tentar encontrar uma correspondência parcial
-            for cat in categorias_intencao:
-                if cat in categoria:
-                    return cat
+        # Resposta fora das categorias: repetir no modelo grande
+        if _categoria_conhecida(resposta) is None:
+            resposta = model_router.invocar(
+                "classificacao", "grande", "categoria_invalida", _criar_chain, mensagens,
+                temperature=0.1, escalonamento=True
+            )
+        return _validar_categoria(resposta)
             
-            # Se não encontrar correspondência, retornar busca_geral
-            return "busca_geral"
+    except Exception as e:
+        print(f"Erro na classificação de intenção: {e}")
+        return "busca_geral"
+
+async def aclassificar_intencao(texto_usuario):
+    """
+    Versão assíncrona de `classificar_intencao`.
+    
+    Args:
+        texto_usuario (str): Texto fornecido pelo usuário
+        
+    Returns:
+        str: Categoria da intenção identificada
+    """
+    
+    mensagens = [HumanMessage(content=_montar_prompt(texto_usuario))]
+    
+    try:
+        resposta = await model_router.ainvocar(
+            "classificacao", "pequeno", "padrao", _criar_chain, mensagens, temperature=0.1
+        )
+        
+        if _categoria_conhecida(resposta) is None:
+            resposta = await model_router.ainvocar(
+                "classificacao", "grande", "categoria_invalida", _criar_chain, mensagens,
+                temperature=0.1, escalonamento=True
+            )
+        return _validar_categoria(resposta)
             
     except Exception as e:
         print(f"Erro na classificação de intenção: {e}")
@@ -0,0 +1,162 @@
+"""
+Execuções do pipeline de ingestão e progresso de cada artigo, gravados no banco.
+
+Cada execução do `runpipeline.py` ganha um `ExecucaoPipeline` (o id é o
+número da execução) e cada artigo um `ProgressoArtigo` com a etapa que
+alcançou:
+
+    coletado -> gravado -> trechos -> concluido
+
+Uma execução que não chegou a "concluida" (processo morto, Ctrl+C, erro)
+é retomada pela próxima: a listagem continua da marca da própria execução
+(updatedDate do último lote gravado) e o que ficou no meio do caminho sai
+do banco (artigos sem trechos, trechos sem vetor). Como o progresso e a
+marca são gravados na mesma transação de cada lote, o que se refaz depois
+de uma queda é só o lote em voo. Com `--completo`, uma execução incremental
+inacabada não é retomada: a nova lista a base inteira.
+
+Falhas contam tentativas por artigo e voltam nas execuções seguintes até
+`max_tentativas`; depois disso o artigo vai para a lista de descartados
+(`descartados()`) e fica fora do pipeline até o conteúdo mudar.
+
+Uso:
+    registro = retomar_execucao("grafo", completo=completo) or iniciar_execucao("grafo", completo, filtro)
+    ...
+    registro.finalizar("concluida", resumo)
+"""
+
+from django.utils import timezone
+
+from movidesk_client import filtro_atualizados_desde
+from tools.models import ArtigosFonte, ExecucaoPipeline, ProgressoArtigo
+
+# Status de uma execução que não precisa ser retomada
+CONCLUIDA = "concluida"
+
+CAMPOS_PROGRESSO = ["execucao", "etapa", "tentativas", "descartado", "erro", "atualizado_em"]
+
+
+class RegistroExecucao:
+    """Grava o progresso de uma execução; usado pelos nós e etapas do pipeline."""
+
+    def __init__(self, execucao, max_tentativas=3):
+        self.execucao = execucao
+        self.max_tentativas = max_tentativas
+
+    @property
+    def id(self):
+        return self.execucao.pk
+
+    def filtro_listagem(self):
+        """`$filter` da descoberta: o da execução, ou a partir da marca se ela foi interrompida."""
+        if self.execucao.marca is not None:
+            return filtro_atualizados_desde(self.execucao.marca)
+        return self.execucao.filtro or None
+
+    def avancar_marca(self, marca):
+        """
+        Guarda o updatedDate mais recente de um lote da listagem.
+
+        Chamado na transação que grava o lote (`gravar_fontes`), para que a
+        marca nunca passe de artigos que não chegaram ao banco.
+        """
+        if self.execucao.marca is None or marca > self.execucao.marca:
+            self.execucao.marca = marca
+            ExecucaoPipeline.objects.filter(pk=self.id).update(marca=marca)
+
+    def _marcar(self, artigo_ids, etapa):
+        # Avanço de etapa zera as falhas: conteúdo novo ou etapa vencida ganham novas tentativas
+        agora = timezone.now()
+        ProgressoArtigo.objects.bulk_create(
+            [ProgressoArtigo(artigo_id=artigo_id, execucao_id=self.id, etapa=etapa, tentativas=0,
+                             descartado=False, erro="", atualizado_em=agora) for artigo_id in artigo_ids],
+            update_conflicts=True, unique_fields=["artigo_id"], update_fields=CAMPOS_PROGRESSO,
+        )
+
+    def gravados(self, artigo_ids):
+        """Artigos novos ou alterados gravados em `ArtigosFonte`."""
+        self._marcar(artigo_ids, "gravado")
+
+    def com_trechos(self, fonte_ids):
+        """Artigos (pelas fontes) com os trechos gravados, à espera dos embeddings."""
+        self._marcar(_artigos_das_fontes(fonte_ids), "trechos")
+
+    def concluidos(self, fonte_ids):
+        """Fontes cujos trechos já têm todos vetor."""
+        self._marcar(_artigos_das_fontes(fonte_ids), "concluido")
+
+    def falhas(self, erros, etapa):
+        """
+        Conta uma tentativa para cada artigo de `erros` ({artigo_id: mensagem}).
+
+        Quem chega a `max_tentativas` é descartado.
+        """
+        if not erros:
+            return
+        agora = timezone.now()
+        anteriores = dict(ProgressoArtigo.objects.filter(artigo_id__in=list(erros))
+                          .values_list("artigo_id", "tentativas"))
+        progresso = []
+        for artigo_id, erro in erros.items():
+            tentativas = anteriores.get(artigo_id, 0) + 1
+            progresso.append(ProgressoArtigo(
+                artigo_id=artigo_id, execucao_id=self.id, etapa=etapa, tentativas=tentativas,
+                descartado=tentativas >= self.max_tentativas, erro=str(erro)[:2000], atualizado_em=agora,
+            ))
+        ProgressoArtigo.objects.bulk_create(progresso, update_conflicts=True, unique_fields=["artigo_id"],
+                                            update_fields=CAMPOS_PROGRESSO)
+
+    def falhas_fontes(self, fonte_ids, erro, etapa):
+        """`falhas` para os artigos de um lote de trechos (mesmo erro para todos)."""
+        self.falhas({artigo_id: erro for artigo_id in _artigos_das_fontes(fonte_ids)}, etapa)
+
+    def pendentes_coleta(self):
+        """IDs que falharam antes de chegar ao banco e ainda têm tentativas."""
+        return list(ProgressoArtigo.objects.filter(etapa="coletado", descartado=False)
+                    .values_list("artigo_id", flat=True))
+
+    def finalizar(self, status, resumo=None, erro=""):
+        self.execucao.status = status
+        self.execucao.resumo = resumo
+        self.execucao.erro = erro
+        self.execucao.terminada_em = timezone.now()
+        self.execucao.save(update_fields=["status", "resumo", "erro", "terminada_em"])
+
+
+def _artigos_das_fontes(fonte_ids):
+    return list(ArtigosFonte.objects.filter(pk__in=list(fonte_ids)).values_list("artigo_id", flat=True))
+
+def iniciar_execucao(modo, completo, filtro, max_tentativas=3):
+    """Cria o registro de uma execução nova."""
+    execucao = ExecucaoPipeline.objects.create(modo=modo, completo=completo, filtro=filtro or "")
+    return RegistroExecucao(execucao, max_tentativas)
+
+def retomar_execucao(modo, max_tentativas=3, completo=False):
+    """
+    Registro da última execução que não terminou, ou None.
+
+    Execuções inacabadas mais antigas que ela são dadas como encerradas.
+    Com `completo`, uma inacabada incremental também é encerrada (e volta
+    None): a execução nova lista a base inteira, o que cobre o que faltava.
+    """
+    inacabadas = ExecucaoPipeline.objects.exclude(status=CONCLUIDA).exclude(status="abandonada")
+    execucao = inacabadas.order_by("-id").first()
+    if execucao is None:
+        return None
+    if completo and not execucao.completo:
+        inacabadas.update(status="abandonada", terminada_em=timezone.now())
+        print(f"--- Execução #{execucao.pk} (incremental) encerrada sem retomar: --completo lista a base inteira ---")
+        return None
+    inacabadas.exclude(pk=execucao.pk).update(status="abandonada", terminada_em=timezone.now())
+    execucao.modo = modo
+    execucao.status = "em_andamento"
+    execucao.save(update_fields=["modo", "status"])
+    return RegistroExecucao(execucao, max_tentativas)
+
+def descartados():
+    """Artigos fora do pipeline por excesso de falhas (lista de descartados)."""
+    return ProgressoArtigo.objects.filter(descartado=True).order_by("artigo_id")
+
+def ids_descartados():
+    """Subconsulta dos `artigo_id` descartados (para excluir dos pendentes)."""
+    return ProgressoArtigo.objects.filter(descartado=True).values("artigo_id")
@@ -3,7 +3,11 @@ Ferramenta para geração de áudio usando TTS (Text-to-Speech).
 """
 
 import os
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
+
+import tracing
+import rate_limiter
+from deadlines import ErroEtapa
 
 def gerar_audio(texto):
     """
@@ -18,14 +22,21 @@ def gerar_audio(texto):
     
     try:
         # Inicializar cliente OpenAI
-        client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        client = OpenAI(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            max_retries=0,
+            timeout=rate_limiter.TIMEOUT_PADRAO,
+            http_client=rate_limiter.cliente_http()
+        )
         
         # Gerar áudio
-        response = client.audio.speech.create(
-            model="tts-1",
-            voice="alloy",
-            input=texto
-        )
+        with tracing.medir("llm", "tts-1"):
+            response = client.audio.speech.create(
+                model="tts-1",
+                voice="alloy",
+                input=texto
+            )
+        tracing.registrar_chamada_llm()
         
         # Salvar arquivo de áudio
         audio_filename = "audio_gerado.mp3"
@@ -34,4 +45,42 @@ def gerar_audio(texto):
         return f"🎵 **Áudio gerado com sucesso!**\n\n📝 **Texto:** {texto}\n\n🎧 **Arquivo:** {audio_filename}"
         
     except Exception as e:
-        return f"❌ Erro ao gerar áudio: {str(e)}"
\ No newline at end of file
+        return f"❌ Erro ao gerar áudio: {str(e)}"
+
+async def agerar_audio(texto):
+    """
+    Versão assíncrona de `gerar_audio`.
+    
+    Args:
+        texto (str): Texto para converter em áudio
+        
+    Returns:
+        str: Caminho do arquivo de áudio gerado
+
+    Raises:
+        ErroEtapa: Falha na geração do áudio (a mensagem vai para o usuário)
+    """
+    
+    try:
+        client = AsyncOpenAI(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            max_retries=0,
+            timeout=rate_limiter.TIMEOUT_PADRAO,
+            http_client=rate_limiter.cliente_http_async()
+        )
+        
+        with tracing.medir("llm", "tts-1"):
+            response = await client.audio.speech.create(
+                model="tts-1",
+                voice="alloy",
+                input=texto
+            )
+        tracing.registrar_chamada_llm()
+        
+        audio_filename = "audio_gerado.mp3"
+        await response.astream_to_file(audio_filename)
+        
+        return f"🎵 **Áudio gerado com sucesso!**\n\n📝 **Texto:** {texto}\n\n🎧 **Arquivo:** {audio_filename}"
+        
+    except Exception as e:
+        raise ErroEtapa(f"❌ Erro ao gerar áudio: {str(e)}") from e
\ No newline at end of file
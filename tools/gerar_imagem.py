@@ -3,7 +3,11 @@ Ferramenta para geração de imagens usando DALL-E.
 """
 
 import os
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
+
+import tracing
+import rate_limiter
+from deadlines import ErroEtapa
 
 def gerar_imagem(descricao):
     """
@@ -18,20 +22,65 @@ def gerar_imagem(descricao):
     
     try:
         # Inicializar cliente OpenAI
-        client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        client = OpenAI(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            max_retries=0,
+            timeout=rate_limiter.TIMEOUT_PADRAO,
+            http_client=rate_limiter.cliente_http()
+        )
         
         # Gerar imagem
-        response = client.images.generate(
-            model="dall-e-3",
-            prompt=descricao,
-            size="1024x1024",
-            quality="standard",
-            n=1,
-        )
+        with tracing.medir("llm", "dall-e-3"):
+            response = client.images.generate(
+                model="dall-e-3",
+                prompt=descricao,
+                size="1024x1024",
+                quality="standard",
+                n=1,
+            )
+        tracing.registrar_chamada_llm()
         
         # Retornar URL da imagem
         image_url = response.data[0].url
         return f"✅ Imagem gerada com sucesso!\n\n🖼️ **Descrição:** {descricao}\n\n🔗 **Link da imagem:** {image_url}"
         
     except Exception as e:
-        return f"❌ Erro ao gerar imagem: {str(e)}"
\ No newline at end of file
+        return f"❌ Erro ao gerar imagem: {str(e)}"
+
+async def agerar_imagem(descricao):
+    """
+    Versão assíncrona de `gerar_imagem`.
+    
+    Args:
+        descricao (str): Descrição da imagem a ser gerada
+        
+    Returns:
+        str: URL da imagem gerada
+
+    Raises:
+        ErroEtapa: Falha na geração da imagem (a mensagem vai para o usuário)
+    """
+    
+    try:
+        client = AsyncOpenAI(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            max_retries=0,
+            timeout=rate_limiter.TIMEOUT_PADRAO,
+            http_client=rate_limiter.cliente_http_async()
+        )
+        
+        with tracing.medir("llm", "dall-e-3"):
+            response = await client.images.generate(
+                model="dall-e-3",
+                prompt=descricao,
+                size="1024x1024",
+                quality="standard",
+                n=1,
+            )
+        tracing.registrar_chamada_llm()
+        
+        image_url = response.data[0].url
+        return f"✅ Imagem gerada com sucesso!\n\n🖼️ **Descrição:** {descricao}\n\n🔗 **Link da imagem:** {image_url}"
+        
+    except Exception as e:
+        raise ErroEtapa(f"❌ Erro ao gerar imagem: {str(e)}") from e
\ No newline at end of file
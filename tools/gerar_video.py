@@ -27,4 +27,18 @@ def gerar_video(descricao):
     - Sistema de renderização
     
     📧 Entre em contato para mais informações sobre esta funcionalidade.
-    """
\ No newline at end of file
+    """
+
+async def agerar_video(descricao):
+    """
+    Versão assíncrona de `gerar_video`.
+    
+    Args:
+        descricao (str): Descrição do vídeo a ser gerado
+        
+    Returns:
+        str: Mensagem sobre geração de vídeo
+    """
+    
+    # Placeholder sem I/O - apenas mantém a mesma interface da versão síncrona
+    return gerar_video(descricao)
@@ -0,0 +1,56 @@
+"""
+Importa artigos de um arquivo exportado pelo `movidesk_central.py` para o banco.
+
+Lê o JSONL (ou a lista JSON dos snapshots antigos) um artigo por vez e
+grava em lotes, como o pipeline: upsert em `ArtigosFonte`, trechos e, no
+fim, os embeddings pendentes. Artigos já importados com o mesmo conteúdo
+não são reprocessados, então importar de novo o mesmo arquivo é barato.
+
+    python manage.py importar_artigos artigos_movidesk.jsonl
+    python manage.py importar_artigos artigos_movidesk.json --sem-embeddings
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = "Importa artigos de um arquivo JSON/JSONL para a base de conhecimento (sem chamar a Movidesk)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("arquivo", help="Arquivo JSONL (um artigo por linha) ou JSON (lista de artigos)")
+        parser.add_argument("--lote", type=int, default=None, help="Artigos por transação (padrão: PIPELINE_DB_BATCH)")
+        parser.add_argument("--sem-embeddings", action="store_true",
+                            help="Só grava artigos e trechos; os embeddings ficam para o próximo runpipeline.py")
+
+    def handle(self, *args, **opcoes):
+        # Antes do pipeline, que cria o cliente de embeddings ao ser importado
+        import fake_backends
+        fake_backends.ativar_se_configurado()
+        from movidesk_client import ler_arquivo_artigos
+        from tools.pipeline import embeddar_pendentes, importar_artigos
+
+        self.stdout.write(f"--- 📥 IMPORTANDO {opcoes['arquivo']} ---")
+        inicio = time.perf_counter()
+        try:
+            resumo = importar_artigos(ler_arquivo_artigos(opcoes["arquivo"]), opcoes["lote"])
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Não foi possível importar {opcoes['arquivo']}: {e}")
+        self.stdout.write(
+            f"--- {resumo['novos']} novos, {resumo['alterados']} alterados, {resumo['sem_mudanca']} com o mesmo "
+            f"conteúdo, {resumo['invalidos']} inválidos, {resumo['desatualizados']} mais antigos que o banco; "
+            f"{resumo['trechos']} trechos em "
+            f"{time.perf_counter() - inicio:.2f} s ---"
+        )
+
+        if opcoes["sem_embeddings"]:
+            return
+        embeddings = embeddar_pendentes()
+        self.stdout.write(
+            f"--- {embeddings['trechos']} trechos com embedding em {embeddings['lotes']} lotes, "
+            f"{embeddings['segundos']} s ({embeddings['trechos_por_segundo']} trechos/s, "
+            f"{embeddings['falhas']} lotes com falha) ---"
+        )
+        if embeddings["falhas"]:
+            self.stdout.write(self.style.WARNING("Trechos sem embedding voltam no próximo runpipeline.py."))
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.5 on 2026-10-19 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tools', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MensagemSessao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sessao_id', models.CharField(max_length=64)),
+                ('tipo', models.CharField(max_length=16)),
+                ('conteudo', models.TextField()),
+                ('extras', models.JSONField(blank=True, null=True)),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['sessao_id', 'id'], name='mensagem_sessao_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.5 on 2026-10-19 15:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tools', '0002_mensagemsessao'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='artigosfonte',
+            name='atualizado_em_api',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='artigosfonte',
+            name='hash_conteudo',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
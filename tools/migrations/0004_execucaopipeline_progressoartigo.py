@@ -0,0 +1,45 @@
+# Generated by Django 5.2.5 on 2026-10-19 19:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tools', '0003_artigosfonte_sincronizacao'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExecucaoPipeline',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('modo', models.CharField(max_length=16)),
+                ('completo', models.BooleanField(default=False)),
+                ('status', models.CharField(default='em_andamento', max_length=16)),
+                ('filtro', models.CharField(blank=True, default='', max_length=255)),
+                ('marca', models.DateTimeField(blank=True, null=True)),
+                ('resumo', models.JSONField(blank=True, null=True)),
+                ('erro', models.TextField(blank=True, default='')),
+                ('iniciada_em', models.DateTimeField(auto_now_add=True)),
+                ('terminada_em', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ProgressoArtigo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('artigo_id', models.IntegerField(unique=True)),
+                ('etapa', models.CharField(max_length=16)),
+                ('tentativas', models.PositiveIntegerField(default=0)),
+                ('descartado', models.BooleanField(default=False)),
+                ('erro', models.TextField(blank=True, default='')),
+                ('atualizado_em', models.DateTimeField(auto_now=True)),
+                ('execucao', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='progresso', to='tools.execucaopipeline')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['descartado', 'etapa'], name='progresso_artigo_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.5 on 2026-10-19 21:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tools', '0004_execucaopipeline_progressoartigo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TravaSessao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sessao_id', models.CharField(max_length=64, unique=True)),
+                ('dono', models.CharField(max_length=32)),
+                ('expira_em', models.DateTimeField()),
+            ],
+        ),
+    ]
@@ -6,6 +6,10 @@ class ArtigosFonte(models.Model):
     menu = models.CharField(max_length=255)
     titulo = models.CharField(max_length=255)
     conteudo_bruto = models.TextField()
+    # Estado da sincronização: data de alteração informada pela Movidesk e
+    # hash de título, menu e conteúdo (só um hash diferente reprocessa o artigo)
+    atualizado_em_api = models.DateTimeField(null=True, blank=True)
+    hash_conteudo = models.CharField(max_length=64, blank=True, default="")
     criado_em = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
@@ -25,3 +29,66 @@ class ArtigoProcessado(models.Model):
 
     def __str__(self):
         return f"{self.fonte.titulo} [trecho {self.indice_trecho}]"
+
+
+class MensagemSessao(models.Model):
+    sessao_id = models.CharField(max_length=64)
+    tipo = models.CharField(max_length=16)
+    conteudo = models.TextField()
+    extras = models.JSONField(null=True, blank=True)
+
+    criado_em = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["sessao_id", "id"], name="mensagem_sessao_idx")]
+
+    def __str__(self):
+        return f"{self.sessao_id} [{self.tipo}]"
+
+
+class ExecucaoPipeline(models.Model):
+    # Uma por execução do runpipeline.py; a que não chegou a "concluida" é retomada pela próxima
+    modo = models.CharField(max_length=16)
+    completo = models.BooleanField(default=False)
+    status = models.CharField(max_length=16, default="em_andamento")
+    # $filter da descoberta e updatedDate do último artigo gravado (de onde a listagem continua)
+    filtro = models.CharField(max_length=255, blank=True, default="")
+    marca = models.DateTimeField(null=True, blank=True)
+    resumo = models.JSONField(null=True, blank=True)
+    erro = models.TextField(blank=True, default="")
+
+    iniciada_em = models.DateTimeField(auto_now_add=True)
+    terminada_em = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Execução #{self.pk} ({self.modo}, {self.status})"
+
+
+class ProgressoArtigo(models.Model):
+    artigo_id = models.IntegerField(unique=True)
+    execucao = models.ForeignKey(ExecucaoPipeline, on_delete=models.SET_NULL, null=True, blank=True,
+                                 related_name="progresso")
+    # coletado -> gravado -> trechos -> concluido; `descartado` tira o artigo do pipeline
+    etapa = models.CharField(max_length=16)
+    tentativas = models.PositiveIntegerField(default=0)
+    descartado = models.BooleanField(default=False)
+    erro = models.TextField(blank=True, default="")
+
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["descartado", "etapa"], name="progresso_artigo_idx")]
+
+    def __str__(self):
+        return f"Artigo {self.artigo_id} [{self.etapa}]"
+
+
+class TravaSessao(models.Model):
+    # Turno em andamento de uma sessão, valendo entre processos; sai do banco
+    # na mesma transação que grava as mensagens do turno (ou vence em `expira_em`)
+    sessao_id = models.CharField(max_length=64, unique=True)
+    dono = models.CharField(max_length=32)
+    expira_em = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.sessao_id} [{self.dono}]"
@@ -2,122 +2,610 @@ from langgraph.graph import StateGraph, END
 from langchain_openai import OpenAI, OpenAIEmbeddings
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from tools.models import ArtigosFonte, ArtigoProcessado
-import requests, time
-import os
+from django.db import transaction
+from django.db.models import Max
 from dotenv import load_dotenv
+import os
+import time
+import queue
+import asyncio
+import hashlib
+import threading
+from itertools import islice
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+import rate_limiter
+from movidesk_client import (
+    CAMPOS_ARTIGO, ColetorMovidesk, buscar_artigos, filtro_atualizados_desde, interpretar_data, listar_artigos,
+)
+from tools import execucoes
 
 load_dotenv()   
 
-# Carrega token do ambiente ou usa valor padrão
-TOKEN = os.getenv("MOVIDESK_TOKEN", "b8ad37b5-67e9-485c-acab-ca7a657090f2")
-BASE_URL = "https://api.movidesk.com/public/v1/article"
-embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
+# Token e endereço da Movidesk: MOVIDESK_TOKEN / MOVIDESK_BASE_URL (ver movidesk_client)
+embeddings = OpenAIEmbeddings(model="text-embedding-3-small", **rate_limiter.opcoes_embeddings())
 splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
 
+# Gravações no banco em lotes: uma transação (e um fsync do SQLite) por lote, não por linha.
+# Embeddings: vários trechos por requisição (limitados por tokens estimados e por quantidade)
+# e alguns lotes em voo ao mesmo tempo, sob o limitador compartilhado
+PIPELINE_CONFIG = {
+    "lote_banco": int(os.getenv("PIPELINE_DB_BATCH", "500")),
+    "tokens_lote_embeddings": int(os.getenv("EMBEDDING_BATCH_TOKENS", "20000")),
+    "trechos_lote_embeddings": int(os.getenv("EMBEDDING_BATCH_SIZE", "256")),
+    "lotes_simultaneos": int(os.getenv("EMBEDDING_CONCURRENT_BATCHES", "4")),
+    # Modo em fluxo: itens (artigos ou trechos) que cada fila segura antes de frear a etapa anterior
+    "tamanho_fila": int(os.getenv("PIPELINE_QUEUE_SIZE", "1000")),
+    # Falhas de um artigo antes de ir para a lista de descartados
+    "max_tentativas": int(os.getenv("PIPELINE_MAX_ATTEMPTS", "3")),
+}
+
+# Contagens devolvidas por `gravar_fontes`
+CONTAGENS_FONTES = ("novos", "alterados", "sem_mudanca", "invalidos", "desatualizados")
+# Campos reescritos quando um artigo já existente muda
+CAMPOS_FONTE_ATUALIZADOS = ["titulo", "menu", "conteudo_bruto", "atualizado_em_api", "hash_conteudo"]
+
+def get_pipeline_config():
+    """Retorna a configuração do pipeline de ingestão."""
+    return PIPELINE_CONFIG
+
 
 class Estado(dict):
     artigos: list
+    completo: bool
+    execucao: object
+    resumo: dict
     
 
+def hash_artigo(titulo, menu, conteudo):
+    """Hash do que vira trecho: só um hash diferente leva a re-chunk e re-embedding."""
+    return hashlib.sha256("\0".join([titulo or "", menu or "", conteudo or ""]).encode("utf-8")).hexdigest()
+
+def campos_fonte(artigo_json):
+    """Campos de `ArtigosFonte` a partir do JSON da API."""
+    titulo = artigo_json["title"]
+    # Da API as categorias vêm como objetos; nos arquivos exportados, só o nome
+    menu = ", ".join([cat.get("name", "") if isinstance(cat, dict) else str(cat)
+                      for cat in artigo_json.get("categories") or []])
+    conteudo = artigo_json.get("contentText") or ""
+    return {
+        "titulo": titulo,
+        "menu": menu,
+        "conteudo_bruto": conteudo,
+        "atualizado_em_api": interpretar_data(artigo_json.get("updatedDate")),
+        "hash_conteudo": hash_artigo(titulo, menu, conteudo),
+    }
+
+def filtro_descoberta(completo=False):
+    """
+    `$filter` da descoberta: artigos alterados desde o último já gravado.
+
+    A listagem vem em ordem de `updatedDate`, então os artigos gravados são
+    sempre um prefixo dela e a maior data gravada é uma marca d'água segura
+    (mesmo depois de uma execução interrompida). Sem marca d'água, com
+    artigos de antes da sincronização (sem hash nem data) ou com `completo`,
+    lista a base inteira. Um artigo que a própria API devolve sem
+    `updatedDate` fica sem data, mas com hash, e não força a base inteira.
+    """
+    if completo or ArtigosFonte.objects.filter(atualizado_em_api__isnull=True, hash_conteudo="").exists():
+        return None
+    desde = ArtigosFonte.objects.aggregate(maior=Max("atualizado_em_api"))["maior"]
+    return filtro_atualizados_desde(desde) if desde else None
+
+
+def _em_lotes(itens, tamanho):
+    for inicio in range(0, len(itens), tamanho):
+        yield itens[inicio:inicio + tamanho]
+
+def gravar_fontes(artigos_json, tamanho_lote=None, execucao=None, da_listagem=False):
+    """
+    Grava os artigos da API em `ArtigosFonte`, um lote por transação.
+
+    Artigos novos ou com hash diferente entram num upsert em massa (por
+    `artigo_id`) e perdem os trechos antigos na mesma transação; os de mesmo
+    hash só têm a data atualizada. Um artigo com JSON inválido fica de fora
+    (e conta uma falha na `execucao`, se houver) sem derrubar o lote.
+
+    Um artigo mais antigo que o do banco (updatedDate menor, ou ausente quando
+    o banco tem data, como num export antigo) é ignorado: uma importação não
+    desfaz conteúdo mais novo nem apaga a data que a marca d'água usa.
+
+    Com `da_listagem` (artigos na ordem da listagem por `updatedDate`), a
+    marca da `execucao` avança na mesma transação de cada lote.
+
+    Returns:
+        tuple: (fontes novas ou alteradas, {"novos", "alterados", "sem_mudanca", "invalidos", "desatualizados"})
+    """
+    tamanho_lote = tamanho_lote or PIPELINE_CONFIG["lote_banco"]
+    existentes = {
+        artigo_id: (pk, hash_conteudo, atualizado_em_api)
+        for artigo_id, pk, hash_conteudo, atualizado_em_api
+        in ArtigosFonte.objects.values_list("artigo_id", "pk", "hash_conteudo", "atualizado_em_api")
+    }
+    contagens = dict.fromkeys(CONTAGENS_FONTES, 0)
+    fontes = []
+    for lote in _em_lotes(artigos_json, tamanho_lote):
+        gravar, so_data, alterados, invalidos, datas = {}, [], [], {}, []
+        for artigo_json in lote:
+            try:
+                artigo_id = int(artigo_json["id"])
+                campos = campos_fonte(artigo_json)
+            except (KeyError, TypeError, ValueError, AttributeError) as e:
+                # JSON sem ID, sem título, com data inválida...: fica de fora e o resto do lote segue
+                contagens["invalidos"] += 1
+                print(f"Artigo inválido ignorado: {e!r}")
+                if isinstance(artigo_json, dict) and isinstance(artigo_json.get("id"), int):
+                    invalidos[artigo_json["id"]] = repr(e)
+                continue
+            existente = existentes.get(artigo_id)
+            data = campos["atualizado_em_api"]
+            if data is not None:
+                datas.append(data)
+            if existente is not None and existente[2] is not None and (data is None or data < existente[2]):
+                # O banco já tem uma versão mais nova: nem conteúdo nem data voltam para trás
+                contagens["desatualizados"] += 1
+                continue
+            if existente is not None and existente[1] == campos["hash_conteudo"]:
+                # Só a data mudou (ou é o artigo da marca d'água): trechos e embeddings continuam valendo
+                if data is not None and data != existente[2]:
+                    so_data.append(ArtigosFonte(pk=existente[0], atualizado_em_api=data))
+                contagens["sem_mudanca"] += 1
+                continue
+            # Um mesmo artigo repetido no lote: vale o último (o upsert não aceita duplicatas)
+            gravar[artigo_id] = ArtigosFonte(artigo_id=artigo_id, **campos)
+            if existente is not None:
+                alterados.append(existente[0])
+
+        with transaction.atomic():
+            if so_data:
+                ArtigosFonte.objects.bulk_update(so_data, ["atualizado_em_api"])
+            if gravar:
+                ArtigosFonte.objects.bulk_create(
+                    list(gravar.values()), update_conflicts=True,
+                    unique_fields=["artigo_id"], update_fields=CAMPOS_FONTE_ATUALIZADOS,
+                )
+            if alterados:
+                # Trechos do conteúdo anterior saem junto com a atualização; `processar` recria
+                ArtigoProcessado.objects.filter(fonte_id__in=alterados).delete()
+            if execucao is not None:
+                execucao.gravados(list(gravar))
+                execucao.falhas(invalidos, "coletado")
+                if da_listagem and datas:
+                    execucao.avancar_marca(max(datas))
+        contagens["alterados"] += len(set(alterados))
+        contagens["novos"] += len(gravar) - len(set(alterados))
+        if gravar:
+            gravadas = list(ArtigosFonte.objects.filter(artigo_id__in=list(gravar)))
+            fontes.extend(gravadas)
+            # Repetições em lotes seguintes comparam com o que acabou de ser gravado
+            existentes.update({fonte.artigo_id: (fonte.pk, fonte.hash_conteudo, fonte.atualizado_em_api)
+                               for fonte in gravadas})
+    return fontes, contagens
+
+def gravar_trechos(artigos, tamanho_lote=None, execucao=None):
+    """
+    Divide os artigos em trechos e grava com upsert em (fonte, indice_trecho).
+
+    Os artigos entram em lotes de cerca de `tamanho_lote` trechos, cada lote
+    numa transação (com o progresso da `execucao`, se houver); um trecho
+    regravado volta a ficar sem embedding e os trechos além do novo fim do
+    artigo são apagados.
+
+    Returns:
+        int: Trechos gravados
+    """
+    tamanho_lote = tamanho_lote or PIPELINE_CONFIG["lote_banco"]
+    total = 0
+    trechos, quantidades = [], {}
+
+    def descarregar():
+        with transaction.atomic():
+            com_trechos = set(ArtigoProcessado.objects.filter(fonte_id__in=list(quantidades))
+                              .values_list("fonte_id", flat=True).distinct())
+            ArtigoProcessado.objects.bulk_create(
+                trechos, batch_size=tamanho_lote, update_conflicts=True,
+                unique_fields=["fonte", "indice_trecho"], update_fields=["conteudo_limpo", "embedding"],
+            )
+            for fonte_id in com_trechos:
+                ArtigoProcessado.objects.filter(fonte_id=fonte_id, indice_trecho__gte=quantidades[fonte_id]).delete()
+            if execucao is not None:
+                # Artigo sem conteúdo não tem trecho para embeddar: já termina aqui
+                execucao.com_trechos([fonte_id for fonte_id, qtd in quantidades.items() if qtd])
+                execucao.concluidos([fonte_id for fonte_id, qtd in quantidades.items() if not qtd])
+
+    for artigo in artigos:
+        chunks = splitter.split_text(artigo.conteudo_bruto or "")
+        trechos.extend(
+            ArtigoProcessado(fonte_id=artigo.pk, indice_trecho=idx, conteudo_limpo=chunk, embedding=None)
+            for idx, chunk in enumerate(chunks)
+        )
+        quantidades[artigo.pk] = len(chunks)
+        if len(trechos) >= tamanho_lote:
+            descarregar()
+            total += len(trechos)
+            trechos, quantidades = [], {}
+    if quantidades:
+        descarregar()
+        total += len(trechos)
+    return total
+
+def gravar_embeddings(trechos, tamanho_lote=None, execucao=None):
+    """
+    Grava os vetores dos trechos com `bulk_update`, numa transação.
+
+    Com `execucao`, os artigos que ficaram com todos os trechos com vetor
+    passam a "concluido" na mesma transação.
+    """
+    with transaction.atomic():
+        ArtigoProcessado.objects.bulk_update(trechos, ["embedding"], batch_size=tamanho_lote or PIPELINE_CONFIG["lote_banco"])
+        if execucao is not None:
+            fonte_ids = {trecho.fonte_id for trecho in trechos}
+            faltando = set(ArtigoProcessado.objects.filter(fonte_id__in=fonte_ids, embedding__isnull=True)
+                           .values_list("fonte_id", flat=True))
+            execucao.concluidos(fonte_ids - faltando)
+
+def _embeddar_agora(lote):
+    """`embed_documents` nesta thread, com o resultado num Future (como os do executor)."""
+    futuro = Future()
+    try:
+        futuro.set_result(embeddings.embed_documents([t.conteudo_limpo for t in lote], chunk_size=len(lote)))
+    except Exception as e:
+        futuro.set_exception(e)
+    return futuro
+
+def _registrar_lote_embeddings(lote, futuro, resumo, execucao=None):
+    """Grava um lote de embeddings que voltou (ou conta a falha dele) e atualiza o resumo."""
+    try:
+        vetores = futuro.result()
+    except Exception as e:
+        por_fonte = {}
+        for trecho in lote:
+            por_fonte.setdefault(trecho.fonte_id, []).append(trecho)
+        if execucao is not None and len(por_fonte) > 1:
+            # Antes de contar falha para todos, isola o artigo que derrubou o lote: um por vez
+            for trechos in por_fonte.values():
+                _registrar_lote_embeddings(trechos, _embeddar_agora(trechos), resumo, execucao)
+            return
+        # O lote continua sem vetor e volta na próxima execução (até o limite de tentativas)
+        resumo["falhas"] += 1
+        print(f"Erro ao gerar embeddings de {len(lote)} trechos: {e}")
+        if execucao is not None:
+            execucao.falhas_fontes({trecho.fonte_id for trecho in lote}, repr(e), "trechos")
+        return
+    for trecho, vetor in zip(lote, vetores):
+        trecho.embedding = vetor
+    gravar_embeddings(lote, execucao=execucao)
+    resumo["trechos"] += len(lote)
+    resumo["lotes"] += 1
+
+def estimar_tokens_texto(texto):
+    """Estimativa de tokens do texto (~4 caracteres por token, como no limitador)."""
+    return len(texto) // 4 + 1
+
+def lotes_por_tokens(trechos, max_tokens, max_trechos):
+    """Agrupa os trechos em lotes de até `max_tokens` estimados e `max_trechos` itens."""
+    lote, tokens = [], 0
+    for trecho in trechos:
+        estimativa = estimar_tokens_texto(trecho.conteudo_limpo)
+        if lote and (tokens + estimativa > max_tokens or len(lote) >= max_trechos):
+            yield lote
+            lote, tokens = [], 0
+        lote.append(trecho)
+        tokens += estimativa
+    if lote:
+        yield lote
+
+def _trechos_pendentes(tamanho_leitura):
+    """Trechos sem vetor em ordem de id, lidos do banco aos poucos (fora os de artigos descartados)."""
+    ultimo = 0
+    while True:
+        leitura = list(ArtigoProcessado.objects.filter(embedding__isnull=True, id__gt=ultimo)
+                       .exclude(fonte__artigo_id__in=execucoes.ids_descartados())
+                       .order_by("id").only("id", "fonte_id", "conteudo_limpo")[:tamanho_leitura])
+        if not leitura:
+            return
+        yield from leitura
+        ultimo = leitura[-1].id
+
+def embeddar_pendentes(max_tokens=None, max_trechos=None, simultaneos=None, execucao=None):
+    """
+    Gera os embeddings de todos os trechos sem vetor.
+
+    Os lotes vão para `embed_documents` em até `simultaneos` threads (o
+    limitador compartilhado segura o ritmo e as novas tentativas), e cada
+    lote é gravado assim que volta, numa transação. Uma execução
+    interrompida perde no máximo os lotes em voo: o que foi gravado já tem
+    vetor e não é pedido de novo.
+
+    Returns:
+        dict: trechos, lotes, falhas, segundos e trechos por segundo
+    """
+    max_tokens = max_tokens or PIPELINE_CONFIG["tokens_lote_embeddings"]
+    max_trechos = max_trechos or PIPELINE_CONFIG["trechos_lote_embeddings"]
+    simultaneos = simultaneos or PIPELINE_CONFIG["lotes_simultaneos"]
+    lotes = lotes_por_tokens(_trechos_pendentes(PIPELINE_CONFIG["lote_banco"]), max_tokens, max_trechos)
+
+    resumo = {"trechos": 0, "lotes": 0, "falhas": 0}
+    inicio = time.perf_counter()
+    # As threads só chamam a API; o banco é gravado nesta thread
+    with ThreadPoolExecutor(max_workers=simultaneos, thread_name_prefix="embeddings") as executor:
+        em_voo = {}
+
+        def enviar_proximo():
+            lote = next(lotes, None)
+            if lote is not None:
+                futuro = executor.submit(embeddings.embed_documents, [t.conteudo_limpo for t in lote],
+                                         chunk_size=len(lote))
+                em_voo[futuro] = lote
+
+        for _ in range(simultaneos):
+            enviar_proximo()
+        while em_voo:
+            prontos, _ = wait(em_voo, return_when=FIRST_COMPLETED)
+            for futuro in prontos:
+                _registrar_lote_embeddings(em_voo.pop(futuro), futuro, resumo, execucao)
+                enviar_proximo()
+
+    duracao = time.perf_counter() - inicio
+    resumo["segundos"] = round(duracao, 3)
+    resumo["trechos_por_segundo"] = round(resumo["trechos"] / duracao, 1) if duracao else 0.0
+    return resumo
+
+
+def importar_artigos(artigos_json, tamanho_lote=None):
+    """
+    Grava artigos vindos de um iterável qualquer (ex.: `ler_arquivo_artigos`), lote a lote.
+
+    Cada lote passa por `gravar_fontes` e, os novos ou alterados, por
+    `gravar_trechos`; os embeddings ficam pendentes para `embeddar_pendentes`.
+    Só um lote fica em memória por vez.
+
+    Returns:
+        dict: contagens da gravação e trechos gravados
+    """
+    tamanho_lote = tamanho_lote or PIPELINE_CONFIG["lote_banco"]
+    artigos_json = iter(artigos_json)
+    resumo = {**dict.fromkeys(CONTAGENS_FONTES, 0), "trechos": 0}
+    while lote := list(islice(artigos_json, tamanho_lote)):
+        fontes, contagens = gravar_fontes(lote, tamanho_lote)
+        for chave, valor in contagens.items():
+            resumo[chave] += valor
+        resumo["trechos"] += gravar_trechos(fontes, tamanho_lote)
+    return resumo
+
+
+# --- MODO EM FLUXO ---
+
+_FIM = object()
+
+def executar_streaming(completo=False, tamanho_fila=None, execucao=None):
+    """
+    Ingestão em fluxo: coleta, gravação (com os trechos) e embeddings ao mesmo tempo.
+
+    Em vez de cada nó do grafo terminar antes do próximo começar, os
+    artigos passam por filas limitadas:
+
+        listagem (thread) -> artigos -> gravação e trechos (esta thread)
+            -> trechos -> embeddings (thread + lotes em voo) -> vetores -> gravação
+
+    Fila cheia segura a etapa anterior, então a memória fica limitada pelas
+    filas, pela página da listagem e pelos lotes em voo, e o tempo total
+    tende ao da etapa mais lenta. Todo acesso ao banco fica nesta thread (o
+    SQLite aceita um escritor por vez); as outras só falam com as APIs.
+    Com `execucao`, a listagem parte do filtro dela e cada lote gravado
+    avança a marca de onde uma retomada continua.
+
+    Returns:
+        dict: contagens da gravação, trechos, lotes, falhas e tempos
+    """
+    tamanho_fila = tamanho_fila or PIPELINE_CONFIG["tamanho_fila"]
+    tamanho_lote = PIPELINE_CONFIG["lote_banco"]
+    simultaneos = PIPELINE_CONFIG["lotes_simultaneos"]
+    filtro = execucao.filtro_listagem() if execucao is not None else filtro_descoberta(completo)
+    print(f"--- 🌊 INGESTÃO EM FLUXO: {filtro or 'base completa'} ---")
+
+    fila_artigos = queue.Queue(maxsize=tamanho_fila)
+    fila_trechos = queue.Queue(maxsize=tamanho_fila)
+    # Sem limite próprio: só entra o que saiu de uma vaga, e a vaga só volta depois da gravação
+    fila_vetores = queue.Queue()
+    vagas = threading.Semaphore(simultaneos)
+    parar = threading.Event()
+    erros_coleta, erros_embeddings = [], []
+    resumo_coleta = {}
+    resumo = {**dict.fromkeys(CONTAGENS_FONTES, 0), "trechos": 0, "lotes": 0, "falhas": 0}
+    inicio = time.perf_counter()
+
+    def colocar(fila, item):
+        # put que desiste se a execução foi interrompida
+        while not parar.is_set():
+            try:
+                fila.put(item, timeout=0.2)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def coletar():
+        async def listar():
+            async with ColetorMovidesk() as coletor:
+                try:
+                    async for artigo in coletor.listar(CAMPOS_ARTIGO, filtro, ordem="updatedDate"):
+                        # Espera bloqueante de propósito: com a fila cheia, a próxima página não é pedida
+                        if not colocar(fila_artigos, artigo):
+                            return
+                finally:
+                    resumo_coleta.update(coletor.resumo())
+        try:
+            asyncio.run(listar())
+        except Exception as e:
+            erros_coleta.append(e)
+        finally:
+            colocar(fila_artigos, _FIM)
+
+    def embeddar():
+        def recebidos():
+            while not parar.is_set():
+                try:
+                    trecho = fila_trechos.get(timeout=0.2)
+                except queue.Empty:
+                    continue
+                if trecho is _FIM:
+                    return
+                yield trecho
+
+        try:
+            with ThreadPoolExecutor(max_workers=simultaneos, thread_name_prefix="embeddings") as executor:
+                lotes = lotes_por_tokens(recebidos(), PIPELINE_CONFIG["tokens_lote_embeddings"],
+                                         PIPELINE_CONFIG["trechos_lote_embeddings"])
+                for lote in lotes:
+                    while not vagas.acquire(timeout=0.2):
+                        if parar.is_set():
+                            return
+                    futuro = executor.submit(embeddings.embed_documents, [t.conteudo_limpo for t in lote],
+                                             chunk_size=len(lote))
+                    futuro.add_done_callback(lambda f, lote=lote: fila_vetores.put((lote, f)))
+        except Exception as e:
+            erros_embeddings.append(e)
+
+    def gravar_vetores(espera=0):
+        # Grava os lotes de embeddings que já voltaram (esperando até `espera` s pelo primeiro)
+        while True:
+            try:
+                lote, futuro = fila_vetores.get(timeout=espera) if espera else fila_vetores.get_nowait()
+            except queue.Empty:
+                return
+            espera = 0
+            # Com falha, o lote continua sem vetor: `embeddar_pendentes` tenta de novo no fim
+            _registrar_lote_embeddings(lote, futuro, resumo, execucao)
+            vagas.release()
+
+    def enviar(item):
+        # Fila de trechos cheia: enquanto espera, grava o que os embeddings devolveram
+        while not parar.is_set():
+            try:
+                fila_trechos.put(item, timeout=0.05)
+                return
+            except queue.Full:
+                gravar_vetores()
+            if not threads[1].is_alive():
+                # Ninguém mais esvazia a fila: falha em vez de esperar para sempre
+                erro = erros_embeddings[0] if erros_embeddings else None
+                raise RuntimeError(f"A etapa de embeddings parou: {erro!r}") from erro
+
+    def gravar_artigos(lote):
+        fontes, contagens = gravar_fontes(lote, tamanho_lote, execucao, da_listagem=True)
+        for chave, valor in contagens.items():
+            resumo[chave] += valor
+        if fontes:
+            gravar_trechos(fontes, tamanho_lote, execucao)
+        for trecho in (ArtigoProcessado.objects.filter(fonte__in=fontes, embedding__isnull=True)
+                       .order_by("id").only("id", "fonte_id", "conteudo_limpo")):
+            enviar(trecho)
+
+    threads = [threading.Thread(target=coletar, name="coleta", daemon=True),
+               threading.Thread(target=embeddar, name="embeddings", daemon=True)]
+    for thread in threads:
+        thread.start()
+    try:
+        lote = []
+        while True:
+            gravar_vetores()
+            try:
+                artigo = fila_artigos.get(timeout=0.05)
+            except queue.Empty:
+                # Coleta mais lenta que a gravação: grava o lote parcial em vez de esperar
+                if lote:
+                    gravar_artigos(lote)
+                    lote = []
+                continue
+            if artigo is _FIM:
+                break
+            lote.append(artigo)
+            if len(lote) >= tamanho_lote:
+                gravar_artigos(lote)
+                lote = []
+        if lote:
+            gravar_artigos(lote)
+        enviar(_FIM)
+        while threads[1].is_alive() or not fila_vetores.empty():
+            gravar_vetores(espera=0.1)
+    finally:
+        parar.set()
+        for thread in threads:
+            thread.join()
+
+    for erro in erros_coleta:
+        print(f"Erro geral na coleta: {erro}")
+        resumo["erro_coleta"] = repr(erro)
+    for erro in erros_embeddings:
+        # O que ficou sem vetor vai para `embeddar_pendentes` logo abaixo
+        print(f"Erro geral nos embeddings: {erro}")
+    # Sobras: artigos sem trechos e trechos sem vetor (lotes com falha, execuções interrompidas)
+    gravar_trechos(list(ArtigosFonte.objects.filter(trechos__isnull=True)), tamanho_lote, execucao)
+    sobras = embeddar_pendentes(execucao=execucao)
+
+    duracao = time.perf_counter() - inicio
+    resumo["trechos"] += sobras["trechos"]
+    resumo["lotes"] += sobras["lotes"]
+    resumo["falhas"] = sobras["falhas"]
+    resumo["paginas"] = resumo_coleta.get("paginas", 0)
+    resumo["segundos_coleta"] = resumo_coleta.get("segundos", 0.0)
+    resumo["segundos"] = round(duracao, 3)
+    resumo["trechos_por_segundo"] = round(resumo["trechos"] / duracao, 1) if duracao else 0.0
+    print(f"--- {resumo['novos']} novos, {resumo['alterados']} alterados, {resumo['sem_mudanca']} com o mesmo conteúdo; "
+          f"{resumo['trechos']} trechos com embedding em {resumo['segundos']} s "
+          f"({resumo['trechos_por_segundo']} trechos/s, {resumo['falhas']} lotes com falha) ---")
+    return resumo
+
+
 #nó nº 1  - coleta dos dados 
 
 def coletar_artigos(state: Estado):
-    # Lista completa de IDs dos artigos para buscar
-    LISTA_DE_IDS = [
-        551342, 382259, 123456, 553732, 552295, 552283, 551342, 549123, 549113, 545088,
-        545081, 542294, 540901, 540741, 535331, 535031, 534770, 534371, 532878, 532701,
-        531946, 531905, 527637, 527394, 526187, 526182, 525273, 525124, 524512, 520637,
-        514332, 514329, 512752, 512743, 512740, 512731, 512727, 511873, 503742, 503735,
-        502190, 501916, 498480, 498466, 498441, 497559, 495387, 494625, 488361, 481672,
-        481665, 476297, 474681, 474320, 471623, 471620, 471619, 471614, 471605, 471603,
-        469958, 466730, 466604, 465801, 464712, 464711, 462438, 462249, 462207, 462200,
-        462132, 462067, 458694, 458561, 458187, 458163, 458071, 457707, 457602, 457312,
-        457247, 457245, 457225, 457104, 456627, 456289, 456286, 456284, 456274, 455767,
-        455750, 455618, 455293, 455283, 453824, 451576, 449478, 449153, 449126, 448564,
-        448551, 448547, 447773, 447632, 447377, 446595, 445642, 444400, 443874, 443711,
-        441461, 441453, 441384, 441382, 441336, 441311, 441298, 441293, 440855, 440852,
-        440629, 439892, 439690, 439689, 438961, 438560, 438145, 435547, 434602, 434571,
-        432965, 431742, 431741, 431740, 431739, 431737, 431734, 430184, 430182, 430180,
-        429910, 429908, 429905, 429904, 429869, 429868, 429867, 429866, 429864, 429863,
-        429860, 426870, 426869, 426868, 426866, 426865, 426862, 426861, 426860, 426859,
-        426857, 426856, 426855, 426853, 426852, 426849, 426840, 426839, 426838, 426836,
-        426832, 426830, 426828, 426824, 426823, 426814, 426792, 426711, 426179, 425946,
-        424766, 422216, 421725, 421613, 421538, 419712, 419249, 419086, 418777, 415379,
-        414818, 414041, 413990, 412161, 410433, 409123, 409102, 409094, 23068, 23066,
-        23065, 20223, 19202, 19176, 18641, 18223, 18039, 18035, 17944, 17870, 17771,
-        17746, 17625, 17606, 17605, 17598, 17582, 17421, 17132, 17113, 17106, 17028,
-        17013, 16963, 16956, 16945, 16933, 16930, 16920, 16905, 16898, 16796, 16789,
-        16787, 16752, 7116, 6493
-    ]
-    
     artigos = []
-    total_ids = len(LISTA_DE_IDS)
+    contagens = dict.fromkeys(CONTAGENS_FONTES, 0)
+    execucao = state.get("execucao")
     
-    print(f"--- INICIANDO BUSCA DE {total_ids} ARTIGOS ESPECÍFICOS ---")
+    filtro = execucao.filtro_listagem() if execucao is not None else filtro_descoberta(state.get("completo"))
+    print(f"--- DESCOBRINDO ARTIGOS: {filtro or 'base completa'} ---")
     
     try:
-        for i, id_atual in enumerate(LISTA_DE_IDS):
-            url = f"{BASE_URL}/{id_atual}?token={TOKEN}"
-            
-            print(f"Processando {i + 1}/{total_ids} - Tentando ID: {id_atual}...")
-            
-            try:
-                r = requests.get(url, timeout=30)
-                
-                if r.status_code == 200:
-                    artigo_json = r.json()
-                    
-                    fonte, _ = ArtigosFonte.objects.update_or_create(
-                        artigo_id=artigo_json["id"],
-                        defaults={
-                            "titulo": artigo_json["title"],
-                            "conteudo_bruto": artigo_json.get("contentText", ""),
-                            "menu": ", ".join([cat.get("name", "") for cat in artigo_json.get("categories", [])]),
-                        },
-                    )
-                    artigos.append(fonte)
-                    print(f"  -> SUCESSO! Artigo '{artigo_json['title']}' encontrado.")
-                    
-                elif r.status_code == 404:
-                    print(f"  -> Artigo ID {id_atual} não encontrado (404)")
-                    
-                else:
-                    print(f"  -> Erro {r.status_code} para ID {id_atual}")
-                    
-            except requests.exceptions.JSONDecodeError as e:
-                print(f"Erro ao decodificar JSON para ID {id_atual}: {e}")
-            except requests.exceptions.RequestException as e:
-                print(f"Erro na requisição HTTP para ID {id_atual}: {e}")
-            
-            time.sleep(0.5)  # Pausa entre requisições
+        # Só os campos usados, em páginas grandes: uma requisição por página, não por artigo
+        listados, resumo = listar_artigos(CAMPOS_ARTIGO, filtro=filtro, ordem="updatedDate")
+        print(f"--- {len(listados)} artigos em {resumo['paginas']} páginas ({resumo['segundos']} s) ---")
+        # Lote a lote, avançando (na mesma transação) a marca de onde uma retomada continua
+        for lote in _em_lotes(listados, PIPELINE_CONFIG["lote_banco"]):
+            fontes, contagens_lote = gravar_fontes(lote, execucao=execucao, da_listagem=True)
+            artigos.extend(fontes)
+            for chave, valor in contagens_lote.items():
+                contagens[chave] += valor
             
     except Exception as e:
         print(f"Erro geral na coleta: {e}")
-            
+        contagens["erro_coleta"] = repr(e)
+    
+    print(f"--- {contagens['novos']} novos, {contagens['alterados']} alterados, "
+          f"{contagens['sem_mudanca']} com o mesmo conteúdo, {contagens['invalidos']} inválidos, "
+          f"{contagens['desatualizados']} mais antigos que o banco ---")
     state["artigos"] = artigos
+    state["resumo"] = contagens
     return state
 
 # Nó 2 - Processamento
 def processar_artigos(state: Estado):
-    for artigo in state["artigos"]:
-        if artigo.trechos.exists():
-            continue
-        chunks = splitter.split_text(artigo.conteudo_bruto or "")
-        for idx, chunk in enumerate(chunks):
-            ArtigoProcessado.objects.create(
-                fonte=artigo,
-                indice_trecho=idx,
-                conteudo_limpo=chunk,
-            )
+    # Novos/alterados desta execução e os que ficaram sem trechos (execução interrompida)
+    pendentes = {artigo.pk: artigo for artigo in state["artigos"]}
+    for artigo in ArtigosFonte.objects.filter(trechos__isnull=True):
+        pendentes.setdefault(artigo.pk, artigo)
+    gravar_trechos(list(pendentes.values()), execucao=state.get("execucao"))
     return state
 
 # Nó 3 - Embeddings
 def gerar_embeddings(state: Estado):
-    for artigo in state["artigos"]:
-        for trecho in artigo.trechos.filter(embedding__isnull=True):
-            vetor = embeddings.embed_query(trecho.conteudo_limpo)
-            trecho.embedding = vetor
-            trecho.save()
+    # Todo trecho ainda sem vetor: os recriados agora e os de execuções interrompidas
+    resumo = embeddar_pendentes(execucao=state.get("execucao"))
+    if resumo["trechos"] or resumo["falhas"]:
+        print(f"--- {resumo['trechos']} trechos com embedding em {resumo['lotes']} lotes, {resumo['segundos']} s "
+              f"({resumo['trechos_por_segundo']} trechos/s, {resumo['falhas']} lotes com falha) ---")
+    state["resumo"] = {**(state.get("resumo") or {}), **resumo}
     return state
 
 # Construindo o grafo
@@ -133,4 +621,63 @@ workflow.add_edge("processar", "embeddings")
 workflow.add_edge("embeddings", END)
 
 pipeline = workflow.compile()
-        
\ No newline at end of file
+
+
+# --- EXECUÇÕES REGISTRADAS ---
+
+def _recoletar_falhas(execucao):
+    """Busca de novo, pelo ID, os artigos que falharam na coleta e ainda têm tentativas."""
+    ids = execucao.pendentes_coleta()
+    if not ids:
+        return
+    print(f"--- 🔁 Tentando de novo {len(ids)} artigos que falharam na coleta ---")
+    erros = {}
+
+    def ao_receber(artigo_id, artigo, erro):
+        if artigo is None:
+            erros[artigo_id] = repr(erro) if erro is not None else "Artigo não encontrado (404)"
+
+    artigos_json, _ = buscar_artigos(ids, ao_receber)
+    gravar_fontes(artigos_json, execucao=execucao)
+    execucao.falhas(erros, "coletado")
+
+def executar(completo=False, streaming=False):
+    """
+    Execução registrada do pipeline (a do `runpipeline.py`).
+
+    Retoma a última execução que não terminou (com `completo`, só se ela
+    também era completa) ou abre uma nova, tenta de novo os artigos que
+    falharam na coleta e roda o grafo (ou o modo em fluxo). Uma interrupção
+    deixa a execução para ser retomada na próxima.
+
+    Returns:
+        dict: resumo da execução
+    """
+    modo = "fluxo" if streaming else "grafo"
+    max_tentativas = PIPELINE_CONFIG["max_tentativas"]
+    execucao = execucoes.retomar_execucao(modo, max_tentativas, completo)
+    if execucao is not None:
+        print(f"--- ♻️ RETOMANDO EXECUÇÃO #{execucao.id}: {execucao.filtro_listagem() or 'base completa'} ---")
+    else:
+        execucao = execucoes.iniciar_execucao(modo, completo, filtro_descoberta(completo), max_tentativas)
+        print(f"--- EXECUÇÃO #{execucao.id} ---")
+
+    try:
+        _recoletar_falhas(execucao)
+        if streaming:
+            resumo = executar_streaming(completo, execucao=execucao)
+        else:
+            resumo = pipeline.invoke({"completo": completo, "execucao": execucao}).get("resumo")
+    except BaseException as e:
+        execucao.finalizar("interrompida", erro=repr(e))
+        raise
+    if resumo and resumo.get("erro_coleta"):
+        # A listagem não chegou ao fim: a próxima execução continua da marca
+        execucao.finalizar("interrompida", resumo, erro=resumo["erro_coleta"])
+    else:
+        execucao.finalizar(execucoes.CONCLUIDA, resumo)
+
+    descartados = execucoes.descartados().count()
+    if descartados:
+        print(f"--- ⚠️ {descartados} artigos na lista de descartados (runpipeline.py --descartados) ---")
+    return resumo
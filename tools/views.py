@@ -0,0 +1,248 @@
+"""
+API HTTP assíncrona do assistente (servida por `agentes/asgi.py`).
+
+Todas as sessões de um processo compartilham o mesmo grafo compilado e as
+mesmas bases de conhecimento; o estado de cada sessão é o histórico
+persistido em `session_history`, então qualquer processo atende qualquer
+sessão e vários workers podem rodar atrás de um balanceador:
+
+    uvicorn agentes.asgi:application --workers 4
+
+Os turnos de uma sessão são serializados pela trava no banco
+(`session_history.adquirir_trava`), não só dentro do processo: um turno
+que chega a outro worker espera o anterior terminar e ser gravado.
+
+Endpoints:
+    POST   /api/chat/            {"sessao": "...", "mensagem": "..."} -> JSON
+    POST   /api/chat/stream/     mesmo corpo -> eventos SSE (etapa, parcial, resposta)
+    DELETE /api/sessoes/<id>/    apaga o histórico da sessão
+    GET    /api/status/          fila, limitador e gravador de histórico
+
+Quando a fila de atendimento do processo está cheia, ou a sessão continua
+ocupada por outro turno depois de SESSION_LOCK_TIMEOUT_SECONDS, a API
+responde 503 com Retry-After, em vez de acumular requisições sem limite.
+
+Configuração:
+    API_WORKERS: mensagens processadas ao mesmo tempo por processo
+    API_QUEUE_SIZE: mensagens aguardando vez antes de recusar novas
+    API_QUEUE_TIMEOUT_SECONDS: espera máxima na fila
+"""
+
+import os
+import json
+import uuid
+import asyncio
+from contextlib import asynccontextmanager
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_http_methods, require_POST
+
+API_CONFIG = {
+    "workers": int(os.getenv("API_WORKERS", "8")),
+    "tamanho_fila": int(os.getenv("API_QUEUE_SIZE", "64")),
+    "espera_maxima": float(os.getenv("API_QUEUE_TIMEOUT_SECONDS", "10")),
+}
+
+def get_api_config():
+    """Retorna a configuração da API."""
+    return API_CONFIG
+
+
+class FilaCheia(Exception):
+    """A mensagem não coube na fila de atendimento do processo."""
+
+
+class SessaoOcupada(Exception):
+    """O turno anterior da sessão não terminou (ou não foi gravado) a tempo."""
+
+
+class FilaAtendimento:
+    """
+    Limita as mensagens em execução e as que aguardam vez.
+
+    Além de `workers` em execução, no máximo `tamanho_fila` esperam; as
+    demais são recusadas na hora, assim como as que esperam mais que
+    `espera_maxima`.
+    """
+
+    def __init__(self, workers=8, tamanho_fila=64, espera_maxima=10.0):
+        self.workers = workers
+        self.tamanho_fila = tamanho_fila
+        self.espera_maxima = espera_maxima
+        self._vagas = asyncio.Semaphore(workers)
+        self.aguardando = 0
+        self.em_execucao = 0
+        self.atendidas = 0
+        self.recusadas = 0
+
+    def cheia(self):
+        return self.aguardando >= self.tamanho_fila
+
+    @asynccontextmanager
+    async def vez(self):
+        if self.cheia():
+            self.recusadas += 1
+            raise FilaCheia()
+        self.aguardando += 1
+        try:
+            await asyncio.wait_for(self._vagas.acquire(), timeout=self.espera_maxima)
+        except asyncio.TimeoutError:
+            self.recusadas += 1
+            raise FilaCheia()
+        finally:
+            self.aguardando -= 1
+
+        self.em_execucao += 1
+        try:
+            yield
+        finally:
+            self.em_execucao -= 1
+            self.atendidas += 1
+            self._vagas.release()
+
+    def resumo(self):
+        return {
+            "workers": self.workers,
+            "em_execucao": self.em_execucao,
+            "aguardando": self.aguardando,
+            "atendidas": self.atendidas,
+            "recusadas": self.recusadas,
+        }
+
+fila = FilaAtendimento(API_CONFIG["workers"], API_CONFIG["tamanho_fila"], API_CONFIG["espera_maxima"])
+
+# Mensagens da mesma sessão são processadas uma de cada vez (histórico em ordem):
+# no processo pela trava asyncio, entre processos pela trava no banco
+_travas_sessao = {}
+
+@asynccontextmanager
+async def _sessao_exclusiva(sessao_id):
+    from session_history import adquirir_trava, liberar_trava
+    trava, usuarios = _travas_sessao.get(sessao_id, (asyncio.Lock(), 0))
+    _travas_sessao[sessao_id] = (trava, usuarios + 1)
+    try:
+        async with trava:
+            # Espera o turno anterior ser gravado: o próximo recarrega o histórico do banco
+            dono = await sync_to_async(adquirir_trava, thread_sensitive=False)(sessao_id)
+            if dono is None:
+                raise SessaoOcupada()
+            try:
+                yield
+            finally:
+                # Sem esperar a gravação: a trava sai do banco junto com as mensagens do turno
+                liberar_trava(sessao_id, dono)
+    finally:
+        trava, usuarios = _travas_sessao[sessao_id]
+        if usuarios == 1:
+            del _travas_sessao[sessao_id]
+        else:
+            _travas_sessao[sessao_id] = (trava, usuarios - 1)
+
+async def _criar_assistente(sessao_id):
+    """Sessão sobre o grafo compartilhado do processo (carrega a cauda do histórico)."""
+    # Importado aqui: a primeira carga traz ferramentas, bases de conhecimento e o grafo
+    from agent_graph import AssistenteMultimodalGraph
+    return await sync_to_async(AssistenteMultimodalGraph)(sessao_id=sessao_id)
+
+# --- VIEWS ---
+def _ler_corpo(request):
+    """Retorna (sessao, mensagem) do corpo JSON, ou uma resposta de erro."""
+    try:
+        dados = json.loads(request.body or b"{}")
+    except json.JSONDecodeError:
+        return None, JsonResponse({"erro": "Corpo deve ser JSON"}, status=400)
+    mensagem = (dados.get("mensagem") or "").strip()
+    if not mensagem:
+        return None, JsonResponse({"erro": "Campo 'mensagem' é obrigatório"}, status=400)
+    return (str(dados.get("sessao") or uuid.uuid4().hex), mensagem), None
+
+def _resposta_fila_cheia():
+    resposta = JsonResponse({"erro": "Servidor ocupado, tente novamente"}, status=503)
+    resposta["Retry-After"] = str(max(1, int(fila.espera_maxima)))
+    return resposta
+
+def _resposta_sessao_ocupada():
+    resposta = JsonResponse({"erro": "Sessão ocupada com outra mensagem, tente novamente"}, status=503)
+    resposta["Retry-After"] = "1"
+    return resposta
+
+def _evento_sse(nome, dados):
+    return f"event: {nome}\ndata: {json.dumps(dados, ensure_ascii=False)}\n\n"
+
+@csrf_exempt
+@require_POST
+async def chat(request):
+    """Processa uma mensagem e devolve a resposta completa."""
+    entrada, erro = _ler_corpo(request)
+    if erro:
+        return erro
+    sessao_id, mensagem = entrada
+
+    try:
+        async with fila.vez():
+            async with _sessao_exclusiva(sessao_id):
+                assistente = await _criar_assistente(sessao_id)
+                resultado = await assistente.aprocessar_mensagem(mensagem)
+    except FilaCheia:
+        return _resposta_fila_cheia()
+    except SessaoOcupada:
+        return _resposta_sessao_ocupada()
+    return JsonResponse({"sessao": sessao_id, **resultado})
+
+@csrf_exempt
+@require_POST
+async def chat_stream(request):
+    """Processa uma mensagem emitindo o progresso como Server-Sent Events."""
+    entrada, erro = _ler_corpo(request)
+    if erro:
+        return erro
+    sessao_id, mensagem = entrada
+    if fila.cheia():
+        fila.recusadas += 1
+        return _resposta_fila_cheia()
+
+    async def eventos():
+        yield _evento_sse("sessao", {"sessao": sessao_id})
+        try:
+            async with fila.vez():
+                async with _sessao_exclusiva(sessao_id):
+                    assistente = await _criar_assistente(sessao_id)
+                    async for evento in assistente.astream_mensagem(mensagem):
+                        nome = evento.pop("evento")
+                        yield _evento_sse(nome, evento)
+        except FilaCheia:
+            yield _evento_sse("erro", {"erro": "Servidor ocupado, tente novamente", "status": 503})
+        except SessaoOcupada:
+            yield _evento_sse("erro", {"erro": "Sessão ocupada com outra mensagem, tente novamente", "status": 503})
+
+    resposta = StreamingHttpResponse(eventos(), content_type="text/event-stream")
+    resposta["Cache-Control"] = "no-cache"
+    resposta["X-Accel-Buffering"] = "no"
+    return resposta
+
+@csrf_exempt
+@require_http_methods(["DELETE"])
+async def sessao(request, sessao_id):
+    """Apaga o histórico de uma sessão."""
+    from session_history import HistoricoPersistente
+    try:
+        async with _sessao_exclusiva(sessao_id):
+            historico = await sync_to_async(HistoricoPersistente)(sessao_id)
+            historico.clear()
+    except SessaoOcupada:
+        return _resposta_sessao_ocupada()
+    return JsonResponse({"sessao": sessao_id, "limpa": True})
+
+@require_GET
+async def status(request):
+    """Estatísticas do processo: fila de atendimento, limitador e histórico."""
+    import rate_limiter
+    import session_history
+    return JsonResponse({
+        "pid": os.getpid(),
+        "fila": fila.resumo(),
+        "limitador": rate_limiter.obter_estatisticas_limitador()["por_endpoint"],
+        "historico": session_history.obter_estatisticas_historico(),
+    })
@@ -0,0 +1,358 @@
+"""
+Instrumentação por requisição: tempo por nó, chamadas de LLM, tokens,
+recuperação, embeddings e acertos de cache.
+
+Cada mensagem processada gera um trace que é enviado aos sinks configurados
+(arquivo JSONL, buffer circular em memória ou qualquer objeto com `emitir`).
+Sem sink configurado nenhum trace é criado e as funções daqui retornam
+imediatamente.
+
+Configuração:
+    TRACE_SINK: "memoria", "jsonl" ou "memoria,jsonl" (vazio desativa)
+    TRACE_FILE: caminho do arquivo JSONL (padrão traces.jsonl)
+    TRACE_BUFFER_SIZE: quantidade de traces mantidos em memória
+"""
+
+import os
+import json
+import math
+import time
+import uuid
+import threading
+import functools
+import contextvars
+from contextlib import contextmanager
+from collections import deque
+from datetime import datetime
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+# --- SINKS ---
+
+class MemoriaSink:
+    """Mantém os últimos traces em um buffer circular."""
+
+    def __init__(self, capacidade=1000):
+        self._traces = deque(maxlen=capacidade)
+
+    def emitir(self, trace):
+        self._traces.append(trace)
+
+    def traces(self):
+        """Retorna uma cópia dos traces em memória (mais antigo primeiro)."""
+        return list(self._traces)
+
+
+class JsonlSink:
+    """Acrescenta cada trace como uma linha em um arquivo JSONL."""
+
+    def __init__(self, caminho="traces.jsonl"):
+        self.caminho = caminho
+        self._lock = threading.Lock()
+
+    def emitir(self, trace):
+        linha = json.dumps(trace, ensure_ascii=False, default=str)
+        with self._lock:
+            with open(self.caminho, 'a', encoding='utf-8') as f:
+                f.write(linha + "\n")
+
+
+_sinks = []
+
+def configurar_sinks(sinks):
+    """Substitui os sinks ativos (lista vazia desativa a instrumentação)."""
+    global _sinks
+    _sinks = list(sinks)
+
+def adicionar_sink(sink):
+    """Adiciona um sink aos já configurados."""
+    configurar_sinks(_sinks + [sink])
+
+def ativo():
+    """Indica se há algum sink recebendo traces."""
+    return bool(_sinks)
+
+def obter_sink_memoria():
+    """Retorna o primeiro sink em memória configurado, se houver."""
+    for sink in _sinks:
+        if isinstance(sink, MemoriaSink):
+            return sink
+    return None
+
+def _configurar_pelo_ambiente():
+    """Cria os sinks a partir de TRACE_SINK / TRACE_FILE / TRACE_BUFFER_SIZE."""
+    sinks = []
+    for nome in os.getenv("TRACE_SINK", "memoria").split(","):
+        nome = nome.strip().lower()
+        if nome == "memoria":
+            sinks.append(MemoriaSink(int(os.getenv("TRACE_BUFFER_SIZE", "1000"))))
+        elif nome == "jsonl":
+            sinks.append(JsonlSink(os.getenv("TRACE_FILE", "traces.jsonl")))
+    configurar_sinks(sinks)
+
+_configurar_pelo_ambiente()
+
+# --- TRACE ---
+
+class Trace:
+    """Dados coletados durante uma requisição."""
+
+    def __init__(self, **atributos):
+        self.trace_id = uuid.uuid4().hex
+        self.inicio = time.perf_counter()
+        self.inicio_iso = datetime.now().isoformat()
+        self.atributos = atributos
+        self.spans = []
+        self.eventos = []
+        self.contadores = {
+            "llm_chamadas": 0,
+            "tokens_prompt": 0,
+            "tokens_completion": 0,
+            "embeddings": 0,
+            "cache_hits": 0,
+            "cache_misses": 0,
+        }
+        self._lock = threading.Lock()
+
+    def adicionar_span(self, tipo, nome, inicio, fim, **atributos):
+        span = {
+            "tipo": tipo,
+            "nome": nome,
+            "inicio_ms": round((inicio - self.inicio) * 1000, 3),
+            "duracao_ms": round((fim - inicio) * 1000, 3),
+        }
+        span.update(atributos)
+        with self._lock:
+            self.spans.append(span)
+
+    def adicionar_evento(self, tipo, nome, **atributos):
+        evento = {"tipo": tipo, "nome": nome, "t_ms": round((time.perf_counter() - self.inicio) * 1000, 3)}
+        evento.update(atributos)
+        with self._lock:
+            self.eventos.append(evento)
+
+    def incrementar(self, contador, valor=1):
+        with self._lock:
+            self.contadores[contador] = self.contadores.get(contador, 0) + valor
+
+    def finalizar(self, **atributos):
+        """Converte o trace em dicionário serializável."""
+        self.atributos.update(atributos)
+        return {
+            "trace_id": self.trace_id,
+            "inicio": self.inicio_iso,
+            "duracao_ms": round((time.perf_counter() - self.inicio) * 1000, 3),
+            "atributos": self.atributos,
+            "spans": self.spans,
+            "eventos": self.eventos,
+            "contadores": self.contadores,
+        }
+
+_trace_atual = contextvars.ContextVar("trace_atual", default=None)
+
+def trace_atual():
+    """Retorna o trace da requisição em andamento (ou None)."""
+    return _trace_atual.get()
+
+@contextmanager
+def trace_requisicao(**atributos):
+    """
+    Abre um trace para a requisição e o emite aos sinks ao final.
+
+    Sem sinks configurados, apenas executa o bloco (retorna None).
+    """
+    if not _sinks:
+        yield None
+        return
+
+    trace = Trace(**atributos)
+    token = _trace_atual.set(trace)
+    erro = None
+    try:
+        yield trace
+    except BaseException as e:
+        erro = repr(e)
+        raise
+    finally:
+        _trace_atual.reset(token)
+        dados = trace.finalizar(**({"erro": erro} if erro else {}))
+        for sink in _sinks:
+            try:
+                sink.emitir(dados)
+            except Exception as e:
+                print(f"Erro ao emitir trace: {e}")
+
+@contextmanager
+def medir(tipo, nome, **atributos):
+    """Mede a duração do bloco como um span do trace atual."""
+    trace = _trace_atual.get()
+    if trace is None:
+        yield None
+        return
+
+    inicio = time.perf_counter()
+    extras = dict(atributos)
+    try:
+        yield extras
+    finally:
+        trace.adicionar_span(tipo, nome, inicio, time.perf_counter(), **extras)
+
+def registrar_evento(tipo, nome, **atributos):
+    """Registra um evento pontual no trace atual."""
+    trace = _trace_atual.get()
+    if trace is not None:
+        trace.adicionar_evento(tipo, nome, **atributos)
+
+def registrar_cache(nome, hit):
+    """Registra um acerto ou falha de cache no trace atual."""
+    trace = _trace_atual.get()
+    if trace is not None:
+        trace.incrementar("cache_hits" if hit else "cache_misses")
+        trace.adicionar_evento("cache", nome, hit=hit)
+
+def registrar_embeddings(quantidade=1):
+    """Contabiliza chamadas de embedding no trace atual."""
+    trace = _trace_atual.get()
+    if trace is not None:
+        trace.incrementar("embeddings", quantidade)
+
+def registrar_chamada_llm(uso=None):
+    """
+    Contabiliza uma chamada feita fora do LangChain (ex.: cliente OpenAI direto).
+
+    Args:
+        uso: Objeto `usage` da resposta da OpenAI, quando existir
+    """
+    trace = _trace_atual.get()
+    if trace is not None:
+        trace.incrementar("llm_chamadas")
+        trace.incrementar("tokens_prompt", getattr(uso, "prompt_tokens", 0) or 0)
+        trace.incrementar("tokens_completion", getattr(uso, "completion_tokens", 0) or 0)
+
+# --- NÓS DO GRAFO ---
+
+def rastrear_no(nome, func):
+    """Envolve um nó síncrono do grafo registrando seu tempo de parede."""
+    @functools.wraps(func)
+    def wrapper(state):
+        if _trace_atual.get() is None:
+            return func(state)
+        with medir("no", nome):
+            return func(state)
+    return wrapper
+
+def arastrear_no(nome, afunc):
+    """Envolve um nó assíncrono do grafo registrando seu tempo de parede."""
+    @functools.wraps(afunc)
+    async def wrapper(state):
+        if _trace_atual.get() is None:
+            return await afunc(state)
+        with medir("no", nome):
+            return await afunc(state)
+    return wrapper
+
+# --- CALLBACK DO LANGCHAIN ---
+
+class CallbackTracing(BaseCallbackHandler):
+    """Registra latência e tokens de cada chamada de LLM feita via LangChain."""
+
+    run_inline = True
+
+    def __init__(self, trace):
+        self.trace = trace
+        self._inicios = {}
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._inicios[run_id] = (time.perf_counter(), _nome_modelo(serialized, kwargs))
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._inicios[run_id] = (time.perf_counter(), _nome_modelo(serialized, kwargs))
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        inicio, modelo = self._inicios.pop(run_id, (None, "llm"))
+        if inicio is None:
+            return
+        tokens_prompt, tokens_completion = extrair_tokens(response)
+        self.trace.incrementar("llm_chamadas")
+        self.trace.incrementar("tokens_prompt", tokens_prompt)
+        self.trace.incrementar("tokens_completion", tokens_completion)
+        self.trace.adicionar_span(
+            "llm", modelo, inicio, time.perf_counter(),
+            tokens_prompt=tokens_prompt, tokens_completion=tokens_completion,
+        )
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        inicio, modelo = self._inicios.pop(run_id, (None, "llm"))
+        if inicio is not None:
+            self.trace.adicionar_span("llm", modelo, inicio, time.perf_counter(), erro=repr(error))
+
+def _nome_modelo(serialized, kwargs):
+    """Extrai o nome do modelo dos metadados do callback."""
+    parametros = kwargs.get("invocation_params") or {}
+    return parametros.get("model") or parametros.get("model_name") or (serialized or {}).get("name", "llm")
+
+def extrair_tokens(response):
+    """Lê o uso de tokens do LLMResult (llm_output ou usage_metadata da mensagem)."""
+    uso = (response.llm_output or {}).get("token_usage") or {}
+    if uso:
+        return uso.get("prompt_tokens", 0) or 0, uso.get("completion_tokens", 0) or 0
+    tokens_prompt = tokens_completion = 0
+    for geracoes in response.generations:
+        for geracao in geracoes:
+            metadata = getattr(getattr(geracao, "message", None), "usage_metadata", None) or {}
+            tokens_prompt += metadata.get("input_tokens", 0)
+            tokens_completion += metadata.get("output_tokens", 0)
+    return tokens_prompt, tokens_completion
+
+def callbacks_da_requisicao(trace):
+    """Retorna a configuração de callbacks para `invoke`/`ainvoke` do grafo."""
+    if trace is None:
+        return {}
+    return {"callbacks": [CallbackTracing(trace)]}
+
+# --- AGREGAÇÃO ---
+
+def percentil(valores, p):
+    """Percentil por posição mais próxima (p entre 0 e 100)."""
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    indice = max(0, min(len(ordenados) - 1, math.ceil(p / 100 * len(ordenados)) - 1))
+    return ordenados[indice]
+
+def resumo_por_span(traces, tipo="no"):
+    """
+    Agrega p50/p95 da duração dos spans de um tipo.
+
+    Returns:
+        dict: {nome: {"n", "p50_ms", "p95_ms"}}
+    """
+    duracoes = {}
+    for trace in traces:
+        for span in trace.get("spans", []):
+            if span["tipo"] == tipo:
+                duracoes.setdefault(span["nome"], []).append(span["duracao_ms"])
+    return {
+        nome: {
+            "n": len(valores),
+            "p50_ms": percentil(valores, 50),
+            "p95_ms": percentil(valores, 95),
+        }
+        for nome, valores in sorted(duracoes.items())
+    }
+
+def resumo_requisicoes(traces):
+    """Agrega latência total, tokens e cache das requisições."""
+    duracoes = [t["duracao_ms"] for t in traces]
+    totais = {}
+    for trace in traces:
+        for contador, valor in trace.get("contadores", {}).items():
+            totais[contador] = totais.get(contador, 0) + valor
+    consultas_cache = totais.get("cache_hits", 0) + totais.get("cache_misses", 0)
+    return {
+        "requisicoes": len(traces),
+        "p50_ms": percentil(duracoes, 50),
+        "p95_ms": percentil(duracoes, 95),
+        "taxa_cache": totais.get("cache_hits", 0) / consultas_cache if consultas_cache else 0.0,
+        **totais,
+    }